@@ -0,0 +1,70 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Compares the run time of a circuit which is compiled by the default engine
+list and simulated by the Simulator, with and without an AsyncEngine in front
+of the Simulator.
+
+Usage:
+    python benchmarks/async_pipeline.py [--num-qubits 20] [--num-gates 5000]
+"""
+
+import argparse
+import random
+import time
+
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import AsyncEngine
+from projectq.ops import All, CNOT, H, Measure, Rx, Rz, Toffoli
+import projectq.setups.default
+
+
+def run(num_qubits, num_gates, asynchronous, buffer_size, seed=0):
+    engine_list = projectq.setups.default.get_engine_list()
+    if asynchronous:
+        engine_list.append(AsyncEngine())
+    eng = MainEngine(Simulator(), engine_list,
+                     buffer_size=buffer_size)
+    rng = random.Random(seed)
+    start = time.time()
+    qureg = eng.allocate_qureg(num_qubits)
+    for _ in range(num_gates):
+        a, b, c = rng.sample(range(num_qubits), 3)
+        choice = rng.random()
+        if choice < 0.3:
+            CNOT | (qureg[a], qureg[b])
+        elif choice < 0.35:
+            Toffoli | (qureg[a], qureg[b], qureg[c])
+        else:
+            rng.choice([H, Rx(0.3), Rz(0.1)]) | qureg[a]
+    All(Measure) | qureg
+    eng.flush()
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-qubits", type=int, default=20)
+    parser.add_argument("--num-gates", type=int, default=5000)
+    args = parser.parse_args()
+
+    print("{:>12} {:>10} {:>10}".format("buffer_size", "sync [s]",
+                                        "async [s]"))
+    for buffer_size in [None, 100]:
+        print("{:>12} {:>10.2f} {:>10.2f}".format(
+            str(buffer_size),
+            run(args.num_qubits, args.num_gates, False, buffer_size),
+            run(args.num_qubits, args.num_gates, True, buffer_size)))
@@ -0,0 +1,84 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Streams commands through a MainEngine and reports the throughput (commands
+per second) and the memory used per stored command.
+
+Usage:
+    python benchmarks/command_stream.py [--num-commands 1000000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from projectq import MainEngine
+from projectq.cengines import DummyEngine
+from projectq.meta import Compute, Uncompute
+from projectq.ops import CNOT, H, Rz
+
+
+def stream(eng, qureg, num_commands):
+    """
+    Apply num_commands gates (H, CNOT, Rz and compute/uncompute sections)
+    to the qureg.
+    """
+    n = len(qureg)
+    count = 0
+    i = 0
+    while count < num_commands:
+        H | qureg[i % n]
+        CNOT | (qureg[i % n], qureg[(i + 1) % n])
+        Rz(0.1 * (i % 100)) | qureg[(i + 2) % n]
+        with Compute(eng):
+            H | qureg[(i + 3) % n]
+        Uncompute(eng)
+        count += 5
+        i += 1
+    eng.flush()
+    return count
+
+
+def run(num_commands, num_qubits=16):
+    # throughput: commands are discarded by the backend
+    eng = MainEngine(DummyEngine(), [])
+    qureg = eng.allocate_qureg(num_qubits)
+    start = time.time()
+    count = stream(eng, qureg, num_commands)
+    elapsed = time.time() - start
+    print("Throughput: {:.0f} commands/s ({} commands in {:.2f}s)"
+          .format(count / elapsed, count, elapsed))
+    del qureg, eng
+    gc.collect()
+
+    # memory: the backend keeps all commands
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [])
+    qureg = eng.allocate_qureg(num_qubits)
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    count = stream(eng, qureg, num_commands)
+    memory = tracemalloc.get_traced_memory()[0] - start_memory
+    tracemalloc.stop()
+    print("Memory: {:.1f} bytes/command ({:.1f} MB for {} commands)"
+          .format(memory / float(count), memory / 2. ** 20, count))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-commands", type=int, default=10 ** 6)
+    args = parser.parse_args()
+    run(args.num_commands)
@@ -0,0 +1,86 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures how many commands per second the CommandRecorder writes to and the
+CommandReplayer reads from a binary command stream file.
+
+Usage:
+    python benchmarks/command_stream_file.py [--num-commands 500000]
+"""
+
+import argparse
+import io
+import random
+import time
+
+from projectq import MainEngine
+from projectq.backends import CommandRecorder, CommandReplayer
+from projectq.cengines import BasicEngine
+from projectq.ops import Command, H, Rz, X
+
+
+class CountingEngine(BasicEngine):
+    """ Backend which only counts the commands it receives. """
+    def __init__(self):
+        BasicEngine.__init__(self)
+        self.num_commands = 0
+
+    def is_available(self, cmd):
+        return True
+
+    def receive(self, command_list):
+        self.num_commands += len(command_list)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-commands", type=int, default=500000)
+    parser.add_argument("--num-qubits", type=int, default=20)
+    args = parser.parse_args()
+
+    stream = io.BytesIO()
+    recorder = CommandRecorder(stream)
+    eng = MainEngine(CountingEngine(), [recorder])
+    qureg = eng.allocate_qureg(args.num_qubits)
+    rng = random.Random(0)
+    commands = []
+    for _ in range(args.num_commands):
+        a, b = rng.sample(range(args.num_qubits), 2)
+        choice = rng.random()
+        if choice < 0.3:
+            commands.append(Command(eng, X, ([qureg[b]],), [qureg[a]]))
+        elif choice < 0.6:
+            commands.append(Command(eng, Rz(rng.random()), ([qureg[a]],)))
+        else:
+            commands.append(Command(eng, H, ([qureg[a]],)))
+
+    start = time.time()
+    for i in range(0, len(commands), 1000):
+        recorder.receive(commands[i:i + 1000])
+    recorder.close()
+    elapsed = time.time() - start
+    del commands
+    print("record: {:.0f} commands/s ({:.1f} bytes/command)".format(
+        args.num_commands / elapsed,
+        len(stream.getvalue()) / float(args.num_commands)))
+
+    replayer = CommandReplayer()
+    backend = CountingEngine()
+    MainEngine(backend, [replayer])
+    stream.seek(0)
+    start = time.time()
+    replayer.replay(stream)
+    elapsed = time.time() - start
+    print("replay: {:.0f} commands/s".format(backend.num_commands / elapsed))
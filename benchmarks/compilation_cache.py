@@ -0,0 +1,73 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures the time it takes to submit the same circuit repeatedly to a compiler
+pipeline with a mapper, with and without a CompilationCache.
+
+Usage:
+    python benchmarks/compilation_cache.py [--num-jobs 200] [--num-gates 200]
+"""
+
+import argparse
+import random
+import time
+
+import projectq.setups.decompositions
+from projectq import MainEngine
+from projectq.cengines import (AutoReplacer, CompilationCache,
+                               DecompositionRuleSet, DummyEngine,
+                               InstructionFilter, LinearMapper,
+                               LocalOptimizer, TagRemover)
+from projectq.ops import All, CNOT, H, Measure, Rz, Toffoli
+
+
+def run(num_jobs, num_gates, num_qubits, cache, seed=0):
+    rule_set = DecompositionRuleSet(modules=[projectq.setups.decompositions])
+    engine_list = [TagRemover(), LocalOptimizer(m=10), AutoReplacer(rule_set),
+                   InstructionFilter(lambda eng, cmd:
+                                     len(cmd.control_qubits) <= 1),
+                   LocalOptimizer(m=10), LinearMapper(num_qubits=num_qubits)]
+    if cache:
+        engine_list.insert(0, CompilationCache())
+    eng = MainEngine(DummyEngine(), engine_list)
+    start = time.time()
+    for _ in range(num_jobs):
+        rng = random.Random(seed)
+        qureg = eng.allocate_qureg(num_qubits)
+        for _ in range(num_gates):
+            a, b, c = rng.sample(range(num_qubits), 3)
+            choice = rng.random()
+            if choice < 0.3:
+                CNOT | (qureg[a], qureg[b])
+            elif choice < 0.35:
+                Toffoli | (qureg[a], qureg[b], qureg[c])
+            else:
+                rng.choice([H, Rz(0.1)]) | qureg[a]
+        All(Measure) | qureg
+        eng.flush(deallocate_qubits=True)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-jobs", type=int, default=200)
+    parser.add_argument("--num-gates", type=int, default=200)
+    parser.add_argument("--num-qubits", type=int, default=8)
+    args = parser.parse_args()
+
+    elapsed_off = run(args.num_jobs, args.num_gates, args.num_qubits, False)
+    elapsed_on = run(args.num_jobs, args.num_gates, args.num_qubits, True)
+    print("without cache: {:.2f}s, with cache: {:.2f}s ({:.1f}x)".format(
+        elapsed_off, elapsed_on, elapsed_off / elapsed_on))
@@ -0,0 +1,70 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Decomposes Toffoli gates (and their inverses) into CNOTs and single-qubit
+gates using the AutoReplacer and the default decomposition rules, and
+reports the number of Toffoli gates decomposed per second (best of
+several runs), with and without decomposition templates.
+
+Usage:
+    python benchmarks/decomposition.py [--num-toffolis 100000] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import projectq.setups.decompositions
+from projectq import MainEngine
+from projectq.cengines import (AutoReplacer, DecompositionRuleSet,
+                               DummyEngine, InstructionFilter)
+from projectq.meta import Dagger, get_control_count
+from projectq.ops import Toffoli
+
+
+def is_available(eng, cmd):
+    return get_control_count(cmd) <= 1 and len(cmd.qubits[0]) == 1
+
+
+def run(num_toffolis, template_cache_size=0):
+    """
+    Return the time it takes to decompose num_toffolis Toffoli gates.
+    """
+    rule_set = DecompositionRuleSet(modules=[projectq.setups.decompositions])
+    backend = DummyEngine()
+    replacer = AutoReplacer(rule_set, template_cache_size=template_cache_size)
+    eng = MainEngine(backend, [replacer,
+                               InstructionFilter(is_available)])
+    qureg = eng.allocate_qureg(3)
+    start = time.time()
+    for i in range(num_toffolis // 2):
+        Toffoli | (qureg[0], qureg[1], qureg[2])
+        with Dagger(eng):
+            Toffoli | (qureg[1], qureg[2], qureg[0])
+    eng.flush()
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-toffolis", type=int, default=10 ** 5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for template_cache_size in [0, 100]:
+        elapsed = min(run(args.num_toffolis, template_cache_size)
+                      for _ in range(args.repeat))
+        print("template_cache_size={}: {:.0f} Toffoli gates/s "
+              "({} Toffoli gates in {:.2f}s)".format(
+                  template_cache_size, args.num_toffolis / elapsed,
+                  args.num_toffolis, elapsed))
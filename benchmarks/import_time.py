@@ -0,0 +1,54 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures the time it takes to import ProjectQ in a fresh interpreter (after
+numpy, whose import time does not depend on ProjectQ).
+
+Usage:
+    python benchmarks/import_time.py [--num-runs 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+_SCRIPT = """
+import time
+import numpy
+start = time.time()
+import projectq
+import projectq.backends, projectq.cengines, projectq.ops
+print(time.time() - start)
+"""
+
+
+def run(root):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([root, env.get("PYTHONPATH", "")])
+    output = subprocess.check_output([sys.executable, "-c", _SCRIPT],
+                                     env=env, cwd=root)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times = [run(root) for _ in range(args.num_runs)]
+    print("import projectq: best {:.3f}s, mean {:.3f}s".format(
+        min(times), sum(times) / len(times)))
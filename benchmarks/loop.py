@@ -0,0 +1,87 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Compares executing loops in the Simulator and the ResourceCounter with
+unrolling them in the LoopEngine: run time of a small loop body (which the
+Simulator executes as a single gate) and of a loop body with an ancilla.
+
+Usage:
+    python benchmarks/loop.py [--num-iterations 10000] [--num-qubits 10]
+"""
+
+import argparse
+import time
+
+from projectq import MainEngine
+from projectq.backends import ResourceCounter, Simulator
+from projectq.meta import Control, Loop
+from projectq.ops import All, CNOT, H, Measure, Rx, Rz
+
+
+def small_loop(eng, qureg, num_iterations):
+    """
+    Loop with two gates on two qubits.
+    """
+    with Loop(eng, num_iterations):
+        CNOT | (qureg[0], qureg[1])
+        Rx(0.1) | qureg[0]
+
+
+def ancilla_loop(eng, qureg, num_iterations):
+    """
+    Loop which computes the parity of all qubits into an ancilla.
+    """
+    with Loop(eng, num_iterations):
+        ancilla = eng.allocate_qubit()
+        for qubit in qureg:
+            CNOT | (qubit, ancilla)
+        with Control(eng, ancilla):
+            Rz(0.1) | qureg[0]
+        for qubit in reversed(qureg):
+            CNOT | (qubit, ancilla)
+        del ancilla
+
+
+def run(backend, loop, num_qubits, num_iterations):
+    eng = MainEngine(backend, [])
+    qureg = eng.allocate_qureg(num_qubits)
+    All(H) | qureg
+    start = time.time()
+    loop(eng, qureg, num_iterations)
+    eng.flush()
+    elapsed = time.time() - start
+    All(Measure) | qureg
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-iterations", type=int, default=10000)
+    parser.add_argument("--num-qubits", type=int, default=10)
+    args = parser.parse_args()
+
+    print("{:>16} {:>8} {:>10} {:>10}".format("backend", "loop",
+                                              "unrolled", "loop-aware"))
+    for backend_class in [Simulator, ResourceCounter]:
+        for loop in [small_loop, ancilla_loop]:
+            times = []
+            for unroll in [True, False]:
+                backend = backend_class()
+                if unroll:
+                    backend.is_meta_tag_handler = lambda tag: False
+                times.append(run(backend, loop, args.num_qubits,
+                                 args.num_iterations))
+            print("{:>16} {:>8} {:>10.2f} {:>10.2f}".format(
+                backend_class.__name__, loop.__name__.split("_")[0],
+                times[0], times[1]))
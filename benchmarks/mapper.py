@@ -0,0 +1,108 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Compares the default mapping strategies of the LinearMapper and the
+GridMapper with the lookahead SabreRouter, and the GraphMapper on the same
+grid: number of swaps and compile time on random circuits and on the QFT.
+
+Usage:
+    python benchmarks/mapper.py [--num-qubits 16] [--num-gates 2000]
+"""
+
+import argparse
+import math
+import random
+import time
+
+import networkx as nx
+
+from projectq import MainEngine
+from projectq.cengines import (DummyEngine, GraphMapper, GridMapper,
+                               LinearMapper, SabreRouter)
+from projectq.meta import Control
+from projectq.ops import CNOT, H, R, Rz, T
+
+
+def random_circuit(eng, num_qubits, num_gates, seed=0):
+    """
+    Random circuit of CNOTs (half of the gates) and single-qubit gates.
+    """
+    rng = random.Random(seed)
+    qureg = eng.allocate_qureg(num_qubits)
+    for _ in range(num_gates):
+        if rng.random() < 0.5:
+            a, b = rng.sample(range(num_qubits), 2)
+            CNOT | (qureg[a], qureg[b])
+        else:
+            rng.choice([H, T, Rz(0.1)]) | qureg[rng.randrange(num_qubits)]
+    eng.flush()
+
+
+def qft_circuit(eng, num_qubits, num_gates=None):
+    """
+    Quantum Fourier transform with controlled phase gates.
+    """
+    qureg = eng.allocate_qureg(num_qubits)
+    for i in range(num_qubits):
+        H | qureg[i]
+        for j in range(i + 1, num_qubits):
+            with Control(eng, qureg[j]):
+                R(math.pi / (1 << (j - i))) | qureg[i]
+    eng.flush()
+
+
+def run(mapper, circuit, num_qubits, num_gates):
+    """
+    Return the number of swaps and the time it takes to map the circuit.
+    """
+    eng = MainEngine(DummyEngine(), [mapper])
+    start = time.time()
+    circuit(eng, num_qubits, num_gates)
+    elapsed = time.time() - start
+    num_swaps = sum(num * count for num, count in
+                    mapper.num_of_swaps_per_mapping.items())
+    return num_swaps, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-qubits", type=int, default=16)
+    parser.add_argument("--num-gates", type=int, default=2000)
+    parser.add_argument("--lookahead", type=int, default=20)
+    args = parser.parse_args()
+
+    num_rows = int(math.sqrt(args.num_qubits))
+    num_columns = args.num_qubits // num_rows
+    mappers = [
+        ("LinearMapper", lambda router: LinearMapper(args.num_qubits,
+                                                     router=router)),
+        ("GridMapper", lambda router: GridMapper(num_rows, num_columns,
+                                                 router=router)),
+        ("GraphMapper", lambda router: GraphMapper(
+            nx.convert_node_labels_to_integers(
+                nx.grid_2d_graph(num_rows, num_columns)), router=router))]
+    print("{:>13} {:>7} {:>8} {:>8} {:>10}".format(
+        "mapper", "circuit", "router", "swaps", "time [s]"))
+    for name, make_mapper in mappers:
+        for circuit in [random_circuit, qft_circuit]:
+            for router in [None, SabreRouter(lookahead=args.lookahead)]:
+                if router is None and name == "GraphMapper":
+                    continue  # always routes with a SabreRouter
+                num_swaps, elapsed = run(make_mapper(router), circuit,
+                                         num_rows * num_columns,
+                                         args.num_gates)
+                print("{:>13} {:>7} {:>8} {:>8} {:>10.2f}".format(
+                    name, circuit.__name__.split("_")[0],
+                    "sabre" if router else "default", num_swaps, elapsed))
@@ -0,0 +1,83 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Compares the LocalOptimizer, the PeepholeOptimizer and the
+CommutationOptimizer for several window sizes m: run time and number of gates
+sent on to the backend.
+
+Usage:
+    python benchmarks/optimizer.py [--num-gates 20000] [--num-qubits 8]
+"""
+
+import argparse
+import random
+import time
+
+from projectq import MainEngine
+from projectq.cengines import (CommutationOptimizer, DummyEngine,
+                               LocalOptimizer, PeepholeOptimizer)
+from projectq.ops import (ClassicalInstructionGate, CNOT, H, Rx, Rz, S, Sdag,
+                          T, Tdag, X)
+
+
+def circuit(eng, num_qubits, num_gates, seed):
+    """
+    Random circuit which contains inverse pairs and mergeable rotations
+    separated by other gates.
+    """
+    rng = random.Random(seed)
+    gates = [H, X, S, Sdag, T, Tdag, Rx(0.1), Rz(0.2), Rz(-0.2)]
+    qureg = eng.allocate_qureg(num_qubits)
+    for _ in range(num_gates):
+        if rng.random() < 0.2:
+            a, b = rng.sample(range(num_qubits), 2)
+            CNOT | (qureg[a], qureg[b])
+        else:
+            rng.choice(gates) | qureg[rng.randrange(num_qubits)]
+    eng.flush()
+    return qureg
+
+
+def run(optimizer, num_qubits, num_gates, seed=0):
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [optimizer])
+    start = time.time()
+    circuit(eng, num_qubits, num_gates, seed)
+    elapsed = time.time() - start
+    num_sent = sum(1 for cmd in backend.received_commands
+                   if not isinstance(cmd.gate, ClassicalInstructionGate))
+    return elapsed, num_sent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-gates", type=int, default=20000)
+    parser.add_argument("--num-qubits", type=int, default=8)
+    parser.add_argument("--max-local-window", type=int, default=1000,
+                        help="largest window size to run the LocalOptimizer "
+                        "with (it is quadratic in m)")
+    args = parser.parse_args()
+
+    print("{:>20} {:>7} {:>10} {:>10}".format("engine", "m", "time [s]",
+                                              "gates"))
+    for m in [10, 100, 1000, 10000]:
+        engines = [PeepholeOptimizer, CommutationOptimizer]
+        if m <= args.max_local_window:
+            engines.insert(0, LocalOptimizer)
+        for engine in engines:
+            elapsed, num_sent = run(engine(m=m), args.num_qubits,
+                                    args.num_gates)
+            print("{:>20} {:>7} {:>10.2f} {:>10}".format(
+                engine.__name__, m, elapsed, num_sent))
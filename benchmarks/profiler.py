@@ -0,0 +1,77 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures the overhead of MainEngine(profile=True) on a compiler pipeline with
+an optimizer and an AutoReplacer (which decomposes Toffoli gates), with and
+without buffering in the MainEngine, and prints the profile of the last run.
+
+Usage:
+    python benchmarks/profiler.py [--num-gates 20000] [--num-qubits 10]
+"""
+
+import argparse
+import random
+import time
+
+import projectq.setups.decompositions
+from projectq import MainEngine
+from projectq.cengines import (AutoReplacer, DecompositionRuleSet,
+                               DummyEngine, InstructionFilter,
+                               PeepholeOptimizer, TagRemover)
+from projectq.ops import CNOT, H, Rz, Toffoli
+
+
+def run(num_qubits, num_gates, buffer_size, profile, seed=0):
+    rule_set = DecompositionRuleSet(modules=[projectq.setups.decompositions])
+    engine_list = [TagRemover(), PeepholeOptimizer(), AutoReplacer(rule_set),
+                   InstructionFilter(lambda eng, cmd:
+                                     len(cmd.control_qubits) <= 1),
+                   TagRemover()]
+    eng = MainEngine(DummyEngine(), engine_list, buffer_size=buffer_size,
+                     profile=profile)
+    rng = random.Random(seed)
+    qureg = eng.allocate_qureg(num_qubits)
+    start = time.time()
+    for _ in range(num_gates):
+        a, b, c = rng.sample(range(num_qubits), 3)
+        choice = rng.random()
+        if choice < 0.3:
+            CNOT | (qureg[a], qureg[b])
+        elif choice < 0.35:
+            Toffoli | (qureg[a], qureg[b], qureg[c])
+        else:
+            rng.choice([H, Rz(0.1)]) | qureg[a]
+    eng.flush()
+    return time.time() - start, eng.profiler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-gates", type=int, default=20000)
+    parser.add_argument("--num-qubits", type=int, default=10)
+    args = parser.parse_args()
+
+    print("{:>12} {:>10} {:>10} {:>9}".format("buffer_size", "off [s]",
+                                              "on [s]", "overhead"))
+    for buffer_size in [None, 100]:
+        elapsed_off, _ = run(args.num_qubits, args.num_gates, buffer_size,
+                             False)
+        elapsed_on, profiler = run(args.num_qubits, args.num_gates,
+                                   buffer_size, True)
+        print("{:>12} {:>10.2f} {:>10.2f} {:>8.0f}%".format(
+            str(buffer_size), elapsed_off, elapsed_on,
+            100. * (elapsed_on / elapsed_off - 1)))
+    print()
+    print(profiler)
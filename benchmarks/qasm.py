@@ -0,0 +1,66 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Measures how many gates per second the QASMWriter writes to and read_qasm
+reads from an OpenQASM 2.0 file.
+
+Usage:
+    python benchmarks/qasm.py [--num-gates 200000] [--num-qubits 20]
+"""
+
+import argparse
+import io
+import random
+import time
+
+from projectq import MainEngine
+from projectq.backends import QASMWriter, read_qasm
+from projectq.cengines import DummyEngine
+from projectq.ops import CNOT, H, Rz
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-gates", type=int, default=200000)
+    parser.add_argument("--num-qubits", type=int, default=20)
+    args = parser.parse_args()
+
+    stream = io.StringIO()
+    writer = QASMWriter(stream, num_qubits=args.num_qubits)
+    eng = MainEngine(writer, [], buffer_size=1000)
+    qureg = eng.allocate_qureg(args.num_qubits)
+    rng = random.Random(0)
+    start = time.time()
+    for _ in range(args.num_gates):
+        a, b = rng.sample(range(args.num_qubits), 2)
+        choice = rng.random()
+        if choice < 0.3:
+            CNOT | (qureg[a], qureg[b])
+        elif choice < 0.6:
+            Rz(rng.random()) | qureg[a]
+        else:
+            H | qureg[a]
+    eng.flush()
+    writer.close()
+    elapsed = time.time() - start
+    print("write: {:.0f} gates/s".format(args.num_gates / elapsed))
+
+    eng = MainEngine(DummyEngine(), [], buffer_size=1000)
+    stream.seek(0)
+    start = time.time()
+    read_qasm(stream, eng)
+    eng.flush()
+    elapsed = time.time() - start
+    print("read: {:.0f} gates/s".format(args.num_gates / elapsed))
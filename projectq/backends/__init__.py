@@ -18,17 +18,31 @@ Contains back-ends for ProjectQ.
 This includes:
 
 * a debugging tool to print all received commands (CommandPrinter)
+* engines which record commands to a file in a compact binary format and
+  replay them (CommandRecorder and CommandReplayer)
+* an engine which writes commands to an OpenQASM 2.0 file (QASMWriter) and a
+  function which reads such files (read_qasm)
 * a circuit drawing engine (which can be used anywhere within the compilation
   chain)
 * a simulator with emulation capabilities
+* a batch simulator running one circuit on many state vectors at once
+* a matrix-product-state simulator for weakly entangled circuits
+* a sparse state-vector simulator for circuits with few nonzero amplitudes
+* noise models (Pauli, depolarizing, amplitude-damping and readout errors)
+  which are simulated using quantum trajectories
 * a resource counter (counts gates and keeps track of the maximal width of the
   circuit)
 * an interface to the IBM Quantum Experience chip (and simulator).
 * an interface to the AQT trapped ion system (and simulator).
 """
 from ._printer import CommandPrinter
+from ._commandstream import CommandRecorder, CommandReplayer
+from ._qasm import QASMWriter, read_qasm
 from ._circuits import CircuitDrawer, CircuitDrawerMatplotlib
-from ._sim import Simulator, ClassicalSimulator
+from ._sim import (Simulator, ClassicalSimulator, BatchSimulator,
+                   MPSSimulator, SparseSimulator, PauliChannel,
+                   DepolarizingChannel, AmplitudeDampingChannel, ReadoutError,
+                   NoiseModel, NoisySimulator, run_trajectories)
 from ._resource import ResourceCounter
 from ._ibm import IBMBackend
 from ._aqt import AQTBackend
@@ -21,7 +21,19 @@ from projectq.meta import get_control_count, LogicalQubitIDTag
 from projectq.ops import (Rx, Ry, Rxx, Measure, Allocate, Barrier, Deallocate,
                           FlushGate)
 
-from ._aqt_http_client import send, retrieve
+
+# The http client imports requests, which is loaded on first use only so that
+# importing ProjectQ stays fast.
+def send(*args, **kwargs):
+    """ Send a circuit through the AQT API (see _aqt_http_client.send). """
+    from ._aqt_http_client import send as _send
+    return _send(*args, **kwargs)
+
+
+def retrieve(*args, **kwargs):
+    """ Retrieve a job from the AQT API (see _aqt_http_client.retrieve). """
+    from ._aqt_http_client import retrieve as _retrieve
+    return _retrieve(*args, **kwargs)
 
 
 # _rearrange_result & _format_counts imported and modified from qiskit
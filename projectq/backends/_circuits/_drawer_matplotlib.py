@@ -23,7 +23,25 @@ import itertools
 from projectq.cengines import LastEngineException, BasicEngine
 from projectq.ops import (FlushGate, Measure, Allocate, Deallocate)
 from projectq.meta import get_control_count
-from projectq.backends._circuits import to_draw
+
+# ==============================================================================
+
+
+def to_draw(qubit_lines, qubit_labels=None, drawing_order=None, **kwargs):
+    """
+    Draw the circuit using matplotlib.
+
+    Wrapper around projectq.backends._circuits._plot.to_draw, which is
+    imported on first use so that importing ProjectQ does not load
+    matplotlib.
+
+    Returns:
+        A tuple with (figure, axes)
+    """
+    from projectq.backends._circuits._plot import to_draw as _to_draw
+    return _to_draw(qubit_lines, qubit_labels=qubit_labels,
+                    drawing_order=drawing_order, **kwargs)
+
 
 # ==============================================================================
 
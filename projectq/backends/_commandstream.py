@@ -0,0 +1,728 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains compiler engines which store the commands they receive in a file
+using a compact binary format (see CommandRecorder) and which send the
+commands stored in such a file to the next engines (see CommandReplayer).
+
+File format:
+    The file starts with the 5 bytes ``b"PQCS\\x02"`` (magic number and
+    version), followed by a sequence of records. All integers are unsigned
+    varints (7 bits per byte, least significant group first, the most
+    significant bit of a byte is set if more bytes follow). Each record
+    starts with a varint head = (index << 2) | (has_controls << 1) |
+    has_tags.
+
+    * If index is 0, the record adds an entry to the table of gates and tags:
+      varint n, followed by n bytes which are the entry. If the first of
+      these bytes is ``b"L"``, the entry is stored by name: the remaining
+      bytes are the UTF-8 encoded Python literal of the tuple (kind, value),
+      where gates and tags are dicts with the name of their class and their
+      constructor arguments (see _to_literal). If it is ``b"P"``, the
+      remaining bytes are the pickled tuple (only if pickling was allowed
+      when the stream was recorded).
+    * Otherwise, the record is a command whose gate is the table entry
+      index - 1. If the entry is a class of parametrized gates (e.g., Rz),
+      the angle follows as a little-endian double. Then follow the number of
+      quantum registers, and for each register its length and the qubit ids
+      (each id is stored as id + 1, such that the id -1 of flush gates fits
+      into a varint). If has_controls is set, the number of control qubits
+      and their ids follow. If has_tags is set, the number of tags and for
+      each tag its table index follow (and, for LogicalQubitIDTags, the
+      logical qubit id).
+"""
+
+import ast
+import gc
+import numbers
+import pickle
+import struct
+
+import numpy
+
+from projectq.cengines import BasicEngine, LastEngineException
+from projectq.meta import (ComputeTag, DirtyQubitTag, LogicalQubitIDTag,
+                           UncomputeTag)
+from projectq.ops import (AllocateDirtyQubitGate, AllocateQubitGate,
+                          BarrierGate, BasicPhaseGate, BasicRotationGate,
+                          Command, ControlledGate, DaggeredGate,
+                          DeallocateQubitGate, EntangleGate, FlipBits,
+                          FlushGate, HGate, MatrixGate, MeasureGate, Ph,
+                          QFTGate, R, Rx, Rxx, Ry, Ryy, Rz, Rzz, SGate,
+                          SqrtSwapGate, SqrtXGate, SwapGate, TGate, Tensor,
+                          XGate, YGate, ZGate)
+from projectq.types import WeakQubitRef
+
+_MAGIC = b"PQCS\x02"
+_DOUBLE = struct.Struct('<d')
+
+# kinds of the table entries
+_GATE = 0
+_PARAMETRIZED_GATE = 1  # class of gates, the angle is stored per command
+_TAG = 2
+_LOGICAL_QUBIT_ID_TAG = 3  # the logical qubit id is stored per command
+
+
+def _write_varint(buf, value):
+    """
+    Append a non-negative integer to a bytearray as a varint.
+    """
+    while value > 127:
+        buf.append((value & 127) | 128)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(data, pos):
+    """
+    Read a varint from a bytearray.
+
+    Returns:
+        Tuple (value, position after the varint).
+
+    Raises:
+        IndexError: If the data ends in the middle of the varint.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 127) << shift
+        if byte < 128:
+            return value, pos
+        shift += 7
+
+
+def _no_arguments(obj):
+    return ()
+
+
+def _angle(gate):
+    return (gate.angle,)
+
+
+def _inner_gate(gate):
+    return (gate._gate,)
+
+
+# gate and tag classes which are stored by name, and the functions which
+# return the constructor arguments of their instances
+_KNOWN_CLASSES = [
+    (HGate, _no_arguments), (XGate, _no_arguments), (YGate, _no_arguments),
+    (ZGate, _no_arguments), (SGate, _no_arguments), (TGate, _no_arguments),
+    (SqrtXGate, _no_arguments), (SwapGate, _no_arguments),
+    (SqrtSwapGate, _no_arguments), (EntangleGate, _no_arguments),
+    (FlushGate, _no_arguments), (MeasureGate, _no_arguments),
+    (AllocateQubitGate, _no_arguments), (DeallocateQubitGate, _no_arguments),
+    (AllocateDirtyQubitGate, _no_arguments), (BarrierGate, _no_arguments),
+    (QFTGate, _no_arguments),
+    (Ph, _angle), (Rx, _angle), (Ry, _angle), (Rz, _angle), (Rxx, _angle),
+    (Ryy, _angle), (Rzz, _angle), (R, _angle),
+    (MatrixGate, lambda gate: (gate.matrix,)),
+    (FlipBits, lambda gate: (gate.bits_to_flip,)),
+    (DaggeredGate, _inner_gate), (Tensor, _inner_gate),
+    (ControlledGate, lambda gate: (gate._gate, gate._n)),
+    (ComputeTag, _no_arguments), (UncomputeTag, _no_arguments),
+    (DirtyQubitTag, _no_arguments)]
+_CLASSES_BY_NAME = None  # name -> class
+_ARGUMENTS_BY_CLASS = None  # class -> (name, function returning arguments)
+
+
+def _get_known_classes():
+    """
+    Return the dicts which map the names of the known classes to the
+    classes, and the classes to their names and the functions which return
+    the constructor arguments of their instances.
+    """
+    global _CLASSES_BY_NAME, _ARGUMENTS_BY_CLASS
+    if _CLASSES_BY_NAME is None:
+        # (imported here, as projectq.libs.math depends on the compiler
+        # engines, which depend on the back-ends)
+        from projectq.libs.math import (AddConstant, AddConstantModN,
+                                        MultiplyByConstantModN)
+        known = _KNOWN_CLASSES + [
+            (AddConstant, lambda gate: (gate.a,)),
+            (AddConstantModN, lambda gate: (gate.a, gate.N)),
+            (MultiplyByConstantModN, lambda gate: (gate.a, gate.N))]
+        _ARGUMENTS_BY_CLASS = dict((cls, (cls.__name__, get_arguments))
+                                   for cls, get_arguments in known)
+        _CLASSES_BY_NAME = dict((cls.__name__, cls) for cls, _ in known)
+    return _CLASSES_BY_NAME, _ARGUMENTS_BY_CLASS
+
+
+class _UnknownClassError(Exception):
+    pass
+
+
+def _to_literal(obj):
+    """
+    Return a Python literal which represents the object, where instances of
+    the known classes are represented as dicts {'class': name, 'args':
+    constructor arguments}, numpy arrays as dicts {'array': entries} and
+    complex numbers as dicts {'complex': (real, imag)}.
+
+    Raises:
+        _UnknownClassError: If the object (or one of the arguments) is an
+            instance of an unknown class.
+    """
+    if obj is None or isinstance(obj, (bool, str)):
+        return obj
+    if isinstance(obj, numbers.Integral):
+        return int(obj)
+    if isinstance(obj, numbers.Real):
+        return float(obj)
+    if isinstance(obj, numbers.Complex):
+        # (the literal of a complex number doesn't keep the sign of zero)
+        return {'complex': (float(obj.real), float(obj.imag))}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_literal(item) for item in obj)
+    if isinstance(obj, numpy.ndarray):
+        return {'array': _to_literal(obj.tolist())}
+    entry = _get_known_classes()[1].get(type(obj))
+    if entry is None:
+        raise _UnknownClassError(type(obj).__name__)
+    name, get_arguments = entry
+    return {'class': name,
+            'args': tuple(_to_literal(arg) for arg in get_arguments(obj))}
+
+
+def _get_class(name):
+    """
+    Return the known class with the given name.
+
+    Raises:
+        ValueError: If there is no such class.
+    """
+    cls = _get_known_classes()[0].get(name)
+    if cls is None:
+        raise ValueError("Unknown class '{}' in the command stream."
+                         .format(name))
+    return cls
+
+
+def _from_literal(value):
+    """
+    Return the object which is represented by a literal of _to_literal.
+
+    Raises:
+        ValueError: If the literal contains an unknown class.
+    """
+    if isinstance(value, dict):
+        if 'array' in value:
+            return numpy.array(_from_literal(value['array']))
+        if 'complex' in value:
+            return complex(*value['complex'])
+        cls = _get_class(value['class'])
+        return cls(*[_from_literal(arg) for arg in value['args']])
+    if isinstance(value, (list, tuple)):
+        return type(value)(_from_literal(item) for item in value)
+    return value
+
+
+def _encode_entry(kind, value, allow_pickle):
+    """
+    Return the bytes which store a table entry (see module documentation).
+
+    Raises:
+        TypeError: If the entry contains an instance of an unknown class and
+            allow_pickle is False.
+    """
+    try:
+        if kind == _PARAMETRIZED_GATE:
+            if value not in _get_known_classes()[1]:
+                raise _UnknownClassError(value.__name__)
+            literal = value.__name__
+        else:
+            literal = _to_literal(value)
+        return b"L" + repr((kind, literal)).encode('utf-8')
+    except _UnknownClassError as err:
+        if not allow_pickle:
+            raise TypeError("The class {} cannot be stored by name. Use "
+                            "CommandRecorder(..., allow_pickle=True) to store "
+                            "it using pickle.".format(err))
+        return b"P" + pickle.dumps((kind, value), 2)
+
+
+def _decode_entry(data, allow_pickle):
+    """
+    Return the table entry (kind, value) stored in the bytes data.
+
+    Raises:
+        ValueError: If the entry is pickled and allow_pickle is False, or if
+            it contains an unknown class.
+    """
+    if data[:1] == b"P":
+        if not allow_pickle:
+            raise ValueError("The command stream contains pickled gates or "
+                             "tags. Only if it comes from a trusted source, "
+                             "replay it using "
+                             "CommandReplayer(allow_pickle=True).")
+        return pickle.loads(data[1:])
+    kind, value = ast.literal_eval(data[1:].decode('utf-8'))
+    if kind == _PARAMETRIZED_GATE:
+        return kind, _get_class(value)
+    return kind, _from_literal(value)
+
+
+def _is_parametrized(gate):
+    """
+    Return True if the gate is determined by its class and its (real-valued)
+    angle.
+    """
+    cls = type(gate)
+    return ((cls.__init__ is BasicRotationGate.__init__ or
+             cls.__init__ is BasicPhaseGate.__init__) and
+            isinstance(gate.angle, float))
+
+
+class _CommandEncoder(object):
+    """
+    Encodes commands into the binary format (see module documentation).
+    """
+    def __init__(self, allow_pickle=False):
+        """
+        Args:
+            allow_pickle (bool): If True, gates and tags of unknown classes
+                are stored using pickle.
+        """
+        self._allow_pickle = allow_pickle
+        self._num_entries = 0
+        # id(gate) -> (head, gate) for the gates stored in self._gates, the
+        # gate is kept alive such that its id is not reused
+        self._gates_by_id = dict()
+        self._gates = dict()  # gate (or its entry if unhashable) -> head
+        self._classes = dict()  # class of parametrized gates -> head
+        self._tags = dict()  # entry of the tag -> index
+        self._logical_qubit_id_tag = None  # index of the LogicalQubitIDTag
+
+    def _add_entry(self, buf, data):
+        """
+        Append a record which adds an entry (encoded by _encode_entry) to the
+        table and return its index (counted from 1).
+        """
+        buf.append(0)
+        _write_varint(buf, len(data))
+        buf.extend(data)
+        self._num_entries += 1
+        return self._num_entries
+
+    def _get_gate_head(self, buf, gate):
+        """
+        Return the head of a command with the given gate (without the flags)
+        and whether the gate is parametrized, adding the gate to the table if
+        necessary.
+        """
+        if _is_parametrized(gate):
+            cls = type(gate)
+            head = self._classes.get(cls)
+            if head is None:
+                data = _encode_entry(_PARAMETRIZED_GATE, cls,
+                                     self._allow_pickle)
+                head = self._add_entry(buf, data) << 2
+                self._classes[cls] = head
+            return head, True
+        data = None
+        try:
+            head = self._gates.get(gate)
+            key = gate
+        except TypeError:  # unhashable gate
+            key = data = _encode_entry(_GATE, gate, self._allow_pickle)
+            head = self._gates.get(key)
+        if head is None:
+            if data is None:
+                data = _encode_entry(_GATE, gate, self._allow_pickle)
+            head = self._add_entry(buf, data) << 2
+            self._gates[key] = head
+            # only the instance which is stored anyway (e.g., a singleton
+            # such as H) takes the fast path, as caching the id of every
+            # instance would keep all of them alive
+            if key is gate:
+                self._gates_by_id[id(gate)] = (head, gate)
+        return head, False
+
+    def _get_tag_values(self, buf, tags):
+        """
+        Return the varints which encode the given tags (adding the tags to
+        the table if necessary).
+        """
+        values = [len(tags)]
+        for tag in tags:
+            if isinstance(tag, LogicalQubitIDTag):
+                if self._logical_qubit_id_tag is None:
+                    self._logical_qubit_id_tag = self._add_entry(
+                        buf, _encode_entry(_LOGICAL_QUBIT_ID_TAG, None,
+                                           self._allow_pickle))
+                values.append(self._logical_qubit_id_tag)
+                values.append(tag.logical_qubit_id + 1)
+            else:
+                data = _encode_entry(_TAG, tag, self._allow_pickle)
+                index = self._tags.get(data)
+                if index is None:
+                    index = self._add_entry(buf, data)
+                    self._tags[data] = index
+                values.append(index)
+        return values
+
+    def encode(self, buf, commands):
+        """
+        Append the records of the given commands (and of the new table
+        entries) to a bytearray.
+
+        Args:
+            buf (bytearray): Buffer to append the records to.
+            commands (list<Command>): Commands to encode.
+        """
+        gates_by_id = self._gates_by_id
+        for cmd in commands:
+            gate = cmd.gate
+            entry = gates_by_id.get(id(gate))
+            if entry is None:
+                head, parametrized = self._get_gate_head(buf, gate)
+            else:
+                head, parametrized = entry[0], False
+            controls = cmd.control_qubits
+            tags = cmd.tags
+            if controls:
+                head |= 2
+            if tags:
+                # (new table entries have to precede the command)
+                tag_values = self._get_tag_values(buf, tags)
+                head |= 1
+            if head < 128:
+                buf.append(head)
+            else:
+                _write_varint(buf, head)
+            if parametrized:
+                buf.extend(_DOUBLE.pack(gate.angle))
+            quregs = cmd.qubits
+            _write_varint(buf, len(quregs))
+            for qureg in quregs + ((controls,) if controls else ()):
+                _write_varint(buf, len(qureg))
+                for qubit in qureg:
+                    qubit_id = qubit.id + 1
+                    if qubit_id < 128:
+                        buf.append(qubit_id)
+                    else:
+                        _write_varint(buf, qubit_id)
+            if tags:
+                for value in tag_values:
+                    _write_varint(buf, value)
+
+
+class _CommandDecoder(object):
+    """
+    Decodes commands from the binary format (see module documentation).
+    """
+    def __init__(self, engine, allow_pickle=False):
+        """
+        Args:
+            engine (BasicEngine): Engine of the qubits of the decoded
+                commands (usually the MainEngine).
+            allow_pickle (bool): If True, pickled table entries are loaded.
+        """
+        self._engine = engine
+        self._allow_pickle = allow_pickle
+        self._entries = [None]  # (kind, value), counted from 1
+        self._qubits = dict()  # qubit id + 1 -> WeakQubitRef
+
+    def _get_qubit(self, stored_id):
+        """
+        Return the (shared) WeakQubitRef of the qubit with the given stored
+        id (i.e., qubit id + 1).
+        """
+        qubit = WeakQubitRef(self._engine, stored_id - 1)
+        self._qubits[stored_id] = qubit
+        return qubit
+
+    def decode(self, data, pos, commands):
+        """
+        Decode the records in data, starting at position pos, and append the
+        decoded commands to a list.
+
+        Returns:
+            The position of the first record which is incomplete (or the
+            length of data).
+        """
+        entries = self._entries
+        engine = self._engine
+        qubits = self._qubits
+        get_qubit = self._get_qubit
+        new_command = Command.__new__
+        end = len(data)
+        while pos < end:
+            start = pos
+            try:
+                head = data[pos]
+                pos += 1
+                if head > 127:
+                    head, pos = _read_varint(data, start)
+                index = head >> 2
+                if index == 0:
+                    length, pos = _read_varint(data, pos)
+                    if pos + length > end:
+                        return start
+                    entries.append(_decode_entry(bytes(data[pos:pos +
+                                                            length]),
+                                                 self._allow_pickle))
+                    pos += length
+                    continue
+                kind, gate = entries[index]
+                if kind == _PARAMETRIZED_GATE:
+                    angle, = _DOUBLE.unpack_from(data, pos)
+                    pos += 8
+                    gate = gate(angle)
+                num_quregs = data[pos]
+                pos += 1
+                if num_quregs > 127:
+                    num_quregs, pos = _read_varint(data, pos - 1)
+                quregs = []
+                for _ in range(num_quregs + ((head >> 1) & 1)):
+                    length = data[pos]
+                    pos += 1
+                    if length > 127:
+                        length, pos = _read_varint(data, pos - 1)
+                    qureg = []
+                    for _ in range(length):
+                        qubit_id = data[pos]
+                        pos += 1
+                        if qubit_id > 127:
+                            qubit_id, pos = _read_varint(data, pos - 1)
+                        qubit = qubits.get(qubit_id)
+                        if qubit is None:
+                            qubit = get_qubit(qubit_id)
+                        qureg.append(qubit)
+                    quregs.append(qureg)
+                controls = quregs.pop() if head & 2 else []
+                tags = []
+                if head & 1:
+                    num_tags, pos = _read_varint(data, pos)
+                    for _ in range(num_tags):
+                        tag_index, pos = _read_varint(data, pos)
+                        kind, tag = entries[tag_index]
+                        if kind == _LOGICAL_QUBIT_ID_TAG:
+                            logical_id, pos = _read_varint(data, pos)
+                            tag = LogicalQubitIDTag(logical_id - 1)
+                        tags.append(tag)
+            except (IndexError, struct.error):  # incomplete record
+                return start
+            # the recorded qubits are already in the order in which Command
+            # stores them, so the (costly) constructor is bypassed
+            cmd = new_command(Command)
+            cmd.gate = gate
+            cmd.tags = tags
+            cmd._qubits = tuple(quregs)
+            cmd._control_qubits = controls
+            cmd._engine = engine
+            commands.append(cmd)
+        return pos
+
+
+class CommandRecorder(BasicEngine):
+    """
+    CommandRecorder is a compiler engine which writes the commands it
+    receives to a file (in the binary format described in
+    projectq.backends._commandstream) prior to sending them on to the next
+    compiler engine.
+
+    The commands are buffered and written to the file at every flush (and
+    whenever the buffer is full). The gates and meta tags are stored by the
+    name of their class and their constructor arguments, which is supported
+    for the gates and tags of ProjectQ (e.g., H, Rx(0.5), get_inverse(QFT),
+    MatrixGate, AddConstant or ComputeTag). Other gates and tags can only be
+    stored if pickling is allowed explicitly.
+
+    Example:
+        .. code-block:: python
+
+            recorder = CommandRecorder("circuit.pqcs")
+            eng = MainEngine(Simulator(), get_engine_list() + [recorder])
+            ...
+            eng.flush()
+            recorder.close()
+    """
+    def __init__(self, file, buffer_size=1 << 16, allow_pickle=False):
+        """
+        Initialize a CommandRecorder.
+
+        Args:
+            file (str|file): Name of the file, or a file object opened in
+                binary mode.
+            buffer_size (int): Number of bytes after which the buffer is
+                written to the file.
+            allow_pickle (bool): If True, gates and tags which cannot be
+                stored by name are stored using pickle. Such streams can only
+                be replayed with CommandReplayer(allow_pickle=True).
+        """
+        BasicEngine.__init__(self)
+        if isinstance(file, str):
+            self._file = open(file, 'wb')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._buffer_size = buffer_size
+        self._buffer = bytearray(_MAGIC)
+        self._encoder = _CommandEncoder(allow_pickle)
+
+    def is_available(self, cmd):
+        """
+        Specialized implementation of is_available: Returns True if the
+        CommandRecorder is the last engine (since it can record any command).
+
+        Args:
+            cmd (Command): Command of which to check availability.
+        """
+        try:
+            return BasicEngine.is_available(self, cmd)
+        except LastEngineException:
+            return True
+
+    def _write(self):
+        """
+        Write the buffer to the file.
+        """
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self):
+        """
+        Write the remaining commands to the file and close it (if the
+        CommandRecorder opened it).
+        """
+        if self._file is None:
+            return
+        self._write()
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._file = None
+
+    def receive(self, command_list):
+        """
+        Receive a list of commands from the previous engine, write them to
+        the file and send them on to the next engine.
+
+        Args:
+            command_list (list<Command>): List of commands to record.
+        """
+        if self._file is not None:  # (i.e., not closed)
+            self._encoder.encode(self._buffer, command_list)
+            has_flush = any(isinstance(cmd.gate, FlushGate)
+                            for cmd in command_list)
+            if has_flush or len(self._buffer) >= self._buffer_size:
+                self._write()
+                if has_flush:
+                    self._file.flush()
+        if not self.is_last_engine:
+            self.send(command_list)
+
+
+class CommandReplayer(BasicEngine):
+    """
+    CommandReplayer is a compiler engine which sends the commands stored in
+    a file by a CommandRecorder to the next engines.
+
+    Example:
+        .. code-block:: python
+
+            replayer = CommandReplayer()
+            eng = MainEngine(Simulator(), [replayer])
+            replayer.replay("circuit.pqcs")
+
+    Note:
+        The commands are replayed with the qubit ids with which they were
+        recorded, i.e., the qubits are not known to the MainEngine, and the
+        measurement results of the replayed commands can be accessed with
+        eng.get_measurement_result(WeakQubitRef(eng, qubit_id)).
+    """
+    def __init__(self, chunk_size=1 << 16, allow_pickle=False):
+        """
+        Initialize a CommandReplayer.
+
+        Args:
+            chunk_size (int): Number of bytes which are read from the file at
+                once. The commands of each chunk are sent on as one list (and
+                up to each flush gate).
+            allow_pickle (bool): If True, gates and tags which were stored
+                using pickle are loaded. Loading pickled data can execute
+                arbitrary code, so only allow it for trusted command streams.
+        """
+        BasicEngine.__init__(self)
+        self._chunk_size = chunk_size
+        self._allow_pickle = allow_pickle
+
+    def replay(self, file):
+        """
+        Send the commands stored in a file to the next engine.
+
+        Args:
+            file (str|file): Name of the file, or a file object opened in
+                binary mode.
+
+        Raises:
+            ValueError: If the file is not a command stream, if it ends in
+                the middle of a record, or if it contains pickled gates or
+                tags and allow_pickle is False.
+        """
+        if isinstance(file, str):
+            with open(file, 'rb') as stream_file:
+                self._replay(stream_file)
+        else:
+            self._replay(file)
+
+    def _replay(self, file):
+        if bytes(file.read(len(_MAGIC))) != _MAGIC:
+            raise ValueError("The file is not a command stream (or was "
+                             "written by an incompatible version).")
+        decoder = _CommandDecoder(self.main_engine, self._allow_pickle)
+        data = bytearray()
+        while True:
+            chunk = file.read(self._chunk_size)
+            data.extend(chunk)
+            commands = []
+            # the decoded commands don't contain reference cycles, so the
+            # cyclic garbage collector (which would run many times while
+            # they are created) is paused
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                pos = decoder.decode(data, 0, commands)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            del data[:pos]
+            start = 0
+            for i, cmd in enumerate(commands):
+                if isinstance(cmd.gate, FlushGate):
+                    self.send(commands[start:i + 1])
+                    start = i + 1
+            if start < len(commands):
+                self.send(commands[start:])
+            if not chunk:
+                if len(data) > 0:
+                    raise ValueError("The command stream ends in the middle "
+                                     "of a record.")
+                return
+
+    def receive(self, command_list):
+        """
+        Send on the commands received from the previous engine.
+
+        Args:
+            command_list (list<Command>): List of commands.
+        """
+        self.send(command_list)
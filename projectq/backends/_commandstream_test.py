@@ -0,0 +1,222 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Tests for projectq.backends._commandstream.py.
+"""
+
+import io
+import os
+
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import DummyEngine, LinearMapper
+from projectq.libs.math import AddConstant, AddConstantModN
+from projectq.meta import ComputeTag, DirtyQubitTag, LogicalQubitIDTag
+from projectq.ops import (All, BasicGate, C, CNOT, Command, FlipBits,
+                          get_inverse, H, MatrixGate, Measure, Ph, QFT, Rx, S,
+                          Swap, Tensor, Toffoli, X)
+from projectq.types import WeakQubitRef
+
+from projectq.backends import _commandstream
+
+
+class UnhashableGate(BasicGate):
+    __hash__ = None
+
+    def __str__(self):
+        return "UnhashableGate"
+
+
+def record(engine_list, circuit, **kwargs):
+    """ Record the commands of a circuit and return the stream and backend. """
+    stream = io.BytesIO()
+    recorder = _commandstream.CommandRecorder(stream, **kwargs)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, engine_list + [recorder])
+    circuit(eng)
+    eng.flush()
+    recorder.close()
+    return stream.getvalue(), backend.received_commands
+
+
+def replay(data, **kwargs):
+    replayer = _commandstream.CommandReplayer(**kwargs)
+    backend = DummyEngine(save_commands=True)
+    MainEngine(backend, [replayer])
+    replayer.replay(io.BytesIO(data))
+    return backend.received_commands
+
+
+def circuit(eng):
+    qureg = eng.allocate_qureg(3)
+    H | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    Toffoli | (qureg[0], qureg[1], qureg[2])
+    Swap | (qureg[0], qureg[2])
+    Rx(0.25) | qureg[1]
+    Rx(0.5) | qureg[1]
+    Ph(1.5) | qureg[2]
+    MatrixGate([[0, 1j], [-1j, 0]]) | qureg[0]
+    get_inverse(S) | qureg[1]
+    AddConstant(3) | qureg
+    AddConstantModN(1, 5) | qureg
+    FlipBits([1, 0, 1]) | qureg
+    eng.send([Command(eng, C(Rx(0.5), 2), (qureg[:2], [qureg[2]]))])
+    eng.send([Command(eng, Tensor(H), (qureg,))])
+    eng.send([Command(eng, X, ([qureg[0]],),
+                      tags=[ComputeTag(), DirtyQubitTag()])])
+    eng.send([Command(eng, X, ([qureg[1]],), tags=[ComputeTag()])])
+    All(Measure) | qureg
+
+
+def test_command_stream_round_trip():
+    data, received = record([], circuit)
+    assert data.startswith(b"PQCS\x02")
+    # the gates and tags are stored by name
+    assert b"pickle" not in data and b"\x80\x02" not in data
+    replayed = replay(data)
+    assert len(replayed) == len(received)
+    for cmd, expected in zip(replayed, received):
+        assert type(cmd.gate) is type(expected.gate)
+        assert str(cmd) == str(expected)
+        assert cmd.tags == expected.tags
+        assert cmd.engine is replayed[0].engine
+    # the gate table stores each gate once, and angles are stored per command
+    assert data.count(b"MatrixGate") == 1
+    assert data.count(b"'Rx'") == 2  # parametrized and controlled
+
+
+def test_command_stream_math_gate():
+    def math_circuit(eng):
+        qureg = eng.allocate_qureg(3)
+        AddConstant(3) | qureg
+        All(Measure) | qureg
+
+    data, _ = record([], math_circuit)
+    replayer = _commandstream.CommandReplayer()
+    eng = MainEngine(Simulator(), [replayer])
+    replayer.replay(io.BytesIO(data))
+    results = [eng.get_measurement_result(WeakQubitRef(eng, qubit_id))
+               for qubit_id in range(3)]
+    assert results == [1, 1, 0]
+
+
+def test_command_stream_pickle():
+    def custom_circuit(eng):
+        qureg = eng.allocate_qureg(2)
+        UnhashableGate() | qureg[0]
+        UnhashableGate() | qureg[1]
+        All(Measure) | qureg
+
+    with pytest.raises(TypeError):
+        record([], custom_circuit)
+    data, received = record([], custom_circuit, allow_pickle=True)
+    with pytest.raises(ValueError):
+        replay(data)
+    replayed = replay(data, allow_pickle=True)
+    assert [str(cmd) for cmd in replayed] == [str(cmd) for cmd in received]
+    # the unhashable gates are stored once
+    assert data.count(b"UnhashableGate") == 1
+
+
+def test_command_stream_chunks():
+    data, received = record([], circuit)
+    replayed = replay(data, chunk_size=3)
+    assert [str(cmd) for cmd in replayed] == [str(cmd) for cmd in received]
+
+
+def test_command_stream_large_ids():
+    def large_circuit(eng):
+        qureg = eng.allocate_qureg(300)
+        for qubit in qureg[1:]:
+            CNOT | (qureg[0], qubit)
+        All(Measure) | qureg
+
+    data, received = record([], large_circuit)
+    replayed = replay(data)
+    assert [str(cmd) for cmd in replayed] == [str(cmd) for cmd in received]
+
+
+def test_command_stream_gate_table_bounded():
+    def repeated_circuit(eng):
+        qureg = eng.allocate_qureg(2)
+        for _ in range(1000):
+            H | qureg[0]
+            get_inverse(QFT) | qureg  # a new gate instance every time
+        All(Measure) | qureg
+
+    stream = io.BytesIO()
+    recorder = _commandstream.CommandRecorder(stream)
+    eng = MainEngine(DummyEngine(), [recorder])
+    repeated_circuit(eng)
+    eng.flush()
+    encoder = recorder._encoder
+    # Allocate, H, QFT^-1, Measure, Deallocate and the FlushGate
+    assert len(encoder._gates) == 6
+    assert len(encoder._gates_by_id) <= len(encoder._gates)
+    recorder.close()
+    replayed = replay(stream.getvalue())
+    assert sum(1 for cmd in replayed
+               if cmd.gate == get_inverse(QFT)) == 1000
+
+
+def test_command_stream_mapper_simulator():
+    def measured_circuit(eng):
+        qureg = eng.allocate_qureg(3)
+        X | qureg[0]
+        CNOT | (qureg[0], qureg[2])
+        All(Measure) | qureg
+
+    data, received = record([LinearMapper(num_qubits=3)], measured_circuit)
+    assert any(isinstance(tag, LogicalQubitIDTag)
+               for cmd in received for tag in cmd.tags)
+    replayer = _commandstream.CommandReplayer()
+    eng = MainEngine(Simulator(), [replayer])
+    replayer.replay(io.BytesIO(data))
+    results = [eng.get_measurement_result(WeakQubitRef(eng, qubit_id))
+               for qubit_id in range(3)]
+    assert results == [1, 0, 1]
+
+
+def test_command_stream_files(tmpdir):
+    filename = os.path.join(str(tmpdir), "circuit.pqcs")
+    recorder = _commandstream.CommandRecorder(filename, buffer_size=4)
+    dummy = DummyEngine(save_commands=True)
+    eng = MainEngine(recorder, [dummy])
+    assert recorder.is_available(Command(eng, H, (eng.allocate_qubit(),)))
+    circuit(eng)
+    eng.flush()
+    recorder.close()
+    recorder.close()  # no effect
+    num_recorded = len(dummy.received_commands)
+    # commands after closing are not recorded
+    H | eng.allocate_qubit()
+    eng.flush()
+    replayer = _commandstream.CommandReplayer()
+    backend = DummyEngine(save_commands=True)
+    MainEngine(backend, [replayer])
+    replayer.replay(filename)
+    assert ([str(cmd) for cmd in backend.received_commands] ==
+            [str(cmd) for cmd in dummy.received_commands[:num_recorded]])
+
+
+def test_command_stream_invalid():
+    with pytest.raises(ValueError):
+        replay(b"ABCDE")
+    data, _ = record([], circuit)
+    with pytest.raises(ValueError):
+        replay(data[:-3])
@@ -36,7 +36,19 @@ from projectq.ops import (NOT,
                           Barrier,
                           FlushGate)
 
-from ._ibm_http_client import send, retrieve
+
+# The http client imports requests, which is loaded on first use only so that
+# importing ProjectQ stays fast.
+def send(*args, **kwargs):
+    """ Send a circuit through the IBM API (see _ibm_http_client.send). """
+    from ._ibm_http_client import send as _send
+    return _send(*args, **kwargs)
+
+
+def retrieve(*args, **kwargs):
+    """ Retrieve a job from the IBM API (see _ibm_http_client.retrieve). """
+    from ._ibm_http_client import retrieve as _retrieve
+    return _retrieve(*args, **kwargs)
 
 
 class IBMBackend(BasicEngine):
@@ -81,7 +93,7 @@ class IBMBackend(BasicEngine):
         self._num_retries = num_retries
         self._interval = interval
         self._probabilities = dict()
-        self.qasm = ""
+        self._qasm = []  # QASM lines (joined by the qasm property)
         self._json=[]
         self._measured_ids = []
         self._allocated_qubits = set()
@@ -109,6 +121,15 @@ class IBMBackend(BasicEngine):
             return True
         return False
 
+    @property
+    def qasm(self):
+        """ QASM representation of the circuit sent to the backend. """
+        return "".join(self._qasm)
+
+    @qasm.setter
+    def qasm(self, qasm):
+        self._qasm = [qasm]
+
     def get_qasm(self):
         """ Return the QASM representation of the circuit sent to the backend.
         Should be called AFTER calling the ibm device """
@@ -131,7 +152,7 @@ class IBMBackend(BasicEngine):
         if self._clear:
             self._probabilities = dict()
             self._clear = False
-            self.qasm = ""
+            self._qasm = []
             self._json=[]
             self._allocated_qubits = set()
 
@@ -156,15 +177,12 @@ class IBMBackend(BasicEngine):
         elif gate == NOT and get_control_count(cmd) == 1:
             ctrl_pos = cmd.control_qubits[0].id
             qb_pos = cmd.qubits[0][0].id
-            self.qasm += "\ncx q[{}], q[{}];".format(ctrl_pos, qb_pos)
+            self._qasm.append("\ncx q[{}], q[{}];".format(ctrl_pos, qb_pos))
             self._json.append({'qubits': [ctrl_pos,  qb_pos], 'name': 'cx'})
         elif gate == Barrier:
             qb_pos = [qb.id for qr in cmd.qubits for qb in qr]
-            self.qasm += "\nbarrier "
-            qb_str = ""
-            for pos in qb_pos:
-                qb_str += "q[{}], ".format(pos)
-            self.qasm += qb_str[:-2] + ";"
+            self._qasm.append("\nbarrier " + ", ".join(
+                "q[{}]".format(pos) for pos in qb_pos) + ";")
             self._json.append({'qubits': qb_pos, 'name': 'barrier'})
         elif isinstance(gate, (Rx, Ry, Rz)):
             assert get_control_count(cmd) == 0
@@ -178,12 +196,12 @@ class IBMBackend(BasicEngine):
             gate_qasm = u_strs[str(gate)[0:2]].format(gate.angle)
             gate_name=u_name[str(gate)[0:2]]
             params= u_angle[str(gate)[0:2]]
-            self.qasm += "\n{} q[{}];".format(gate_qasm, qb_pos)
+            self._qasm.append("\n{} q[{}];".format(gate_qasm, qb_pos))
             self._json.append({'qubits': [qb_pos], 'name': gate_name,'params': params})
         elif gate == H:
             assert get_control_count(cmd) == 0
             qb_pos = cmd.qubits[0][0].id
-            self.qasm += "\nu2(0,pi/2) q[{}];".format(qb_pos)
+            self._qasm.append("\nu2(0,pi/2) q[{}];".format(qb_pos))
             self._json.append({'qubits': [qb_pos], 'name': 'u2','params': [0, 3.141592653589793]})
         else:
             raise Exception('Command not authorized. You should run the circuit with the appropriate ibm setup.')
@@ -257,8 +275,8 @@ class IBMBackend(BasicEngine):
         # finally: add measurements (no intermediate measurements are allowed)
         for measured_id in self._measured_ids:
             qb_loc = self.main_engine.mapper.current_mapping[measured_id]
-            self.qasm += "\nmeasure q[{}] -> c[{}];".format(qb_loc,
-                                                            qb_loc)
+            self._qasm.append("\nmeasure q[{}] -> c[{}];".format(qb_loc,
+                                                                 qb_loc))
             self._json.append({'qubits': [qb_loc], 'name': 'measure','memory':[qb_loc]})
         # return if no operations / measurements have been performed.
         if self.qasm == "":
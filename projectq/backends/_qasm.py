@@ -0,0 +1,621 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains a compiler engine which writes the commands it receives to a file in
+OpenQASM 2.0 (see QASMWriter), and a function which reads an OpenQASM 2.0
+file and sends its gates to a MainEngine (see read_qasm).
+
+Both work incrementally, i.e., neither the text nor the circuit is ever held
+in memory as a whole.
+"""
+
+import ast
+import math
+import operator
+import re
+
+from projectq.cengines import BasicEngine, LastEngineException
+from projectq.ops import (AllocateQubitGate, Barrier, BarrierGate, Command,
+                          DeallocateQubitGate, FlushGate, get_inverse, H,
+                          Measure, MeasureGate, Ph, R, Rx, Rxx, Ry, Rz, Rzz,
+                          S, Sdag, SqrtX, Swap, T, Tdag, X, Y, Z)
+
+#: Names of the gates without parameters, for 0, 1 and 2 control qubits
+_GATE_NAMES = {(H, 0): "h", (X, 0): "x", (Y, 0): "y", (Z, 0): "z",
+               (S, 0): "s", (Sdag, 0): "sdg", (T, 0): "t", (Tdag, 0): "tdg",
+               (SqrtX, 0): "sx", (get_inverse(SqrtX), 0): "sxdg",
+               (Swap, 0): "swap", (X, 1): "cx", (Y, 1): "cy", (Z, 1): "cz",
+               (H, 1): "ch", (Swap, 1): "cswap", (X, 2): "ccx"}
+
+#: Names of the gates with an angle (by class), for 0 and 1 control qubits
+_ROTATION_NAMES = {(Rx, 0): "rx", (Ry, 0): "ry", (Rz, 0): "rz",
+                   (R, 0): "u1", (Rxx, 0): "rxx", (Rzz, 0): "rzz",
+                   (Rx, 1): "crx", (Ry, 1): "cry", (Rz, 1): "crz",
+                   (R, 1): "cu1"}
+
+
+class QASMWriter(BasicEngine):
+    """
+    QASMWriter is a compiler engine which writes the commands it receives to
+    a file in OpenQASM 2.0 prior to sending them on to the next compiler
+    engine.
+
+    As the last engine, it accepts the gates of the standard library
+    qelib1.inc (such that an AutoReplacer decomposes all other gates), i.e.,
+    H, X, Y, Z, S, T, SqrtX (and their inverses), Swap, Rx, Ry, Rz, R, Rxx,
+    Rzz, Ph (global phases are dropped), gates with one control qubit (CNOT,
+    CY, CZ, CH, CSwap, CRx, CRy, CRz, CR, controlled Ph), the Toffoli gate,
+    barriers and measurements. Measurement results are not available if the
+    QASMWriter is the last engine.
+
+    The text is buffered and written to the file at every flush (and
+    whenever the buffer is full).
+
+    Example:
+        .. code-block:: python
+
+            writer = QASMWriter("circuit.qasm", num_qubits=5)
+            eng = MainEngine(writer, projectq.setups.ibm.get_engine_list())
+            ...
+            eng.flush()
+            writer.close()
+
+    Note:
+        If the number of qubits is not known in advance, every qubit is
+        declared as a register of its own (qubit 3 is q3[0]) when it is
+        allocated, since the registers have to be declared before they are
+        used.
+    """
+    def __init__(self, file, num_qubits=None, buffer_size=1 << 16):
+        """
+        Initialize a QASMWriter.
+
+        Args:
+            file (str|file): Name of the file, or a file object opened in
+                text mode.
+            num_qubits (int): Size of the quantum (and classical) register q
+                (and c), or None to declare one register per qubit. The qubit
+                ids have to be smaller than num_qubits (e.g., if there is a
+                mapper).
+            buffer_size (int): Number of characters after which the buffer is
+                written to the file.
+        """
+        BasicEngine.__init__(self)
+        if isinstance(file, str):
+            self._file = open(file, 'w')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._num_qubits = num_qubits
+        self._buffer_size = buffer_size
+        self._buffer = ['OPENQASM 2.0;\ninclude "qelib1.inc";\n']
+        self._buffered = 0
+        if num_qubits is not None:
+            self._buffer.append("qreg q[{0}];\ncreg c[{0}];\n"
+                                .format(num_qubits))
+        self._declared = set()  # ids of the qubits which have a register
+
+    def _is_supported(self, cmd):
+        """
+        Return True if the command can be written in OpenQASM 2.0.
+        """
+        gate = cmd.gate
+        num_controls = len(cmd.control_qubits)
+        if isinstance(gate, (AllocateQubitGate, DeallocateQubitGate,
+                             MeasureGate, BarrierGate)):
+            return num_controls == 0
+        if isinstance(gate, Ph):
+            return num_controls <= 1
+        if type(gate) in (Rx, Ry, Rz, R, Rxx, Rzz):
+            return (type(gate), num_controls) in _ROTATION_NAMES
+        try:
+            return (gate, num_controls) in _GATE_NAMES
+        except TypeError:  # unhashable gate
+            return False
+
+    def is_available(self, cmd):
+        """
+        Specialized implementation of is_available: Returns True if the
+        command can be written in OpenQASM 2.0 (and if the next engine, if
+        any, can handle it).
+
+        Args:
+            cmd (Command): Command of which to check availability.
+        """
+        if not self._is_supported(cmd):
+            return False
+        try:
+            return BasicEngine.is_available(self, cmd)
+        except LastEngineException:
+            return True
+
+    def _get_qubit_name(self, qubit_id):
+        """
+        Return the name of a qubit (declaring its register if necessary).
+        """
+        if self._num_qubits is not None:
+            if qubit_id >= self._num_qubits:
+                raise ValueError("Qubit id {} is not smaller than the number "
+                                 "of qubits {}.".format(qubit_id,
+                                                        self._num_qubits))
+            return "q[{}]".format(qubit_id)
+        if qubit_id not in self._declared:
+            self._declared.add(qubit_id)
+            self._buffer.append("qreg q{0}[1];\ncreg c{0}[1];\n"
+                                .format(qubit_id))
+        return "q{}[0]".format(qubit_id)
+
+    def _write_cmd(self, cmd):
+        """
+        Append the OpenQASM statement of a command to the buffer.
+
+        Raises:
+            ValueError: If the command cannot be written in OpenQASM 2.0.
+        """
+        if not self._is_supported(cmd):
+            raise ValueError("The command {} cannot be written in OpenQASM "
+                             "2.0. Please use an AutoReplacer to decompose "
+                             "it.".format(cmd))
+        gate = cmd.gate
+        if isinstance(gate, DeallocateQubitGate):
+            return
+        if isinstance(gate, AllocateQubitGate):
+            self._get_qubit_name(cmd.qubits[0][0].id)
+            return
+        names = [self._get_qubit_name(qubit.id)
+                 for qubit in cmd.control_qubits]
+        names.extend(self._get_qubit_name(qubit.id)
+                     for qureg in cmd.qubits for qubit in qureg)
+        if isinstance(gate, MeasureGate):
+            for name in names:
+                line = "measure {} -> {};\n".format(name, "c" + name[1:])
+                self._buffer.append(line)
+                self._buffered += len(line)
+            return
+        if isinstance(gate, BarrierGate):
+            line = "barrier {};\n".format(", ".join(names))
+        elif isinstance(gate, Ph):
+            if len(names) == 1:  # global phase
+                return
+            # controlled global phase = phase shift of the control qubit
+            line = "u1({!r}) {};\n".format(gate.angle, names[0])
+        elif type(gate) in (Rx, Ry, Rz, R, Rxx, Rzz):
+            line = "{}({!r}) {};\n".format(
+                _ROTATION_NAMES[type(gate), len(cmd.control_qubits)],
+                gate.angle, ", ".join(names))
+        else:
+            line = "{} {};\n".format(
+                _GATE_NAMES[gate, len(cmd.control_qubits)], ", ".join(names))
+        self._buffer.append(line)
+        self._buffered += len(line)
+
+    def _write(self):
+        """
+        Write the buffer to the file.
+        """
+        self._file.write("".join(self._buffer))
+        self._buffer = []
+        self._buffered = 0
+
+    def close(self):
+        """
+        Write the remaining statements to the file and close it (if the
+        QASMWriter opened it).
+        """
+        if self._file is None:
+            return
+        self._write()
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._file = None
+
+    def receive(self, command_list):
+        """
+        Receive a list of commands from the previous engine, write them to
+        the file and send them on to the next engine.
+
+        Args:
+            command_list (list<Command>): List of commands to write.
+        """
+        if self._file is not None:  # (i.e., not closed)
+            has_flush = False
+            for cmd in command_list:
+                if isinstance(cmd.gate, FlushGate):
+                    has_flush = True
+                else:
+                    self._write_cmd(cmd)
+            if has_flush or self._buffered >= self._buffer_size:
+                self._write()
+                if has_flush:
+                    self._file.flush()
+        if not self.is_last_engine:
+            self.send(command_list)
+
+
+#: Operators and functions which may appear in parameters
+_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub,
+              ast.Mult: operator.mul, ast.Div: operator.truediv,
+              ast.Pow: operator.pow, ast.USub: operator.neg,
+              ast.UAdd: operator.pos}
+_FUNCTIONS = {'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+              'exp': math.exp, 'ln': math.log, 'sqrt': math.sqrt}
+
+
+def _evaluate(node, variables):
+    """
+    Evaluate the syntax tree of a parameter expression.
+    """
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, variables)
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.left, variables),
+                                         _evaluate(node.right, variables))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.operand, variables))
+    if isinstance(node, ast.Name) and node.id in variables:
+        return variables[node.id]
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+            node.func.id in _FUNCTIONS and len(node.args) == 1):
+        return _FUNCTIONS[node.func.id](_evaluate(node.args[0], variables))
+    number = getattr(node, 'n', getattr(node, 'value', None))
+    if isinstance(number, (int, float)) and not isinstance(number, bool):
+        return float(number)
+    raise ValueError("Invalid parameter expression.")
+
+
+def _evaluate_parameter(expression, variables):
+    """
+    Return the value of a parameter expression (e.g., "pi/2" or "-0.5*x").
+    """
+    try:
+        return float(expression)
+    except ValueError:
+        pass
+    try:
+        node = ast.parse(" ".join(expression.split()).replace('^', '**'),
+                         mode='eval')
+    except SyntaxError:
+        raise ValueError("Invalid parameter expression.")
+    return _evaluate(node, variables)
+
+
+def _starts_with_keyword(text, keyword, pos=0):
+    """
+    Return True if the text contains the given keyword at position pos.
+    """
+    end = pos + len(keyword)
+    return (text.startswith(keyword, pos) and
+            (end == len(text) or not (text[end].isalnum() or
+                                      text[end] == "_")))
+
+
+def _iter_statements(lines):
+    """
+    Yield the statements (without the trailing semicolon) and the numbers of
+    the lines on which they start. Gate definitions are yielded as one
+    statement (up to and including the closing brace).
+    """
+    pending = ""
+    start_line = 1
+    line_number = 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.split("//", 1)[0]
+        if not pending:
+            start_line = line_number
+            line = line.lstrip()
+        pending += line
+        pos = 0
+        while True:
+            while pos < len(pending) and pending[pos].isspace():
+                pos += 1
+            if _starts_with_keyword(pending, "gate", pos):
+                end = pending.find("}", pos)
+            else:
+                end = pending.find(";", pos)
+            if end < 0:
+                break
+            yield start_line, pending[pos:end + 1].rstrip(";")
+            pos = end + 1
+            start_line = line_number
+        pending = pending[pos:]
+        if not pending.strip():
+            pending = ""
+    if pending.strip():
+        raise ValueError("Line {}: Missing semicolon at the end of the "
+                         "file.".format(start_line))
+
+
+_STATEMENT = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*"
+                        r"(?:\((?P<params>[^)]*(?:\)[^)]*)*)\))?\s*"
+                        r"(?P<args>.*?)\s*$", re.DOTALL)
+_ARGUMENT = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*"
+                       r"(?:\[\s*(\d+)\s*\])?\s*$")
+
+
+def _split(text):
+    """
+    Split a comma-separated list (e.g., of arguments) into its items.
+    """
+    text = text.strip()
+    return [item.strip() for item in text.split(",")] if text else []
+
+
+def _split_parameters(text):
+    """
+    Split a comma-separated list of parameter expressions, which may contain
+    commas in parentheses.
+    """
+    items = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            items.append(text[start:i].strip())
+            start = i + 1
+    items.append(text[start:].strip())
+    return items if items != [""] else []
+
+
+def _u3(theta, phi, lam):
+    """
+    Return the gates of U3(theta, phi, lambda) = Rz(phi) Ry(theta) Rz(lambda)
+    times the global phase exp(i * (phi + lambda) / 2).
+    """
+    return [Rz(lam), Ry(theta), Rz(phi), Ph((phi + lam) / 2.)]
+
+
+def _make_library():
+    """
+    Return the gates of the standard library as a dict which maps their
+    names to tuples (number of parameters, number of control qubits,
+    function which returns the gates for the given parameters).
+    """
+    library = dict()
+    for (gate, num_controls), name in _GATE_NAMES.items():
+        library[name] = (0, num_controls, (lambda gate: lambda: [gate])(gate))
+    for (cls, num_controls), name in _ROTATION_NAMES.items():
+        library[name] = (1, num_controls,
+                         (lambda cls: lambda angle: [cls(angle)])(cls))
+    library.update({
+        "id": (0, 0, lambda: []),
+        "u0": (1, 0, lambda gamma: []),
+        "p": (1, 0, lambda lam: [R(lam)]),
+        "cp": (1, 1, lambda lam: [R(lam)]),
+        "u2": (2, 0, lambda phi, lam: _u3(math.pi / 2, phi, lam)),
+        "u3": (3, 0, _u3),
+        "u": (3, 0, _u3),
+        "U": (3, 0, _u3),
+        "cu3": (3, 1, _u3),
+        "CX": (0, 1, lambda: [X])})
+    return library
+
+
+_LIBRARY = _make_library()
+
+
+class _QASMReader(object):
+    """
+    Reads OpenQASM 2.0 statements and sends the corresponding commands to a
+    MainEngine.
+    """
+    def __init__(self, engine):
+        self._engine = engine
+        self.qregs = dict()  # name -> Qureg
+        self.cregs = dict()  # name -> list of measured qubits (or None)
+        self._gates = dict()  # name -> (parameters, arguments, body)
+
+    def _get_arguments(self, text):
+        """
+        Return the registers (lists of qubits) of the arguments of a
+        statement. Qubits (e.g., q[0]) are registers of length 1.
+        """
+        registers = []
+        for argument in _split(text):
+            match = _ARGUMENT.match(argument)
+            if match is None or match.group(1) not in self.qregs:
+                raise ValueError("Unknown quantum register in '{}'."
+                                 .format(argument))
+            qureg = self.qregs[match.group(1)]
+            if match.group(2) is None:
+                registers.append(list(qureg))
+            else:
+                index = int(match.group(2))
+                if index >= len(qureg):
+                    raise ValueError("Index out of range in '{}'."
+                                     .format(argument))
+                registers.append([qureg[index]])
+        return registers
+
+    def _broadcast(self, registers):
+        """
+        Return the lists of qubits to which a gate is applied (a gate applied
+        to registers of equal size is applied to each position).
+        """
+        size = max(len(register) for register in registers)
+        if any(len(register) not in (1, size) for register in registers):
+            raise ValueError("The registers have different sizes.")
+        return [[register[0] if len(register) == 1 else register[i]
+                 for register in registers] for i in range(size)]
+
+    def _apply(self, name, parameters, qubits):
+        """
+        Apply a gate of the standard library or a defined gate.
+        """
+        if name in self._gates:
+            names, arguments, body = self._gates[name]
+            if len(names) != len(parameters) or len(arguments) != len(qubits):
+                raise ValueError("Wrong number of parameters or arguments "
+                                 "for gate '{}'.".format(name))
+            variables = dict(zip(names, parameters))
+            variables['pi'] = math.pi
+            qubits = dict(zip(arguments, qubits))
+            for gate_name, expressions, gate_arguments in body:
+                try:
+                    self._apply(gate_name,
+                                [_evaluate_parameter(expression, variables)
+                                 for expression in expressions],
+                                [qubits[argument]
+                                 for argument in gate_arguments])
+                except KeyError as error:
+                    raise ValueError("Unknown argument {} in the definition "
+                                     "of gate '{}'.".format(error, name))
+            return
+        if name not in _LIBRARY:
+            raise ValueError("Unknown gate '{}'.".format(name))
+        num_parameters, num_controls, get_gates = _LIBRARY[name]
+        if len(parameters) != num_parameters:
+            raise ValueError("Wrong number of parameters for gate '{}'."
+                             .format(name))
+        controls = qubits[:num_controls]
+        targets = tuple([qubit] for qubit in qubits[num_controls:])
+        engine = self._engine
+        for gate in get_gates(*parameters):
+            engine.receive([Command(engine, gate, targets, controls)])
+
+    def _define_gate(self, statement):
+        """
+        Store the definition of a gate ("gate name(params) args { body }").
+        """
+        head, body = statement[len("gate"):].split("{", 1)
+        match = _STATEMENT.match(head)
+        if match is None:
+            raise ValueError("Invalid gate definition.")
+        parameters = _split(match.group('params') or "")
+        arguments = _split(match.group('args'))
+        operations = []
+        for operation in body.rstrip("}").split(";"):
+            if not operation.strip():
+                continue
+            operation_match = _STATEMENT.match(operation)
+            if operation_match is None:
+                raise ValueError("Invalid statement '{}' in the definition "
+                                 "of gate '{}'.".format(operation,
+                                                        match.group(1)))
+            operation_name = operation_match.group(1)
+            if operation_name == "barrier":
+                continue
+            operations.append((operation_name,
+                               _split_parameters(
+                                   operation_match.group('params') or ""),
+                               _split(operation_match.group('args'))))
+        self._gates[match.group(1)] = (parameters, arguments, operations)
+
+    def read_statement(self, statement):
+        """
+        Process one statement.
+
+        Raises:
+            ValueError: If the statement is invalid or not supported.
+        """
+        if _starts_with_keyword(statement, "gate"):
+            self._define_gate(statement)
+            return
+        match = _STATEMENT.match(statement)
+        if match is None:
+            raise ValueError("Invalid statement.")
+        name = match.group(1)
+        if name in ("OPENQASM", "include"):
+            return
+        if name in ("qreg", "creg"):
+            register = _ARGUMENT.match(match.group('args'))
+            if register is None or register.group(2) is None:
+                raise ValueError("Invalid register declaration.")
+            size = int(register.group(2))
+            if name == "qreg":
+                self.qregs[register.group(1)] = \
+                    self._engine.allocate_qureg(size)
+            else:
+                self.cregs[register.group(1)] = [None] * size
+            return
+        if name == "measure":
+            quantum, classical = match.group('args').split("->")
+            qubits = self._get_arguments(quantum)[0]
+            bit = _ARGUMENT.match(classical)
+            if bit is None or bit.group(1) not in self.cregs:
+                raise ValueError("Unknown classical register.")
+            bits = self.cregs[bit.group(1)]
+            indices = (range(len(bits)) if bit.group(2) is None
+                       else [int(bit.group(2))])
+            if len(indices) != len(qubits):
+                raise ValueError("The registers have different sizes.")
+            for qubit, index in zip(qubits, indices):
+                Measure | qubit
+                bits[index] = qubit
+            return
+        if name == "barrier":
+            Barrier | tuple(qubit for register in
+                            self._get_arguments(match.group('args'))
+                            for qubit in register)
+            return
+        if name in ("opaque", "if", "reset"):
+            raise ValueError("'{}' is not supported.".format(name))
+        parameters = [_evaluate_parameter(expression, {'pi': math.pi})
+                      for expression in
+                      _split_parameters(match.group('params') or "")]
+        for qubits in self._broadcast(
+                self._get_arguments(match.group('args'))):
+            self._apply(name, parameters, qubits)
+
+
+def read_qasm(file, eng):
+    """
+    Read an OpenQASM 2.0 file and send its gates to a MainEngine.
+
+    The file is read statement by statement, and the commands are sent to
+    the engine as they are read. The registers are allocated when they are
+    declared. Gate definitions and the gates of the standard library
+    qelib1.inc are supported, classical control (if), reset and opaque
+    gates are not.
+
+    Example:
+        .. code-block:: python
+
+            eng = MainEngine()
+            qregs, cregs = read_qasm("circuit.qasm", eng)
+            eng.flush()
+            print([int(qubit) for qubit in cregs['c']])
+
+    Args:
+        file (str|file): Name of the file, or a file object opened in text
+            mode.
+        eng (MainEngine): Engine to send the commands to.
+
+    Returns:
+        Tuple (qregs, cregs) where qregs maps the names of the quantum
+        registers to the allocated Quregs, and cregs maps the names of the
+        classical registers to lists of the qubits which were measured into
+        their bits (or None for bits which were not measured).
+
+    Raises:
+        ValueError: If the file contains an invalid or unsupported statement
+            (the message contains its line number).
+    """
+    if isinstance(file, str):
+        with open(file, 'r') as qasm_file:
+            return read_qasm(qasm_file, eng)
+    reader = _QASMReader(eng)
+    for line_number, statement in _iter_statements(file):
+        try:
+            reader.read_statement(statement)
+        except ValueError as error:
+            raise ValueError("Line {}: {}".format(line_number, error))
+    return reader.qregs, reader.cregs
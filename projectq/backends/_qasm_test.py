@@ -0,0 +1,263 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Tests for projectq.backends._qasm.py.
+"""
+
+import io
+import math
+import os
+
+import numpy as np
+import pytest
+
+import projectq.setups.decompositions
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import (AutoReplacer, DecompositionRuleSet,
+                               DummyEngine, LinearMapper)
+from projectq.ops import (All, Barrier, C, CNOT, Command, Entangle, H,
+                          Measure, Ph, QFT, R, Rx, Ry, Rz, S, Sdag, SqrtX,
+                          Swap, T, Toffoli, X, Y)
+
+from projectq.backends import _qasm
+
+
+def write(engine_list, circuit, **kwargs):
+    stream = io.StringIO()
+    writer = _qasm.QASMWriter(stream, **kwargs)
+    eng = MainEngine(writer, engine_list)
+    circuit(eng)
+    eng.flush()
+    writer.close()
+    return stream.getvalue()
+
+
+def test_qasm_writer_gates():
+    def circuit(eng):
+        qureg = eng.allocate_qureg(3)
+        H | qureg[0]
+        CNOT | (qureg[0], qureg[1])
+        Toffoli | (qureg[0], qureg[1], qureg[2])
+        Sdag | qureg[1]
+        Rz(0.5) | qureg[2]
+        C(R(0.25)) | (qureg[0], qureg[2])
+        C(Ph(0.75)) | (qureg[1], qureg[0])
+        Ph(0.5) | qureg[0]
+        Swap | (qureg[0], qureg[2])
+        Barrier | qureg
+        Measure | qureg[0]
+
+    text = write([], circuit, num_qubits=3)
+    assert text == ('OPENQASM 2.0;\ninclude "qelib1.inc";\n'
+                    'qreg q[3];\ncreg c[3];\n'
+                    'h q[0];\ncx q[0], q[1];\nccx q[0], q[1], q[2];\n'
+                    'sdg q[1];\nrz(0.5) q[2];\ncu1(0.25) q[0], q[2];\n'
+                    'u1(0.75) q[1];\nswap q[0], q[2];\n'
+                    'barrier q[0], q[1], q[2];\nmeasure q[0] -> c[0];\n')
+
+
+def test_qasm_writer_registers():
+    def circuit(eng):
+        qubit = eng.allocate_qubit()
+        X | qubit
+        del qubit
+        Y | eng.allocate_qubit()
+
+    text = write([], circuit)
+    assert "qreg q0[1];\ncreg c0[1];\nx q0[0];\nqreg q1[1];" in text
+
+    with pytest.raises(ValueError):
+        write([], circuit, num_qubits=1)
+
+
+def test_qasm_writer_availability():
+    writer = _qasm.QASMWriter(io.StringIO())
+    eng = MainEngine(writer, [])
+    qureg = eng.allocate_qureg(3)
+    assert writer.is_available(Command(eng, S, ([qureg[0]],)))
+    assert writer.is_available(Command(eng, SqrtX, ([qureg[0]],)))
+    assert not writer.is_available(Command(eng, S, ([qureg[0]],),
+                                           qureg[1:2]))
+    assert not writer.is_available(Command(eng, Rx(0.1), ([qureg[0]],),
+                                           qureg[1:]))
+    assert not writer.is_available(Command(eng, Entangle, (qureg,)))
+    with pytest.raises(ValueError):
+        Entangle | qureg
+    inline_writer = _qasm.QASMWriter(io.StringIO())
+    eng = MainEngine(DummyEngine(), [inline_writer])
+    assert not inline_writer.is_available(
+        Command(eng, Entangle, (eng.allocate_qureg(2),)))
+
+
+def test_qasm_writer_file(tmpdir):
+    filename = os.path.join(str(tmpdir), "circuit.qasm")
+    writer = _qasm.QASMWriter(filename, buffer_size=1)
+    dummy = DummyEngine(save_commands=True)
+    eng = MainEngine(DummyEngine(), [writer, dummy])
+    H | eng.allocate_qubit()
+    eng.flush()
+    writer.close()
+    writer.close()  # no effect
+    X | eng.allocate_qubit()  # not written
+    eng.flush()
+    with open(filename) as qasm_file:
+        assert qasm_file.read().endswith("h q0[0];\n")
+    assert len(dummy.received_commands) > 0
+
+
+def run_in_simulator(circuit):
+    rule_set = DecompositionRuleSet(modules=[projectq.setups.decompositions])
+    eng = MainEngine(Simulator(), [AutoReplacer(rule_set)])
+    qureg = circuit(eng)
+    eng.flush()
+    order, state = eng.backend.cheat()
+    state = np.array(state)
+    # sort the amplitudes by the qubits of the register
+    ids = [qubit.id for qubit in qureg]
+    amplitudes = np.zeros(len(state), dtype=complex)
+    for index, amplitude in enumerate(state):
+        new_index = sum(((index >> order[qubit_id]) & 1) << i
+                        for i, qubit_id in enumerate(ids))
+        amplitudes[new_index] = amplitude
+    All(Measure) | qureg
+    return amplitudes
+
+
+def test_qasm_round_trip():
+    def circuit(eng):
+        qureg = eng.allocate_qureg(3)
+        All(H) | qureg
+        QFT | qureg
+        C(Ry(0.3)) | (qureg[0], qureg[1])
+        T | qureg[2]
+        SqrtX | qureg[1]
+        Rx(1.2) | qureg[2]
+        C(Swap) | (qureg[2], qureg[0], qureg[1])
+        return qureg
+
+    expected = run_in_simulator(circuit)
+    rule_set = DecompositionRuleSet(modules=[projectq.setups.decompositions])
+    text = write([AutoReplacer(rule_set)], circuit, num_qubits=3)
+    assert "QFT" not in text
+
+    def read(eng):
+        qregs, _ = _qasm.read_qasm(io.StringIO(text), eng)
+        return qregs['q']
+
+    state = run_in_simulator(read)
+    # equal up to a global phase
+    overlap = np.vdot(expected, state)
+    assert abs(overlap) == pytest.approx(1.)
+
+
+def test_qasm_round_trip_mapper():
+    def circuit(eng):
+        qureg = eng.allocate_qureg(3)
+        H | qureg[0]
+        CNOT | (qureg[0], qureg[2])
+        All(Measure) | qureg
+
+    text = write([LinearMapper(num_qubits=3)], circuit, num_qubits=3)
+    assert "measure q[2] -> c[2];" in text
+    eng = MainEngine(Simulator(), [])
+    _, cregs = _qasm.read_qasm(io.StringIO(text), eng)
+    eng.flush()
+    results = [int(qubit) for qubit in cregs['c']]
+    assert sorted(results) in ([0, 0, 0], [0, 1, 1])
+
+
+QASM = u"""OPENQASM 2.0;
+include "qelib1.inc";
+// a comment
+gate majority(theta) a, b, c
+{
+  cx c, b;
+  cx c, a;
+  ccx a, b, c;
+  rz(theta / 2) c;
+  barrier a;
+}
+gate twice a { majority(pi) a, a, a; }
+qreg q[2]; qreg r[2];
+creg c[2];
+h q;
+x q[1]; u3(pi/2, -pi
+  /4, sin(0.5)^2) r[0];
+cx q, r;
+u2(0, pi) r[1];
+majority(0.5) q[0], q[1], r[0];
+barrier q, r[1];
+measure q -> c;
+measure r[1] -> c[0];
+"""
+
+
+def test_read_qasm():
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [])
+    qregs, cregs = _qasm.read_qasm(io.StringIO(QASM), eng)
+    assert sorted(qregs) == ['q', 'r']
+    assert len(qregs['q']) == 2
+    assert cregs['c'] == [qregs['r'][1], qregs['q'][1]]
+    gates = [str(cmd.gate) for cmd in backend.received_commands
+             if cmd.gate not in (projectq.ops.Allocate, )]
+    assert gates[:3] == ["H", "H", "X"]
+    # u3(theta, phi, lambda) = Rz(phi) Ry(theta) Rz(lambda) up to a phase
+    assert gates[3:7] == [str(Rz(math.sin(0.5) ** 2)), str(Ry(math.pi / 2)),
+                          str(Rz(-math.pi / 4)),
+                          str(Ph((math.sin(0.5) ** 2 - math.pi / 4) / 2))]
+    # cx q, r is applied to each pair of qubits
+    cx_commands = [cmd for cmd in backend.received_commands
+                   if cmd.gate == X and len(cmd.control_qubits) == 1][:2]
+    assert [(cmd.control_qubits[0].id, cmd.qubits[0][0].id)
+            for cmd in cx_commands] == [(qregs['q'][0].id, qregs['r'][0].id),
+                                        (qregs['q'][1].id, qregs['r'][1].id)]
+    assert str(Rz(0.25)) in gates
+    assert gates.count("Barrier") == 1
+    assert gates.count("Measure") == 3
+
+
+def test_read_qasm_file(tmpdir):
+    filename = os.path.join(str(tmpdir), "circuit.qasm")
+    with open(filename, 'w') as qasm_file:
+        qasm_file.write("qreg q[1];\nx q[0];")
+    eng = MainEngine(Simulator(), [])
+    qregs, _ = _qasm.read_qasm(filename, eng)
+    Measure | qregs['q']
+    eng.flush()
+    assert int(qregs['q'][0]) == 1
+
+
+@pytest.mark.parametrize("text, line", [
+    ("qreg q[1];\nfoo q[0];", 2),
+    ("qreg q[1];\nh p[0];", 2),
+    ("qreg q[1];\nh q[1];", 2),
+    ("qreg q[1];\nrx q[0];", 2),
+    ("qreg q[1];\nrx(1 + ) q[0];", 2),
+    ("qreg q[1];\nrx(x) q[0];", 2),
+    ("qreg q[1];\n\nreset q[0];", 3),
+    ("qreg q[2];\nqreg r[3];\ncx q, r;", 3),
+    ("qreg q[1];\ncreg c[2];\nmeasure q -> c;", 3),
+    ("qreg q[1];\nmeasure q -> d;", 2),
+    ("qreg q;", 1),
+    ("qreg q[1];\ngate g a { h b; }\ng q[0];", 3),
+    ("qreg q[1];\ngate g a { h a; }\ng q[0], q[0];", 3),
+    ("qreg q[1];\nh q[0]", 2)])
+def test_read_qasm_errors(text, line):
+    eng = MainEngine(DummyEngine(), [])
+    with pytest.raises(ValueError) as error:
+        _qasm.read_qasm(io.StringIO(text), eng)
+    assert "Line {}:".format(line) in str(error.value)
@@ -18,11 +18,59 @@ gate used in a circuit, in addition to the max. number of active qubits.
 """
 
 from projectq.cengines import BasicEngine, LastEngineException
-from projectq.meta import get_control_count, LogicalQubitIDTag
+from projectq.meta import (get_control_count, LogicalQubitIDTag, LoopBody,
+                           LoopCollector, LoopEndTag, LoopTag)
 from projectq.ops import FlushGate, Deallocate, Allocate, Measure
 from projectq.types import WeakQubitRef
 
 
+def _apply_depths(transform, depths):
+    """
+    Apply a depth transformation to the depths of the qubits.
+
+    The depths are max-plus expressions, i.e., dicts which map a variable (a
+    qubit id, 'previous' for the max. depth of the deallocated qubits or None
+    for the constant 0) to an offset, and stand for the maximum over all
+    variables of the variable plus its offset. A transformation maps each
+    variable to its new depth in terms of the depths before.
+
+    Args:
+        transform (dict): Depth transformation.
+        depths (dict): Depths of the variables (variables which are missing
+            have their symbolic value, i.e., {variable: 0}).
+
+    Returns:
+        The new depths (a new dict).
+    """
+    new_depths = dict(depths)
+    for variable, expression in transform.items():
+        new_depth = dict()
+        for source, offset in expression.items():
+            if source is None:
+                source_depth = {None: 0}
+            else:
+                source_depth = depths.get(source, {source: 0})
+            for source_variable, source_offset in source_depth.items():
+                if new_depth.get(source_variable, -1) < offset + source_offset:
+                    new_depth[source_variable] = offset + source_offset
+        new_depths[variable] = new_depth
+    return new_depths
+
+
+def _power_of_depths(transform, num):
+    """
+    Return the depth transformation which applies transform num times
+    (using repeated squaring).
+    """
+    result = dict()
+    while num > 0:
+        if num & 1:
+            result = _apply_depths(transform, result)
+        transform = _apply_depths(transform, transform)
+        num >>= 1
+    return result
+
+
 class ResourceCounter(BasicEngine):
     """
     ResourceCounter is a compiler engine which counts the number of gates and
@@ -55,6 +103,26 @@ class ResourceCounter(BasicEngine):
         # key: qubit id, depth of this qubit
         self._depth_of_qubit = dict()
         self._previous_max_depth = 0
+        self._loop_collector = LoopCollector()
+
+    def is_meta_tag_handler(self, tag):
+        """
+        The resource counter counts loops (see :class:`projectq.meta.Loop`)
+        without unrolling them, unless it has to forward the loops to an
+        engine which cannot handle them.
+
+        Args:
+            tag: Meta tag class.
+
+        Returns:
+            True if tag is LoopTag or LoopEndTag and the following engines
+            (if any) handle loops as well.
+        """
+        if tag != LoopTag and tag != LoopEndTag:
+            return False
+        return (self.is_last_engine or
+                (self.next_engine.is_meta_tag_supported(LoopTag) and
+                 self.next_engine.is_meta_tag_supported(LoopEndTag)))
 
     def is_available(self, cmd):
         """
@@ -98,15 +166,7 @@ class ResourceCounter(BasicEngine):
             for qureg in cmd.qubits:
                 for qubit in qureg:
                     self._depth_of_qubit[qubit.id] += 1
-                    # Check if a mapper assigned a different logical id
-                    logical_id_tag = None
-                    for tag in cmd.tags:
-                        if isinstance(tag, LogicalQubitIDTag):
-                            logical_id_tag = tag
-                    if logical_id_tag is not None:
-                        qubit = WeakQubitRef(qubit.engine,
-                                             logical_id_tag.logical_qubit_id)
-                    self.main_engine.set_measurement_result(qubit, 0)
+            self._set_measurement_results(cmd)
         else:
             qubit_ids = set()
             for qureg in cmd.all_qubits:
@@ -137,6 +197,117 @@ class ResourceCounter(BasicEngine):
         except KeyError:
             self.gate_class_counts[gate_class_description] = 1
 
+    def _set_measurement_results(self, cmd):
+        """
+        Set the results of the qubits measured by cmd to 0.
+        """
+        for qureg in cmd.qubits:
+            for qubit in qureg:
+                # Check if a mapper assigned a different logical id
+                logical_id_tag = None
+                for tag in cmd.tags:
+                    if isinstance(tag, LogicalQubitIDTag):
+                        logical_id_tag = tag
+                if logical_id_tag is not None:
+                    qubit = WeakQubitRef(qubit.engine,
+                                         logical_id_tag.logical_qubit_id)
+                self.main_engine.set_measurement_result(qubit, 0)
+
+    def _count_loop(self, loop):
+        """
+        Count all iterations of a loop by counting its body once.
+
+        The depths are tracked symbolically (see _apply_depths), such that
+        the depth transformation of all iterations is the num-th power of
+        the transformation of the body.
+
+        Args:
+            loop (LoopBody): Loop to count.
+
+        Returns:
+            A tuple (transform, gate_counts, gate_class_counts, peak) of the
+            depth transformation, the gate (class) counts of all iterations
+            and the max. number of qubits which are active at the same time
+            in addition to the qubits which were active before the loop.
+        """
+        depths = dict()
+        gate_counts = dict()
+        gate_class_counts = dict()
+        active_qubits = 0
+        peak = 0
+
+        def add_counts(counts, key, num):
+            counts[key] = counts.get(key, 0) + num
+
+        for item in loop.body:
+            if isinstance(item, LoopBody):
+                transform, inner_counts, inner_class_counts, inner_peak = (
+                    self._count_loop(item))
+                depths = _apply_depths(transform, depths)
+                for key, num in inner_counts.items():
+                    add_counts(gate_counts, key, num)
+                for key, num in inner_class_counts.items():
+                    add_counts(gate_class_counts, key, num)
+                peak = max(peak, active_qubits + inner_peak)
+                continue
+            cmd = item
+            if cmd.gate == FlushGate():
+                continue
+            if cmd.gate == Allocate:
+                active_qubits += 1
+                depths[cmd.qubits[0][0].id] = {None: 0}
+            elif cmd.gate == Deallocate:
+                active_qubits -= 1
+                qubit_id = cmd.qubits[0][0].id
+                depths = _apply_depths({'previous': {'previous': 0,
+                                                     qubit_id: 0}}, depths)
+                depths.pop(qubit_id, None)
+            elif self.is_last_engine and cmd.gate == Measure:
+                for qureg in cmd.qubits:
+                    for qubit in qureg:
+                        depths = _apply_depths({qubit.id: {qubit.id: 1}},
+                                               depths)
+                self._set_measurement_results(cmd)
+            else:
+                qubit_ids = set()
+                for qureg in cmd.all_qubits:
+                    for qubit in qureg:
+                        qubit_ids.add(qubit.id)
+                max_depth = dict((qubit_id, 1) for qubit_id in qubit_ids)
+                depths = _apply_depths(
+                    dict((qubit_id, max_depth) for qubit_id in qubit_ids),
+                    depths)
+            peak = max(peak, active_qubits)
+            ctrl_cnt = get_control_count(cmd)
+            add_counts(gate_counts, (cmd.gate, ctrl_cnt), 1)
+            add_counts(gate_class_counts, (cmd.gate.__class__, ctrl_cnt), 1)
+
+        for counts in (gate_counts, gate_class_counts):
+            for key in counts:
+                counts[key] *= loop.num
+        return (_power_of_depths(depths, loop.num), gate_counts,
+                gate_class_counts, peak)
+
+    def _add_loop(self, loop):
+        """
+        Add all iterations of a loop to the count.
+        """
+        transform, gate_counts, gate_class_counts, peak = (
+            self._count_loop(loop))
+        depths = dict((qubit_id, {None: depth}) for qubit_id, depth
+                      in self._depth_of_qubit.items())
+        depths['previous'] = {None: self._previous_max_depth}
+        depths = _apply_depths(transform, depths)
+        self._previous_max_depth = depths.pop('previous')[None]
+        self._depth_of_qubit = dict((qubit_id, depth[None]) for qubit_id, depth
+                                    in depths.items())
+        self.max_width = max(self.max_width, self._active_qubits + peak)
+        for key, num in gate_counts.items():
+            self.gate_counts[key] = self.gate_counts.get(key, 0) + num
+        for key, num in gate_class_counts.items():
+            self.gate_class_counts[key] = (self.gate_class_counts.get(key, 0)
+                                           + num)
+
     def __str__(self):
         """
         Return the string representation of this ResourceCounter.
@@ -178,8 +349,11 @@ class ResourceCounter(BasicEngine):
                 count).
         """
         for cmd in command_list:
-            if not cmd.gate == FlushGate():
-                self._add_cmd(cmd)
+            for item in self._loop_collector.add(cmd):
+                if isinstance(item, LoopBody):
+                    self._add_loop(item)
+                elif not item.gate == FlushGate():
+                    self._add_cmd(item)
 
             # (try to) send on
             if not self.is_last_engine:
@@ -19,7 +19,7 @@ Tests for projectq.backends._resource.py.
 import pytest
 
 from projectq.cengines import DummyEngine, MainEngine, NotYetMeasuredError
-from projectq.meta import LogicalQubitIDTag
+from projectq.meta import Control, LogicalQubitIDTag, Loop, LoopTag
 from projectq.ops import All, Allocate, CNOT, Command, H, Measure, QFT, Rz, Rzz, X
 from projectq.types import WeakQubitRef
 
@@ -136,3 +136,48 @@ def test_resource_counter_depth_of_dag():
     assert resource_counter.depth_of_dag == 9
     qb0[0].__del__()
     assert resource_counter.depth_of_dag == 9
+
+
+def _count_loops(resource_counter, num):
+    eng = MainEngine(resource_counter, [])
+    qureg = eng.allocate_qureg(3)
+    H | qureg[0]
+    with Loop(eng, num):
+        CNOT | (qureg[0], qureg[1])
+        with Loop(eng, 3):
+            X | qureg[2]
+            ancilla = eng.allocate_qubit()
+            with Control(eng, ancilla):
+                Rz(0.1) | qureg[2]
+            Measure | ancilla
+            del ancilla
+    H | qureg[1]
+    with Loop(eng, num):
+        Rz(0.2) | qureg[0]
+    All(Measure) | qureg
+    eng.flush()
+    assert int(qureg[0]) == 0
+
+
+def test_resource_counter_loop():
+    resource_counter = ResourceCounter()
+    _count_loops(resource_counter, 5)
+    assert resource_counter.is_meta_tag_handler(LoopTag)
+
+    unrolling_counter = ResourceCounter()
+    unrolling_counter.is_meta_tag_handler = lambda tag: False
+    _count_loops(unrolling_counter, 5)
+    assert resource_counter.gate_counts == unrolling_counter.gate_counts
+    assert (resource_counter.gate_class_counts ==
+            unrolling_counter.gate_class_counts)
+    assert resource_counter.depth_of_dag == unrolling_counter.depth_of_dag
+    assert resource_counter.max_width == unrolling_counter.max_width == 4
+
+
+def test_resource_counter_large_loop():
+    resource_counter = ResourceCounter()
+    _count_loops(resource_counter, 10 ** 6)
+    assert resource_counter.gate_counts[(Rz(0.2), 0)] == 10 ** 6
+    assert resource_counter.gate_counts[(X, 1)] == 10 ** 6
+    assert resource_counter.gate_counts[(Rz(0.1), 1)] == 3 * 10 ** 6
+    assert resource_counter.depth_of_dag == 6 * 10 ** 6 + 1
@@ -14,3 +14,12 @@
 
 from ._simulator import Simulator
 from ._classical_simulator import ClassicalSimulator
+from ._batch_simulator import BatchSimulator
+from ._mps_simulator import MPSSimulator
+from ._sparse_simulator import SparseSimulator
+from ._noise import (PauliChannel,
+                     DepolarizingChannel,
+                     AmplitudeDampingChannel,
+                     ReadoutError,
+                     NoiseModel)
+from ._trajectories import NoisySimulator, run_trajectories
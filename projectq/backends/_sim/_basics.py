@@ -0,0 +1,174 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains the base class of the Python simulators which keep track of the
+position of each qubit in their state representation.
+"""
+
+from projectq.cengines import BasicEngine
+from projectq.meta import get_control_count, LogicalQubitIDTag
+from projectq.ops import (Measure,
+                          FlushGate,
+                          Allocate,
+                          Deallocate,
+                          BasicMathGate)
+from projectq.types import WeakQubitRef
+
+
+class BasicSimulator(BasicEngine):
+    """
+    Base class of simulators which store the position of each allocated
+    qubit id in `self._map`.
+
+    It implements the availability check, the conversion from logical to
+    mapped qubits, the handling of measurement commands and `receive`.
+    Derived classes implement `_handle(cmd)` and `_measure(qubit_id)` and
+    call `_handle_measure(cmd)` for Measure commands.
+
+    Attributes:
+        emulates_math (bool): Whether math gates (BasicMathGate) are
+            available, i.e., emulated by the simulator.
+    """
+    emulates_math = False
+
+    def __init__(self):
+        """
+        Initialize the basic simulator (with no allocated qubits).
+        """
+        BasicEngine.__init__(self)
+        self._map = dict()
+
+    def is_available(self, cmd):
+        """
+        Specialized implementation of is_available: The simulator can deal
+        with all arbitrarily-controlled gates which provide a gate-matrix (via
+        gate.matrix) and act on 5 or less qubits, and with math gates if
+        `emulates_math` is True.
+
+        Args:
+            cmd (Command): Command for which to check availability.
+
+        Returns:
+            True if it can be simulated and False otherwise.
+        """
+        if (cmd.gate == Measure or cmd.gate == Allocate or
+                cmd.gate == Deallocate or
+                (self.emulates_math and isinstance(cmd.gate, BasicMathGate))):
+            return True
+        try:
+            m = cmd.gate.matrix
+            # Allow up to 5-qubit gates
+            return len(m) <= 2 ** 5
+        except Exception:
+            return False
+
+    def _synchronize(self):
+        """
+        Wait until asynchronous engines (see AsyncEngine) have sent all
+        commands to the simulator, such that its state can be queried.
+        """
+        synchronize = getattr(self.main_engine, 'synchronize', None)
+        if synchronize is not None:
+            synchronize()
+
+    def _convert_logical_to_mapped_qureg(self, qureg):
+        """
+        Converts a qureg from logical to mapped qubits if there is a mapper.
+
+        Args:
+            qureg (list[Qubit],Qureg): Logical quantum bits
+        """
+        self._synchronize()
+        mapper = self.main_engine.mapper
+        if mapper is None:
+            return qureg
+        mapped_qureg = []
+        for qubit in qureg:
+            if qubit.id not in mapper.current_mapping:
+                raise RuntimeError("Unknown qubit id. Please make sure you "
+                                   "have called eng.flush().")
+            mapped_qureg.append(WeakQubitRef(qubit.engine,
+                                             mapper.current_mapping[qubit.id]))
+        return mapped_qureg
+
+    def _check_ids(self, ids, name):
+        """
+        Raise a RuntimeError (mentioning the function `name`) if one of the
+        qubit ids has not been allocated.
+        """
+        for qubit_id in ids:
+            if qubit_id not in self._map:
+                raise RuntimeError("{}(): Unknown qubit id. Please make sure "
+                                   "you have called eng.flush().".format(name))
+
+    def _measure_qubits(self, ids):
+        """
+        Measure the qubits with the given ids one after the other.
+
+        Returns:
+            List with the outcome of each qubit.
+        """
+        return [self._measure(qubit_id) for qubit_id in ids]
+
+    def _set_measurement_result(self, qubit, outcome):
+        """
+        Forward the outcome of measuring the (logical) qubit to the
+        MainEngine.
+        """
+        self.main_engine.set_measurement_result(qubit, outcome)
+
+    def _handle_measure(self, cmd):
+        """
+        Measure the qubits of a Measure command and store the outcomes for
+        the logical qubits.
+
+        Args:
+            cmd (Command): Measure command to handle.
+        """
+        assert(get_control_count(cmd) == 0)
+        qubits = [qb for qr in cmd.qubits for qb in qr]
+        outcomes = self._measure_qubits([qb.id for qb in qubits])
+        logical_id_tag = None
+        for tag in cmd.tags:
+            if isinstance(tag, LogicalQubitIDTag):
+                logical_id_tag = tag
+        for qb, outcome in zip(qubits, outcomes):
+            # Check if a mapper assigned a different logical id
+            if logical_id_tag is not None:
+                qb = WeakQubitRef(qb.engine, logical_id_tag.logical_qubit_id)
+            self._set_measurement_result(qb, outcome)
+
+    def _handle(self, cmd):
+        """
+        Handle a command, i.e., update the simulated state.
+
+        Args:
+            cmd (Command): Command to handle.
+        """
+        raise NotImplementedError
+
+    def receive(self, command_list):
+        """
+        Receive a list of commands from the previous engine and handle them
+        prior to sending them on to the next engine.
+
+        Args:
+            command_list (list<Command>): List of commands to execute.
+        """
+        for cmd in command_list:
+            if not cmd.gate == FlushGate():
+                self._handle(cmd)
+            if not self.is_last_engine:
+                self.send([cmd])
@@ -0,0 +1,90 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Tests for projectq.backends._sim._basics.py.
+"""
+
+import numpy
+import pytest
+
+from projectq import MainEngine
+from projectq.cengines import BasicMapperEngine, DummyEngine
+from projectq.libs.math import AddConstant
+from projectq.meta import LogicalQubitIDTag
+from projectq.ops import (Allocate, BasicGate, Command, Deallocate, H,
+                          MatrixGate, Measure, QFT, X)
+from projectq.types import WeakQubitRef
+
+from projectq.backends._sim import _basics
+
+
+class ClassicalBitSimulator(_basics.BasicSimulator):
+    """ Stores the value of each qubit and applies X gates only. """
+    def __init__(self):
+        _basics.BasicSimulator.__init__(self)
+        self.values = []
+
+    def _measure(self, qubit_id):
+        return self.values[self._map[qubit_id]]
+
+    def _handle(self, cmd):
+        qubit_id = cmd.qubits[0][0].id
+        if cmd.gate == Measure:
+            self._handle_measure(cmd)
+        elif cmd.gate == Allocate:
+            self._map[qubit_id] = len(self.values)
+            self.values.append(False)
+        elif cmd.gate == X:
+            self.values[self._map[qubit_id]] ^= True
+
+
+def test_basic_simulator_is_available():
+    sim = ClassicalBitSimulator()
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    for gate in (Measure, Allocate, Deallocate, H):
+        assert sim.is_available(Command(eng, gate, (qubit,)))
+    math_cmd = Command(eng, AddConstant(1), (qubit,))
+    assert not sim.is_available(math_cmd)
+    sim.emulates_math = True
+    assert sim.is_available(math_cmd)
+    assert not sim.is_available(Command(eng, QFT, (qubit,)))
+    assert not sim.is_available(Command(eng, BasicGate(), (qubit,)))
+    qureg = eng.allocate_qureg(6)
+    assert not sim.is_available(Command(eng, MatrixGate(numpy.eye(64)),
+                                        (qureg,)))
+
+
+def test_basic_simulator_measure_with_mapper():
+    mapper = BasicMapperEngine()
+    mapper.current_mapping = {0: 1, 1: 0}
+    sim = ClassicalBitSimulator()
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [mapper, sim])
+    qureg = eng.allocate_qureg(2)
+    X | qureg[0]
+    Measure | qureg[0]
+    eng.flush()
+    assert int(qureg[0]) == 1
+    # commands are forwarded to the next engine
+    assert any(isinstance(tag, LogicalQubitIDTag)
+               for cmd in backend.received_commands for tag in cmd.tags)
+    mapped = sim._convert_logical_to_mapped_qureg(qureg)
+    assert [qb.id for qb in mapped] == [1, 0]
+    sim._check_ids([qb.id for qb in mapped], "test")
+    with pytest.raises(RuntimeError):
+        sim._check_ids([2], "test")
+    with pytest.raises(RuntimeError):
+        sim._convert_logical_to_mapped_qureg([WeakQubitRef(eng, 2)])
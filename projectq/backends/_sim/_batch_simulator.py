@@ -0,0 +1,413 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains a simulator which runs the same circuit on a whole batch of state
+vectors at once, e.g., for parameter sweeps in variational algorithms.
+"""
+
+import numpy as np
+
+from projectq.ops import (Measure,
+                          Allocate,
+                          Deallocate,
+                          BasicMathGate,
+                          BasicRotationGate,
+                          BasicPhaseGate,
+                          Ph,
+                          R,
+                          Rx,
+                          Ry,
+                          Rz,
+                          Rxx,
+                          Ryy,
+                          Rzz)
+
+from ._basics import BasicSimulator
+from ._npkernels import apply_matrix, pauli_term_action
+
+
+def _is_batched(gate):
+    """
+    Return True if the gate is a rotation/phase gate with one angle per batch
+    member.
+    """
+    return (isinstance(gate, (BasicRotationGate, BasicPhaseGate)) and
+            isinstance(gate.angle, np.ndarray))
+
+
+def _stack(size, entries):
+    """
+    Return the stacked matrices of shape (batch, size, size) with the given
+    entries, a dict mapping (row, column) to the array of values of all
+    batch members.
+    """
+    num = len(next(iter(entries.values())))
+    matrices = np.zeros((num, size, size), dtype=np.complex128)
+    for (row, column), values in entries.items():
+        matrices[:, row, column] = values
+    return matrices
+
+
+def _rotation_entries(angles):
+    """ Return cos(angles / 2) and sin(angles / 2). """
+    return np.cos(.5 * angles), np.sin(.5 * angles)
+
+
+def _rx(angles):
+    c, s = _rotation_entries(angles)
+    return _stack(2, {(0, 0): c, (0, 1): -1j * s, (1, 0): -1j * s,
+                      (1, 1): c})
+
+
+def _ry(angles):
+    c, s = _rotation_entries(angles)
+    return _stack(2, {(0, 0): c, (0, 1): -s, (1, 0): s, (1, 1): c})
+
+
+def _rz(angles):
+    phase = np.exp(.5j * angles)
+    return _stack(2, {(0, 0): phase.conj(), (1, 1): phase})
+
+
+def _rxx(angles):
+    c, s = _rotation_entries(angles)
+    return _stack(4, {(0, 0): c, (1, 1): c, (2, 2): c, (3, 3): c,
+                      (0, 3): -1j * s, (1, 2): -1j * s, (2, 1): -1j * s,
+                      (3, 0): -1j * s})
+
+
+def _ryy(angles):
+    c, s = _rotation_entries(angles)
+    return _stack(4, {(0, 0): c, (1, 1): c, (2, 2): c, (3, 3): c,
+                      (0, 3): 1j * s, (1, 2): -1j * s, (2, 1): -1j * s,
+                      (3, 0): 1j * s})
+
+
+def _rzz(angles):
+    phase = np.exp(.5j * angles)
+    return _stack(4, {(0, 0): phase.conj(), (1, 1): phase, (2, 2): phase,
+                      (3, 3): phase.conj()})
+
+
+def _ph(angles):
+    phase = np.exp(1j * angles)
+    return _stack(2, {(0, 0): phase, (1, 1): phase})
+
+
+def _r(angles):
+    return _stack(2, {(0, 0): np.ones(len(angles)),
+                      (1, 1): np.exp(1j * angles)})
+
+
+# Closed forms of the stacked matrices of batched gates, per gate class
+_BATCHED_MATRICES = {Rx: _rx, Ry: _ry, Rz: _rz, Rxx: _rxx, Ryy: _ryy,
+                     Rzz: _rzz, Ph: _ph, R: _r}
+
+
+class BatchSimulator(BasicSimulator):
+    """
+    BatchSimulator is a compiler engine which simulates a batch of
+    `batch_size` independent quantum computers running the same circuit.
+
+    The state is stored as a (batch_size, 2^n) numpy array and every command
+    is applied to all members at once. Rotation and phase gates (Rx, Ry, Rz,
+    Rxx, Ryy, Rzz, R, Ph, ...) may carry a numpy array of `batch_size`
+    angles, one for each member:
+
+    .. code-block:: python
+
+        sim = BatchSimulator(batch_size=len(thetas))
+        eng = MainEngine(sim, [])
+        qureg = eng.allocate_qureg(2)
+        H | qureg[0]
+        Ry(numpy.array(thetas)) | qureg[1]
+        CNOT | (qureg[0], qureg[1])
+        eng.flush()
+        energies = sim.get_expectation_value(hamiltonian, qureg)
+
+    Measurements are carried out for each member independently. The outcome
+    of the first member is forwarded to the MainEngine (i.e., ``int(qubit)``),
+    while all outcomes are available through :meth:`get_measurement_results`.
+    """
+    emulates_math = True
+
+    def __init__(self, batch_size, rnd_seed=None):
+        """
+        Initialize the batch simulator.
+
+        Args:
+            batch_size (int): Number of simulated state vectors.
+            rnd_seed (int): Random seed for the measurements.
+        """
+        BasicSimulator.__init__(self)
+        self._batch_size = int(batch_size)
+        self._rng = np.random.RandomState(rnd_seed)
+        self._state = np.ones((self._batch_size, 1), dtype=np.complex128)
+        self._measurement_results = dict()
+
+    @property
+    def batch_size(self):
+        """ Number of simulated state vectors. """
+        return self._batch_size
+
+    def is_available(self, cmd):
+        """
+        Specialized implementation of is_available: The batch simulator can
+        deal with all arbitrarily-controlled gates which provide a gate-matrix
+        (via gate.matrix) and act on 5 or less qubits, with rotation and phase
+        gates carrying one angle per batch member, and with math gates.
+
+        Args:
+            cmd (Command): Command for which to check availability.
+
+        Returns:
+            True if it can be simulated and False otherwise.
+        """
+        return (_is_batched(cmd.gate) or
+                BasicSimulator.is_available(self, cmd))
+
+    def _get_matrix(self, gate):
+        """
+        Return the gate matrix (or the stacked matrices of all batch members
+        for batched gates).
+        """
+        if not _is_batched(gate):
+            return np.asarray(gate.matrix, dtype=np.complex128)
+        if gate.angle.shape != (self._batch_size,):
+            raise ValueError("BatchSimulator: {} carries {} angles but the "
+                             "batch size is {}.".format(
+                                 gate.__class__.__name__,
+                                 gate.angle.shape, self._batch_size))
+        stacked_matrices = _BATCHED_MATRICES.get(type(gate))
+        if stacked_matrices is not None:
+            return stacked_matrices(gate.angle)
+        # other (e.g., user-defined) classes: one gate per batch member
+        return np.array([np.asarray(gate.__class__(angle).matrix)
+                         for angle in gate.angle], dtype=np.complex128)
+
+    def _measure_qubits(self, ids):
+        """
+        Measure the qubits with the given ids in every batch member.
+
+        Returns:
+            Boolean array of shape (len(ids), batch).
+        """
+        probabilities = np.abs(self._state) ** 2
+        cumulative = np.cumsum(probabilities, axis=1)
+        rnd = self._rng.random_sample(self._batch_size) * cumulative[:, -1]
+        picked = np.minimum((cumulative < rnd[:, None]).sum(axis=1),
+                            self._state.shape[1] - 1)
+
+        mask = 0
+        for qubit_id in ids:
+            mask |= 1 << self._map[qubit_id]
+        indices = np.arange(self._state.shape[1])
+        keep = (indices[None, :] & mask) == (picked & mask)[:, None]
+        self._state[~keep] = 0.
+        self._state /= np.linalg.norm(self._state, axis=1)[:, None]
+        return np.array([(picked >> self._map[qubit_id]) & 1
+                         for qubit_id in ids], dtype=bool)
+
+    def _set_measurement_result(self, qubit, outcome):
+        """
+        Store the outcomes of all members and forward the outcome of the
+        first member to the MainEngine.
+        """
+        self._measurement_results[qubit.id] = outcome
+        self.main_engine.set_measurement_result(qubit, bool(outcome[0]))
+
+    def _deallocate(self, qubit_id):
+        pos = self._map[qubit_id]
+        tensor = self._state.reshape((self._batch_size, -1, 2, 1 << pos))
+        probability_one = np.sum(np.abs(tensor[:, :, 1, :]) ** 2, axis=(1, 2))
+        if not np.all((probability_one < 1.e-10) |
+                      (probability_one > 1. - 1.e-10)):
+            raise RuntimeError("Error: Qubit has not been measured / "
+                               "uncomputed in all batch members! There is "
+                               "most likely a bug in your code.")
+        value = probability_one > .5
+        self._state = np.where(value[:, None, None], tensor[:, :, 1, :],
+                               tensor[:, :, 0, :]).reshape(
+                                   (self._batch_size, -1))
+        del self._map[qubit_id]
+        for key in self._map:
+            if self._map[key] > pos:
+                self._map[key] -= 1
+
+    def _emulate_math(self, cmd):
+        """
+        Emulate a math gate by permuting the amplitudes of all members.
+        """
+        ctrlmask = 0
+        for qb in cmd.control_qubits:
+            ctrlmask |= 1 << self._map[qb.id]
+        locations = [[self._map[qb.id] for qb in qr] for qr in cmd.qubits]
+        math_fun = cmd.gate.get_math_function(cmd.qubits)
+        new_indices = np.arange(self._state.shape[1])
+        for i in range(self._state.shape[1]):
+            if (i & ctrlmask) != ctrlmask:
+                continue
+            args = [sum(((i >> loc) & 1) << j for j, loc in enumerate(locs))
+                    for locs in locations]
+            res = math_fun(args)
+            new_i = i
+            for locs, value in zip(locations, res):
+                for j, loc in enumerate(locs):
+                    if ((new_i >> loc) & 1) != ((value >> j) & 1):
+                        new_i ^= 1 << loc
+            new_indices[i] = new_i
+        new_state = np.empty_like(self._state)
+        new_state[:, new_indices] = self._state
+        self._state = new_state
+
+    def get_expectation_value(self, qubit_operator, qureg):
+        """
+        Get the expectation values of qubit_operator w.r.t. the wave functions
+        of all batch members.
+
+        Args:
+            qubit_operator (projectq.ops.QubitOperator): Operator to measure.
+            qureg (list[Qubit],Qureg): Quantum bits to measure.
+
+        Returns:
+            numpy.ndarray of shape (batch_size,) with one expectation value
+            per batch member.
+
+        Raises:
+            Exception: If `qubit_operator` acts on more qubits than present in
+                the `qureg` argument.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        self._check_ids([qb.id for qb in qureg], "get_expectation_value")
+        for term in qubit_operator.terms:
+            if not term == () and term[-1][0] >= len(qureg):
+                raise Exception("qubit_operator acts on more qubits than "
+                                "contained in the qureg.")
+        positions = [self._map[qb.id] for qb in qureg]
+        conj_state = self._state.conj()
+        expectation = np.zeros(self._batch_size)
+        for term, coefficient in qubit_operator.terms.items():
+            source, phase = pauli_term_action(term, positions, len(self._map))
+            expectation += (coefficient * np.einsum(
+                'bi,bi->b', conj_state, self._state[:, source] * phase)).real
+        return expectation
+
+    def get_probability(self, bit_string, qureg):
+        """
+        Return the probabilities of the outcome `bit_string` when measuring
+        the quantum register `qureg` in each batch member.
+
+        Args:
+            bit_string (list[bool|int]|string[0|1]): Measurement outcome.
+            qureg (Qureg|list[Qubit]): Quantum register.
+
+        Returns:
+            numpy.ndarray of shape (batch_size,) with the probabilities.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        self._check_ids([qb.id for qb in qureg], "get_probability")
+        mask = 0
+        bit_str = 0
+        for qb, bit in zip(qureg, bit_string):
+            mask |= 1 << self._map[qb.id]
+            bit_str |= int(bit) << self._map[qb.id]
+        indices = np.arange(self._state.shape[1])
+        selected = self._state[:, (indices & mask) == bit_str]
+        return np.sum(np.abs(selected) ** 2, axis=1)
+
+    def get_amplitude(self, bit_string, qureg):
+        """
+        Return the probability amplitudes of the supplied `bit_string` in
+        each batch member. The ordering is given by the quantum register
+        `qureg`, which must contain all allocated qubits.
+
+        Args:
+            bit_string (list[bool|int]|string[0|1]): Computational basis state
+            qureg (Qureg|list[Qubit]): Quantum register determining the
+                ordering. Must contain all allocated qubits.
+
+        Returns:
+            numpy.ndarray of shape (batch_size,) with the amplitudes.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        if not set(qb.id for qb in qureg) == set(self._map):
+            raise RuntimeError("The second argument to get_amplitude() must"
+                               " be a permutation of all allocated qubits. "
+                               "Please make sure you have called "
+                               "eng.flush().")
+        index = 0
+        for qb, bit in zip(qureg, bit_string):
+            index |= int(bit) << self._map[qb.id]
+        return self._state[:, index].copy()
+
+    def get_measurement_results(self, qureg):
+        """
+        Return the outcomes of the last measurement of each qubit in all batch
+        members.
+
+        Args:
+            qureg (Qureg|list[Qubit]): Measured qubits.
+
+        Returns:
+            Boolean numpy.ndarray of shape (batch_size, len(qureg)).
+        """
+        self._synchronize()
+        return np.array([self._measurement_results[qb.id] for qb in qureg]).T
+
+    def cheat(self):
+        """
+        Access the ordering of the qubits and the state vectors directly.
+
+        Returns:
+            A tuple where the first entry is a dictionary mapping qubit
+            indices to bit-locations and the second entry is the
+            (batch_size, 2^n) array of state vectors.
+        """
+        self._synchronize()
+        return (dict(self._map), self._state)
+
+    def _handle(self, cmd):
+        """
+        Handle a command, i.e., apply it to all members of the batch.
+
+        Args:
+            cmd (Command): Command to handle.
+        """
+        if cmd.gate == Measure:
+            self._handle_measure(cmd)
+        elif cmd.gate == Allocate:
+            qubit_id = cmd.qubits[0][0].id
+            if qubit_id in self._map:
+                raise RuntimeError("AllocateQubit: ID already exists. Qubit "
+                                   "IDs should be unique.")
+            self._map[qubit_id] = len(self._map)
+            self._state = np.concatenate(
+                (self._state, np.zeros_like(self._state)), axis=1)
+        elif cmd.gate == Deallocate:
+            self._deallocate(cmd.qubits[0][0].id)
+        elif isinstance(cmd.gate, BasicMathGate):
+            self._emulate_math(cmd)
+        else:
+            matrix = self._get_matrix(cmd.gate)
+            ids = [qb.id for qr in cmd.qubits for qb in qr]
+            if not 2 ** len(ids) == matrix.shape[-1]:
+                raise Exception("BatchSimulator: Error applying {} gate: "
+                                "{}-qubit gate applied to {} qubits.".format(
+                                    str(cmd.gate),
+                                    int(np.log2(matrix.shape[-1])),
+                                    len(ids)))
+            apply_matrix(self._state, len(self._map), matrix,
+                         [self._map[qubit_id] for qubit_id in ids],
+                         [self._map[qb.id] for qb in cmd.control_qubits])
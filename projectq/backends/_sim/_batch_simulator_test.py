@@ -0,0 +1,138 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Tests for projectq.backends._sim._batch_simulator.py
+"""
+
+import numpy
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import BatchSimulator, Simulator
+from projectq.cengines import BasicMapperEngine
+from projectq.libs.math import AddConstant
+from projectq.meta import Control
+from projectq.ops import (All, CNOT, H, Measure, QubitOperator, Ph, R, Rx,
+                          Rxx, Ry, Ryy, Rz, Rzz, Swap, TimeEvolution, X)
+
+from projectq.backends._sim import _batch_simulator
+
+
+def _circuit(eng, qureg, angles):
+    H | qureg[0]
+    Ry(angles[0]) | qureg[1]
+    CNOT | (qureg[0], qureg[2])
+    Rzz(angles[1]) | (qureg[1], qureg[2])
+    with Control(eng, qureg[0]):
+        Rx(angles[2]) | qureg[3]
+        Swap | (qureg[1], qureg[2])
+    Ph(angles[1]) | qureg[2]
+    AddConstant(3) | qureg[1:]
+    Rz(0.4) | qureg[3]
+
+
+def test_batch_simulator_matches_simulator():
+    angles = numpy.array([[0.1, 0.7, 2.3, -1.],
+                          [1.2, -0.4, 0.3, 5.],
+                          [3.3, 0.2, 0.9, 0.]])
+    hamiltonian = (QubitOperator('X0 Y1', 0.5) + QubitOperator('Z2 Z3', 1.5) +
+                   QubitOperator('Y3', -0.7) + QubitOperator('', 0.2))
+
+    sim = BatchSimulator(batch_size=4, rnd_seed=1)
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(4)
+    _circuit(eng, qureg, angles)
+    eng.flush()
+    energies = sim.get_expectation_value(hamiltonian, qureg)
+    probabilities = sim.get_probability('1010', qureg)
+    amplitudes = sim.get_amplitude('0110', qureg)
+    assert energies.shape == (4,)
+    All(Measure) | qureg
+
+    for member in range(4):
+        ref_sim = Simulator()
+        ref_eng = MainEngine(ref_sim, [])
+        ref_qureg = ref_eng.allocate_qureg(4)
+        _circuit(ref_eng, ref_qureg, angles[:, member])
+        ref_eng.flush()
+        assert energies[member] == pytest.approx(
+            ref_sim.get_expectation_value(hamiltonian, ref_qureg))
+        assert probabilities[member] == pytest.approx(
+            ref_sim.get_probability('1010', ref_qureg))
+        assert amplitudes[member] == pytest.approx(
+            ref_sim.get_amplitude('0110', ref_qureg))
+        All(Measure) | ref_qureg
+
+
+@pytest.mark.parametrize("gate_class", [Rx, Ry, Rz, Rxx, Ryy, Rzz, Ph, R])
+def test_batch_simulator_stacked_matrices(gate_class):
+    angles = numpy.array([0.1, -2.3, 4.5, 7.])
+    stacked = _batch_simulator._BATCHED_MATRICES[gate_class](angles)
+    expected = [numpy.asarray(gate_class(angle).matrix) for angle in angles]
+    assert numpy.allclose(stacked, expected)
+
+
+def test_batch_simulator_measurement():
+    sim = BatchSimulator(batch_size=64, rnd_seed=3)
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(2)
+    H | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    X | qureg[1]
+    All(Measure) | qureg
+    eng.flush()
+    results = sim.get_measurement_results(qureg)
+    assert results.shape == (64, 2)
+    assert numpy.all(results[:, 0] != results[:, 1])
+    assert 0 < numpy.sum(results[:, 0]) < 64
+    assert [int(qb) for qb in qureg] == list(results[0])
+    assert numpy.allclose(numpy.sum(numpy.abs(sim.cheat()[1]) ** 2, axis=1),
+                          1.)
+    # deallocation keeps the (different) classical states of all members
+    del qureg[0]
+    eng.flush()
+    assert numpy.allclose(sim.get_probability('1', qureg),
+                          results[:, 1])
+
+
+def test_batch_simulator_errors():
+    sim = BatchSimulator(batch_size=2)
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    assert sim.is_available(
+        Rx(numpy.array([0.1, 0.2])).generate_command(qubit))
+    assert not sim.is_available(
+        TimeEvolution(1., QubitOperator('X0')).generate_command(qubit))
+    with pytest.raises(ValueError):
+        sim._get_matrix(Rx(numpy.array([0.1, 0.2, 0.3])))
+    with pytest.raises(Exception):
+        sim.get_expectation_value(QubitOperator('Z1'), qubit)
+    # the qubit is not classical in the second batch member
+    Ry(numpy.array([0., 0.5])) | qubit
+    eng.flush()
+    with pytest.raises(RuntimeError):
+        qubit[0].__del__()
+    assert qubit[0].id == -1
+
+
+def test_batch_simulator_with_mapper():
+    mapper = BasicMapperEngine()
+    mapper.current_mapping = {0: 1, 1: 0}
+    sim = BatchSimulator(batch_size=2)
+    eng = MainEngine(sim, [mapper])
+    qureg = eng.allocate_qureg(2)
+    Ry(numpy.array([0., numpy.pi])) | qureg[0]
+    eng.flush()
+    assert numpy.allclose(sim.get_probability('10', qureg), [0., 1.])
+    All(Measure) | qureg
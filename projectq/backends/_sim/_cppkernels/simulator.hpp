@@ -17,6 +17,7 @@
 
 #include <vector>
 #include <complex>
+#include <cstdint>
 
 #if defined(NOINTRIN) || !defined(INTRIN)
 #include "nointrin/kernels.hpp"
@@ -32,30 +33,127 @@
 #include <tuple>
 #include <random>
 #include <functional>
+#include <atomic>
+#include <bitset>
+#include <memory>
+#include <type_traits>
+#include <stdexcept>
 
 
+// Keeps track of the memory held by the state vector and the auxiliary
+// state-sized buffers of a simulator.
+struct MemoryStatistics{
+    std::atomic<std::size_t> current, peak;
+
+    MemoryStatistics() : current(0), peak(0) {}
+
+    void add(std::size_t bytes){
+        auto c = (current += bytes);
+        auto p = peak.load();
+        while (c > p && !peak.compare_exchange_weak(p, c)){}
+    }
+    void remove(std::size_t bytes){
+        current -= bytes;
+    }
+};
+
+// Aligned allocator which reports to the MemoryStatistics it was created
+// with (if any). The statistics move along with the memory, e.g., when two
+// state vectors are swapped.
+template <typename T, unsigned int Alignment>
+class tracked_allocator : public aligned_allocator<T, Alignment>
+{
+ public:
+    template <typename U>
+    struct rebind
+    {
+        typedef tracked_allocator<U, Alignment> other;
+    };
+
+    typedef std::true_type propagate_on_container_copy_assignment;
+    typedef std::true_type propagate_on_container_move_assignment;
+    typedef std::true_type propagate_on_container_swap;
+
+    tracked_allocator() noexcept {}
+    explicit tracked_allocator(std::shared_ptr<MemoryStatistics> stats) noexcept
+        : stats_(std::move(stats)) {}
+    template <typename U>
+    tracked_allocator(tracked_allocator<U, Alignment> const& other) noexcept
+        : stats_(other.stats()) {}
+
+    T* allocate(std::size_t n)
+    {
+        auto p = aligned_allocator<T, Alignment>::allocate(n);
+        if (stats_)
+            stats_->add(n * sizeof(T));
+        return p;
+    }
+
+    void deallocate(T* p, std::size_t n) noexcept
+    {
+        // update the statistics before the memory is freed, such that
+        // nothing which is derived from p is used after the free
+        if (stats_)
+            stats_->remove(n * sizeof(T));
+        aligned_allocator<T, Alignment>::deallocate(p, n);
+    }
+
+    std::shared_ptr<MemoryStatistics> const& stats() const noexcept
+    {
+        return stats_;
+    }
+
+    bool operator==(tracked_allocator const& other) const noexcept
+    {
+        return stats_ == other.stats_;
+    }
+    bool operator!=(tracked_allocator const& other) const noexcept
+    {
+        return stats_ != other.stats_;
+    }
+
+ private:
+    std::shared_ptr<MemoryStatistics> stats_;
+};
+
 class Simulator{
 public:
     using calc_type = double;
     using complex_type = std::complex<calc_type>;
-    using StateVector = std::vector<complex_type, aligned_allocator<complex_type,512>>;
+    using StateVector = std::vector<complex_type, tracked_allocator<complex_type,512>>;
     using Map = std::map<unsigned, unsigned>;
     using RndEngine = std::mt19937;
     using Term = std::vector<std::pair<unsigned, char>>;
     using TermsDict = std::vector<std::pair<Term, calc_type>>;
     using ComplexTermsDict = std::vector<std::pair<Term, complex_type>>;
 
-    Simulator(unsigned seed = 1) : N_(0), vec_(1,0.), fusion_qubits_min_(4),
-                                   fusion_qubits_max_(5), rnd_eng_(seed) {
+    // memory_budget: maximum number of bytes to use for the state vector and
+    // auxiliary buffers (0 = unlimited). If an operation would exceed it,
+    // an in-place or chunked algorithm is used instead.
+    Simulator(unsigned seed = 1, std::size_t memory_budget = 0)
+        : N_(0), memory_stats_(std::make_shared<MemoryStatistics>()),
+          allocator_(memory_stats_), vec_(1, 0., allocator_),
+          fusion_qubits_min_(4), fusion_qubits_max_(5), rnd_eng_(seed),
+          memory_budget_(memory_budget), tmpBuff1_(allocator_),
+          tmpBuff2_(allocator_) {
         vec_[0]=1.; // all-zero initial state
         std::uniform_real_distribution<double> dist(0., 1.);
         rng_ = std::bind(dist, std::ref(rnd_eng_));
     }
 
     void allocate_qubit(unsigned id){
-        if (map_.count(id) == 0){
+        if (map_.count(id) == 0 && memory_budget_ > 0){
+            if (2 * vec_.size() * sizeof(complex_type) > memory_budget_)
+                throw(std::runtime_error(
+                    "AllocateQubit: Memory budget exceeded."));
+            release_buffers();
+            map_[id] = N_++;
+            // the new qubit is the most significant one and starts in |0>
+            vec_.resize(1UL << N_, 0.);
+        }
+        else if (map_.count(id) == 0){
             map_[id] = N_++;
-            StateVector newvec; // avoid large memory allocations
+            StateVector newvec(allocator_); // avoid large memory allocations
             if( tmpBuff1_.capacity() >= (1UL << N_) )
               std::swap(newvec, tmpBuff1_);
             newvec.resize(1UL << N_);
@@ -119,8 +217,23 @@ public:
                     vec_[i+j+static_cast<std::size_t>(!value)*delta] = 0.;
             }
         }
+        else if (memory_budget_ > 0){
+            // compact in place (destination never lies behind the source);
+            // the capacity is kept for subsequent allocations
+            for (std::size_t i = 0; i < vec_.size(); i += 2*delta)
+                for (std::size_t j = 0; j < delta; ++j)
+                    vec_[i/2 + j] = vec_[i + static_cast<std::size_t>(value)*delta + j];
+            vec_.resize(1UL << (N_-1));
+
+            for (auto& p : map_){
+                if (p.second > pos)
+                    p.second--;
+            }
+            map_.erase(id);
+            N_--;
+        }
         else{
-            StateVector newvec; // avoid costly memory reallocations
+            StateVector newvec(allocator_); // avoid costly memory reallocations
             if( tmpBuff1_.capacity() >= (1UL << (N_-1)) )
               std::swap(tmpBuff1_, newvec);
             newvec.resize((1UL << (N_-1)));
@@ -221,7 +334,7 @@ public:
             fused_gates_ = fused_gates;
     }
 
-    template <class F, class QuReg>
+    template <class IntType, class F, class QuReg>
     void emulate_math(F const& f, QuReg quregs, const std::vector<unsigned>& ctrl,
                       bool parallelize = false){
         run();
@@ -231,7 +344,45 @@ public:
             for (unsigned j = 0; j < quregs[i].size(); ++j)
                 quregs[i][j] = map_[quregs[i][j]];
 
-        StateVector newvec; // avoid costly memory reallocations
+        auto permute = [&](std::size_t i, std::vector<IntType>& res){
+            for (unsigned qr_i = 0; qr_i < quregs.size(); ++qr_i){
+                res[qr_i] = 0;
+                for (unsigned qb_i = 0; qb_i < quregs[qr_i].size(); ++qb_i)
+                    res[qr_i] |= static_cast<IntType>((i >> quregs[qr_i][qb_i])&1) << qb_i;
+            }
+            f(res);
+            auto new_i = i;
+            for (unsigned qr_i = 0; qr_i < quregs.size(); ++qr_i){
+                for (unsigned qb_i = 0; qb_i < quregs[qr_i].size(); ++qb_i){
+                    if (!(((new_i >> quregs[qr_i][qb_i])&1) == static_cast<std::size_t>((res[qr_i] >> qb_i)&1)))
+                        new_i ^= (1UL << quregs[qr_i][qb_i]);
+                }
+            }
+            return new_i;
+        };
+
+        if (!has_memory_for(1)){
+            // apply the permutation in place by following its cycles
+            std::vector<bool> done(vec_.size(), false);
+            std::vector<IntType> res(quregs.size());
+            for (std::size_t i = 0; i < vec_.size(); ++i){
+                if (done[i] || (ctrlmask&i) != ctrlmask)
+                    continue;
+                auto amplitude = vec_[i];
+                vec_[i] = 0.;
+                done[i] = true;
+                auto j = permute(i, res);
+                while (!done[j]){
+                    std::swap(amplitude, vec_[j]);
+                    done[j] = true;
+                    j = permute(j, res);
+                }
+                vec_[j] += amplitude;
+            }
+            return;
+        }
+
+        StateVector newvec(allocator_); // avoid costly memory reallocations
         if( tmpBuff1_.capacity() >= vec_.size() )
           std::swap(newvec, tmpBuff1_);
         newvec.resize(vec_.size());
@@ -239,61 +390,79 @@ public:
         for (std::size_t i = 0; i < vec_.size(); i++)
           newvec[i] = 0;
 
-//#pragma omp parallel reduction(+:newvec[:newvec.size()]) if(parallelize) // requires OpenMP 4.5
+        // f is a permutation on all valid inputs, hence different threads
+        // (almost) never write to the same entry; the atomic updates only
+        // guard against collisions caused by invalid (zero-amplitude) inputs
+#pragma omp parallel if(parallelize)
         {
-          std::vector<int> res(quregs.size());
-          //#pragma omp for schedule(static)
+          std::vector<IntType> res(quregs.size());
+#pragma omp for schedule(static)
           for (std::size_t i = 0; i < vec_.size(); ++i){
               if ((ctrlmask&i) == ctrlmask){
-                  for (unsigned qr_i = 0; qr_i < quregs.size(); ++qr_i){
-                      res[qr_i] = 0;
-                      for (unsigned qb_i = 0; qb_i < quregs[qr_i].size(); ++qb_i)
-                          res[qr_i] |= ((i >> quregs[qr_i][qb_i])&1) << qb_i;
-                  }
-                  f(res);
-                  auto new_i = i;
-                  for (unsigned qr_i = 0; qr_i < quregs.size(); ++qr_i){
-                      for (unsigned qb_i = 0; qb_i < quregs[qr_i].size(); ++qb_i){
-                          if (!(((new_i >> quregs[qr_i][qb_i])&1) == ((res[qr_i] >> qb_i)&1)))
-                              new_i ^= (1UL << quregs[qr_i][qb_i]);
-                      }
-                  }
-                  newvec[new_i] += vec_[i];
+                  auto new_i = permute(i, res);
+                  auto dst = reinterpret_cast<calc_type*>(&newvec[new_i]);
+#pragma omp atomic
+                  dst[0] += std::real(vec_[i]);
+#pragma omp atomic
+                  dst[1] += std::imag(vec_[i]);
               }
               else
-                  newvec[i] += vec_[i];
+                  newvec[i] = vec_[i];
           }
         }
         std::swap(vec_, newvec);
         std::swap(tmpBuff1_, newvec);
+        release_buffers();
     }
 
-    // faster version without calling python 
+    // faster version without calling python
+    // (a is taken modulo 2^64, which is exact for registers of < 64 qubits)
     template<class QuReg>
-    inline void emulate_math_addConstant(int a, const QuReg& quregs, const std::vector<unsigned>& ctrl)
+    inline void emulate_math_addConstant(std::uint64_t a, const QuReg& quregs, const std::vector<unsigned>& ctrl)
     {
-      emulate_math([a](std::vector<int> &res){for(auto& x: res) x = x + a;}, quregs, ctrl, true);
+      emulate_math<std::uint64_t>([a](std::vector<std::uint64_t> &res){for(auto& x: res) x = x + a;}, quregs, ctrl, true);
     }
 
-    // faster version without calling python 
+    // faster version without calling python
     template<class QuReg>
-    inline void emulate_math_addConstantModN(int a, int N, const QuReg& quregs, const std::vector<unsigned>& ctrl)
+    inline void emulate_math_addConstantModN(std::uint64_t a, std::uint64_t N, const QuReg& quregs, const std::vector<unsigned>& ctrl)
     {
-      emulate_math([a,N](std::vector<int> &res){for(auto& x: res) x = (x + a) % N;}, quregs, ctrl, true);
+      a %= N;
+      // x % N, a < N <= 2^63, hence the sum cannot overflow
+      emulate_math<std::uint64_t>([a,N](std::vector<std::uint64_t> &res){for(auto& x: res) x = (x % N + a) % N;}, quregs, ctrl, true);
     }
 
-    // faster version without calling python 
+    // faster version without calling python
     template<class QuReg>
-    inline void emulate_math_multiplyByConstantModN(int a, int N, const QuReg& quregs, const std::vector<unsigned>& ctrl)
+    inline void emulate_math_multiplyByConstantModN(std::uint64_t a, std::uint64_t N, const QuReg& quregs, const std::vector<unsigned>& ctrl)
     {
-      emulate_math([a,N](std::vector<int> &res){for(auto& x: res) x = (x * a) % N;}, quregs, ctrl, true);
+      a %= N;
+      if (N <= (1ULL << 32)) // x % N, a < 2^32: product fits into 64 bits
+        emulate_math<std::uint64_t>([a,N](std::vector<std::uint64_t> &res){for(auto& x: res) x = ((x % N) * a) % N;}, quregs, ctrl, true);
+      else
+        emulate_math<std::uint64_t>([a,N](std::vector<std::uint64_t> &res){for(auto& x: res) x = mulmod(x % N, a, N);}, quregs, ctrl, true);
     }
 
     calc_type get_expectation_value(TermsDict const& td, std::vector<unsigned> const& ids){
         run();
         calc_type expectation = 0.;
 
-        StateVector current_state; // avoid costly memory reallocations
+        if (!has_memory_for(1)){
+            // <psi|P|psi> = sum_i conj(psi[i]) * phase(i^x) * psi[i^x]
+            for (auto const& term : td){
+                auto const pauli = compile_term(term.first, ids, term.second);
+                calc_type delta = 0.;
+                #pragma omp parallel for reduction(+:delta) schedule(static)
+                for (std::size_t i = 0; i < vec_.size(); ++i){
+                    auto const j = i ^ pauli.xmask;
+                    delta += std::real(std::conj(vec_[i]) * pauli.factor(j) * vec_[j]);
+                }
+                expectation += delta;
+            }
+            return expectation;
+        }
+
+        StateVector current_state(allocator_); // avoid costly memory reallocations
         if( tmpBuff1_.capacity() >= vec_.size() )
           std::swap(tmpBuff1_, current_state);
         current_state.resize(vec_.size());
@@ -318,12 +487,28 @@ public:
             expectation += coefficient * delta;
         }
         std::swap(current_state, tmpBuff1_);
+        release_buffers();
         return expectation;
     }
 
     void apply_qubit_operator(ComplexTermsDict const& td, std::vector<unsigned> const& ids){
         run();
-        StateVector new_state, current_state; // avoid costly memory reallocations
+        if (!has_memory_for(2)){
+            std::vector<PauliTerm> terms;
+            for (auto const& term : td)
+                terms.push_back(compile_term(term.first, ids, term.second));
+            for_each_coset(terms, 0, [&](std::vector<std::size_t> const& indices,
+                                         std::vector<std::size_t> const& offsets,
+                                         CosetVector& in, CosetVector& out){
+                for (std::size_t c = 0; c < indices.size(); ++c)
+                    in[c] = vec_[indices[c]];
+                apply_terms(terms, indices, offsets, in, out);
+                for (std::size_t c = 0; c < indices.size(); ++c)
+                    vec_[indices[c]] = out[c];
+            });
+            return;
+        }
+        StateVector new_state(allocator_), current_state(allocator_); // avoid costly memory reallocations
         if( tmpBuff1_.capacity() >= vec_.size() )
           std::swap(tmpBuff1_, new_state);
         if( tmpBuff2_.capacity() >= vec_.size() )
@@ -347,6 +532,7 @@ public:
         std::swap(vec_, new_state);
         std::swap(tmpBuff1_, new_state);
         std::swap(tmpBuff2_, current_state);
+        release_buffers();
     }
 
     calc_type get_probability(std::vector<bool> const& bit_string,
@@ -400,14 +586,47 @@ public:
         }
         unsigned s = std::abs(time) * op_nrm + 1.;
         complex_type correction = std::exp(-time * I * tr / (double)s);
-        auto output_state = vec_;
         auto ctrlmask = get_control_mask(ctrl);
+
+        if (!has_memory_for(3)){
+            // exp(-iHt) acts on every coset separately: accumulate the Taylor
+            // series in place using only coset-sized buffers
+            std::vector<PauliTerm> terms;
+            for (auto const& tup : td)
+                terms.push_back(compile_term(tup.first, ids, tup.second));
+            for_each_coset(terms, ctrlmask, [&](std::vector<std::size_t> const& indices,
+                                                std::vector<std::size_t> const& offsets,
+                                                CosetVector& current, CosetVector& update){
+                for (unsigned i = 0; i < s; ++i){
+                    for (std::size_t c = 0; c < indices.size(); ++c)
+                        current[c] = vec_[indices[c]];
+                    calc_type nrm_change = 1.;
+                    for (unsigned k = 0; nrm_change > 1.e-12; ++k){
+                        auto coeff = (-time * I) / double(s * (k + 1));
+                        apply_terms(terms, indices, offsets, current, update);
+                        nrm_change = 0.;
+                        for (std::size_t c = 0; c < indices.size(); ++c){
+                            update[c] *= coeff;
+                            vec_[indices[c]] += update[c];
+                            nrm_change += std::norm(update[c]);
+                        }
+                        std::swap(current, update);
+                        nrm_change = std::sqrt(nrm_change);
+                    }
+                    for (std::size_t c = 0; c < indices.size(); ++c)
+                        vec_[indices[c]] *= correction;
+                }
+            });
+            return;
+        }
+
+        auto output_state = vec_;
         for (unsigned i = 0; i < s; ++i){
             calc_type nrm_change = 1.;
             for (unsigned k = 0; nrm_change > 1.e-12; ++k){
                 auto coeff = (-time * I) / double(s * (k + 1));
                 auto current_state = vec_;
-                auto update = StateVector(vec_.size(), 0.);
+                auto update = StateVector(vec_.size(), 0., allocator_);
                 for (auto const& tup : td){
                     apply_term(tup.first, ids, {});
                     #pragma omp parallel for schedule(static)
@@ -530,10 +749,149 @@ public:
         return make_tuple(map_, std::ref(vec_));
     }
 
+    std::tuple<std::size_t, std::size_t> get_memory_statistics() const{
+        return std::make_tuple(memory_stats_->current.load(),
+                               memory_stats_->peak.load());
+    }
+
+    void reset_peak_memory(){
+        memory_stats_->peak = memory_stats_->current.load();
+    }
+
     ~Simulator(){
     }
 
 private:
+    using CosetVector = std::vector<complex_type>;
+
+    // Pauli string P with P|i> = factor(i) |i ^ xmask>
+    struct PauliTerm{
+        std::size_t xmask, zmask;
+        complex_type coefficient;
+
+        complex_type factor(std::size_t i) const{
+            return (std::bitset<64>(i & zmask).count() & 1) ? -coefficient : coefficient;
+        }
+    };
+
+    PauliTerm compile_term(Term const& term, std::vector<unsigned> const& ids,
+                           complex_type coefficient){
+        complex_type I(0., 1.);
+        PauliTerm pauli{0, 0, coefficient};
+        for (auto const& local_op : term){
+            std::size_t bit = 1UL << map_[ids[local_op.first]];
+            if (local_op.second != 'Z')
+                pauli.xmask |= bit;
+            if (local_op.second != 'X')
+                pauli.zmask |= bit;
+            if (local_op.second == 'Y')
+                pauli.coefficient *= I;
+        }
+        return pauli;
+    }
+
+    // out = sum_k P_k in, where in and out hold the amplitudes of one coset
+    // (see for_each_coset)
+    void apply_terms(std::vector<PauliTerm> const& terms,
+                     std::vector<std::size_t> const& indices,
+                     std::vector<std::size_t> const& offsets,
+                     CosetVector const& in, CosetVector& out){
+        for (std::size_t c = 0; c < indices.size(); ++c){
+            out[c] = 0.;
+            for (unsigned k = 0; k < terms.size(); ++k){
+                auto const src = c ^ offsets[k];
+                out[c] += terms[k].factor(indices[src]) * in[src];
+            }
+        }
+    }
+
+    // The cosets of the space spanned by the X/Y masks of the terms are
+    // invariant under all of them, hence operators built from these terms can
+    // be applied one coset at a time. For every coset (with all controls
+    // being 1), f(indices, offsets, buffer1, buffer2) is called, where
+    // indices[c] is the state-vector index of the c-th coset element and term
+    // k maps indices[c] to indices[c ^ offsets[k]].
+    template <class F>
+    void for_each_coset(std::vector<PauliTerm> const& terms,
+                        std::size_t ctrlmask, F const& f){
+        // basis in reduced row echelon form
+        std::vector<std::size_t> basis, pivots;
+        for (auto const& term : terms){
+            auto x = term.xmask;
+            for (unsigned b = 0; b < basis.size(); ++b)
+                if ((x >> pivots[b]) & 1)
+                    x ^= basis[b];
+            if (x == 0)
+                continue;
+            std::size_t p = 0;
+            while ((x >> p) > 1)
+                ++p;
+            for (auto& b : basis)
+                if ((b >> p) & 1)
+                    b ^= x;
+            basis.push_back(x);
+            pivots.push_back(p);
+        }
+        std::size_t pivotmask = 0;
+        for (auto p : pivots)
+            pivotmask |= 1UL << p;
+        std::vector<std::size_t> offsets(terms.size(), 0);
+        for (unsigned k = 0; k < terms.size(); ++k)
+            for (unsigned b = 0; b < basis.size(); ++b)
+                offsets[k] |= ((terms[k].xmask >> pivots[b]) & 1UL) << b;
+
+        std::size_t coset_size = 1UL << basis.size();
+        std::size_t num_cosets = vec_.size() / coset_size;
+        #pragma omp parallel if(num_cosets >= 64)
+        {
+            std::vector<std::size_t> indices(coset_size);
+            CosetVector buffer1(coset_size), buffer2(coset_size);
+            #pragma omp for schedule(static)
+            for (std::size_t i = 0; i < vec_.size(); ++i){
+                if ((i & pivotmask) != 0 || (i & ctrlmask) != ctrlmask)
+                    continue;
+                indices[0] = i;
+                for (std::size_t c = 1; c < coset_size; ++c){
+                    unsigned b = 0;
+                    while (((c >> b) & 1) == 0)
+                        ++b;
+                    indices[c] = indices[c ^ (1UL << b)] ^ basis[b];
+                }
+                f(indices, offsets, buffer1, buffer2);
+            }
+        }
+    }
+
+    // true if num_buffers auxiliary state-sized buffers fit into the budget
+    bool has_memory_for(unsigned num_buffers) const{
+        return memory_budget_ == 0 ||
+               (num_buffers + 1) * vec_.size() * sizeof(complex_type) <= memory_budget_;
+    }
+
+    // free the recycled buffers if the memory budget is limited
+    void release_buffers(){
+        if (memory_budget_ > 0){
+            StateVector(allocator_).swap(tmpBuff1_);
+            StateVector(allocator_).swap(tmpBuff2_);
+        }
+    }
+
+    // overflow-safe (a * b) % N for a, b < N
+    static inline std::uint64_t mulmod(std::uint64_t a, std::uint64_t b, std::uint64_t N){
+#if defined(__SIZEOF_INT128__)
+        return static_cast<std::uint64_t>((static_cast<unsigned __int128>(a) * b) % N);
+#else
+        std::uint64_t res = 0;
+        while (b > 0){
+            if (b & 1)
+                res = (res >= N - a) ? res - (N - a) : res + a;
+            a = (a >= N - a) ? a - (N - a) : a + a;
+            b >>= 1;
+        }
+        return res;
+#endif
+    }
+
     void apply_term(Term const& term, std::vector<unsigned> const& ids,
                     std::vector<unsigned> const& ctrl){
         complex_type I(0., 1.);
@@ -562,18 +920,18 @@ private:
     }
 
     unsigned N_; // #qubits
+    std::shared_ptr<MemoryStatistics> memory_stats_;
+    tracked_allocator<complex_type, 512> allocator_;
     StateVector vec_;
     Map map_;
     Fusion fused_gates_;
     unsigned fusion_qubits_min_, fusion_qubits_max_;
     RndEngine rnd_eng_;
     std::function<double()> rng_;
+    std::size_t memory_budget_;
 
     // large array buffers to avoid costly reallocations
-    static StateVector tmpBuff1_, tmpBuff2_;
+    StateVector tmpBuff1_, tmpBuff2_;
 };
 
-Simulator::StateVector Simulator::tmpBuff1_;
-Simulator::StateVector Simulator::tmpBuff2_;
-
 #endif
@@ -32,36 +32,43 @@ using QuRegs = std::vector<std::vector<unsigned>>;
 
 template <class QR>
 void emulate_math_wrapper(Simulator &sim, py::function const& pyfunc, QR const& qr, std::vector<unsigned> const& ctrls){
-    auto f = [&](std::vector<int>& x) {
+    auto f = [&](std::vector<std::int64_t>& x) {
         pybind11::gil_scoped_acquire acquire;
-        x = std::move(pyfunc(x).cast<std::vector<int>>());
+        x = std::move(pyfunc(x).cast<std::vector<std::int64_t>>());
     };
     pybind11::gil_scoped_release release;
-    sim.emulate_math(f, qr, ctrls);
+    sim.emulate_math<std::int64_t>(f, qr, ctrls);
 }
 PYBIND11_PLUGIN(_cppsim) {
     py::module m("_cppsim", "_cppsim");
+    // the state is only accessed through the Simulator object, so the
+    // methods which apply gates or compute on the state vector release the
+    // GIL (e.g., for the AsyncEngine)
+    auto release_gil = py::call_guard<py::gil_scoped_release>();
     py::class_<Simulator>(m, "Simulator")
         .def(py::init<unsigned>())
+        .def(py::init<unsigned, std::size_t>())
         .def("allocate_qubit", &Simulator::allocate_qubit)
         .def("deallocate_qubit", &Simulator::deallocate_qubit)
         .def("get_classical_value", &Simulator::get_classical_value)
         .def("is_classical", &Simulator::is_classical)
-        .def("measure_qubits", &Simulator::measure_qubits_return)
-        .def("apply_controlled_gate", &Simulator::apply_controlled_gate<MatrixType>)
+        .def("measure_qubits", &Simulator::measure_qubits_return, release_gil)
+        .def("apply_controlled_gate", &Simulator::apply_controlled_gate<MatrixType>, release_gil)
         .def("emulate_math", &emulate_math_wrapper<QuRegs>)
-        .def("emulate_math_addConstant", &Simulator::emulate_math_addConstant<QuRegs>)
-        .def("emulate_math_addConstantModN", &Simulator::emulate_math_addConstantModN<QuRegs>)
-        .def("emulate_math_multiplyByConstantModN", &Simulator::emulate_math_multiplyByConstantModN<QuRegs>)
-        .def("get_expectation_value", &Simulator::get_expectation_value)
-        .def("apply_qubit_operator", &Simulator::apply_qubit_operator)
-        .def("emulate_time_evolution", &Simulator::emulate_time_evolution)
-        .def("get_probability", &Simulator::get_probability)
+        .def("emulate_math_addConstant", &Simulator::emulate_math_addConstant<QuRegs>, release_gil)
+        .def("emulate_math_addConstantModN", &Simulator::emulate_math_addConstantModN<QuRegs>, release_gil)
+        .def("emulate_math_multiplyByConstantModN", &Simulator::emulate_math_multiplyByConstantModN<QuRegs>, release_gil)
+        .def("get_expectation_value", &Simulator::get_expectation_value, release_gil)
+        .def("apply_qubit_operator", &Simulator::apply_qubit_operator, release_gil)
+        .def("emulate_time_evolution", &Simulator::emulate_time_evolution, release_gil)
+        .def("get_probability", &Simulator::get_probability, release_gil)
         .def("get_amplitude", &Simulator::get_amplitude)
         .def("set_wavefunction", &Simulator::set_wavefunction)
-        .def("collapse_wavefunction", &Simulator::collapse_wavefunction)
-        .def("run", &Simulator::run)
+        .def("collapse_wavefunction", &Simulator::collapse_wavefunction, release_gil)
+        .def("run", &Simulator::run, release_gil)
         .def("cheat", &Simulator::cheat)
+        .def("get_memory_statistics", &Simulator::get_memory_statistics)
+        .def("reset_peak_memory", &Simulator::reset_peak_memory)
         ;
     return m.ptr();
 }
@@ -0,0 +1,95 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains the adjoint (reverse-mode) differentiation of expectation values with
+respect to the angles of the rotation gates of a recorded circuit.
+"""
+
+import numpy as np
+
+from projectq.ops import Rx, Ry, Rz, Rxx, Ryy, Rzz, Ph, R
+
+from ._npkernels import apply_matrix, apply_qubit_operator
+
+_X = np.array([[0, 1], [1, 0]], dtype=np.complex128)
+_Y = np.array([[0, -1j], [1j, 0]], dtype=np.complex128)
+_Z = np.array([[1, 0], [0, -1]], dtype=np.complex128)
+
+# Generators G such that gate(theta).matrix = exp(-i theta G / 2)
+_GENERATORS = {Rx: _X,
+               Ry: _Y,
+               Rz: _Z,
+               Rxx: np.kron(_X, _X),
+               Ryy: np.kron(_Y, _Y),
+               Rzz: np.kron(_Z, _Z),
+               Ph: -2. * np.eye(2, dtype=np.complex128),
+               R: np.diag([0., -2.]).astype(np.complex128)}
+
+
+def is_parametrized(gate):
+    """
+    Return True if the gradient with respect to the angle of gate is
+    supported.
+    """
+    return type(gate) in _GENERATORS
+
+
+def adjoint_gradient(state, qubit_map, tape, qubit_operator, positions):
+    """
+    Compute <psi|H|psi> and its derivatives with respect to the angles of all
+    parametrized gates on the tape.
+
+    With psi = U_N ... U_1 psi_0, lambda = H psi is propagated backwards
+    together with psi. For U_k = exp(-i theta_k G_k / 2), the derivative is
+    d<H>/d theta_k = Im <lambda_k|G_k|psi_k>, where psi_k and lambda_k are
+    the states right after U_k. Each gate therefore costs three passes over a
+    state vector (U_k^dagger on psi and lambda, and G_k on psi for
+    parametrized gates).
+
+    Args:
+        state (numpy.ndarray): Final state vector psi.
+        qubit_map (dict): Mapping from qubit ids to bit positions.
+        tape (list[tuple]): Recorded (gate, matrix, ids, ctrlids) tuples in
+            the order of application.
+        qubit_operator (projectq.ops.QubitOperator): Hermitian operator H.
+        positions (list[int]): Bit positions of the qubits H acts upon.
+
+    Returns:
+        Tuple (expectation, gradient), where gradient is a numpy array with
+        one entry per parametrized gate on the tape (in the order of
+        application).
+    """
+    num_qubits = len(qubit_map)
+    psi = np.array(state, dtype=np.complex128).reshape(1, -1)
+    lam = apply_qubit_operator(psi, num_qubits, qubit_operator, positions)
+    expectation = np.vdot(psi[0], lam[0]).real
+    # propagate psi and lambda together
+    stack = np.concatenate((psi, lam))
+    indices = np.arange(stack.shape[1])
+    gradient = []
+    for gate, matrix, ids, ctrlids in reversed(tape):
+        target_pos = [qubit_map[qubit_id] for qubit_id in ids]
+        ctrl_pos = [qubit_map[qubit_id] for qubit_id in ctrlids]
+        if is_parametrized(gate):
+            mu = stack[:1].copy()
+            apply_matrix(mu, num_qubits, _GENERATORS[type(gate)], target_pos,
+                         ctrl_pos)
+            # the derivative of a controlled gate vanishes outside of the
+            # subspace where all controls are 1
+            ctrlmask = sum(1 << pos for pos in ctrl_pos)
+            active = (indices & ctrlmask) == ctrlmask
+            gradient.append(np.vdot(stack[1, active], mu[0, active]).imag)
+        apply_matrix(stack, num_qubits, matrix.conj().T, target_pos, ctrl_pos)
+    return expectation, np.array(gradient[::-1])
@@ -0,0 +1,411 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains a matrix-product-state simulator for circuits with low entanglement.
+"""
+
+import numpy as np
+
+from projectq.ops import Measure, Allocate, Deallocate
+
+from ._basics import BasicSimulator
+from ._npkernels import apply_matrix
+
+_PAULIS = {'X': np.array([[0, 1], [1, 0]], dtype=np.complex128),
+           'Y': np.array([[0, -1j], [1j, 0]], dtype=np.complex128),
+           'Z': np.array([[1, 0], [0, -1]], dtype=np.complex128)}
+_PROJECTORS = [np.diag([1., 0.]).astype(np.complex128),
+               np.diag([0., 1.]).astype(np.complex128)]
+
+
+class MPSSimulator(BasicSimulator):
+    """
+    MPSSimulator is a compiler engine which simulates a quantum computer by
+    representing its state as a matrix product state (MPS).
+
+    Each qubit corresponds to one site of a chain (in the order of
+    allocation) and the memory and run time scale with the bond dimension
+    chi instead of 2^n, which allows to simulate shallow, one-dimensional or
+    otherwise weakly entangled circuits on many qubits. Gates acting on
+    non-neighboring sites are applied by temporarily swapping the sites next
+    to each other.
+
+    Whenever a bond is split, singular values are discarded if their
+    accumulated weight is below `truncation_threshold` or if the bond
+    dimension exceeds `max_bond_dimension`. The accumulated discarded weight
+    is available as :attr:`truncation_error` and bounds the infidelity of the
+    simulated state:
+
+    .. code-block:: python
+
+        sim = MPSSimulator(max_bond_dimension=64)
+        eng = MainEngine(sim, [])
+        qureg = eng.allocate_qureg(100)
+        ...
+        eng.flush()
+        energy = sim.get_expectation_value(hamiltonian, qureg)
+        print(sim.truncation_error)
+    """
+    def __init__(self, max_bond_dimension=None, truncation_threshold=1.e-12,
+                 rnd_seed=None):
+        """
+        Initialize the MPS simulator.
+
+        Args:
+            max_bond_dimension (int): Maximal bond dimension chi (unlimited
+                by default, i.e., only the truncation_threshold applies).
+            truncation_threshold (float): Maximal weight (sum of the squared
+                singular values) discarded when splitting a bond.
+            rnd_seed (int): Random seed for the measurements.
+        """
+        BasicSimulator.__init__(self)
+        self._max_bond_dimension = max_bond_dimension
+        self._truncation_threshold = truncation_threshold
+        self._rng = np.random.RandomState(rnd_seed)
+        # site tensors of shape (left bond, 2, right bond)
+        self._tensors = []
+        # qubit id of each site (self._map stores the site of each qubit id)
+        self._sites = []
+        # orthogonality center
+        self._center = 0
+        self._truncation_error = 0.
+
+    @property
+    def truncation_error(self):
+        """
+        Accumulated weight of all discarded singular values (an upper bound
+        on the infidelity of the simulated state, up to second order).
+        """
+        return self._truncation_error
+
+    def get_bond_dimensions(self):
+        """
+        Return the bond dimensions between neighboring sites.
+
+        Returns:
+            List of n-1 integers.
+        """
+        return [tensor.shape[2] for tensor in self._tensors[:-1]]
+
+    def _move_center(self, site):
+        """
+        Move the orthogonality center to the given site using QR
+        decompositions.
+        """
+        while self._center < site:
+            tensor = self._tensors[self._center]
+            left, _, right = tensor.shape
+            q, r = np.linalg.qr(tensor.reshape(left * 2, right))
+            self._tensors[self._center] = q.reshape(left, 2, -1)
+            self._tensors[self._center + 1] = np.tensordot(
+                r, self._tensors[self._center + 1], axes=(1, 0))
+            self._center += 1
+        while self._center > site:
+            tensor = self._tensors[self._center]
+            left, _, right = tensor.shape
+            q, r = np.linalg.qr(tensor.reshape(left, 2 * right).T)
+            self._tensors[self._center] = q.T.reshape(-1, 2, right)
+            self._tensors[self._center - 1] = np.tensordot(
+                self._tensors[self._center - 1], r.T, axes=(2, 0))
+            self._center -= 1
+
+    def _split(self, theta, start):
+        """
+        Split the block tensor theta of shape (left, 2, ..., 2, right) into
+        site tensors starting at `start`, truncating each bond. The
+        orthogonality center ends up on the last site of the block.
+        """
+        num_sites = theta.ndim - 2
+        for offset in range(num_sites - 1):
+            left = theta.shape[0]
+            rest = theta.shape[2:]
+            u, s, vh = np.linalg.svd(theta.reshape(left * 2, -1),
+                                     full_matrices=False)
+            keep = self._truncate(s)
+            self._tensors[start + offset] = u[:, :keep].reshape(left, 2, keep)
+            theta = (s[:keep, None] * vh[:keep]).reshape((keep,) + rest)
+        self._tensors[start + num_sites - 1] = theta
+        self._center = start + num_sites - 1
+
+    def _truncate(self, s):
+        """
+        Return the number of singular values to keep, accumulate the
+        discarded weight and renormalize the kept singular values (in place).
+        """
+        weights = s ** 2
+        total = np.sum(weights)
+        # discarded[k] = weight of all singular values from index k on
+        discarded = np.cumsum(weights[::-1])[::-1] / total
+        keep = max(1, int(np.sum(discarded > self._truncation_threshold)))
+        if self._max_bond_dimension is not None:
+            keep = min(keep, self._max_bond_dimension)
+        if keep < len(s):
+            self._truncation_error += discarded[keep]
+        s[:keep] /= np.sqrt(np.sum(weights[:keep]) / total)
+        return keep
+
+    def _contract_block(self, start, num_sites):
+        """
+        Return the tensor of shape (left, 2, ..., 2, right) of the given
+        contiguous sites.
+        """
+        theta = self._tensors[start]
+        for site in range(start + 1, start + num_sites):
+            theta = np.tensordot(theta, self._tensors[site], axes=(-1, 0))
+        return theta
+
+    def _swap_sites(self, site):
+        """
+        Swap the sites `site` and `site + 1`.
+        """
+        self._move_center(site)
+        theta = self._contract_block(site, 2).transpose(0, 2, 1, 3)
+        self._split(theta, site)
+        self._sites[site], self._sites[site + 1] = (self._sites[site + 1],
+                                                    self._sites[site])
+        self._map[self._sites[site]] = site
+        self._map[self._sites[site + 1]] = site + 1
+
+    def _apply_gate(self, matrix, ids, ctrlids):
+        """
+        Apply a (controlled) gate by moving all involved sites next to each
+        other, updating the block and moving the sites back.
+        """
+        involved = sorted(set(self._map[qubit_id]
+                              for qubit_id in list(ids) + list(ctrlids)))
+        start = involved[0]
+        swaps = []
+        for offset, site in enumerate(involved):
+            while site > start + offset:
+                self._swap_sites(site - 1)
+                swaps.append(site - 1)
+                site -= 1
+
+        num_sites = len(involved)
+        self._move_center(start)
+        theta = self._contract_block(start, num_sites)
+        shape = theta.shape
+        # bit position m-1-j corresponds to site start+j of the block
+        state = theta.transpose((0, num_sites + 1) +
+                                tuple(range(1, num_sites + 1)))
+        state = state.reshape(shape[0] * shape[-1], 2 ** num_sites)
+        apply_matrix(state, num_sites, matrix,
+                     [start + num_sites - 1 - self._map[qubit_id]
+                      for qubit_id in ids],
+                     [start + num_sites - 1 - self._map[qubit_id]
+                      for qubit_id in ctrlids])
+        state = state.reshape((shape[0], shape[-1]) + (2,) * num_sites)
+        theta = state.transpose((0,) + tuple(range(2, num_sites + 2)) + (1,))
+        self._split(theta, start)
+
+        for site in reversed(swaps):
+            self._swap_sites(site)
+
+    def _transfer(self, operators):
+        """
+        Return <psi| prod_k O_k |psi> for single-site operators O_k.
+
+        Args:
+            operators (dict): Mapping from sites to 2x2 operator matrices.
+        """
+        if len(operators) == 0:
+            return 1.
+        first = min(operators)
+        last = max(operators)
+        # Sites outside [first, last] are in canonical form w.r.t. the center
+        self._move_center(first)
+        env = np.eye(self._tensors[first].shape[0], dtype=np.complex128)
+        for site in range(first, last + 1):
+            tensor = self._tensors[site]
+            if site in operators:
+                op_tensor = np.tensordot(operators[site], tensor,
+                                         axes=(1, 1)).transpose(1, 0, 2)
+            else:
+                op_tensor = tensor
+            env = np.tensordot(env, tensor.conj(), axes=(0, 0))
+            env = np.tensordot(env, op_tensor, axes=([0, 1], [0, 1]))
+        return np.trace(env)
+
+    def get_expectation_value(self, qubit_operator, qureg):
+        """
+        Get the expectation value of qubit_operator w.r.t. the current wave
+        function represented by the supplied quantum register.
+
+        Args:
+            qubit_operator (projectq.ops.QubitOperator): Operator to measure.
+            qureg (list[Qubit],Qureg): Quantum bits to measure.
+
+        Returns:
+            Expectation value
+
+        Raises:
+            Exception: If `qubit_operator` acts on more qubits than present in
+                the `qureg` argument.
+
+        Note:
+            If there is a mapper present in the compiler, this function
+            automatically converts from logical qubits to mapped qubits for
+            the qureg argument.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        self._check_ids([qb.id for qb in qureg], "get_expectation_value")
+        for term in qubit_operator.terms:
+            if not term == () and term[-1][0] >= len(qureg):
+                raise Exception("qubit_operator acts on more qubits than "
+                                "contained in the qureg.")
+        expectation = 0.
+        for term, coefficient in qubit_operator.terms.items():
+            operators = {self._map[qureg[index].id]: _PAULIS[action]
+                         for index, action in term}
+            expectation += (coefficient * self._transfer(operators)).real
+        return expectation
+
+    def get_probability(self, bit_string, qureg):
+        """
+        Return the probability of the outcome `bit_string` when measuring
+        the quantum register `qureg`.
+
+        Args:
+            bit_string (list[bool|int]|string[0|1]): Measurement outcome.
+            qureg (Qureg|list[Qubit]): Quantum register.
+
+        Returns:
+            Probability of measuring the provided bit string.
+
+        Note:
+            If there is a mapper present in the compiler, this function
+            automatically converts from logical qubits to mapped qubits for
+            the qureg argument.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        self._check_ids([qb.id for qb in qureg], "get_probability")
+        operators = {self._map[qb.id]: _PROJECTORS[int(bit)]
+                     for qb, bit in zip(qureg, bit_string)}
+        return self._transfer(operators).real
+
+    def get_amplitude(self, bit_string, qureg):
+        """
+        Return the probability amplitude of the supplied `bit_string`.
+        The ordering is given by the quantum register `qureg`, which must
+        contain all allocated qubits.
+
+        Args:
+            bit_string (list[bool|int]|string[0|1]): Computational basis state
+            qureg (Qureg|list[Qubit]): Quantum register determining the
+                ordering. Must contain all allocated qubits.
+
+        Returns:
+            Probability amplitude of the provided bit string.
+
+        Note:
+            If there is a mapper present in the compiler, this function
+            automatically converts from logical qubits to mapped qubits for
+            the qureg argument.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        if not set(qb.id for qb in qureg) == set(self._map):
+            raise RuntimeError("The second argument to get_amplitude() must"
+                               " be a permutation of all allocated qubits. "
+                               "Please make sure you have called "
+                               "eng.flush().")
+        bits = [0] * len(self._sites)
+        for qb, bit in zip(qureg, bit_string):
+            bits[self._map[qb.id]] = int(bit)
+        vector = np.ones(1, dtype=np.complex128)
+        for tensor, bit in zip(self._tensors, bits):
+            vector = vector.dot(tensor[:, bit, :])
+        return complex(vector[0])
+
+    def _measure(self, qubit_id):
+        """
+        Measure a single qubit and collapse the state accordingly.
+        """
+        site = self._map[qubit_id]
+        self._move_center(site)
+        tensor = self._tensors[site]
+        weights = np.sum(np.abs(tensor) ** 2, axis=(0, 2))
+        value = int(self._rng.random_sample() * np.sum(weights) < weights[1])
+        tensor = tensor.copy()
+        tensor[:, 1 - value, :] = 0.
+        self._tensors[site] = tensor / np.sqrt(weights[value])
+        return bool(value)
+
+    def _allocate(self, qubit_id):
+        if qubit_id in self._map:
+            raise RuntimeError("AllocateQubit: ID already exists. Qubit IDs "
+                               "should be unique.")
+        tensor = np.zeros((1, 2, 1), dtype=np.complex128)
+        tensor[0, 0, 0] = 1.
+        self._map[qubit_id] = len(self._sites)
+        self._sites.append(qubit_id)
+        self._tensors.append(tensor)
+
+    def _deallocate(self, qubit_id):
+        site = self._map[qubit_id]
+        self._move_center(site)
+        tensor = self._tensors[site]
+        weights = np.sum(np.abs(tensor) ** 2, axis=(0, 2))
+        probability_one = weights[1] / np.sum(weights)
+        if 1.e-10 < probability_one < 1. - 1.e-10:
+            raise RuntimeError("Error: Qubit has not been measured / "
+                               "uncomputed! There is most likely a bug in "
+                               "your code.")
+        matrix = tensor[:, int(probability_one > .5), :]
+        del self._tensors[site]
+        del self._sites[site]
+        del self._map[qubit_id]
+        for other_site in range(site, len(self._sites)):
+            self._map[self._sites[other_site]] = other_site
+        if site > 0:
+            site -= 1
+            self._tensors[site] = np.tensordot(self._tensors[site], matrix,
+                                               axes=(2, 0))
+        elif len(self._tensors) > 0:
+            self._tensors[site] = np.tensordot(matrix, self._tensors[site],
+                                               axes=(1, 0))
+        else:
+            self._center = 0
+            return
+        self._tensors[site] /= np.linalg.norm(self._tensors[site])
+        self._center = site
+
+    def _handle(self, cmd):
+        """
+        Handle a command, i.e., update the matrix product state.
+
+        Args:
+            cmd (Command): Command to handle.
+
+        Raises:
+            Exception: If the gate matrix does not match the number of
+                qubits it is applied to.
+        """
+        if cmd.gate == Measure:
+            self._handle_measure(cmd)
+        elif cmd.gate == Allocate:
+            self._allocate(cmd.qubits[0][0].id)
+        elif cmd.gate == Deallocate:
+            self._deallocate(cmd.qubits[0][0].id)
+        else:
+            matrix = np.asarray(cmd.gate.matrix, dtype=np.complex128)
+            ids = [qb.id for qr in cmd.qubits for qb in qr]
+            if not 2 ** len(ids) == len(matrix):
+                raise Exception("MPSSimulator: Error applying {} gate: "
+                                "{}-qubit gate applied to {} qubits.".format(
+                                    str(cmd.gate),
+                                    int(np.log2(len(matrix))),
+                                    len(ids)))
+            self._apply_gate(matrix, ids,
+                             [qb.id for qb in cmd.control_qubits])
@@ -0,0 +1,137 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Tests for projectq.backends._sim._mps_simulator.py
+"""
+
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import MPSSimulator, Simulator
+from projectq.cengines import BasicMapperEngine
+from projectq.libs.math import AddConstant
+from projectq.meta import Control
+from projectq.ops import (All, CNOT, Command, H, Measure, QubitOperator, Rx,
+                          Ry, Rz, Rzz, Swap, Toffoli, X)
+from projectq.types import WeakQubitRef
+
+
+def _circuit(eng, qureg):
+    All(H) | qureg[::2]
+    Ry(0.3) | qureg[1]
+    CNOT | (qureg[0], qureg[4])
+    Rzz(0.7) | (qureg[3], qureg[1])
+    with Control(eng, qureg[5]):
+        Rx(1.3) | qureg[2]
+        Swap | (qureg[0], qureg[3])
+    Toffoli | (qureg[4], qureg[1], qureg[3])
+    Rz(0.4) | qureg[0]
+    CNOT | (qureg[2], qureg[5])
+
+
+def test_mps_simulator_matches_simulator():
+    hamiltonian = (QubitOperator('X0 Y1', 0.5) + QubitOperator('Z2 Z5', 1.5) +
+                   QubitOperator('Y3 X4', -0.7) + QubitOperator('', 0.2))
+    sim = MPSSimulator()
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(6)
+    ref_sim = Simulator()
+    ref_eng = MainEngine(ref_sim, [])
+    ref_qureg = ref_eng.allocate_qureg(6)
+    _circuit(eng, qureg)
+    _circuit(ref_eng, ref_qureg)
+    eng.flush()
+    ref_eng.flush()
+    assert sim.get_expectation_value(hamiltonian, qureg) == pytest.approx(
+        ref_sim.get_expectation_value(hamiltonian, ref_qureg))
+    for bits in ['101', '011', '000']:
+        assert sim.get_probability(bits, qureg[1:4]) == pytest.approx(
+            ref_sim.get_probability(bits, ref_qureg[1:4]))
+    for bits in ['101101', '010011']:
+        assert sim.get_amplitude(bits, qureg[::-1]) == pytest.approx(
+            ref_sim.get_amplitude(bits, ref_qureg[::-1]))
+    assert sim.truncation_error < 1.e-12
+    assert max(sim.get_bond_dimensions()) <= 8
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
+
+
+def test_mps_simulator_measurement_and_deallocation():
+    sim = MPSSimulator(rnd_seed=5)
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(40)
+    H | qureg[0]
+    for i in range(39):
+        CNOT | (qureg[i], qureg[i + 1])
+    eng.flush()
+    assert sim.get_bond_dimensions() == [2] * 39
+    assert sim.get_probability([1] * 40, qureg) == pytest.approx(.5)
+    Measure | qureg[17]
+    value = int(qureg[17])
+    All(Measure) | qureg
+    assert [int(qb) for qb in qureg] == [value] * 40
+    del qureg[3]
+    eng.flush()
+    assert len(sim.get_bond_dimensions()) == 38
+    assert sim.get_amplitude([value] * 39, qureg) == pytest.approx(1.)
+
+
+def test_mps_simulator_truncation():
+    sim = MPSSimulator(max_bond_dimension=1)
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(2)
+    Ry(0.5) | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    eng.flush()
+    assert sim.get_bond_dimensions() == [1]
+    assert sim.truncation_error == pytest.approx(0.5 - 0.5 * 0.877582561890,
+                                                 abs=1.e-9)
+    assert sim.get_probability('00', qureg) == pytest.approx(1.)
+    All(Measure) | qureg
+
+
+def test_mps_simulator_errors():
+    sim = MPSSimulator()
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    H | qubit
+    eng.flush()
+    assert not sim.is_available(Command(eng, AddConstant(1), (qubit,)))
+    with pytest.raises(RuntimeError):
+        sim.get_probability('1', [WeakQubitRef(eng, 10)])
+    with pytest.raises(Exception):
+        sim.get_expectation_value(QubitOperator('Z1'), qubit)
+    with pytest.raises(RuntimeError):
+        sim.get_amplitude('10', qubit + [WeakQubitRef(eng, 10)])
+    with pytest.raises(RuntimeError):
+        qubit[0].__del__()
+    assert qubit[0].id == -1
+
+
+def test_mps_simulator_with_mapper():
+    mapper = BasicMapperEngine()
+    mapper.current_mapping = {0: 2, 1: 0, 2: 1}
+    sim = MPSSimulator()
+    eng = MainEngine(sim, [mapper])
+    qureg = eng.allocate_qureg(3)
+    X | qureg[2]
+    CNOT | (qureg[2], qureg[0])
+    eng.flush()
+    assert sim.get_probability('101', qureg) == pytest.approx(1.)
+    assert sim.get_amplitude('101', qureg) == pytest.approx(1.)
+    assert sim.get_expectation_value(QubitOperator('Z1'), qureg) == \
+        pytest.approx(1.)
+    All(Measure) | qureg
+    eng.flush()
+    assert [int(qb) for qb in qureg] == [1, 0, 1]
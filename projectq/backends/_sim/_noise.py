@@ -0,0 +1,280 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains single-qubit noise channels and the noise model which attaches them
+to gates and qubits. The channels are unraveled into quantum trajectories,
+i.e., every application samples one Kraus operator and updates the state
+vector of the simulator accordingly.
+"""
+
+import math
+
+from projectq.ops import BasicGate
+
+_PAULI_MATRICES = {'X': [[0., 1.], [1., 0.]],
+                   'Y': [[0., -1.j], [1.j, 0.]],
+                   'Z': [[1., 0.], [0., -1.]]}
+
+
+class PauliChannel(object):
+    """
+    Applies X, Y or Z with probabilities px, py and pz (and the identity
+    otherwise).
+    """
+    def __init__(self, px=0., py=0., pz=0.):
+        """
+        Initialize a Pauli channel.
+
+        Args:
+            px (float): Probability of an X error.
+            py (float): Probability of a Y error.
+            pz (float): Probability of a Z error.
+
+        Raises:
+            ValueError: If the probabilities are negative or exceed 1 in
+                total.
+        """
+        if min(px, py, pz) < 0. or px + py + pz > 1.:
+            raise ValueError("PauliChannel: Invalid error probabilities.")
+        self.px = px
+        self.py = py
+        self.pz = pz
+
+    def apply(self, simulator, qubit_id, rng):
+        """
+        Apply the channel to one trajectory.
+
+        Args:
+            simulator: Simulator kernels (C++ or Python) holding the state.
+            qubit_id (int): Id of the qubit (as known to the simulator).
+            rng (numpy.random.RandomState): Random number generator of the
+                trajectory.
+        """
+        rnd = rng.random_sample()
+        for pauli, probability in (('X', self.px), ('Y', self.py),
+                                   ('Z', self.pz)):
+            if rnd < probability:
+                simulator.apply_controlled_gate(_PAULI_MATRICES[pauli],
+                                                [qubit_id], [])
+                simulator.run()
+                return
+            rnd -= probability
+
+    def __str__(self):
+        return "PauliChannel({}, {}, {})".format(self.px, self.py, self.pz)
+
+
+class DepolarizingChannel(PauliChannel):
+    """
+    Replaces the qubit by the maximally mixed state with probability
+    4p/3, i.e., applies X, Y and Z with probability p/3 each.
+    """
+    def __init__(self, p):
+        """
+        Initialize a depolarizing channel.
+
+        Args:
+            p (float): Total error probability.
+        """
+        PauliChannel.__init__(self, p / 3., p / 3., p / 3.)
+        self.p = p
+
+    def __str__(self):
+        return "DepolarizingChannel({})".format(self.p)
+
+
+class AmplitudeDampingChannel(object):
+    """
+    Relaxes |1> to |0> with probability gamma (Kraus operators
+    K0 = |0><0| + sqrt(1 - gamma)|1><1| and K1 = sqrt(gamma)|0><1|).
+    """
+    def __init__(self, gamma):
+        """
+        Initialize an amplitude-damping channel.
+
+        Args:
+            gamma (float): Decay probability of the excited state.
+
+        Raises:
+            ValueError: If gamma is not a probability.
+        """
+        if not 0. <= gamma <= 1.:
+            raise ValueError("AmplitudeDampingChannel: gamma must be in "
+                             "[0, 1].")
+        self.gamma = gamma
+
+    def apply(self, simulator, qubit_id, rng):
+        """
+        Apply the channel to one trajectory.
+
+        Args:
+            simulator: Simulator kernels (C++ or Python) holding the state.
+            qubit_id (int): Id of the qubit (as known to the simulator).
+            rng (numpy.random.RandomState): Random number generator of the
+                trajectory.
+        """
+        p_jump = self.gamma * simulator.get_probability([True], [qubit_id])
+        if rng.random_sample() < p_jump:
+            # K1: collapse onto |1> and flip to |0>
+            simulator.collapse_wavefunction([qubit_id], [True])
+            simulator.apply_controlled_gate(_PAULI_MATRICES['X'],
+                                            [qubit_id], [])
+            simulator.run()
+        else:
+            # K0 = (1 + s)/2 I + (1 - s)/2 Z, renormalized
+            s = math.sqrt(1. - self.gamma)
+            norm = math.sqrt(1. - p_jump)
+            simulator.apply_qubit_operator(
+                [([], (1. + s) / (2. * norm)),
+                 ([(0, 'Z')], (1. - s) / (2. * norm))], [qubit_id])
+
+    def __str__(self):
+        return "AmplitudeDampingChannel({})".format(self.gamma)
+
+
+class ReadoutError(object):
+    """
+    Flips the classical measurement outcome (but not the post-measurement
+    state) of a qubit.
+    """
+    def __init__(self, p0to1, p1to0=None):
+        """
+        Initialize a readout error.
+
+        Args:
+            p0to1 (float): Probability of reading 1 if the outcome is 0.
+            p1to0 (float): Probability of reading 0 if the outcome is 1
+                (equal to p0to1 by default).
+        """
+        if p1to0 is None:
+            p1to0 = p0to1
+        self.p0to1 = p0to1
+        self.p1to0 = p1to0
+
+    def apply(self, value, rng):
+        """
+        Return the (possibly flipped) measurement outcome.
+
+        Args:
+            value (bool): Actual measurement outcome.
+            rng (numpy.random.RandomState): Random number generator of the
+                trajectory.
+        """
+        probability = self.p1to0 if value else self.p0to1
+        return (not value) if rng.random_sample() < probability else value
+
+    def __str__(self):
+        return "ReadoutError({}, {})".format(self.p0to1, self.p1to0)
+
+
+class NoiseModel(object):
+    """
+    Collection of noise channels attached to gate types and/or qubits.
+
+    Gate noise is applied to each target qubit of a matching gate right
+    after the gate. Readout errors are applied to the outcomes of
+    measurements.
+
+    Example:
+        .. code-block:: python
+
+            noise_model = NoiseModel()
+            noise_model.add_gate_noise(DepolarizingChannel(1.e-3))
+            noise_model.add_gate_noise(DepolarizingChannel(1.e-2),
+                                       gates=[XGate])
+            noise_model.add_gate_noise(AmplitudeDampingChannel(.02),
+                                       qubits=[3])
+            noise_model.add_readout_error(ReadoutError(.01, .03))
+    """
+    def __init__(self):
+        self._gate_noise = []
+        self._readout_errors = []
+
+    def add_gate_noise(self, channel, gates=None, qubits=None):
+        """
+        Attach a channel to gates.
+
+        Args:
+            channel: PauliChannel, DepolarizingChannel or
+                AmplitudeDampingChannel.
+            gates (list): Gate classes (matching all instances) or gate
+                instances (matching equal gates) after which the channel is
+                applied. All gates match if None.
+            qubits (list[int]): Qubit ids to which the channel applies. All
+                qubits if None.
+        """
+        self._gate_noise.append((channel, _to_tuple(gates),
+                                 _to_set(qubits)))
+
+    def add_readout_error(self, error, qubits=None):
+        """
+        Attach a readout error to measurements.
+
+        Args:
+            error (ReadoutError): Readout error.
+            qubits (list[int]): Qubit ids to which the error applies. All
+                qubits if None.
+        """
+        self._readout_errors.append((error, _to_set(qubits)))
+
+    def get_gate_noise(self, gate, qubit_id):
+        """
+        Return the channels to apply to the qubit after the gate.
+
+        Args:
+            gate (BasicGate): Gate which has been applied.
+            qubit_id (int): Id of a target qubit of the gate.
+        """
+        return [channel for channel, gates, qubits in self._gate_noise
+                if _matches(gate, gates) and
+                (qubits is None or qubit_id in qubits)]
+
+    def get_readout_errors(self, qubit_id):
+        """
+        Return the readout errors to apply to a measurement of the qubit.
+
+        Args:
+            qubit_id (int): Id of the measured qubit.
+        """
+        return [error for error, qubits in self._readout_errors
+                if qubits is None or qubit_id in qubits]
+
+
+def _to_tuple(gates):
+    if gates is None:
+        return None
+    if isinstance(gates, (BasicGate, type)):
+        return (gates,)
+    return tuple(gates)
+
+
+def _to_set(qubits):
+    if qubits is None:
+        return None
+    if isinstance(qubits, int):
+        return {qubits}
+    return set(qubits)
+
+
+def _matches(gate, gates):
+    if gates is None:
+        return True
+    for entry in gates:
+        if isinstance(entry, type):
+            if isinstance(gate, entry):
+                return True
+        elif gate == entry:
+            return True
+    return False
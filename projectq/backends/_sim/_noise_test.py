@@ -0,0 +1,98 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Tests for projectq.backends._sim._noise.py
+"""
+
+import numpy
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import (AmplitudeDampingChannel, DepolarizingChannel,
+                               NoiseModel, PauliChannel, ReadoutError,
+                               Simulator)
+from projectq.ops import H, Measure, Rx, X, XGate
+
+
+def test_pauli_channel():
+    with pytest.raises(ValueError):
+        PauliChannel(.5, .4, .2)
+    with pytest.raises(ValueError):
+        PauliChannel(-.1)
+    sim = Simulator()
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    eng.flush()
+    rng = numpy.random.RandomState(1)
+    PauliChannel(px=1.).apply(sim._simulator, qubit[0].id, rng)
+    assert sim.get_probability('1', qubit) == pytest.approx(1.)
+    PauliChannel(py=1.).apply(sim._simulator, qubit[0].id, rng)
+    assert sim.get_amplitude('0', qubit) == pytest.approx(-1.j)
+    PauliChannel(pz=1.).apply(sim._simulator, qubit[0].id, rng)
+    assert sim.get_amplitude('0', qubit) == pytest.approx(-1.j)
+    depolarizing = DepolarizingChannel(.3)
+    assert depolarizing.px == depolarizing.py == depolarizing.pz == \
+        pytest.approx(.1)
+    assert str(depolarizing) == "DepolarizingChannel(0.3)"
+    Measure | qubit
+
+
+def test_amplitude_damping_channel():
+    with pytest.raises(ValueError):
+        AmplitudeDampingChannel(1.5)
+    sim = Simulator()
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    H | qubit
+    eng.flush()
+    rng = numpy.random.RandomState(2)
+    channel = AmplitudeDampingChannel(.4)
+    outcomes = []
+    for _ in range(20):
+        channel.apply(sim._simulator, qubit[0].id, rng)
+        outcomes.append(sim.get_probability('1', qubit))
+    # no-jump branch: the excited state decays by (1 - gamma) relative to |0>
+    probability = outcomes[0]
+    assert probability in (pytest.approx(0.), pytest.approx(.6 / 1.6))
+    assert outcomes[-1] < 1.e-4
+    AmplitudeDampingChannel(1.).apply(sim._simulator, qubit[0].id, rng)
+    assert sim.get_probability('0', qubit) == pytest.approx(1.)
+    Measure | qubit
+
+
+def test_readout_error():
+    rng = numpy.random.RandomState(3)
+    assert ReadoutError(1.).apply(True, rng) is False
+    assert ReadoutError(1., 0.).apply(True, rng) is True
+    assert ReadoutError(1., 0.).apply(False, rng) is True
+    assert ReadoutError(0.).apply(False, rng) is False
+
+
+def test_noise_model_matching():
+    noise_model = NoiseModel()
+    depolarizing = DepolarizingChannel(.1)
+    damping = AmplitudeDampingChannel(.1)
+    pauli = PauliChannel(pz=.1)
+    noise_model.add_gate_noise(depolarizing)
+    noise_model.add_gate_noise(damping, gates=XGate, qubits=[2])
+    noise_model.add_gate_noise(pauli, gates=[Rx(.5)], qubits=3)
+    assert noise_model.get_gate_noise(H, 2) == [depolarizing]
+    assert noise_model.get_gate_noise(X, 2) == [depolarizing, damping]
+    assert noise_model.get_gate_noise(X, 3) == [depolarizing]
+    assert noise_model.get_gate_noise(Rx(.5), 3) == [depolarizing, pauli]
+    assert noise_model.get_gate_noise(Rx(.4), 3) == [depolarizing]
+    readout = ReadoutError(.1)
+    noise_model.add_readout_error(readout, qubits=[0, 1])
+    assert noise_model.get_readout_errors(1) == [readout]
+    assert noise_model.get_readout_errors(2) == []
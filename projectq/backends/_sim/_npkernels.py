@@ -0,0 +1,119 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains vectorized numpy kernels acting on a stack of state vectors (array of
+shape (batch, 2^n)), where bit p of the index corresponds to the qubit at
+position p.
+"""
+
+import string
+
+import numpy as np
+
+_LETTERS = string.ascii_letters
+
+
+def apply_matrix(state, num_qubits, matrix, positions, ctrl_positions=()):
+    """
+    Apply a k-qubit gate matrix to all state vectors where all control qubits
+    are 1 (in place).
+
+    Args:
+        state (numpy.ndarray): Stack of state vectors, shape (batch, 2^n).
+        num_qubits (int): Number of qubits n.
+        matrix (numpy.ndarray): Gate matrix of shape (2^k, 2^k), or of shape
+            (batch, 2^k, 2^k) for one matrix per state vector.
+        positions (list[int]): Bit positions of the k target qubits, where
+            positions[0] corresponds to the least significant bit of the
+            matrix index.
+        ctrl_positions (list[int]): Bit positions of the control qubits.
+    """
+    batch_size = state.shape[0]
+    tensor = state.reshape((batch_size,) + (2,) * num_qubits)
+    # tensor axis 1 corresponds to the most significant bit
+    ctrl_axes = set(num_qubits - pos for pos in ctrl_positions)
+    index = tuple(1 if axis in ctrl_axes else slice(None)
+                  for axis in range(1, num_qubits + 1))
+    view = tensor[(slice(None),) + index]
+
+    remaining = [axis for axis in range(1, num_qubits + 1)
+                 if axis not in ctrl_axes]
+    letters = {axis: _LETTERS[i + 1] for i, axis in enumerate(remaining)}
+    k = len(positions)
+    targets = [num_qubits - positions[k - 1 - j] for j in range(k)]
+    out = [_LETTERS[len(remaining) + 1 + j] for j in range(k)]
+
+    batch = _LETTERS[0]
+    state_sub = batch + ''.join(letters[axis] for axis in remaining)
+    result_sub = batch + ''.join(out[targets.index(axis)]
+                                 if axis in targets else letters[axis]
+                                 for axis in remaining)
+    matrix_sub = (batch if matrix.ndim == 3 else '') + ''.join(out)
+    matrix_sub += ''.join(letters[axis] for axis in targets)
+    matrix = matrix.reshape(matrix.shape[:-2] + (2,) * (2 * k))
+    view[...] = np.einsum(matrix_sub + ',' + state_sub + '->' + result_sub,
+                          matrix, view)
+
+
+def pauli_term_action(term, positions, num_qubits):
+    """
+    Return the action of a Pauli string P on the computational basis, i.e.,
+    (P psi)[i] = phase[i] * psi[source[i]].
+
+    Args:
+        term (tuple): Term of a QubitOperator, e.g., ((0, 'X'), (2, 'Z')).
+        positions (list[int]): Bit positions of the qubits the term indices
+            refer to.
+        num_qubits (int): Total number of qubits n.
+
+    Returns:
+        Tuple (source, phase) of numpy arrays of length 2^n.
+    """
+    # P|i> = factor * (-1)^parity(i & zmask) |i ^ xmask>
+    xmask = 0
+    zmask = 0
+    factor = 1.
+    for index, action in term:
+        bit = 1 << positions[index]
+        if action != 'Z':
+            xmask |= bit
+        if action != 'X':
+            zmask |= bit
+        if action == 'Y':
+            factor *= 1j
+    source = np.arange(1 << num_qubits) ^ xmask
+    parity = np.zeros_like(source)
+    for pos in range(num_qubits):
+        if (zmask >> pos) & 1:
+            parity ^= (source >> pos) & 1
+    return source, factor * (1 - 2 * parity)
+
+
+def apply_qubit_operator(state, num_qubits, qubit_operator, positions):
+    """
+    Return H psi for all state vectors psi in the stack.
+
+    Args:
+        state (numpy.ndarray): Stack of state vectors, shape (batch, 2^n).
+        num_qubits (int): Number of qubits n.
+        qubit_operator (projectq.ops.QubitOperator): Operator H.
+        positions (list[int]): Bit positions of the qubits the operator acts
+            upon.
+    """
+    result = np.zeros_like(state)
+    for term, coefficient in qubit_operator.terms.items():
+        source, phase = pauli_term_action(term, positions, num_qubits)
+        result += coefficient * phase * state[:, source]
+    return result
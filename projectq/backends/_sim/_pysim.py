@@ -44,6 +44,7 @@ class Simulator(object):
         self._state = _np.ones(1, dtype=_np.complex128)
         self._map = dict()
         self._num_qubits = 0
+        self._peak_memory = self._state.nbytes
         print("(Note: This is the (slow) Python simulator.)")
 
     def cheat(self):
@@ -61,6 +62,22 @@ class Simulator(object):
         """
         return (self._map, self._state)
 
+    def get_memory_statistics(self):
+        """
+        Return the memory held by the state vector and its peak value.
+
+        Returns:
+            A tuple (current, peak) of memory sizes in bytes.
+        """
+        self._peak_memory = max(self._peak_memory, self._state.nbytes)
+        return (self._state.nbytes, self._peak_memory)
+
+    def reset_peak_memory(self):
+        """
+        Reset the peak memory to the current size of the state vector.
+        """
+        self._peak_memory = self._state.nbytes
+
     def measure_qubits(self, ids):
         """
         Measure the qubits with IDs ids and return a list of measurement
@@ -111,6 +128,7 @@ class Simulator(object):
         self._map[ID] = self._num_qubits
         self._num_qubits += 1
         self._state.resize(1 << self._num_qubits)
+        self._peak_memory = max(self._peak_memory, self._state.nbytes)
 
     def get_classical_value(self, ID, tol=1.e-10):
         """
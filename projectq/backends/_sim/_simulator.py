@@ -20,8 +20,13 @@ implementation is used as an alternative.
 
 import math
 import random
+from functools import partial
+
+import numpy as np
+
 from projectq.cengines import BasicEngine
-from projectq.meta import get_control_count, LogicalQubitIDTag
+from projectq.meta import (get_control_count, LogicalQubitIDTag, LoopBody,
+                           LoopCollector, LoopEndTag, LoopTag)
 from projectq.ops import (NOT,
                           H,
                           R,
@@ -33,6 +38,8 @@ from projectq.ops import (NOT,
                           TimeEvolution)
 from projectq.types import WeakQubitRef
 
+from ._gradient import adjoint_gradient
+
 FALLBACK_TO_PYSIM = False
 try:
     from ._cppsim import Simulator as SimulatorBackend
@@ -41,6 +48,40 @@ except ImportError:
     FALLBACK_TO_PYSIM = True
 
 
+def _apply_to_unitary(unitary, matrix, positions):
+    """
+    Return the product of the matrix (acting on the given bit positions,
+    where bit j of a matrix index corresponds to positions[j]) and the
+    unitary.
+    """
+    num_bits = int(round(math.log(len(unitary), 2)))
+    num_gate_bits = len(positions)
+    # bit j of an index corresponds to the axis num_bits - 1 - j
+    tensor = unitary.reshape([2] * num_bits + [len(unitary)])
+    gate = np.asarray(matrix, dtype=complex).reshape([2] * 2 * num_gate_bits)
+    result = np.tensordot(gate,
+                          tensor,
+                          axes=([2 * num_gate_bits - 1 - j
+                                 for j in range(num_gate_bits)],
+                                [num_bits - 1 - position
+                                 for position in positions]))
+    result = np.moveaxis(result, list(range(num_gate_bits)),
+                         [num_bits - 1 - positions[num_gate_bits - 1 - i]
+                          for i in range(num_gate_bits)])
+    return result.reshape(unitary.shape)
+
+
+def _controlled_matrix(matrix, num_controls):
+    """
+    Return the matrix of the gate with num_controls control qubits, which
+    correspond to the most significant bits.
+    """
+    size = len(matrix)
+    controlled = np.identity(size << num_controls, dtype=complex)
+    controlled[-size:, -size:] = matrix
+    return controlled
+
+
 class Simulator(BasicEngine):
     """
     Simulator is a compiler engine which simulates a quantum computer using
@@ -54,7 +95,7 @@ class Simulator(BasicEngine):
         export OMP_NUM_THREADS=4 # use 4 threads
         export OMP_PROC_BIND=spread # bind threads to processors by spreading
     """
-    def __init__(self, gate_fusion=False, rnd_seed=None):
+    def __init__(self, gate_fusion=False, rnd_seed=None, memory_budget=None):
         """
         Construct the C++/Python-simulator object and initialize it with a
         random seed.
@@ -65,6 +106,12 @@ class Simulator(BasicEngine):
                 for the c++ simulator).
             rnd_seed (int): Random seed (uses random.randint(0, 4294967295) by
                 default).
+            memory_budget (int): Maximum number of bytes the simulator may use
+                for the state vector and its auxiliary buffers (unlimited by
+                default; only has an effect for the c++ simulator). If an
+                operation would exceed the budget, it switches to an
+                in-place or chunked algorithm, and allocating a qubit whose
+                state vector does not fit raises a RuntimeError.
 
         Example of gate_fusion: Instead of applying a Hadamard gate to 5
         qubits, the simulator calculates the kronecker product of the 1-qubit
@@ -73,6 +120,14 @@ class Simulator(BasicEngine):
         through the state vector multiple times. Depending on the system (and,
         especially, number of threads), this may or may not be beneficial.
 
+        Example of memory_budget: Expectation values, qubit operators, time
+        evolutions and math gates usually need one to three copies of the
+        state vector. With a budget that cannot accommodate these copies,
+        they are computed in place (or on the invariant subspaces of the
+        operator), so that the available memory can be used for the state
+        vector itself. Note that growing the state vector when allocating a
+        qubit still needs the old and the new state vector at the same time.
+
         Note:
             If the C++ Simulator extension was not built or cannot be found,
             the Simulator defaults to a Python implementation of the kernels.
@@ -85,9 +140,33 @@ class Simulator(BasicEngine):
         """
         if rnd_seed is None:
             rnd_seed = random.randint(0, 4294967295)
+        if memory_budget is None:
+            memory_budget = 0
         BasicEngine.__init__(self)
-        self._simulator = SimulatorBackend(rnd_seed)
+        self._simulator = SimulatorBackend(rnd_seed, memory_budget)
         self._gate_fusion = gate_fusion
+        self._tape = None
+        self._tape_error = None
+        self._loop_collector = LoopCollector()
+
+    def is_meta_tag_handler(self, tag):
+        """
+        The simulator executes loops (see :class:`projectq.meta.Loop`)
+        without unrolling them, unless it has to forward the loops to an
+        engine which cannot handle them.
+
+        Args:
+            tag: Meta tag class.
+
+        Returns:
+            True if tag is LoopTag or LoopEndTag and the following engines
+            (if any) handle loops as well.
+        """
+        if tag != LoopTag and tag != LoopEndTag:
+            return False
+        return (self.is_last_engine or
+                (self.next_engine.is_meta_tag_supported(LoopTag) and
+                 self.next_engine.is_meta_tag_supported(LoopEndTag)))
 
     def is_available(self, cmd):
         """
@@ -117,13 +196,26 @@ class Simulator(BasicEngine):
         except:
             return False
 
+    def _synchronize(self):
+        """
+        Wait until asynchronous engines (see AsyncEngine) have sent all
+        commands to the simulator, such that its state can be queried.
+        """
+        synchronize = getattr(self.main_engine, 'synchronize', None)
+        if synchronize is not None:
+            synchronize()
+
     def _convert_logical_to_mapped_qureg(self, qureg):
         """
         Converts a qureg from logical to mapped qubits if there is a mapper.
 
+        The queries of the state, which all call this function first, wait
+        for asynchronous engines here (before the mapping is read).
+
         Args:
             qureg (list[Qubit],Qureg): Logical quantum bits
         """
+        self._synchronize()
         mapper = self.main_engine.mapper
         if mapper is not None:
             mapped_qureg = []
@@ -347,8 +439,156 @@ class Simulator(BasicEngine):
             DOES NOT automatically convert from logical qubits to mapped
             qubits.
         """
+        self._synchronize()
         return self._simulator.cheat()
 
+    def get_memory_statistics(self, reset_peak=False):
+        """
+        Return the memory currently held by the state vector and the
+        auxiliary buffers of this simulator, and its peak value.
+
+        Args:
+            reset_peak (bool): If True, the peak value is reset to the current
+                memory usage after it has been read.
+
+        Returns:
+            A dictionary with the keys 'current' and 'peak', both in bytes.
+
+        Note:
+            The Python simulator only reports the size of its state vector.
+        """
+        current, peak = self._simulator.get_memory_statistics()
+        if reset_peak:
+            self._simulator.reset_peak_memory()
+        return {'current': current, 'peak': peak}
+
+    def start_gradient_tape(self):
+        """
+        Start recording the gates applied by the simulator (discarding any
+        previous recording), so that gradients can be computed using
+        :meth:`get_expectation_value_and_gradient`.
+
+        Example:
+            .. code-block:: python
+
+                sim = Simulator()
+                eng = MainEngine(sim, [])
+                qureg = eng.allocate_qureg(2)
+                eng.flush()
+                sim.start_gradient_tape()
+                Ry(theta0) | qureg[0]
+                CNOT | (qureg[0], qureg[1])
+                Rz(theta1) | qureg[1]
+                eng.flush()
+                energy, gradient = sim.get_expectation_value_and_gradient(
+                    hamiltonian, qureg)
+                # gradient == [d energy / d theta0, d energy / d theta1]
+
+        Note:
+            The gradient is taken with respect to the angles of the rotation
+            and phase gates as they arrive at the simulator. Compiler engines
+            which merge or decompose rotations (e.g., the LocalOptimizer or
+            the AutoReplacer) therefore change the list of parameters.
+            All qubits have to be allocated before the recording starts and
+            the recorded circuit must not contain measurements, math gates or
+            time evolutions.
+        """
+        self._simulator.run()
+        self._tape = []
+        self._tape_error = None
+
+    def stop_gradient_tape(self):
+        """
+        Stop recording gates and discard the recorded circuit.
+        """
+        self._tape = None
+        self._tape_error = None
+
+    def get_expectation_value_and_gradient(self, qubit_operator, qureg):
+        """
+        Get the expectation value of the Hermitian qubit_operator and its
+        derivatives with respect to the angles of all rotation and phase
+        gates (Rx, Ry, Rz, Rxx, Ryy, Rzz, Ph, R) recorded since the last call
+        to :meth:`start_gradient_tape`.
+
+        The gradient is computed with the adjoint (reverse-mode) method,
+        which needs about three state vector passes per recorded gate and two
+        additional state vectors in memory, independently of the number of
+        parameters.
+
+        Args:
+            qubit_operator (projectq.ops.QubitOperator): Hermitian operator.
+            qureg (list[Qubit],Qureg): Quantum bits to measure.
+
+        Returns:
+            A tuple (expectation, gradient), where gradient is a numpy array
+            containing one derivative for each recorded rotation/phase gate
+            (in the order in which they were applied).
+
+        Raises:
+            RuntimeError: If no gates are being recorded or if the recorded
+                circuit cannot be differentiated (see
+                :meth:`start_gradient_tape`).
+            Exception: If `qubit_operator` acts on more qubits than present in
+                the `qureg` argument.
+
+        Note:
+            Make sure all previous commands have passed through the
+            compilation chain (call main_engine.flush() to make sure).
+
+        Note:
+            If there is a mapper present in the compiler, this function
+            automatically converts from logical qubits to mapped qubits for
+            the qureg argument.
+        """
+        if self._tape is None:
+            raise RuntimeError("No gates have been recorded. Please call "
+                               "start_gradient_tape() before applying the "
+                               "circuit.")
+        if self._tape_error is not None:
+            raise RuntimeError("The recorded circuit cannot be "
+                               "differentiated: " + self._tape_error)
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        num_qubits = len(qureg)
+        for term, _ in qubit_operator.terms.items():
+            if not term == () and term[-1][0] >= num_qubits:
+                raise Exception("qubit_operator acts on more qubits than "
+                                "contained in the qureg.")
+        qubit_map, state = self._simulator.cheat()
+        return adjoint_gradient(state, qubit_map, self._tape, qubit_operator,
+                                [qubit_map[qb.id] for qb in qureg])
+
+    def _record(self, cmd):
+        """
+        Record the command on the gradient tape (if recording).
+        """
+        if self._tape is None or self._tape_error is not None:
+            return
+        if (cmd.gate == Measure or cmd.gate == Allocate or
+                cmd.gate == Deallocate or
+                isinstance(cmd.gate, BasicMathGate) or
+                isinstance(cmd.gate, TimeEvolution)):
+            self._tape_error = "unsupported command {}.".format(cmd)
+        else:
+            self._tape.append((cmd.gate,
+                               np.array(cmd.gate.matrix, dtype=complex),
+                               [qb.id for qr in cmd.qubits for qb in qr],
+                               [qb.id for qb in cmd.control_qubits]))
+
+    def _get_measurement_outcome(self, qubit_id, outcome):
+        """
+        Return the outcome which is reported for measuring a qubit (e.g.,
+        derived classes may apply readout errors).
+
+        Args:
+            qubit_id (int): (Mapped) id of the measured qubit.
+            outcome (bool): Outcome of the measurement of the state vector.
+
+        Returns:
+            The outcome unchanged.
+        """
+        return outcome
+
     def _handle(self, cmd):
         """
         Handle all commands, i.e., call the member functions of the C++-
@@ -362,6 +602,7 @@ class Simulator(BasicEngine):
             Exception: If a non-single-qubit gate needs to be processed
                 (which should never happen due to is_available).
         """
+        self._record(cmd)
         if cmd.gate == Measure:
             assert(get_control_count(cmd) == 0)
             ids = [qb.id for qr in cmd.qubits for qb in qr]
@@ -374,10 +615,11 @@ class Simulator(BasicEngine):
                     for tag in cmd.tags:
                         if isinstance(tag, LogicalQubitIDTag):
                             logical_id_tag = tag
+                    outcome = self._get_measurement_outcome(qb.id, out[i])
                     if logical_id_tag is not None:
                         qb = WeakQubitRef(qb.engine,
                                           logical_id_tag.logical_qubit_id)
-                    self.main_engine.set_measurement_result(qb, out[i])
+                    self.main_engine.set_measurement_result(qb, outcome)
                     i += 1
         elif cmd.gate == Allocate:
             ID = cmd.qubits[0][0].id
@@ -395,25 +637,31 @@ class Simulator(BasicEngine):
                 qubitids.append([])
                 for qb in qr:
                     qubitids[-1].append(qb.id)
+            ctrlids = [qb.id for qb in cmd.control_qubits]
             if FALLBACK_TO_PYSIM:
                 math_fun = cmd.gate.get_math_function(cmd.qubits)
-                self._simulator.emulate_math(math_fun, qubitids,
-                                             [qb.id for qb in cmd.control_qubits])
+                self._simulator.emulate_math(math_fun, qubitids, ctrlids)
             else:
-                # individual code for different standard gates to make it faster!
+                # individual code for different standard gates to make it
+                # faster! The C++ kernels use 64-bit arithmetic (with
+                # overflow-safe modular products), hence the moduli must fit
+                # into 63 bits.
                 if isinstance(cmd.gate, AddConstant):
-                    self._simulator.emulate_math_addConstant(cmd.gate.a, qubitids,
-                                                             [qb.id for qb in cmd.control_qubits])
-                elif isinstance(cmd.gate, AddConstantModN):
-                    self._simulator.emulate_math_addConstantModN(cmd.gate.a, cmd.gate.N, qubitids,
-                                                                 [qb.id for qb in cmd.control_qubits])
-                elif isinstance(cmd.gate, MultiplyByConstantModN):
-                    self._simulator.emulate_math_multiplyByConstantModN(cmd.gate.a, cmd.gate.N, qubitids,
-                                                                        [qb.id for qb in cmd.control_qubits])
+                    self._simulator.emulate_math_addConstant(
+                        cmd.gate.a % (1 << 64), qubitids, ctrlids)
+                elif (isinstance(cmd.gate, AddConstantModN) and
+                      0 < cmd.gate.N < (1 << 63)):
+                    self._simulator.emulate_math_addConstantModN(
+                        cmd.gate.a % cmd.gate.N, cmd.gate.N, qubitids,
+                        ctrlids)
+                elif (isinstance(cmd.gate, MultiplyByConstantModN) and
+                      0 < cmd.gate.N < (1 << 63)):
+                    self._simulator.emulate_math_multiplyByConstantModN(
+                        cmd.gate.a % cmd.gate.N, cmd.gate.N, qubitids,
+                        ctrlids)
                 else:
                     math_fun = cmd.gate.get_math_function(cmd.qubits)
-                    self._simulator.emulate_math(math_fun, qubitids,
-                                                 [qb.id for qb in cmd.control_qubits])
+                    self._simulator.emulate_math(math_fun, qubitids, ctrlids)
         elif isinstance(cmd.gate, TimeEvolution):
             op = [(list(term), coeff) for (term, coeff)
                   in cmd.gate.hamiltonian.terms.items()]
@@ -441,20 +689,126 @@ class Simulator(BasicEngine):
                             " gates with k < 6!\nPlease add an auto-replacer"
                             " engine to your list of compiler engines.")
 
+    def _get_gate_arguments(self, cmd):
+        """
+        Return the arguments (matrix, qubit ids, control qubit ids) of
+        apply_controlled_gate for a command with a k-qubit gate matrix
+        (k <= 5), or None for all other commands.
+        """
+        if (cmd.gate == Measure or cmd.gate == Allocate or
+                cmd.gate == Deallocate or cmd.gate == FlushGate() or
+                isinstance(cmd.gate, BasicMathGate) or
+                isinstance(cmd.gate, TimeEvolution)):
+            return None
+        matrix = cmd.gate.matrix
+        ids = [qb.id for qr in cmd.qubits for qb in qr]
+        if len(matrix) > 2 ** 5 or 2 ** len(ids) != len(matrix):
+            return None  # _handle raises the error
+        return matrix, ids, [qb.id for qb in cmd.control_qubits]
+
+    def _get_loop_unitary(self, loop, ids):
+        """
+        Return the unitary of one iteration of the loop on the qubits with
+        the given ids (bit j of an index corresponds to ids[j]), or None if
+        the loop contains commands other than gates with a matrix.
+        """
+        unitary = np.identity(1 << len(ids), dtype=complex)
+        for item in loop.body:
+            if isinstance(item, LoopBody):
+                inner = self._get_loop_unitary(item, ids)
+                if inner is None:
+                    return None
+                unitary = np.linalg.matrix_power(inner, item.num).dot(unitary)
+                continue
+            arguments = self._get_gate_arguments(item)
+            if arguments is None:
+                return None
+            matrix, qubit_ids, ctrl_ids = arguments
+            unitary = _apply_to_unitary(
+                unitary, _controlled_matrix(matrix, len(ctrl_ids)),
+                [ids.index(qubit_id) for qubit_id in qubit_ids + ctrl_ids])
+        return unitary
+
+    def _get_loop_qubit_ids(self, loop, ids):
+        """
+        Add the ids of all qubits which the loop acts on to the list ids.
+        """
+        for item in loop.body:
+            if isinstance(item, LoopBody):
+                self._get_loop_qubit_ids(item, ids)
+                continue
+            for qr in item.all_qubits:
+                for qb in qr:
+                    if qb.id not in ids:
+                        ids.append(qb.id)
+
+    def _compile_loop(self, loop):
+        """
+        Compile a loop into a function which executes all of its iterations.
+
+        If the loop body only consists of gates on at most 5 qubits, the
+        loop is executed as a single gate (the num-th power of the unitary
+        of the body). Otherwise, the loop body is translated once into a
+        list of simulator calls with pre-converted gate matrices, which the
+        C++ simulator fuses across iterations.
+
+        Args:
+            loop (LoopBody): Loop to compile.
+
+        Returns:
+            A function without arguments which executes the loop.
+        """
+        ids = []
+        self._get_loop_qubit_ids(loop, ids)
+        if self._tape is None and 0 < len(ids) <= 5:
+            unitary = self._get_loop_unitary(loop, ids)
+            if unitary is not None:
+                return partial(self._simulator.apply_controlled_gate,
+                               np.linalg.matrix_power(unitary,
+                                                      loop.num).tolist(),
+                               ids, [])
+        program = []
+        for item in loop.body:
+            if isinstance(item, LoopBody):
+                program.append(self._compile_loop(item))
+                continue
+            arguments = self._get_gate_arguments(item)
+            if item.gate == FlushGate():
+                program.append(self._simulator.run)
+            elif self._tape is None and arguments is not None:
+                matrix, qubit_ids, ctrl_ids = arguments
+                program.append(partial(self._simulator.apply_controlled_gate,
+                                       matrix.tolist(), qubit_ids, ctrl_ids))
+            else:
+                program.append(partial(self._handle, item))
+
+        def run_loop():
+            for _ in range(loop.num):
+                for operation in program:
+                    operation()
+        return run_loop
+
     def receive(self, command_list):
         """
         Receive a list of commands from the previous engine and handle them
         (simulate them classically) prior to sending them on to the next
         engine.
 
+        Commands of loops are collected until the loop is complete and the
+        loop is then executed without unrolling it (see _compile_loop).
+
         Args:
             command_list (list<Command>): List of commands to execute on the
                 simulator.
         """
         for cmd in command_list:
-            if not cmd.gate == FlushGate():
-                self._handle(cmd)
-            else:
-                self._simulator.run()  # flush gate --> run all saved gates
+            for item in self._loop_collector.add(cmd):
+                if isinstance(item, LoopBody):
+                    self._compile_loop(item)()
+                    self._simulator.run()
+                elif not item.gate == FlushGate():
+                    self._handle(item)
+                else:
+                    self._simulator.run()  # flush gate --> run all saved gates
             if not self.is_last_engine:
                 self.send([cmd])
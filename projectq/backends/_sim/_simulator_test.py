@@ -30,9 +30,11 @@ from projectq import MainEngine
 from projectq.cengines import (BasicEngine, BasicMapperEngine, DummyEngine,
                                LocalOptimizer, NotYetMeasuredError)
 from projectq.ops import (All, Allocate, BasicGate, BasicMathGate, CNOT,
-                          Command, H, MatrixGate, Measure, QubitOperator,
-                          Rx, Ry, Rz, S, TimeEvolution, Toffoli, X, Y, Z)
-from projectq.meta import Control, Dagger, LogicalQubitIDTag
+                          Command, H, MatrixGate, Measure, Ph, QubitOperator,
+                          R, Rx, Rxx, Ry, Rz, Rzz, S, TimeEvolution, Toffoli,
+                          X, Y, Z)
+from projectq.meta import (Control, Dagger, LogicalQubitIDTag, Loop,
+                           LoopEndTag, LoopTag)
 from projectq.types import WeakQubitRef
 
 from projectq.backends import Simulator
@@ -623,6 +625,76 @@ def test_simulator_send():
     assert len(backend.received_commands) == 5
 
 
+def _run_loops(eng, qureg):
+    H | qureg[0]
+    with Loop(eng, 5):
+        Rx(0.3) | qureg[1]
+        CNOT | (qureg[0], qureg[2])
+        with Loop(eng, 3):
+            S | qureg[2]
+            with Control(eng, qureg[2]):
+                Ry(0.2) | qureg[0]
+    Rz(0.4) | qureg[1]
+    with Loop(eng, 4):
+        ancilla = eng.allocate_qubit()
+        CNOT | (qureg[1], ancilla)
+        with Control(eng, ancilla):
+            Rx(0.1) | qureg[3]
+        CNOT | (qureg[1], ancilla)
+        del ancilla
+    eng.flush()
+    return [eng.backend.get_amplitude(format(i, '04b'), qureg)
+            for i in range(16)]
+
+
+def test_simulator_loop(sim):
+    eng = MainEngine(sim, [LocalOptimizer()])
+    assert sim.is_meta_tag_handler(LoopTag)
+    assert sim.is_meta_tag_handler(LoopEndTag)
+    assert not sim.is_meta_tag_handler(LogicalQubitIDTag)
+    qureg = eng.allocate_qureg(4)
+    amplitudes = _run_loops(eng, qureg)
+    All(Measure) | qureg
+
+    unrolling_sim = Simulator()
+    unrolling_sim.is_meta_tag_handler = lambda tag: False
+    eng = MainEngine(unrolling_sim, [])
+    qureg = eng.allocate_qureg(4)
+    assert numpy.allclose(amplitudes, _run_loops(eng, qureg))
+    All(Measure) | qureg
+
+
+def test_simulator_loop_forwarding():
+    sim = Simulator()
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [sim])
+    assert not sim.is_meta_tag_handler(LoopTag)
+    qubit = eng.allocate_qubit()
+    with Loop(eng, 3):
+        X | qubit
+    Measure | qubit
+    assert int(qubit) == 1
+    assert [cmd.gate for cmd in backend.received_commands].count(X) == 3
+
+
+def test_simulator_loop_replay(sim):
+    # gradient tapes and measurements prevent computing a single unitary
+    sim.start_gradient_tape()
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    with Loop(eng, 4):
+        Rx(math.pi / 2) | qubit
+        eng.flush()
+    eng.flush()
+    assert sim.get_amplitude('0', qubit) == pytest.approx(-1)
+    with Loop(eng, 3):
+        X | qubit
+        Measure | qubit
+    eng.flush()
+    assert int(qubit) == 1
+    sim.stop_gradient_tape()
+
+
 def test_simulator_functional_entangle(sim):
     eng = MainEngine(sim, [])
     qubits = eng.allocate_qureg(5)
@@ -735,3 +807,189 @@ def test_simulator_constant_math_emulation():
         ref = result[0]
         for res in result[1:]:
             assert ref == res
+
+
+def test_simulator_constant_math_emulation_wide_modulus(monkeypatch):
+    if "cpp_simulator" not in get_available_simulators():
+        pytest.skip("No C++ simulator")
+        return
+
+    import projectq.backends._sim._simulator as _sim
+    from projectq.backends._sim._cppsim import Simulator as CppSim
+    from projectq.libs.math import AddConstantModN, MultiplyByConstantModN
+
+    monkeypatch.setattr(_sim, "FALLBACK_TO_PYSIM", False)
+
+    def to_int(qureg):
+        return sum(int(qb) << i for i, qb in enumerate(qureg))
+
+    # x * a overflows 32-bit integers
+    for N in [(1 << 17) + 3, (1 << 19) + 21]:
+        n = N.bit_length()
+        a = N - 3
+        x = N - 5
+        sim = Simulator()
+        sim._simulator = CppSim(1)
+        eng = MainEngine(sim, [])
+        quint = eng.allocate_qureg(n)
+        ctrl = eng.allocate_qubit()
+        for i in range(n):
+            if (x >> i) & 1:
+                X | quint[i]
+        X | ctrl
+        with Control(eng, ctrl):
+            MultiplyByConstantModN(a, N) | quint
+        All(Measure) | quint
+        eng.flush()
+        assert to_int(quint) == (x * a) % N
+
+        AddConstantModN(a, N) | quint
+        All(Measure) | quint
+        eng.flush()
+        assert to_int(quint) == (x * a + a) % N
+        Measure | ctrl
+
+
+def test_simulator_memory_budget(monkeypatch):
+    if "cpp_simulator" not in get_available_simulators():
+        pytest.skip("No C++ simulator")
+        return
+
+    import projectq.backends._sim._simulator as _sim
+    from projectq.libs.math import AddConstant, MultiplyByConstantModN
+
+    monkeypatch.setattr(_sim, "FALLBACK_TO_PYSIM", False)
+    n = 6
+    op = (QubitOperator('X0 Y1 Z3', 0.3) + QubitOperator('Z2 Z4', -1.2) +
+          QubitOperator('Y2 X4', 0.7j) + QubitOperator('', 0.1))
+    hamiltonian = (QubitOperator('X0 X1', 0.5) + QubitOperator('Y1 Z2', 1.1) +
+                   QubitOperator('Z0', -0.4) + QubitOperator('', 0.3))
+
+    def run(sim):
+        eng = MainEngine(sim, [])
+        qureg = eng.allocate_qureg(n)
+        ancilla = eng.allocate_qubit()
+        All(H) | qureg
+        Rx(0.3) | qureg[1]
+        CNOT | (qureg[0], qureg[2])
+        Ry(1.1) | qureg[4]
+        Rz(0.7) | qureg[3]
+        AddConstant(5) | qureg[:4]
+        with Control(eng, qureg[5]):
+            MultiplyByConstantModN(2, 7) | qureg[:3]
+            TimeEvolution(0.8, hamiltonian) | qureg[:3]
+        eng.flush()
+        sim.apply_qubit_operator(op, qureg)
+        expectation = sim.get_expectation_value(hamiltonian, qureg)
+        Measure | ancilla
+        del ancilla
+        eng.flush()
+        mapping, wavefunction = sim.cheat()
+        state = numpy.array(wavefunction)
+        All(Measure) | qureg
+        return expectation, [mapping[qb.id] for qb in qureg], state
+
+    ref = run(Simulator(rnd_seed=1))
+    # the budget only accommodates the state vector itself
+    budget = 2 ** (n + 1) * 16
+    res = run(Simulator(rnd_seed=1, memory_budget=budget))
+    assert res[0] == pytest.approx(ref[0])
+    assert res[1] == ref[1]
+    assert numpy.allclose(res[2], ref[2])
+
+    sim = Simulator(memory_budget=2 ** 3 * 16)
+    for qubit_id in range(3):
+        sim._simulator.allocate_qubit(qubit_id)
+    with pytest.raises(RuntimeError):
+        sim._simulator.allocate_qubit(3)
+
+
+def test_simulator_memory_statistics(sim):
+    eng = MainEngine(sim, [])
+    sim.get_memory_statistics(reset_peak=True)
+    qureg = eng.allocate_qureg(10)
+    eng.flush()
+    stats = sim.get_memory_statistics()
+    assert stats['current'] >= 2 ** 10 * 16
+    assert stats['peak'] >= stats['current']
+    # the statistics of another simulator are independent
+    other = Simulator()
+    other._simulator = type(sim._simulator)(1)
+    eng2 = MainEngine(other, [])
+    qubit = eng2.allocate_qubit()
+    eng2.flush()
+    other_stats = other.get_memory_statistics(reset_peak=True)
+    assert other_stats['current'] < stats['current']
+    assert sim.get_memory_statistics() == stats
+    All(Measure) | qureg
+    Measure | qubit
+
+
+def _gradient_circuit(sim, engine_list, angles, record):
+    eng = MainEngine(sim, engine_list=engine_list)
+    qureg = eng.allocate_qureg(3)
+    eng.flush()
+    if record:
+        sim.start_gradient_tape()
+    H | qureg[0]
+    Ry(angles[0]) | qureg[1]
+    Rxx(angles[1]) | (qureg[0], qureg[2])
+    with Control(eng, qureg[0]):
+        Rx(angles[2]) | qureg[1]
+    CNOT | (qureg[1], qureg[2])
+    Rz(angles[3]) | qureg[2]
+    Rzz(angles[4]) | (qureg[1], qureg[2])
+    R(angles[5]) | qureg[0]
+    Ph(angles[6]) | qureg[1]
+    eng.flush()
+    return eng, qureg
+
+
+def test_simulator_gradient(sim, mapper):
+    engine_list = []
+    if mapper is not None:
+        engine_list.append(mapper)
+    op = (QubitOperator('Z0 X1', .5) + QubitOperator('Y2', -1.2) +
+          QubitOperator('X0 Y1 Z2', .3) + QubitOperator((), .1))
+    angles = [.3, 1.1, -.7, 2., .4, -1.3, .8]
+    eng, qureg = _gradient_circuit(sim, engine_list, angles, True)
+    expectation, gradient = sim.get_expectation_value_and_gradient(op, qureg)
+    assert expectation == pytest.approx(sim.get_expectation_value(op, qureg))
+    assert len(gradient) == len(angles)
+    All(Measure) | qureg
+
+    eps = 1.e-5
+    for i in range(len(angles)):
+        values = []
+        for shift in (eps, -eps):
+            shifted = list(angles)
+            shifted[i] += shift
+            ref_sim = Simulator()
+            _, ref_qureg = _gradient_circuit(ref_sim, [], shifted, False)
+            values.append(ref_sim.get_expectation_value(op, ref_qureg))
+            All(Measure) | ref_qureg
+        derivative = (values[0] - values[1]) / (2 * eps)
+        assert gradient[i] == pytest.approx(derivative, abs=1.e-6)
+
+
+def test_simulator_gradient_exceptions(sim):
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(2)
+    eng.flush()
+    op = QubitOperator('Z0')
+    with pytest.raises(RuntimeError):
+        sim.get_expectation_value_and_gradient(op, qureg)
+    sim.start_gradient_tape()
+    Rx(.3) | qureg[0]
+    eng.flush()
+    with pytest.raises(Exception):
+        sim.get_expectation_value_and_gradient(QubitOperator('Z2'), qureg)
+    _, gradient = sim.get_expectation_value_and_gradient(op, qureg)
+    assert gradient[0] == pytest.approx(-math.sin(.3))
+    Measure | qureg[1]
+    eng.flush()
+    with pytest.raises(RuntimeError):
+        sim.get_expectation_value_and_gradient(op, qureg)
+    sim.stop_gradient_tape()
+    with pytest.raises(RuntimeError):
+        sim.get_expectation_value_and_gradient(op, qureg)
@@ -0,0 +1,347 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains a sparse state-vector simulator for circuits with few nonzero
+amplitudes, e.g., arithmetic circuits acting on basis states.
+"""
+
+import math
+import random
+import warnings
+
+from projectq.ops import (Measure,
+                          Allocate,
+                          Deallocate,
+                          BasicMathGate)
+
+from ._basics import BasicSimulator
+
+# Amplitudes with a smaller absolute value are dropped
+_TOLERANCE = 1.e-12
+# States with fewer nonzero amplitudes are cheap to simulate in any case
+_MIN_WARN_AMPLITUDES = 1 << 12
+
+
+class SparseSimulator(BasicSimulator):
+    """
+    SparseSimulator is a compiler engine which stores only the nonzero
+    amplitudes of the state vector in a dictionary (mapping basis state
+    indices to amplitudes).
+
+    Memory and run time scale with the number of nonzero amplitudes instead
+    of 2^n. Permutations (X, CNOT, Toffoli, Swap, math gates such as
+    AddConstantModN or MultiplyByConstantModN) and diagonal gates do not
+    increase the number of nonzero amplitudes, which allows to simulate, e.g.,
+    modular exponentiation on 60+ qubits with a small superposition on the
+    exponent register.
+
+    Every gate touches only the nonzero amplitudes. Once the fraction of
+    nonzero amplitudes exceeds `density_threshold` (and there are at least
+    4096 of them), a RuntimeWarning is issued, as the dense
+    :class:`Simulator` is faster in that regime.
+    """
+    emulates_math = True
+
+    def __init__(self, density_threshold=.1, rnd_seed=None):
+        """
+        Initialize the sparse simulator.
+
+        Args:
+            density_threshold (float): Fraction of nonzero amplitudes above
+                which a RuntimeWarning is issued (once per crossing).
+            rnd_seed (int): Random seed for the measurements.
+        """
+        BasicSimulator.__init__(self)
+        self._density_threshold = density_threshold
+        self._rng = random.Random(rnd_seed)
+        self._amplitudes = {0: 1. + 0.j}
+        self._dense = False
+
+    @property
+    def num_nonzero(self):
+        """ Number of stored (nonzero) amplitudes. """
+        return len(self._amplitudes)
+
+    def _get_mask(self, ids, name):
+        """
+        Return the bit mask of the given (allocated) qubit ids.
+        """
+        self._check_ids(ids, name)
+        mask = 0
+        for qubit_id in ids:
+            mask |= 1 << self._map[qubit_id]
+        return mask
+
+    def _check_density(self):
+        """
+        Warn if the fraction of nonzero amplitudes crossed the threshold.
+        """
+        density = len(self._amplitudes) / float(1 << len(self._map))
+        if (density > self._density_threshold and not self._dense and
+                len(self._amplitudes) >= _MIN_WARN_AMPLITUDES):
+            warnings.warn("SparseSimulator: {:.1%} of the {} amplitudes are "
+                          "nonzero. The dense Simulator is more efficient for "
+                          "this circuit.".format(density,
+                                                 1 << len(self._map)),
+                          RuntimeWarning)
+        self._dense = (density > self._density_threshold and
+                       len(self._amplitudes) >= _MIN_WARN_AMPLITUDES)
+
+    def get_expectation_value(self, qubit_operator, qureg):
+        """
+        Get the expectation value of qubit_operator w.r.t. the current wave
+        function represented by the supplied quantum register.
+
+        Args:
+            qubit_operator (projectq.ops.QubitOperator): Operator to measure.
+            qureg (list[Qubit],Qureg): Quantum bits to measure.
+
+        Returns:
+            Expectation value
+
+        Raises:
+            Exception: If `qubit_operator` acts on more qubits than present in
+                the `qureg` argument.
+
+        Note:
+            If there is a mapper present in the compiler, this function
+            automatically converts from logical qubits to mapped qubits for
+            the qureg argument.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        self._get_mask([qb.id for qb in qureg], "get_expectation_value")
+        for term in qubit_operator.terms:
+            if not term == () and term[-1][0] >= len(qureg):
+                raise Exception("qubit_operator acts on more qubits than "
+                                "contained in the qureg.")
+        expectation = 0.
+        for term, coefficient in qubit_operator.terms.items():
+            # P|i> = factor * (-1)^parity(i & zmask) |i ^ xmask>
+            xmask = 0
+            zmask = 0
+            factor = 1.
+            for index, action in term:
+                bit = 1 << self._map[qureg[index].id]
+                if action != 'Z':
+                    xmask |= bit
+                if action != 'X':
+                    zmask |= bit
+                if action == 'Y':
+                    factor *= 1j
+            value = 0.
+            for index, amplitude in self._amplitudes.items():
+                other = self._amplitudes.get(index ^ xmask)
+                if other is not None:
+                    parity = bin((index ^ xmask) & zmask).count('1') & 1
+                    value += amplitude.conjugate() * (1 - 2 * parity) * other
+            expectation += (coefficient * factor * value).real
+        return expectation
+
+    def get_probability(self, bit_string, qureg):
+        """
+        Return the probability of the outcome `bit_string` when measuring
+        the quantum register `qureg`.
+
+        Args:
+            bit_string (list[bool|int]|string[0|1]): Measurement outcome.
+            qureg (Qureg|list[Qubit]): Quantum register.
+
+        Returns:
+            Probability of measuring the provided bit string.
+
+        Note:
+            If there is a mapper present in the compiler, this function
+            automatically converts from logical qubits to mapped qubits for
+            the qureg argument.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        mask = self._get_mask([qb.id for qb in qureg], "get_probability")
+        bit_str = 0
+        for qb, bit in zip(qureg, bit_string):
+            bit_str |= int(bit) << self._map[qb.id]
+        return sum(abs(amplitude) ** 2
+                   for index, amplitude in self._amplitudes.items()
+                   if index & mask == bit_str)
+
+    def get_amplitude(self, bit_string, qureg):
+        """
+        Return the probability amplitude of the supplied `bit_string`.
+        The ordering is given by the quantum register `qureg`, which must
+        contain all allocated qubits.
+
+        Args:
+            bit_string (list[bool|int]|string[0|1]): Computational basis state
+            qureg (Qureg|list[Qubit]): Quantum register determining the
+                ordering. Must contain all allocated qubits.
+
+        Returns:
+            Probability amplitude of the provided bit string.
+
+        Note:
+            If there is a mapper present in the compiler, this function
+            automatically converts from logical qubits to mapped qubits for
+            the qureg argument.
+        """
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        if not set(qb.id for qb in qureg) == set(self._map):
+            raise RuntimeError("The second argument to get_amplitude() must"
+                               " be a permutation of all allocated qubits. "
+                               "Please make sure you have called "
+                               "eng.flush().")
+        index = 0
+        for qb, bit in zip(qureg, bit_string):
+            index |= int(bit) << self._map[qb.id]
+        return self._amplitudes.get(index, 0.j)
+
+    def cheat(self):
+        """
+        Access the ordering of the qubits and the nonzero amplitudes directly.
+
+        Returns:
+            A tuple where the first entry is a dictionary mapping qubit
+            indices to bit-locations and the second entry is a dictionary
+            mapping basis state indices to the nonzero amplitudes.
+        """
+        self._synchronize()
+        return (dict(self._map), dict(self._amplitudes))
+
+    def _measure(self, qubit_id):
+        """
+        Measure a single qubit and collapse the state accordingly.
+        """
+        mask = 1 << self._map[qubit_id]
+        probability_one = sum(abs(amplitude) ** 2
+                              for index, amplitude in self._amplitudes.items()
+                              if index & mask)
+        value = self._rng.random() < probability_one
+        norm = math.sqrt(probability_one if value else 1. - probability_one)
+        self._amplitudes = {index: amplitude / norm
+                            for index, amplitude in self._amplitudes.items()
+                            if bool(index & mask) == value}
+        return value
+
+    def _allocate(self, qubit_id):
+        if qubit_id in self._map:
+            raise RuntimeError("AllocateQubit: ID already exists. Qubit IDs "
+                               "should be unique.")
+        self._map[qubit_id] = len(self._map)
+        self._check_density()
+
+    def _deallocate(self, qubit_id):
+        pos = self._map[qubit_id]
+        mask = 1 << pos
+        probability_one = sum(abs(amplitude) ** 2
+                              for index, amplitude in self._amplitudes.items()
+                              if index & mask)
+        if 1.e-10 < probability_one < 1. - 1.e-10:
+            raise RuntimeError("Error: Qubit has not been measured / "
+                               "uncomputed! There is most likely a bug in "
+                               "your code.")
+        low = mask - 1
+        self._amplitudes = {(index & low) | ((index >> (pos + 1)) << pos):
+                            amplitude
+                            for index, amplitude in self._amplitudes.items()}
+        del self._map[qubit_id]
+        for key in self._map:
+            if self._map[key] > pos:
+                self._map[key] -= 1
+        self._check_density()
+
+    def _emulate_math(self, cmd):
+        """
+        Emulate a math gate by permuting the nonzero amplitudes.
+        """
+        ctrlmask = self._get_mask([qb.id for qb in cmd.control_qubits],
+                                  "emulate_math")
+        locations = [[self._map[qb.id] for qb in qr] for qr in cmd.qubits]
+        math_fun = cmd.gate.get_math_function(cmd.qubits)
+        new_amplitudes = dict()
+        for index, amplitude in self._amplitudes.items():
+            new_index = index
+            if index & ctrlmask == ctrlmask:
+                args = [sum(((index >> loc) & 1) << j
+                            for j, loc in enumerate(locs))
+                        for locs in locations]
+                res = math_fun(args)
+                for locs, value in zip(locations, res):
+                    for j, loc in enumerate(locs):
+                        if ((new_index >> loc) & 1) != ((value >> j) & 1):
+                            new_index ^= 1 << loc
+            new_amplitudes[new_index] = amplitude
+        self._amplitudes = new_amplitudes
+
+    def _apply_matrix(self, matrix, ids, ctrlids):
+        """
+        Apply a (controlled) k-qubit gate by updating the nonzero amplitudes
+        group by group, where a group consists of the 2^k basis states which
+        only differ in the target qubits.
+        """
+        ctrlmask = self._get_mask(ctrlids, "apply_controlled_gate")
+        positions = [self._map[qubit_id] for qubit_id in ids]
+        target_mask = self._get_mask(ids, "apply_controlled_gate")
+        offsets = []
+        for j in range(len(matrix)):
+            offsets.append(sum(((j >> k) & 1) << pos
+                               for k, pos in enumerate(positions)))
+
+        groups = dict()
+        new_amplitudes = dict()
+        for index, amplitude in self._amplitudes.items():
+            if index & ctrlmask != ctrlmask:
+                new_amplitudes[index] = amplitude
+                continue
+            j = sum(((index >> pos) & 1) << k
+                    for k, pos in enumerate(positions))
+            groups.setdefault(index & ~target_mask, dict())[j] = amplitude
+
+        for base, entries in groups.items():
+            for row, offset in enumerate(offsets):
+                value = sum(matrix[row][col] * amplitude
+                            for col, amplitude in entries.items())
+                if abs(value) > _TOLERANCE:
+                    new_amplitudes[base | offset] = value
+        self._amplitudes = new_amplitudes
+        self._check_density()
+
+    def _handle(self, cmd):
+        """
+        Handle a command, i.e., update the nonzero amplitudes.
+
+        Args:
+            cmd (Command): Command to handle.
+
+        Raises:
+            Exception: If the gate matrix does not match the number of
+                qubits it is applied to.
+        """
+        if cmd.gate == Measure:
+            self._handle_measure(cmd)
+        elif cmd.gate == Allocate:
+            self._allocate(cmd.qubits[0][0].id)
+        elif cmd.gate == Deallocate:
+            self._deallocate(cmd.qubits[0][0].id)
+        elif isinstance(cmd.gate, BasicMathGate):
+            self._emulate_math(cmd)
+        else:
+            matrix = cmd.gate.matrix.tolist()
+            ids = [qb.id for qr in cmd.qubits for qb in qr]
+            if not 2 ** len(ids) == len(matrix):
+                raise Exception("SparseSimulator: Error applying {} gate: "
+                                "{}-qubit gate applied to {} qubits.".format(
+                                    str(cmd.gate),
+                                    int(math.log(len(matrix), 2)),
+                                    len(ids)))
+            self._apply_matrix(matrix, ids,
+                               [qb.id for qb in cmd.control_qubits])
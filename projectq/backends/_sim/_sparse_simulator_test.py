@@ -0,0 +1,140 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Tests for projectq.backends._sim._sparse_simulator.py
+"""
+
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import SparseSimulator, Simulator
+from projectq.cengines import BasicMapperEngine
+from projectq.libs.math import (AddConstant, AddConstantModN,
+                                MultiplyByConstantModN)
+from projectq.meta import Control
+from projectq.ops import (All, CNOT, H, Measure, QubitOperator, Rx, Ry, Rz,
+                          Rzz, Swap, Toffoli, X)
+
+
+def _circuit(eng, qureg):
+    H | qureg[0]
+    Ry(0.3) | qureg[1]
+    CNOT | (qureg[0], qureg[4])
+    Rzz(0.7) | (qureg[3], qureg[1])
+    with Control(eng, qureg[0]):
+        Rx(1.3) | qureg[2]
+        AddConstant(3) | qureg[3:]
+    Toffoli | (qureg[4], qureg[1], qureg[3])
+    Swap | (qureg[2], qureg[5])
+    Rz(0.4) | qureg[0]
+
+
+def test_sparse_simulator_matches_simulator():
+    hamiltonian = (QubitOperator('X0 Y1', 0.5) + QubitOperator('Z2 Z5', 1.5) +
+                   QubitOperator('Y3 X4', -0.7) + QubitOperator('', 0.2))
+    sim = SparseSimulator()
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(6)
+    ref_sim = Simulator()
+    ref_eng = MainEngine(ref_sim, [])
+    ref_qureg = ref_eng.allocate_qureg(6)
+    _circuit(eng, qureg)
+    _circuit(ref_eng, ref_qureg)
+    eng.flush()
+    ref_eng.flush()
+    assert sim.get_expectation_value(hamiltonian, qureg) == pytest.approx(
+        ref_sim.get_expectation_value(hamiltonian, ref_qureg))
+    for bits in ['101', '011', '000']:
+        assert sim.get_probability(bits, qureg[1:4]) == pytest.approx(
+            ref_sim.get_probability(bits, ref_qureg[1:4]))
+    for bits in ['101101', '010011', '110001']:
+        assert sim.get_amplitude(bits, qureg[::-1]) == pytest.approx(
+            ref_sim.get_amplitude(bits, ref_qureg[::-1]))
+    assert sim.num_nonzero == len(sim.cheat()[1]) < 2 ** 6
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
+
+
+def test_sparse_simulator_wide_modular_arithmetic():
+    N = (1 << 61) - 1
+    sim = SparseSimulator(rnd_seed=4)
+    eng = MainEngine(sim, [])
+    ctrl = eng.allocate_qureg(2)
+    qureg = eng.allocate_qureg(62)
+    All(H) | ctrl
+    X | qureg[0]
+    with Control(eng, ctrl[0]):
+        MultiplyByConstantModN(3, N) | qureg
+    with Control(eng, ctrl[1]):
+        AddConstantModN(N - 2, N) | qureg
+    eng.flush()
+    assert sim.num_nonzero == 4
+    All(Measure) | ctrl
+    All(Measure) | qureg
+    eng.flush()
+    result = sum(int(qb) << i for i, qb in enumerate(qureg))
+    expected = 3 if int(ctrl[0]) else 1
+    if int(ctrl[1]):
+        expected = (expected + N - 2) % N
+    assert result == expected
+    # deallocate the (classical) control qubits
+    del ctrl
+    eng.flush()
+    assert sim.get_amplitude([(result >> i) & 1 for i in range(62)],
+                             qureg) == pytest.approx(1.)
+    assert sim.num_nonzero == 1
+
+
+def test_sparse_simulator_density_warning():
+    sim = SparseSimulator(density_threshold=.4)
+    eng = MainEngine(sim, [])
+    qureg = eng.allocate_qureg(13)
+    All(H) | qureg[:11]
+    with pytest.warns(RuntimeWarning):
+        H | qureg[11]
+        eng.flush()
+    All(Measure) | qureg
+
+
+def test_sparse_simulator_errors():
+    sim = SparseSimulator()
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    with pytest.raises(Exception):
+        sim.get_expectation_value(QubitOperator('Z1'), qubit)
+    H | qubit
+    eng.flush()
+    with pytest.raises(RuntimeError):
+        sim.get_amplitude('', [])
+    with pytest.raises(RuntimeError):
+        qubit[0].__del__()
+    assert qubit[0].id == -1
+
+
+def test_sparse_simulator_with_mapper():
+    mapper = BasicMapperEngine()
+    mapper.current_mapping = {0: 2, 1: 0, 2: 1}
+    sim = SparseSimulator()
+    eng = MainEngine(sim, [mapper])
+    qureg = eng.allocate_qureg(3)
+    X | qureg[2]
+    CNOT | (qureg[2], qureg[0])
+    eng.flush()
+    assert sim.get_probability('101', qureg) == pytest.approx(1.)
+    assert sim.get_amplitude('101', qureg) == pytest.approx(1.)
+    assert sim.get_expectation_value(QubitOperator('Z1'), qureg) == \
+        pytest.approx(1.)
+    All(Measure) | qureg
+    eng.flush()
+    assert [int(qb) for qb in qureg] == [1, 0, 1]
@@ -0,0 +1,180 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains a noisy simulator which samples quantum trajectories of a noise
+model, and a runner which distributes trajectories over a process pool.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from projectq.ops import All, Allocate, Deallocate, Measure
+
+from ._simulator import Simulator
+
+
+class NoisySimulator(Simulator):
+    """
+    NoisySimulator is a Simulator which applies the channels of a noise model
+    after each gate and to the outcomes of measurements.
+
+    Every run of a circuit corresponds to one quantum trajectory: The
+    channels are unraveled by sampling one Kraus operator per application,
+    so the state remains a pure state vector. Averaging over many
+    trajectories (see :func:`run_trajectories`) reproduces the statistics of
+    the noisy (mixed) state without storing a density matrix.
+    """
+    def __init__(self, noise_model, rnd_seed=None, noise_seed=None, **kwargs):
+        """
+        Initialize the noisy simulator.
+
+        Args:
+            noise_model (NoiseModel): Channels to apply.
+            rnd_seed (int): Random seed of the simulator (measurements).
+            noise_seed (int): Seed of the random number generator sampling
+                the noise.
+            kwargs: Further arguments for the Simulator (e.g.,
+                memory_budget).
+        """
+        Simulator.__init__(self, rnd_seed=rnd_seed, **kwargs)
+        self._noise_model = noise_model
+        self._rng = np.random.RandomState(noise_seed)
+
+    def is_meta_tag_handler(self, tag):
+        """
+        The noisy simulator does not execute loops itself, as the compiled
+        loops of the Simulator would skip the noise channels. Loops are
+        hence unrolled before they reach the noisy simulator.
+
+        Args:
+            tag: Meta tag class.
+
+        Returns:
+            False
+        """
+        return False
+
+    def _get_measurement_outcome(self, qubit_id, outcome):
+        """
+        Apply the readout errors of the qubit to a measurement outcome.
+
+        Args:
+            qubit_id (int): (Mapped) id of the measured qubit.
+            outcome (bool): Outcome of the measurement of the state vector.
+
+        Returns:
+            The outcome which is reported.
+        """
+        for error in self._noise_model.get_readout_errors(qubit_id):
+            outcome = error.apply(outcome, self._rng)
+        return outcome
+
+    def _handle(self, cmd):
+        """
+        Handle a command and apply the noise channels attached to it.
+
+        Args:
+            cmd (Command): Command to handle.
+        """
+        Simulator._handle(self, cmd)
+        if (cmd.gate == Measure or cmd.gate == Allocate or
+                cmd.gate == Deallocate):
+            return
+        for qr in cmd.qubits:
+            for qb in qr:
+                for channel in self._noise_model.get_gate_noise(cmd.gate,
+                                                                qb.id):
+                    channel.apply(self._simulator, qb.id, self._rng)
+
+
+def _run_trajectory(task):
+    """
+    Run one trajectory and return the measured bit string and the
+    expectation values.
+    """
+    from projectq import MainEngine
+    circuit, noise_model, get_engine_list, observables, seeds = task
+    simulator_seed, noise_seed = seeds
+    sim = NoisySimulator(noise_model, rnd_seed=simulator_seed,
+                         noise_seed=noise_seed)
+    engine_list = get_engine_list() if get_engine_list is not None else []
+    eng = MainEngine(sim, engine_list)
+    qureg = circuit(eng)
+    eng.flush()
+    values = [sim.get_expectation_value(op, qureg) for op in observables]
+    All(Measure) | qureg
+    eng.flush()
+    return ''.join(str(int(qb)) for qb in qureg), values
+
+
+def run_trajectories(circuit, noise_model, num_trajectories, observables=(),
+                     seed=None, num_processes=1, get_engine_list=None):
+    """
+    Sample quantum trajectories of a noisy circuit and aggregate the
+    measurement counts and expectation values.
+
+    Each trajectory uses its own random number streams, whose seeds are
+    drawn from `seed` in advance, so results are reproducible and
+    independent of the number of processes.
+
+    Args:
+        circuit (callable): Function which takes a MainEngine, applies the
+            circuit and returns the qureg to measure. The runner measures all
+            qubits of the qureg at the end (with readout errors). Must be
+            defined at module level if num_processes > 1.
+        noise_model (NoiseModel): Noise model to apply.
+        num_trajectories (int): Number of trajectories to sample.
+        observables (list[QubitOperator]): Operators whose expectation values
+            w.r.t. the returned qureg are averaged over all trajectories
+            (evaluated before the final measurement).
+        seed (int): Seed of the root random number stream.
+        num_processes (int): Number of worker processes (None uses all CPUs,
+            1 runs all trajectories in the current process).
+        get_engine_list (callable): Function returning the list of compiler
+            engines placed in front of the simulator (no compiler engines by
+            default). Must be defined at module level if num_processes > 1.
+
+    Returns:
+        A dictionary with the keys 'counts' (mapping measured bit strings,
+        with qureg[0] as the first character, to their number of
+        occurrences) and 'expectation_values' (list of averages, one per
+        observable).
+    """
+    # (seeds of the simulator and of the noise of each trajectory)
+    seeds = np.random.RandomState(seed).randint(0, 2 ** 31,
+                                                size=(num_trajectories, 2))
+    tasks = [(circuit, noise_model, get_engine_list, list(observables),
+              (int(simulator_seed), int(noise_seed)))
+             for simulator_seed, noise_seed in seeds]
+    if num_processes == 1:
+        results = [_run_trajectory(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(num_processes)
+        try:
+            results = pool.map(_run_trajectory, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    counts = dict()
+    sums = [0.] * len(observables)
+    for bits, values in results:
+        counts[bits] = counts.get(bits, 0) + 1
+        for i, value in enumerate(values):
+            sums[i] += value
+    return {'counts': counts,
+            'expectation_values': [value / num_trajectories
+                                   for value in sums]}
@@ -0,0 +1,112 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Tests for projectq.backends._sim._trajectories.py
+"""
+
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import (AmplitudeDampingChannel, DepolarizingChannel,
+                               NoiseModel, NoisySimulator, PauliChannel,
+                               ReadoutError, run_trajectories)
+from projectq.cengines import BasicMapperEngine
+from projectq.meta import Loop
+from projectq.ops import CNOT, H, Measure, QubitOperator, X, XGate
+
+
+def _bell_circuit(eng):
+    qureg = eng.allocate_qureg(2)
+    H | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    return qureg
+
+
+def _flip_circuit(eng):
+    qubit = eng.allocate_qubit()
+    X | qubit
+    return qubit
+
+
+def test_noisy_simulator_readout_error_with_mapper():
+    mapper = BasicMapperEngine()
+    mapper.current_mapping = {0: 1, 1: 0}
+    noise_model = NoiseModel()
+    noise_model.add_readout_error(ReadoutError(1.), qubits=[0])
+    sim = NoisySimulator(noise_model, rnd_seed=1, noise_seed=1)
+    eng = MainEngine(sim, [mapper])
+    qureg = eng.allocate_qureg(2)
+    Measure | qureg[0]
+    Measure | qureg[1]
+    eng.flush()
+    # backend qubit 0 is logical qubit 1
+    assert [int(qb) for qb in qureg] == [0, 1]
+    assert sim.get_probability('00', qureg) == pytest.approx(1.)
+
+
+def test_noisy_simulator_loop():
+    noise_model = NoiseModel()
+    noise_model.add_gate_noise(PauliChannel(px=1.), gates=XGate)
+    results = []
+    for use_loop in (False, True):
+        sim = NoisySimulator(noise_model, rnd_seed=1, noise_seed=1)
+        eng = MainEngine(sim, [])
+        qubit = eng.allocate_qubit()
+        if use_loop:
+            with Loop(eng, 3):
+                X | qubit
+        else:
+            for _ in range(3):
+                X | qubit
+        Measure | qubit
+        eng.flush()
+        results.append(int(qubit))
+    # every X gate is undone by the noise channel
+    assert results == [0, 0]
+
+
+def test_run_trajectories_noiseless():
+    result = run_trajectories(_bell_circuit, NoiseModel(), 50,
+                              observables=[QubitOperator('Z0 Z1')], seed=3)
+    assert set(result['counts']) == {'00', '11'}
+    assert sum(result['counts'].values()) == 50
+    assert result['expectation_values'] == [pytest.approx(1.)]
+
+
+def test_run_trajectories_noise_statistics():
+    noise_model = NoiseModel()
+    noise_model.add_gate_noise(DepolarizingChannel(.3))
+    noise_model.add_gate_noise(AmplitudeDampingChannel(.2), gates=XGate)
+    result = run_trajectories(_flip_circuit, noise_model, 2000,
+                              observables=[QubitOperator('Z0')], seed=5)
+    # after X: depolarizing shrinks <Z> = -1 by (1 - 4p/3), damping maps
+    # <Z> to (1 - gamma) <Z> + gamma
+    expected = (1. - .2) * -(1. - 4. * .3 / 3.) + .2
+    assert result['expectation_values'][0] == pytest.approx(expected,
+                                                            abs=.05)
+    assert result['counts']['0'] / 2000. == pytest.approx(
+        (1. + expected) / 2., abs=.05)
+
+
+def test_run_trajectories_reproducible_with_processes():
+    noise_model = NoiseModel()
+    noise_model.add_gate_noise(DepolarizingChannel(.2))
+    noise_model.add_readout_error(ReadoutError(.05, .1))
+    args = (_bell_circuit, noise_model, 40)
+    kwargs = dict(observables=[QubitOperator('X0 X1')], seed=11)
+    serial = run_trajectories(*args, num_processes=1, **kwargs)
+    parallel = run_trajectories(*args, num_processes=2, **kwargs)
+    assert serial == parallel
+    assert run_trajectories(*args, **kwargs) == serial
+    assert len(serial['counts']) > 2
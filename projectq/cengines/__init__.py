@@ -16,15 +16,21 @@ from ._basics import (BasicEngine,
                       LastEngineException,
                       ForwarderEngine)
 from ._cmdmodifier import CommandModifier
+from ._asyncengine import AsyncEngine
+from ._compilationcache import CompilationCache
 from ._basicmapper import BasicMapperEngine
 from ._ibm5qubitmapper import IBM5QubitMapper
 from ._swapandcnotflipper import SwapAndCNOTFlipper
+from ._sabre import SabreRouter
 from ._linearmapper import LinearMapper, return_swap_depth
 from ._manualmapper import ManualMapper
-from ._main import (MainEngine,
+from ._main import (ActiveQubitSet,
+                    MainEngine,
                     NotYetMeasuredError,
                     UnsupportedEngineError)
 from ._optimize import LocalOptimizer
+from ._peephole import PeepholeOptimizer, CommutationOptimizer
+from ._profiler import EngineProfile, PipelineProfiler, RuleProfile
 from ._replacer import (AutoReplacer,
                         InstructionFilter,
                         DecompositionRuleSet,
@@ -32,3 +38,4 @@ from ._replacer import (AutoReplacer,
 from ._tagremover import TagRemover
 from ._testengine import CompareEngine, DummyEngine
 from ._twodmapper import GridMapper
+from ._graphmapper import GraphMapper
@@ -0,0 +1,173 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains the AsyncEngine, which runs the engines after it (and the backend) on
+a worker thread, such that the construction of a circuit in Python and its
+simulation overlap.
+"""
+
+import sys
+import threading
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+from projectq.cengines import BasicEngine
+from projectq.ops import FlushGate
+
+
+def _is_finalizing():
+    """
+    Return True if the interpreter is shutting down.
+    """
+    is_finalizing = getattr(sys, 'is_finalizing', None)
+    return is_finalizing is not None and is_finalizing()
+
+
+class AsyncEngine(BasicEngine):
+    """
+    Compiler engine which hands the commands it receives to a worker thread,
+    which sends them on to the next engines.
+
+    The commands are put into a bounded queue, such that the thread which
+    issues the commands only has to wait if the worker thread lags behind by
+    more than queue_size command lists. Otherwise, it only waits for the
+    worker thread (see synchronize)
+
+        * on flush gates, i.e., eng.flush() returns once the backend has
+          processed all commands,
+        * when reading measurement results (int(qubit) or
+          MainEngine.get_measurement_result),
+        * when querying the state of the Simulator (e.g., cheat or
+          get_probability).
+
+    Exceptions raised by the next engines are raised at the next command or
+    synchronization after they occurred (and all commands up to that point
+    are dropped).
+
+    Example:
+        .. code-block:: python
+
+            eng = MainEngine(Simulator(), [AutoReplacer(rule_set),
+                                           AsyncEngine()])
+
+    Note:
+        Only the engines after the AsyncEngine run on the worker thread, and
+        the Simulator releases the GIL while it applies gates (such that the
+        threads actually run in parallel). The AsyncEngine is hence usually
+        the last compiler engine before the backend, and combined with
+        MainEngine(buffer_size=...) in order to reduce the number of command
+        lists.
+    """
+    def __init__(self, queue_size=100):
+        """
+        Initialize an AsyncEngine.
+
+        Args:
+            queue_size (int): Maximal number of command lists in the queue.
+        """
+        BasicEngine.__init__(self)
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()  # guards starting/stopping the worker
+        self._worker = None
+        # number of command lists which receive is about to put into the
+        # queue (the worker must not stop before they are in the queue)
+        self._num_pending = 0
+        self._error = None
+
+    def _run(self):
+        """
+        Send the command lists in the queue to the next engine.
+
+        The worker thread stops once it has processed a flush gate and the
+        queue is empty, such that it doesn't keep the engines alive.
+        """
+        while True:
+            command_list, has_flush = self._queue.get()
+            try:
+                if self._error is None:
+                    self.send(command_list)
+            except Exception:
+                self._error = sys.exc_info()[1]
+            finally:
+                stop = False
+                if has_flush:
+                    with self._lock:
+                        if self._queue.empty() and self._num_pending == 0:
+                            self._worker = None
+                            stop = True
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _raise_error(self):
+        """
+        Raise the exception which occurred on the worker thread (if any).
+        """
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+    def synchronize(self):
+        """
+        Wait until the worker thread has processed all commands received so
+        far.
+
+        Raises:
+            Exception: The exception raised by one of the next engines on the
+                worker thread (if any).
+        """
+        if threading.current_thread() is not self._worker:
+            self._queue.join()
+        self._raise_error()
+
+    def receive(self, command_list):
+        """
+        Put the commands into the queue of the worker thread and wait for it
+        if the commands contain a flush gate.
+
+        Args:
+            command_list (list<Command>): List of commands to receive.
+        """
+        self._raise_error()
+        has_flush = any(isinstance(cmd.gate, FlushGate)
+                        for cmd in command_list)
+        with self._lock:
+            # if the worker thread is not running, commands which have to be
+            # waited for anyway are sent on directly (this also avoids
+            # starting threads while the interpreter shuts down)
+            send_directly = (self._worker is None and
+                             (has_flush or _is_finalizing()))
+            if not send_directly:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run)
+                    self._worker.daemon = True
+                    self._worker.start()
+                self._num_pending += 1
+        if send_directly:
+            self.send(command_list)
+            return
+        # (the lock is not held while put blocks on a full queue, as the
+        # worker needs it after processing a flush gate)
+        try:
+            self._queue.put((command_list, has_flush))
+        finally:
+            with self._lock:
+                self._num_pending -= 1
+        if has_flush:
+            self.synchronize()
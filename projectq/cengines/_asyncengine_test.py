@@ -0,0 +1,176 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.cengines._asyncengine.py."""
+
+import threading
+import time
+
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import MPSSimulator, Simulator, SparseSimulator
+from projectq.cengines import DummyEngine, LocalOptimizer
+from projectq.ops import All, CNOT, FlushGate, H, Measure, X
+
+from projectq.cengines import _asyncengine
+
+
+class ThreadRecorder(DummyEngine):
+    """ Backend which records the threads it receives commands on. """
+    def __init__(self):
+        DummyEngine.__init__(self, save_commands=True)
+        self.threads = set()
+
+    def receive(self, command_list):
+        self.threads.add(threading.current_thread())
+        DummyEngine.receive(self, command_list)
+
+
+def run_circuit(engine_list):
+    backend = ThreadRecorder()
+    eng = MainEngine(backend, engine_list)
+    qureg = eng.allocate_qureg(3)
+    for _ in range(10):
+        H | qureg[0]
+        CNOT | (qureg[0], qureg[1])
+        X | qureg[2]
+    eng.flush()
+    num_received = len(backend.received_commands)
+    H | qureg[2]
+    eng.flush()
+    All(Measure) | qureg
+    # (eng.flush(deallocate_qubits=True) deallocates in arbitrary order)
+    del qureg
+    eng.flush()
+    return backend, num_received
+
+
+def test_async_engine_flush():
+    async_eng = _asyncengine.AsyncEngine(queue_size=2)
+    backend, num_received = run_circuit([LocalOptimizer(), async_eng])
+    expected, expected_num_received = run_circuit([LocalOptimizer()])
+    # eng.flush() waits for the worker thread
+    assert num_received == expected_num_received
+    assert ([str(cmd) for cmd in backend.received_commands] ==
+            [str(cmd) for cmd in expected.received_commands])
+    assert isinstance(backend.received_commands[-1].gate, FlushGate)
+    assert threading.current_thread() not in backend.threads
+    # the worker thread stops after each flush
+    assert async_eng._worker is None
+    assert len(backend.threads) == 3
+
+
+def test_async_engine_flush_without_worker():
+    backend = ThreadRecorder()
+    eng = MainEngine(backend, [_asyncengine.AsyncEngine()])
+    eng.flush()
+    # nothing to wait for --> the flush is sent on directly
+    assert backend.threads == set([threading.current_thread()])
+
+
+def test_async_engine_measurement():
+    eng = MainEngine(Simulator(), [_asyncengine.AsyncEngine()])
+    qureg = eng.allocate_qureg(2)
+    X | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    All(Measure) | qureg
+    assert [int(qubit) for qubit in qureg] == [1, 1]
+    X | qureg[1]
+    Measure | qureg[1]
+    assert int(qureg[1]) == 0
+    eng.flush()
+
+
+def test_async_engine_simulator_queries():
+    sim = Simulator()
+    eng = MainEngine(sim, [_asyncengine.AsyncEngine()])
+    qureg = eng.allocate_qureg(2)
+    X | qureg[1]
+    assert sim.get_probability('01', qureg) == pytest.approx(1.)
+    H | qureg[0]
+    mapping, state = sim.cheat()
+    assert len(mapping) == 2
+    assert sorted(abs(amplitude) ** 2 for amplitude in state) == \
+        pytest.approx([0, 0, .5, .5])
+    All(Measure) | qureg
+
+
+@pytest.mark.parametrize("simulator_class", [SparseSimulator, MPSSimulator])
+def test_async_engine_basic_simulator_queries(simulator_class):
+    sim = simulator_class()
+    eng = MainEngine(sim, [_asyncengine.AsyncEngine()])
+    qureg = eng.allocate_qureg(2)
+    X | qureg[1]
+    assert sim.get_probability('01', qureg) == pytest.approx(1.)
+    All(Measure) | qureg
+
+
+def test_async_engine_full_queue():
+    class SlowEngine(DummyEngine):
+        def receive(self, command_list):
+            time.sleep(0.001)
+            DummyEngine.receive(self, command_list)
+
+    backend = SlowEngine(save_commands=True)
+    async_eng = _asyncengine.AsyncEngine(queue_size=1)
+    eng = MainEngine(backend, [async_eng])
+
+    def run():
+        qubit = eng.allocate_qubit()
+        for _ in range(20):
+            for _ in range(5):
+                X | qubit
+            eng.flush()
+        Measure | qubit
+        del qubit
+        eng.flush()
+
+    # receive blocks on the full queue (without holding the lock which the
+    # worker needs after processing a flush gate)
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    thread.join(10.)
+    assert not thread.is_alive()
+    assert sum(1 for cmd in backend.received_commands if cmd.gate == X) == 100
+    assert async_eng._worker is None
+
+
+def test_async_engine_error():
+    class ErrorEngine(DummyEngine):
+        def receive(self, command_list):
+            raise RuntimeError
+
+    backend = ErrorEngine()
+    eng = MainEngine(backend, [_asyncengine.AsyncEngine()], verbose=True)
+    with pytest.raises(RuntimeError):
+        eng.allocate_qubit()
+        eng.flush()
+    # the exception is only raised once
+    eng.synchronize()
+    # the MainEngine sends another FlushGate, therefore we remove the backend
+    dummy = DummyEngine()
+    dummy.is_last_engine = True
+    eng.next_engine = dummy
+
+
+def test_async_engine_synchronize_on_worker_thread():
+    class SynchronizingEngine(DummyEngine):
+        def receive(self, command_list):
+            self.main_engine.synchronize()
+
+    eng = MainEngine(SynchronizingEngine(), [_asyncengine.AsyncEngine()])
+    eng.allocate_qubit()
+    eng.flush()
@@ -48,6 +48,20 @@ class BasicMapperEngine(BasicEngine):
     def current_mapping(self, current_mapping):
         self._current_mapping = current_mapping
 
+    def restore_mapping(self, mapping):
+        """
+        Set the mapping after commands which this mapper has mapped before
+        were sent on without going through the mapper (e.g., by a
+        CompilationCache).
+
+        Must only be called after a flush, i.e., while the mapper does not
+        store any commands.
+
+        Args:
+            mapping (dict): Mapping at the end of the mapped commands.
+        """
+        self.current_mapping = mapping
+
     def _send_cmd_with_mapped_ids(self, cmd):
         """
         Send this Command using the mapped qubit ids of self.current_mapping.
@@ -70,7 +84,7 @@ class BasicMapperEngine(BasicEngine):
             assert len(new_cmd.qubits) == 1 and len(new_cmd.qubits[0]) == 1
 
             # Add LogicalQubitIDTag to MeasureGate
-            def add_logical_id(command, old_tags=deepcopy(cmd.tags)):
+            def add_logical_id(command, old_tags=list(cmd.tags)):
                 command.tags = (old_tags +
                                 [LogicalQubitIDTag(cmd.qubits[0][0].id)])
                 return command
@@ -0,0 +1,407 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains the CompilationCache, a compiler engine which caches the compiled
+circuit (the commands which the backend receives) of the commands between two
+flushes, such that repeated circuits are only compiled once.
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+
+from projectq.cengines import BasicEngine
+from projectq.meta import insert_engine, LogicalQubitIDTag
+from projectq.ops import (AllocateQubitGate, Command, DeallocateQubitGate,
+                          FlushGate)
+from projectq.types import WeakQubitRef
+
+
+def _get_tag_key(tag):
+    """
+    Return a hashable representation of a meta tag (its class and the values
+    of its attributes).
+    """
+    slots = getattr(type(tag), '__slots__', None)
+    if slots is None:
+        return (type(tag), tuple(sorted(vars(tag).items())))
+    return (type(tag),) + tuple(getattr(tag, name) for name in slots)
+
+
+class _CompilationRecorder(BasicEngine):
+    """
+    Engine which is inserted in front of the backend and records the
+    commands the backend receives while a segment is being compiled.
+    """
+    def __init__(self):
+        BasicEngine.__init__(self)
+        self.commands = None  # list of the recorded commands (if recording)
+
+    def receive(self, command_list):
+        if self.commands is not None:
+            self.commands.extend(command_list)
+        self.send(command_list)
+
+
+class _CompiledSegment(object):
+    """
+    Compiled commands of a segment, in which the logical qubit ids are stored
+    as their positions in the segment (qubits which are allocated during the
+    compilation, e.g., ancillas, are numbered after the qubits of the
+    segment). Mapped qubit ids are stored as they are, together with the
+    mapping at the end of the segment.
+    """
+    __slots__ = ('_commands', '_num_qubits', '_mapping')
+
+    def __init__(self, commands, qubit_ids, mapping=None):
+        """
+        Args:
+            commands (list<Command>): Commands received by the backend.
+            qubit_ids (list<int>): Logical qubit ids of the segment.
+            mapping (dict): Mapping of the mapper at the end of the segment,
+                or None if there is no mapper (the qubit ids of the commands
+                are mapped ids if there is a mapper).
+        """
+        positions = dict((qubit_id, i) for i, qubit_id in enumerate(qubit_ids))
+
+        def get_position(qubit_id):
+            if qubit_id == -1:
+                return -1
+            if qubit_id not in positions:
+                positions[qubit_id] = len(positions)
+            return positions[qubit_id]
+
+        mapped = mapping is not None
+        get_id = (lambda qubit_id: qubit_id) if mapped else get_position
+        self._commands = []
+        for cmd in commands:
+            tags = tuple(LogicalQubitIDTag(get_position(tag.logical_qubit_id))
+                         if isinstance(tag, LogicalQubitIDTag) else tag
+                         for tag in cmd.tags)
+            self._commands.append(
+                (cmd.gate,
+                 tuple(tuple(get_id(qubit.id) for qubit in qureg)
+                       for qureg in cmd.qubits),
+                 tuple(get_id(qubit.id) for qubit in cmd.control_qubits),
+                 tags))
+        self._mapping = None
+        if mapped:
+            self._mapping = tuple((get_position(logical_id), mapped_id)
+                                  for logical_id, mapped_id in
+                                  sorted(mapping.items()))
+        self._num_qubits = len(positions)
+
+    def replay(self, qubit_ids, main_engine):
+        """
+        Return the compiled commands for a segment with the given logical
+        qubit ids, and the mapping at the end of the segment.
+
+        Args:
+            qubit_ids (list<int>): Logical qubit ids of the segment.
+            main_engine (MainEngine): Main engine, which provides the ids of
+                the qubits which are allocated during the compilation.
+
+        Returns:
+            A tuple (commands, mapping) where mapping is None if there is no
+            mapper.
+        """
+        ids = list(qubit_ids) + [main_engine.get_new_qubit_id() for _ in
+                                 range(self._num_qubits - len(qubit_ids))]
+        ids.append(-1)  # position -1
+
+        if self._mapping is not None:
+            def get_qubit(qubit_id):
+                return WeakQubitRef(main_engine, qubit_id)
+        else:
+            def get_qubit(position):
+                return WeakQubitRef(main_engine, ids[position])
+
+        commands = [Command(main_engine, gate,
+                            tuple([get_qubit(i) for i in qureg]
+                                  for qureg in qubits),
+                            [get_qubit(i) for i in controls],
+                            [LogicalQubitIDTag(ids[tag.logical_qubit_id])
+                             if isinstance(tag, LogicalQubitIDTag) else tag
+                             for tag in tags])
+                    for gate, qubits, controls, tags in self._commands]
+        mapping = None
+        if self._mapping is not None:
+            mapping = dict((ids[position], mapped_id)
+                           for position, mapped_id in self._mapping)
+        return commands, mapping
+
+
+class CompilationCache(BasicEngine):
+    """
+    Compiler engine which caches the compiled circuit of the commands it
+    receives between two flushes.
+
+    The CompilationCache holds the commands it receives until a flush gate
+    arrives. If the same commands (same gates on the same qubits, up to the
+    qubit ids) have been compiled before, the compiled commands are sent to
+    the backend directly, without going through the engines in between.
+    Otherwise, the commands are compiled by the next engines as usual and
+    the commands which the backend receives are cached.
+
+    Example:
+        .. code-block:: python
+
+            engine_list = ([CompilationCache(max_size=100)] +
+                           projectq.setups.linear.get_engine_list(
+                               num_qubits=5, one_qubit_gates="any",
+                               two_qubit_gates=(CNOT,)))
+            eng = MainEngine(backend, engine_list)
+            for _ in range(1000):
+                qureg = eng.allocate_qureg(3)
+                ...
+                All(Measure) | qureg
+                eng.flush()  # compiled only once (or twice with a mapper)
+                results = [int(qubit) for qubit in qureg]
+
+    Only segments which can be cached independently of the state of the
+    next engines are cached, i.e., segments which
+
+        * only use qubits which they allocate themselves (qubits which were
+          allocated before may only be deallocated; without a mapper, these
+          deallocations are sent through the next engines as usual),
+        * if there is a mapper, start with a mapping which only contains
+          qubits that the segment deallocates (e.g., the qubits of the
+          previous run of the circuit). The mapping at the start of the
+          segment is part of the cache key and the mapping at its end is
+          restored on a cache hit,
+        * consist of hashable gates and meta tags.
+
+    Other segments are sent on unchanged.
+
+    Note:
+        Since the commands are held until the next flush, measurement
+        results are only available after calling eng.flush(). The compiled
+        circuits are stored per CompilationCache, so the cache (and the
+        directory of its on-disk store) must not be shared between engine
+        lists which compile differently. The on-disk store uses pickle, so
+        it must only be used with trusted directories.
+
+    Attributes:
+        hits (int): Number of segments whose compiled commands were found in
+            the cache.
+        misses (int): Number of segments which were compiled (and cached).
+    """
+    def __init__(self, max_size=100, path=None):
+        """
+        Initialize a CompilationCache.
+
+        Args:
+            max_size (int): Number of compiled segments which are kept in
+                memory. The least recently used segment is dropped first.
+            path (str): Directory in which the compiled segments are stored
+                (and looked up if they are not in memory), or None.
+        """
+        BasicEngine.__init__(self)
+        self._max_size = max_size
+        self._path = path
+        self._segment = []
+        self._cache = OrderedDict()
+        self._recorder = None
+        self.hits = 0
+        self.misses = 0
+
+    def _insert_recorder(self):
+        """
+        Insert the recorder of the compiled commands in front of the backend.
+        """
+        backend = self.main_engine.backend
+        engine = self
+        while engine.next_engine is not backend:
+            engine = engine.next_engine
+        self._recorder = _CompilationRecorder()
+        insert_engine(engine, self._recorder)
+
+    def _split_segment(self, segment):
+        """
+        Split a segment into the deallocations of qubits which were
+        allocated before and the remaining commands.
+
+        If there is a mapper, the deallocations of qubits which were
+        allocated before are part of the compiled commands instead, and the
+        mapping at the start of the segment is part of the key.
+
+        Returns:
+            A tuple (deallocations, commands, qubit_ids, key) where qubit_ids
+            are the ids of the qubits which the commands act on (in the
+            order of their positions) and key is the fingerprint of the
+            commands, or None if the segment cannot be cached.
+        """
+        positions = dict()
+        start_mapping = ()
+        mapper = self.main_engine.mapper
+        if mapper is not None:
+            allocated = set(cmd.qubits[0][0].id for cmd in segment
+                            if isinstance(cmd.gate, AllocateQubitGate))
+            previous = [cmd.qubits[0][0].id for cmd in segment
+                        if isinstance(cmd.gate, DeallocateQubitGate) and
+                        cmd.qubits[0][0].id not in allocated]
+            mapping = mapper.current_mapping or dict()
+            # the compiled commands only depend on the mapping if all mapped
+            # qubits are deallocated by the segment (e.g., the qubits of the
+            # previous run of a circuit)
+            if set(mapping) != set(previous):
+                return None
+            previous.sort(key=mapping.get)
+            for qubit_id in previous:
+                positions[qubit_id] = len(positions)
+            start_mapping = tuple(mapping[qubit_id] for qubit_id in previous)
+        deallocations = []
+        commands = []
+        key = []
+        for cmd in segment:
+            if isinstance(cmd.gate, AllocateQubitGate):
+                positions[cmd.qubits[0][0].id] = len(positions)
+            elif (isinstance(cmd.gate, DeallocateQubitGate) and
+                    cmd.qubits[0][0].id not in positions):
+                deallocations.append(cmd)
+                continue
+            try:
+                qubits = tuple(tuple(-1 if qubit.id == -1 else
+                                     positions[qubit.id] for qubit in qureg)
+                               for qureg in cmd.qubits)
+                controls = tuple(positions[qubit.id]
+                                 for qubit in cmd.control_qubits)
+            except KeyError:  # the command acts on a qubit of another segment
+                return None
+            commands.append(cmd)
+            key.append((cmd.gate, qubits, controls,
+                        tuple(_get_tag_key(tag) for tag in cmd.tags)))
+        # e.g., eng.flush(deallocate_qubits=True) deallocates the qubits in
+        # arbitrary order, but consecutive deallocations commute
+        start = 0
+        for i in range(len(key) + 1):
+            if i == len(key) or not isinstance(key[i][0], DeallocateQubitGate):
+                if i - start > 1:
+                    order = sorted(range(start, i), key=lambda j: key[j][1])
+                    commands[start:i] = [commands[j] for j in order]
+                    key[start:i] = [key[j] for j in order]
+                start = i + 1
+        key = (start_mapping, tuple(key))
+        try:
+            hash(key)
+        except (TypeError, NotImplementedError):
+            return None
+        qubit_ids = sorted(positions, key=positions.get)
+        return deallocations, commands, qubit_ids, key
+
+    def _get_filename(self, key):
+        """
+        Return the file name of the compiled segment with the given key in
+        the on-disk store (or None if there is no store or if the key cannot
+        be pickled).
+        """
+        if self._path is None:
+            return None
+        try:
+            data = pickle.dumps(key, 2)
+        except Exception:
+            return None
+        return os.path.join(self._path,
+                            hashlib.sha1(data).hexdigest() + ".pickle")
+
+    def _lookup(self, key):
+        """
+        Return the compiled segment with the given key, or None if it is
+        neither in memory nor in the on-disk store.
+        """
+        try:
+            compiled = self._cache.pop(key)
+        except KeyError:
+            compiled = None
+            filename = self._get_filename(key)
+            if filename is not None and os.path.exists(filename):
+                with open(filename, 'rb') as stored_file:
+                    stored_key, stored = pickle.load(stored_file)
+                if stored_key == key:  # (and not a hash collision)
+                    compiled = stored
+        if compiled is not None:
+            self._store(key, compiled, save=False)
+        return compiled
+
+    def _store(self, key, compiled, save=True):
+        """
+        Store a compiled segment in memory (dropping the least recently used
+        segment if the cache is full) and in the on-disk store.
+        """
+        self._cache[key] = compiled
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+        filename = self._get_filename(key) if save else None
+        if filename is not None:
+            if not os.path.isdir(self._path):
+                os.makedirs(self._path)
+            with open(filename, 'wb') as stored_file:
+                pickle.dump((key, compiled), stored_file, 2)
+
+    def _process_segment(self, segment):
+        """
+        Send the compiled commands of a segment (which ends with a flush
+        gate) to the backend, or send the segment on for compilation.
+        """
+        if self._recorder is None:
+            self._insert_recorder()
+        split_segment = self._split_segment(segment)
+        if split_segment is None:
+            self.send(segment)
+            return
+        deallocations, commands, qubit_ids, key = split_segment
+        compiled = self._lookup(key)
+        if len(deallocations) > 0:
+            if compiled is not None:
+                # the next engines don't see the flush gate of the segment
+                deallocations.append(segment[-1])
+            self.send(deallocations)
+        mapper = self.main_engine.mapper
+        if compiled is not None:
+            self.hits += 1
+            # e.g., an AsyncEngine may still be sending commands
+            self.main_engine.synchronize()
+            replayed, mapping = compiled.replay(qubit_ids, self.main_engine)
+            self._recorder.send(replayed)
+            if mapper is not None:
+                mapper.restore_mapping(mapping)
+            return
+        self.misses += 1
+        self._recorder.commands = []
+        try:
+            self.send(commands)
+            recorded = self._recorder.commands
+        finally:
+            self._recorder.commands = None
+        mapping = None
+        if mapper is not None:
+            mapping = mapper.current_mapping or dict()
+        self._store(key, _CompiledSegment(recorded, qubit_ids, mapping))
+
+    def receive(self, command_list):
+        """
+        Receive a list of commands and process the commands received since
+        the last flush gate if the list contains a flush gate.
+
+        Args:
+            command_list (list<Command>): List of commands to receive.
+        """
+        for cmd in command_list:
+            self._segment.append(cmd)
+            if isinstance(cmd.gate, FlushGate):
+                segment = self._segment
+                self._segment = []
+                self._process_segment(segment)
@@ -0,0 +1,212 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.cengines._compilationcache.py."""
+
+import os
+
+import projectq.setups.decompositions
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import (AutoReplacer, DecompositionRuleSet,
+                               DummyEngine, InstructionFilter, LinearMapper,
+                               LocalOptimizer, TagRemover)
+from projectq.meta import Compute, Uncompute
+from projectq.ops import (All, CNOT, FlushGate, H, Measure, Rx, Toffoli,
+                          X)
+from projectq.types import WeakQubitRef
+
+from projectq.cengines import _compilationcache
+
+
+def make_engine_list(cache):
+    rule_set = DecompositionRuleSet(modules=[projectq.setups.decompositions])
+    return [cache, TagRemover(), LocalOptimizer(m=5), AutoReplacer(rule_set),
+            InstructionFilter(lambda eng, cmd: len(cmd.control_qubits) <= 1),
+            LocalOptimizer(m=5)]
+
+
+def run_circuit(eng, angle=0.5):
+    qureg = eng.allocate_qureg(3)
+    qubit_ids = [qubit.id for qubit in qureg]
+    X | qureg[0]
+    with Compute(eng):
+        X | qureg[1]
+    Toffoli | (qureg[0], qureg[1], qureg[2])
+    Uncompute(eng)
+    Rx(angle) | qureg[2]
+    All(Measure) | qureg
+    eng.flush(deallocate_qubits=True)
+    return qubit_ids
+
+
+def get_results(eng, qubit_ids):
+    return [eng.get_measurement_result(WeakQubitRef(eng, qubit_id))
+            for qubit_id in qubit_ids]
+
+
+def get_commands(backend, qubit_ids):
+    """ Commands of the backend, with qubit ids relative to qubit_ids[0]. """
+    return [(str(cmd.gate), [[qubit.id - qubit_ids[0] for qubit in qureg]
+                             for qureg in cmd.qubits],
+             [qubit.id - qubit_ids[0] for qubit in cmd.control_qubits])
+            for cmd in backend.received_commands
+            if not isinstance(cmd.gate, FlushGate)]
+
+
+def test_compilation_cache_hit():
+    cache = _compilationcache.CompilationCache()
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, make_engine_list(cache))
+    ids1 = run_circuit(eng)
+    commands1 = get_commands(backend, ids1)
+    assert (cache.hits, cache.misses) == (0, 1)
+    backend.received_commands = []
+    ids2 = run_circuit(eng)
+    assert ids2 != ids1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert get_commands(backend, ids2) == commands1
+    assert isinstance(backend.received_commands[-1].gate, FlushGate)
+    # a different angle is a different circuit
+    run_circuit(eng, angle=0.25)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_compilation_cache_simulator():
+    cache = _compilationcache.CompilationCache()
+    eng = MainEngine(Simulator(), make_engine_list(cache))
+    for _ in range(3):
+        qubit_ids = run_circuit(eng, angle=0.)
+        assert get_results(eng, qubit_ids) == [1, 0, 1]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_compilation_cache_mapper():
+    cache = _compilationcache.CompilationCache()
+    sim = Simulator()
+    engine_list = make_engine_list(cache) + [LinearMapper(num_qubits=3)]
+    eng = MainEngine(sim, engine_list)
+    for _ in range(3):
+        qubit_ids = run_circuit(eng, angle=0.)
+        assert get_results(eng, qubit_ids) == [1, 0, 1]
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert eng.mapper.current_mapping == dict()
+
+
+def test_compilation_cache_mapper_not_cached():
+    cache = _compilationcache.CompilationCache()
+    backend = DummyEngine(save_commands=True)
+    engine_list = [cache, LinearMapper(num_qubits=3)]
+    eng = MainEngine(backend, engine_list)
+    qureg = eng.allocate_qureg(2)
+    CNOT | (qureg[0], qureg[1])
+    eng.flush()
+    assert (cache.hits, cache.misses) == (0, 1)
+    # the qubits are still mapped and used --> not cached
+    CNOT | (qureg[0], qureg[1])
+    eng.flush()
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(cache._cache) == 1
+    assert len(backend.received_commands) > 0
+
+
+def test_compilation_cache_mapper_measure():
+    cache = _compilationcache.CompilationCache()
+    sim = Simulator()
+    engine_list = make_engine_list(cache) + [LinearMapper(num_qubits=5)]
+    eng = MainEngine(sim, engine_list)
+    qureg = []
+    for _ in range(4):
+        # the previous qureg is deallocated by this segment
+        qureg = eng.allocate_qureg(2)
+        X | qureg[0]
+        CNOT | (qureg[0], qureg[1])
+        All(Measure) | qureg
+        eng.flush()
+        assert [int(qubit) for qubit in qureg] == [1, 1]
+        assert sorted(eng.mapper.current_mapping) == [qubit.id
+                                                      for qubit in qureg]
+    assert cache.hits > 0
+
+
+def test_compilation_cache_external_qubits():
+    cache = _compilationcache.CompilationCache()
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [cache])
+    qubit = eng.allocate_qubit()
+    eng.flush()
+    assert cache.misses == 1
+    # acts on a qubit of a previous segment
+    X | qubit
+    eng.flush()
+    assert cache.misses == 1
+    # the deallocation of qubit is sent on, the remainder is cached
+    del qubit
+    X | eng.allocate_qubit()
+    eng.flush()
+    assert (cache.hits, cache.misses) == (0, 2)
+    qubit = eng.allocate_qubit()
+    eng.flush()
+    backend.received_commands = []
+    del qubit
+    X | eng.allocate_qubit()
+    eng.flush()
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert [str(cmd.gate) for cmd in backend.received_commands] == [
+        "Deallocate", "", "Allocate", "X", "Deallocate", ""]
+
+
+def test_compilation_cache_lru():
+    cache = _compilationcache.CompilationCache(max_size=2)
+    eng = MainEngine(DummyEngine(), [cache])
+    for angle in [0.1, 0.2, 0.1, 0.3, 0.2]:
+        run_circuit(eng, angle)
+    # 0.2 was dropped when 0.3 was stored
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert len(cache._cache) == 2
+
+
+def test_compilation_cache_disk(tmpdir):
+    path = os.path.join(str(tmpdir), "cache")
+    cache = _compilationcache.CompilationCache(path=path)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, make_engine_list(cache))
+    ids1 = run_circuit(eng)
+    commands1 = get_commands(backend, ids1)
+    assert len(os.listdir(path)) == 1
+    cache = _compilationcache.CompilationCache(path=path)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, make_engine_list(cache))
+    ids2 = run_circuit(eng)
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert get_commands(backend, ids2) == commands1
+
+
+def test_compilation_cache_unhashable():
+    class UnhashableTag(object):
+        __hash__ = None
+
+        def __init__(self):
+            self.value = []
+
+    cache = _compilationcache.CompilationCache()
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [cache])
+    qubit = eng.allocate_qubit()
+    cmd = X.generate_command(qubit)
+    cmd.tags = [UnhashableTag()]
+    eng.send([cmd])
+    eng.flush()
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert len(backend.received_commands) == 3
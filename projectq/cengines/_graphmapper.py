@@ -0,0 +1,369 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Mapper for a quantum circuit to an arbitrary coupling graph.
+
+Input: Quantum circuit with 1 and 2 qubit gates on n qubits. Gates are assumed
+       to be applied in parallel if they act on disjoint qubit(s) and any pair
+       of qubits can perform a 2 qubit gate (all-to-all connectivity)
+Output: Quantum circuit in which only qubits which are connected in the
+        coupling graph perform a 2 qubit gate. The mapper uses Swap gates in
+        order to move qubits next to each other. If the coupling graph is
+        directed, CNOTs are only applied in the direction of the edges.
+"""
+
+from copy import deepcopy
+
+from projectq.cengines import (BasicMapperEngine, return_swap_depth,
+                               SabreRouter, SwapAndCNOTFlipper)
+from projectq.cengines._sabre import get_distances
+from projectq.meta import LogicalQubitIDTag
+from projectq.ops import (AllocateQubitGate, Command, DeallocateQubitGate,
+                          FlushGate, Swap)
+from projectq.types import WeakQubitRef
+
+
+class GraphMapper(BasicMapperEngine):
+    """
+    Maps a quantum circuit to the coupling graph of a device.
+
+    The nodes of the graph are the qubit ids of the backend and its edges
+    connect the qubits which can perform a 2 qubit gate. The shortest
+    distances between all pairs of qubits are computed once; the qubits are
+    then placed and the Swaps are inserted by a SabreRouter, i.e., the work
+    per routing step only depends on the gates of the front layer and the
+    lookahead window.
+
+    If the graph is a networkx.DiGraph, an edge (c, t) means that a CNOT can
+    be performed with control c and target t. CNOTs in the opposite
+    direction are then flipped using Hadamard gates and Swaps are translated
+    to CNOTs, as done by the SwapAndCNOTFlipper.
+
+    Example:
+        .. code-block:: python
+
+            graph = nx.DiGraph([(0, 1), (1, 2), (2, 0), (2, 3)])
+            eng = MainEngine(backend, [AutoReplacer(rule_set),
+                                       InstructionFilter(two_qubit_gates),
+                                       GraphMapper(graph)])
+
+    Attributes:
+        current_mapping:  Stores the mapping: key is logical qubit id, value
+                          is backend qubit id (node of the graph)
+        storage (int): Number of gate it caches before mapping.
+        router (SabreRouter): Router which places the qubits and inserts the
+                              swaps
+        num_mappings (int): Number of times the mapper changed the mapping
+        depth_of_swaps (dict): Key are circuit depth of swaps, value is the
+                               number of such mappings which have been
+                               applied
+        num_of_swaps_per_mapping (dict): Key are the number of swaps per
+                                         mapping, value is the number of such
+                                         mappings which have been applied
+
+    Note:
+        1) Gates are cached and only mapped from time to time. A
+           FastForwarding gate doesn't empty the cache, only a FlushGate does.
+        2) Only 1 and two qubit gates allowed.
+        3) For a directed graph, CNOT and Hadamard gates have to be supported
+           by the following engines.
+    """
+    def __init__(self, graph, storage=1000, router=None):
+        """
+        Initialize a GraphMapper compiler engine.
+
+        Args:
+            graph (networkx.Graph): Connected coupling graph whose nodes are
+                the qubit ids of the backend. A networkx.DiGraph also fixes
+                the direction of the CNOTs.
+            storage (int): Number of gates to temporarily store, default is
+                1000
+            router (SabreRouter): Router to use. Default is a SabreRouter
+                with default parameters.
+
+        Raises:
+            RuntimeError: if the graph is empty or not connected
+        """
+        import networkx as nx  # deferred to keep `import projectq` fast
+        BasicMapperEngine.__init__(self)
+        if (graph.number_of_nodes() == 0 or
+                not nx.is_connected(graph.to_undirected())):
+            raise RuntimeError("The coupling graph has to be connected.")
+        self.graph = graph
+        self.num_qubits = graph.number_of_nodes()
+        self.storage = storage
+        if router is None:
+            router = SabreRouter()
+        self.router = router
+        # Internally we use the mapped ids 0,...,self.num_qubits-1 until
+        # sending a command:
+        self._mapped_ids_to_backend_ids = dict(enumerate(sorted(
+            graph.nodes())))
+        self._backend_ids_to_mapped_ids = dict(
+            (backend_id, mapped_id) for mapped_id, backend_id in
+            self._mapped_ids_to_backend_ids.items())
+        undirected_graph = graph.to_undirected()
+        self._neighbours = [
+            sorted(self._backend_ids_to_mapped_ids[neighbour]
+                   for neighbour in undirected_graph.neighbors(backend_id))
+            for _, backend_id in sorted(
+                self._mapped_ids_to_backend_ids.items())]
+        self._distances = get_distances(self._neighbours)
+        # Flips CNOTs and translates Swaps on directed graphs:
+        self._flipper = None
+        if graph.is_directed():
+            self._flipper = SwapAndCNOTFlipper(set(graph.edges()))
+        # Mapping from logical ids to the internal mapped ids:
+        self._current_mapped_mapping = deepcopy(self.current_mapping)
+        # Storing commands
+        self._stored_commands = list()
+        # Logical qubit ids for which the Allocate gate has already been
+        # processed and sent to the next engine but which are not yet
+        # deallocated:
+        self._currently_allocated_ids = set()
+        # Statistics:
+        self.num_mappings = 0
+        self.depth_of_swaps = dict()
+        self.num_of_swaps_per_mapping = dict()
+
+    @property
+    def current_mapping(self):
+        return deepcopy(self._current_mapping)
+
+    @current_mapping.setter
+    def current_mapping(self, current_mapping):
+        self._current_mapping = current_mapping
+        if current_mapping is None:
+            self._current_mapped_mapping = None
+        else:
+            self._current_mapped_mapping = dict()
+            for logical_id, backend_id in current_mapping.items():
+                self._current_mapped_mapping[logical_id] = (
+                    self._backend_ids_to_mapped_ids[backend_id])
+
+    def restore_mapping(self, mapping):
+        """
+        Set the mapping (and the allocated qubits) after commands which this
+        mapper has mapped before were sent on without going through the
+        mapper (see BasicMapperEngine.restore_mapping).
+
+        Args:
+            mapping (dict): Mapping at the end of the mapped commands.
+        """
+        self.current_mapping = mapping
+        self._currently_allocated_ids = set(mapping)
+
+    def is_available(self, cmd):
+        """
+        Only allows 1 or two qubit gates.
+        """
+        num_qubits = 0
+        for qureg in cmd.all_qubits:
+            num_qubits += len(qureg)
+        return num_qubits <= 2
+
+    def send(self, command_list):
+        """
+        Forward the list of commands to the next engine in the pipeline, via
+        the SwapAndCNOTFlipper if the coupling graph is directed.
+        """
+        if self._flipper is None:
+            BasicMapperEngine.send(self, command_list)
+        else:
+            self._flipper.next_engine = self.next_engine
+            self._flipper.main_engine = self.main_engine
+            self._flipper.receive(command_list)
+
+    def _send_possible_commands(self):
+        """
+        Sends the stored commands possible without changing the mapping.
+
+        Note: self._current_mapped_mapping (hence also self.current_mapping)
+              must exist already
+        """
+        active_ids = set(self._currently_allocated_ids)
+        active_ids.update(self._current_mapped_mapping)
+
+        new_stored_commands = []
+        for i in range(len(self._stored_commands)):
+            cmd = self._stored_commands[i]
+            if len(active_ids) == 0:
+                new_stored_commands += self._stored_commands[i:]
+                break
+            if isinstance(cmd.gate, AllocateQubitGate):
+                logical_id = cmd.qubits[0][0].id
+                if logical_id in self._current_mapped_mapping:
+                    self._currently_allocated_ids.add(logical_id)
+                    qb = WeakQubitRef(engine=self,
+                                      idx=self._current_mapping[logical_id])
+                    new_cmd = Command(engine=self, gate=AllocateQubitGate(),
+                                      qubits=([qb],),
+                                      tags=[LogicalQubitIDTag(logical_id)])
+                    self.send([new_cmd])
+                else:
+                    new_stored_commands.append(cmd)
+            elif isinstance(cmd.gate, DeallocateQubitGate):
+                logical_id = cmd.qubits[0][0].id
+                if logical_id in active_ids:
+                    qb = WeakQubitRef(engine=self,
+                                      idx=self._current_mapping[logical_id])
+                    new_cmd = Command(engine=self,
+                                      gate=DeallocateQubitGate(),
+                                      qubits=([qb],),
+                                      tags=[LogicalQubitIDTag(logical_id)])
+                    self._currently_allocated_ids.remove(logical_id)
+                    active_ids.remove(logical_id)
+                    self._current_mapped_mapping.pop(logical_id)
+                    self._current_mapping.pop(logical_id)
+                    self.send([new_cmd])
+                else:
+                    new_stored_commands.append(cmd)
+            else:
+                send_gate = True
+                mapped_ids = set()
+                for qureg in cmd.all_qubits:
+                    for qubit in qureg:
+                        if qubit.id not in active_ids:
+                            send_gate = False
+                            break
+                        mapped_ids.add(self._current_mapped_mapping[qubit.id])
+                # Check that mapped ids are connected in the graph
+                if send_gate and len(mapped_ids) == 2:
+                    mapped_id0, mapped_id1 = mapped_ids
+                    send_gate = self._distances[mapped_id0][mapped_id1] == 1
+                if send_gate:
+                    self._send_cmd_with_mapped_ids(cmd)
+                else:
+                    for qureg in cmd.all_qubits:
+                        for qubit in qureg:
+                            active_ids.discard(qubit.id)
+                    new_stored_commands.append(cmd)
+        self._stored_commands = new_stored_commands
+
+    def _run(self):
+        """
+        Routes the stored gates: places the new qubits, inserts the swaps
+        chosen by self.router and executes all possible gates, until all
+        stored gates have been sent or the router cannot make progress.
+        """
+        num_of_stored_commands_before = len(self._stored_commands)
+        if not self.current_mapping:
+            self.current_mapping = dict()
+        else:
+            self._send_possible_commands()
+        while len(self._stored_commands) > 0:
+            num_of_stored_commands_in_step = len(self._stored_commands)
+            # place the new qubits and execute the gates which don't need
+            # swaps, before routing the remaining ones:
+            self._apply_new_mapping(self.router.place_new_qubits(
+                self._current_mapped_mapping, self.num_qubits,
+                self._stored_commands, self._distances), [])
+            swaps, new_mapped_mapping = self.router.find_swaps(
+                self._current_mapped_mapping, self._stored_commands,
+                self._distances, self._neighbours)
+            self._apply_new_mapping(new_mapped_mapping, swaps)
+            if len(self._stored_commands) == num_of_stored_commands_in_step:
+                break
+        # Check that mapper actually made progress
+        if (len(self._stored_commands) > 0 and
+                len(self._stored_commands) == num_of_stored_commands_before):
+            raise RuntimeError("Mapper is potentially in an infinite loop. "
+                               "It is likely that the algorithm requires "
+                               "too many qubits. Increase the number of "
+                               "qubits for this mapper.")
+
+    def _apply_new_mapping(self, new_mapped_mapping, swaps):
+        """
+        Sends the swaps which change the current mapping to
+        new_mapped_mapping and executes all possible gates.
+
+        Only the mapped ids which are involved in the swaps are allocated (if
+        they are not used already) and deallocated afterwards (if they don't
+        store any information).
+        """
+        if swaps:
+            mapped_ids_used = set(self._current_mapped_mapping[logical_id]
+                                  for logical_id in
+                                  self._currently_allocated_ids)
+            swapped_ids = set(mapped_id for swap in swaps
+                              for mapped_id in swap)
+            for mapped_id in sorted(swapped_ids - mapped_ids_used):
+                qb = WeakQubitRef(
+                    engine=self,
+                    idx=self._mapped_ids_to_backend_ids[mapped_id])
+                cmd = Command(engine=self, gate=AllocateQubitGate(),
+                              qubits=([qb],))
+                self.send([cmd])
+            # Send swap operations to arrive at new_mapped_mapping:
+            for qubit_id0, qubit_id1 in swaps:
+                q0 = WeakQubitRef(
+                    engine=self,
+                    idx=self._mapped_ids_to_backend_ids[qubit_id0])
+                q1 = WeakQubitRef(
+                    engine=self,
+                    idx=self._mapped_ids_to_backend_ids[qubit_id1])
+                cmd = Command(engine=self, gate=Swap, qubits=([q0], [q1]))
+                self.send([cmd])
+            # Register statistics:
+            self.num_mappings += 1
+            depth = return_swap_depth(swaps)
+            if depth not in self.depth_of_swaps:
+                self.depth_of_swaps[depth] = 1
+            else:
+                self.depth_of_swaps[depth] += 1
+            if len(swaps) not in self.num_of_swaps_per_mapping:
+                self.num_of_swaps_per_mapping[len(swaps)] = 1
+            else:
+                self.num_of_swaps_per_mapping[len(swaps)] += 1
+            # Deallocate all mapped ids which we only needed for the swaps:
+            new_mapped_ids_used = set(new_mapped_mapping[logical_id]
+                                      for logical_id in
+                                      self._currently_allocated_ids)
+            for mapped_id in sorted((swapped_ids | mapped_ids_used) -
+                                    new_mapped_ids_used):
+                qb = WeakQubitRef(
+                    engine=self,
+                    idx=self._mapped_ids_to_backend_ids[mapped_id])
+                cmd = Command(engine=self, gate=DeallocateQubitGate(),
+                              qubits=([qb],))
+                self.send([cmd])
+        # Change to new map:
+        new_mapping = dict()
+        for logical_id, mapped_id in new_mapped_mapping.items():
+            new_mapping[logical_id] = (
+                self._mapped_ids_to_backend_ids[mapped_id])
+        self.current_mapping = new_mapping
+        # Send possible gates:
+        self._send_possible_commands()
+
+    def receive(self, command_list):
+        """
+        Receives a command list and, for each command, stores it until
+        we do a mapping (FlushGate or Cache of stored commands is full).
+
+        Args:
+            command_list (list of Command objects): list of commands to
+                receive.
+        """
+        for cmd in command_list:
+            if isinstance(cmd.gate, FlushGate):
+                while(len(self._stored_commands)):
+                    self._run()
+                self.send([cmd])
+            else:
+                self._stored_commands.append(cmd)
+            # Storage is full: Create new map and send some gates away:
+            if len(self._stored_commands) >= self.storage:
+                self._run()
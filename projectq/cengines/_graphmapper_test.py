@@ -0,0 +1,168 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.cengines._graphmapper.py."""
+
+import random
+
+import networkx as nx
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import DummyEngine, SabreRouter
+from projectq.meta import get_control_count, LogicalQubitIDTag
+from projectq.ops import (All, Allocate, ClassicalInstructionGate, CNOT,
+                          Command, CZ, FlushGate, H, Measure, Ry, Rz, Swap,
+                          XGate)
+from projectq.types import WeakQubitRef
+
+from projectq.cengines import _graphmapper as gm
+
+
+def _ring_with_tail():
+    # ring 10-11-12-13-14-15-10 with a tail 13-16-17, using backend ids
+    # which don't start at 0
+    graph = nx.Graph()
+    graph.add_edges_from([(10, 11), (11, 12), (12, 13), (13, 14), (14, 15),
+                          (15, 10), (13, 16), (16, 17)])
+    return graph
+
+
+def _random_circuit(eng, num_qubits, rng, num_gates=100):
+    qureg = eng.allocate_qureg(num_qubits)
+    for _ in range(num_gates):
+        if rng.random() < 0.5:
+            a, b = rng.sample(range(num_qubits), 2)
+            rng.choice([CNOT, CZ]) | (qureg[a], qureg[b])
+        else:
+            rng.choice([H, Ry(0.3), Rz(0.7)]) | qureg[rng.randrange(
+                num_qubits)]
+    eng.flush()
+    return qureg
+
+
+def _check_state(sim, qureg, ref_sim, ref_qureg):
+    for i in range(1 << len(qureg)):
+        bits = [(i >> j) & 1 for j in range(len(qureg))]
+        assert sim.get_amplitude(bits, qureg) == pytest.approx(
+            ref_sim.get_amplitude(bits, ref_qureg))
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
+
+
+def test_wrong_graph():
+    with pytest.raises(RuntimeError):
+        gm.GraphMapper(nx.Graph())
+    with pytest.raises(RuntimeError):
+        gm.GraphMapper(nx.Graph([(0, 1), (2, 3)]))
+
+
+def test_is_available():
+    mapper = gm.GraphMapper(_ring_with_tail())
+    qb = [WeakQubitRef(engine=None, idx=i) for i in range(3)]
+    cmd0 = Command(None, Swap, qubits=([qb[0]], [qb[1]]))
+    cmd1 = Command(None, XGate(), qubits=([qb[0]],), controls=qb[1:])
+    assert mapper.is_available(cmd0)
+    assert not mapper.is_available(cmd1)
+
+
+def test_distances():
+    mapper = gm.GraphMapper(_ring_with_tail())
+    backend_ids = mapper._backend_ids_to_mapped_ids
+    assert mapper._distances[backend_ids[10]][backend_ids[13]] == 3
+    assert mapper._distances[backend_ids[11]][backend_ids[17]] == 4
+    assert mapper._distances[backend_ids[15]][backend_ids[16]] == 3
+
+
+@pytest.mark.parametrize("storage", [1000, 5])
+def test_run_undirected(storage):
+    rng = random.Random(1)
+    state = rng.getstate()
+    ref_sim = Simulator()
+    ref_qureg = _random_circuit(MainEngine(ref_sim, []), 6, rng)
+    rng.setstate(state)
+    graph = _ring_with_tail()
+    mapper = gm.GraphMapper(graph, storage=storage,
+                            router=SabreRouter(lookahead=5))
+    backend = DummyEngine(save_commands=True)
+    sim = Simulator()
+    qureg = _random_circuit(MainEngine(sim, [mapper, backend]), 6, rng)
+    assert mapper.num_mappings > 0
+    assert set(mapper.current_mapping.values()).issubset(graph.nodes())
+    for cmd in backend.received_commands:
+        ids = [qb.id for qr in cmd.all_qubits for qb in qr]
+        if len(ids) == 2:
+            assert graph.has_edge(*ids)
+    _check_state(sim, qureg, ref_sim, ref_qureg)
+
+
+def test_run_directed():
+    rng = random.Random(2)
+    state = rng.getstate()
+    ref_sim = Simulator()
+    ref_qureg = _random_circuit(MainEngine(ref_sim, []), 5, rng)
+    rng.setstate(state)
+    graph = nx.DiGraph([(0, 1), (2, 1), (2, 3), (3, 4), (4, 0), (1, 4)])
+    mapper = gm.GraphMapper(graph)
+    backend = DummyEngine(save_commands=True)
+    sim = Simulator()
+    qureg = _random_circuit(MainEngine(sim, [mapper, backend]), 5, rng)
+    assert mapper.num_mappings > 0
+    for cmd in backend.received_commands:
+        assert cmd.gate != Swap
+        if isinstance(cmd.gate, XGate) and get_control_count(cmd) == 1:
+            assert graph.has_edge(cmd.control_qubits[0].id,
+                                  cmd.qubits[0][0].id)
+    _check_state(sim, qureg, ref_sim, ref_qureg)
+
+
+def test_logical_id_tags_and_partial_allocation():
+    # path 0-1-2-3-4: CNOT between the ends needs swaps, but only the
+    # qubits which are involved in a swap are allocated for it
+    mapper = gm.GraphMapper(nx.path_graph(5))
+    backend = DummyEngine(save_commands=True)
+    backend.is_last_engine = True
+    mapper.next_engine = backend
+    qb = [WeakQubitRef(engine=None, idx=i) for i in range(3)]
+    cmds = [Command(None, Allocate, qubits=([qb[i]],)) for i in range(3)]
+    cmds += [Command(None, XGate(), qubits=([qb[0]],), controls=[qb[1]]),
+             Command(None, XGate(), qubits=([qb[1]],), controls=[qb[2]]),
+             Command(None, XGate(), qubits=([qb[0]],), controls=[qb[2]])]
+    mapper.receive(cmds)
+    mapper.receive([Command(None, FlushGate(),
+                            qubits=([WeakQubitRef(None, -1)],))])
+    assert mapper._stored_commands == []
+    allocations = [cmd for cmd in backend.received_commands
+                   if cmd.gate == Allocate]
+    tagged = [cmd for cmd in allocations
+              if any(isinstance(tag, LogicalQubitIDTag)
+                     for tag in cmd.tags)]
+    assert len(tagged) == 3
+    assert len(allocations) - len(tagged) <= 1
+    assert sum(1 for cmd in backend.received_commands
+               if cmd.gate == Swap) == 1
+
+
+def test_run_infinite_loop_detection():
+    mapper = gm.GraphMapper(nx.Graph([(0, 1)]))
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [mapper])
+    with pytest.raises(RuntimeError):
+        qureg = eng.allocate_qureg(3)
+        CNOT | (qureg[0], qureg[2])
+        eng.flush()
+    for qubit in qureg:
+        qubit.id = -1
+    eng.next_engine = DummyEngine()
@@ -27,6 +27,7 @@ from collections import deque
 from copy import deepcopy
 
 from projectq.cengines import BasicMapperEngine
+from projectq.cengines._sabre import chain_neighbours, get_distances
 from projectq.meta import LogicalQubitIDTag
 from projectq.ops import (Allocate, AllocateQubitGate, Deallocate,
                           DeallocateQubitGate, Command, FlushGate,
@@ -77,6 +78,8 @@ class LinearMapper(BasicMapperEngine):
         num_of_swaps_per_mapping (dict): Key are the number of swaps per
                                          mapping, value is the number of such
                                          mappings which have been applied
+        router (SabreRouter): Router which inserts the swaps instead of
+                              the default mapping strategy, or None
 
     Note:
         1) Gates are cached and only mapped from time to time. A
@@ -85,7 +88,7 @@ class LinearMapper(BasicMapperEngine):
         3) Does not optimize for dirty qubits.
     """
 
-    def __init__(self, num_qubits, cyclic=False, storage=1000):
+    def __init__(self, num_qubits, cyclic=False, storage=1000, router=None):
         """
         Initialize a LinearMapper compiler engine.
 
@@ -93,11 +96,21 @@ class LinearMapper(BasicMapperEngine):
             num_qubits(int): Number of physical qubits in the linear chain
             cyclic(bool): If 1D chain is a cycle. Default is False.
             storage(int): Number of gates to temporarily store, default is 1000
+            router(SabreRouter): Router which inserts swaps one at a time
+                                 using a lookahead heuristic. Default is None
+                                 which means the stored gates are mapped on a
+                                 first come first served basis and the
+                                 qubits are moved to the new mapping by an
+                                 odd-even transposition sort.
         """
         BasicMapperEngine.__init__(self)
         self.num_qubits = num_qubits
         self.cyclic = cyclic
         self.storage = storage
+        self.router = router
+        # Coupling graph and distance table for the router (created lazily):
+        self._neighbours = None
+        self._distances = None
         # Storing commands
         self._stored_commands = list()
         # Logical qubit ids for which the Allocate gate has already been
@@ -109,6 +122,18 @@ class LinearMapper(BasicMapperEngine):
         self.depth_of_swaps = dict()
         self.num_of_swaps_per_mapping = dict()
 
+    def restore_mapping(self, mapping):
+        """
+        Set the mapping (and the allocated qubits) after commands which this
+        mapper has mapped before were sent on without going through the
+        mapper (see BasicMapperEngine.restore_mapping).
+
+        Args:
+            mapping (dict): Mapping at the end of the mapped commands.
+        """
+        self.current_mapping = mapping
+        self._currently_allocated_ids = set(mapping)
+
     def is_available(self, cmd):
         """
         Only allows 1 or two qubit gates.
@@ -477,7 +502,7 @@ class LinearMapper(BasicMapperEngine):
         Note: self.current_mapping must exist already
         """
         active_ids = deepcopy(self._currently_allocated_ids)
-        for logical_id in self.current_mapping:
+        for logical_id in self._current_mapping:
             active_ids.add(logical_id)
 
         new_stored_commands = []
@@ -487,11 +512,11 @@ class LinearMapper(BasicMapperEngine):
                 new_stored_commands += self._stored_commands[i:]
                 break
             if isinstance(cmd.gate, AllocateQubitGate):
-                if cmd.qubits[0][0].id in self.current_mapping:
+                if cmd.qubits[0][0].id in self._current_mapping:
                     self._currently_allocated_ids.add(cmd.qubits[0][0].id)
                     qb = WeakQubitRef(
                         engine=self,
-                        idx=self.current_mapping[cmd.qubits[0][0].id])
+                        idx=self._current_mapping[cmd.qubits[0][0].id])
                     new_cmd = Command(
                         engine=self,
                         gate=AllocateQubitGate(),
@@ -504,7 +529,7 @@ class LinearMapper(BasicMapperEngine):
                 if cmd.qubits[0][0].id in active_ids:
                     qb = WeakQubitRef(
                         engine=self,
-                        idx=self.current_mapping[cmd.qubits[0][0].id])
+                        idx=self._current_mapping[cmd.qubits[0][0].id])
                     new_cmd = Command(
                         engine=self,
                         gate=DeallocateQubitGate(),
@@ -524,7 +549,7 @@ class LinearMapper(BasicMapperEngine):
                         if qubit.id not in active_ids:
                             send_gate = False
                             break
-                        mapped_ids.add(self.current_mapping[qubit.id])
+                        mapped_ids.add(self._current_mapping[qubit.id])
                 # Check that mapped ids are nearest neighbour
                 if len(mapped_ids) == 2:
                     mapped_ids = list(mapped_ids)
@@ -548,11 +573,9 @@ class LinearMapper(BasicMapperEngine):
         """
         Creates a new mapping and executes possible gates.
 
-        It first allocates all 0, ..., self.num_qubits-1 mapped qubit ids, if
-        they are not already used because we might need them all for the
-        swaps. Then it creates a new map, swaps all the qubits to the new map,
-        executes all possible gates, and finally deallocates mapped qubit ids
-        which don't store any information.
+        Without a router, it creates a new map, swaps all the qubits to the
+        new map and executes all possible gates (see _apply_new_mapping).
+        With a router, it routes all stored gates (see _route).
         """
         num_of_stored_commands_before = len(self._stored_commands)
         if not self.current_mapping:
@@ -561,19 +584,38 @@ class LinearMapper(BasicMapperEngine):
             self._send_possible_commands()
             if len(self._stored_commands) == 0:
                 return
-        new_mapping = self.return_new_mapping(self.num_qubits,
-                                              self.cyclic,
-                                              self._currently_allocated_ids,
-                                              self._stored_commands,
-                                              self.current_mapping)
-        swaps = self._odd_even_transposition_sort_swaps(
-                old_mapping=self.current_mapping, new_mapping=new_mapping)
+        if self.router is None:
+            new_mapping = self.return_new_mapping(
+                self.num_qubits, self.cyclic, self._currently_allocated_ids,
+                self._stored_commands, self.current_mapping)
+            swaps = self._odd_even_transposition_sort_swaps(
+                    old_mapping=self.current_mapping, new_mapping=new_mapping)
+            self._apply_new_mapping(new_mapping, swaps)
+        else:
+            self._route()
+        # Check that mapper actually made progress
+        if len(self._stored_commands) == num_of_stored_commands_before:
+            raise RuntimeError("Mapper is potentially in an infinite loop. "
+                               "It is likely that the algorithm requires "
+                               "too many qubits. Increase the number of "
+                               "qubits for this mapper.")
+
+    def _apply_new_mapping(self, new_mapping, swaps):
+        """
+        Sends the swaps which change the current mapping to new_mapping and
+        executes all possible gates.
+
+        It first allocates all 0, ..., self.num_qubits-1 mapped qubit ids, if
+        they are not already used because we might need them all for the
+        swaps, and finally deallocates mapped qubit ids which don't store any
+        information.
+        """
         if swaps:  # first mapping requires no swaps
             # Allocate all mapped qubit ids (which are not already allocated,
             # i.e., contained in self._currently_allocated_ids)
             mapped_ids_used = set()
             for logical_id in self._currently_allocated_ids:
-                mapped_ids_used.add(self.current_mapping[logical_id])
+                mapped_ids_used.add(self._current_mapping[logical_id])
             not_allocated_ids = set(range(self.num_qubits)).difference(
                 mapped_ids_used)
             for mapped_id in not_allocated_ids:
@@ -613,12 +655,28 @@ class LinearMapper(BasicMapperEngine):
         self.current_mapping = new_mapping
         # Send possible gates:
         self._send_possible_commands()
-        # Check that mapper actually made progress
-        if len(self._stored_commands) == num_of_stored_commands_before:
-            raise RuntimeError("Mapper is potentially in an infinite loop. "
-                               "It is likely that the algorithm requires "
-                               "too many qubits. Increase the number of "
-                               "qubits for this mapper.")
+
+    def _route(self):
+        """
+        Inserts the swaps chosen by self.router and executes the gates, until
+        all stored gates have been sent or the router cannot make progress.
+        """
+        if self._distances is None:
+            self._neighbours = chain_neighbours(self.num_qubits, self.cyclic)
+            self._distances = get_distances(self._neighbours)
+        while len(self._stored_commands) > 0:
+            num_of_stored_commands_before = len(self._stored_commands)
+            # place the new qubits and execute the gates which don't need
+            # swaps, before routing the remaining ones:
+            self._apply_new_mapping(self.router.place_new_qubits(
+                self._current_mapping, self.num_qubits, self._stored_commands,
+                self._distances), [])
+            swaps, new_mapping = self.router.find_swaps(
+                self._current_mapping, self._stored_commands, self._distances,
+                self._neighbours)
+            self._apply_new_mapping(new_mapping, swaps)
+            if len(self._stored_commands) == num_of_stored_commands_before:
+                break
 
     def receive(self, command_list):
         """
@@ -14,13 +14,16 @@
 
 """Tests for projectq.cengines._linearmapper.py."""
 from copy import deepcopy
+import random
 
 import pytest
 
-from projectq.cengines import DummyEngine
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import DummyEngine, SabreRouter
 from projectq.meta import LogicalQubitIDTag
-from projectq.ops import (Allocate, BasicGate, CNOT, Command, Deallocate,
-                          FlushGate, Measure, QFT, X)
+from projectq.ops import (All, Allocate, BasicGate, CNOT, Command, Deallocate,
+                          FlushGate, H, Measure, QFT, Ry, Rz, X)
 from projectq.types import WeakQubitRef
 
 from projectq.cengines import _linearmapper as lm
@@ -713,3 +716,42 @@ def test_correct_stats():
     mapper.receive([cmd0, cmd1, cmd2, cmd3, cmd4, cmd5, cmd6, cmd7, cmd8,
                     cmd_flush])
     assert mapper.num_mappings == 2
+
+
+@pytest.mark.parametrize("cyclic, storage", [(False, 1000), (True, 7)])
+def test_run_with_router(cyclic, storage):
+    rng = random.Random(3)
+
+    def circuit(eng):
+        qureg = eng.allocate_qureg(5)
+        for _ in range(100):
+            if rng.random() < 0.5:
+                a, b = rng.sample(range(5), 2)
+                CNOT | (qureg[a], qureg[b])
+            else:
+                rng.choice([H, Ry(0.3), Rz(0.7)]) | qureg[rng.randrange(5)]
+        eng.flush()
+        return qureg
+
+    state = rng.getstate()
+    ref_sim = Simulator()
+    ref_qureg = circuit(MainEngine(ref_sim, []))
+    rng.setstate(state)
+    mapper = lm.LinearMapper(num_qubits=6, cyclic=cyclic, storage=storage,
+                             router=SabreRouter())
+    backend = DummyEngine(save_commands=True)
+    sim = Simulator()
+    eng = MainEngine(sim, [mapper, backend])
+    qureg = circuit(eng)
+    assert mapper.num_mappings > 0
+    for cmd in backend.received_commands:
+        mapped_ids = [qb.id for qureg in cmd.all_qubits for qb in qureg]
+        if len(mapped_ids) == 2:
+            diff = abs(mapped_ids[0] - mapped_ids[1])
+            assert diff == 1 or (cyclic and diff == 5)
+    for i in range(32):
+        bits = [(i >> j) & 1 for j in range(5)]
+        assert sim.get_amplitude(bits, qureg) == pytest.approx(
+            ref_sim.get_amplitude(bits, ref_qureg))
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
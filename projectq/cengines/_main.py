@@ -22,8 +22,8 @@ import traceback
 import weakref
 
 import projectq
-from projectq.cengines import BasicEngine, BasicMapperEngine
-from projectq.ops import Command, FlushGate
+from projectq.cengines import AsyncEngine, BasicEngine, BasicMapperEngine
+from projectq.ops import Command, FlushGate, FastForwardingGate
 from projectq.types import WeakQubitRef
 from projectq.backends import Simulator
 
@@ -36,6 +36,41 @@ class UnsupportedEngineError(Exception):
     pass
 
 
+class ActiveQubitSet(weakref.WeakSet):
+    """
+    WeakSet of the active qubits of a MainEngine, which can also look up an
+    active qubit by its id in constant time.
+
+    Example:
+        .. code-block:: python
+
+            qubit = eng.active_qubits.get(qubit_id)
+    """
+    def __init__(self):
+        weakref.WeakSet.__init__(self)
+        self._qubits_by_id = weakref.WeakValueDictionary()
+
+    def add(self, qubit):
+        weakref.WeakSet.add(self, qubit)
+        self._qubits_by_id[qubit.id] = qubit
+
+    def get(self, qubit_id):
+        """
+        Return the active qubit with the given id.
+
+        Args:
+            qubit_id (int): Id of the qubit.
+
+        Returns:
+            The qubit object, or None if there is no active qubit with this
+            id.
+        """
+        qubit = self._qubits_by_id.get(qubit_id)
+        if qubit is None or qubit.id != qubit_id or qubit not in self:
+            return None
+        return qubit
+
+
 class MainEngine(BasicEngine):
     """
     The MainEngine class provides all functionality of the main compiler
@@ -48,13 +83,17 @@ class MainEngine(BasicEngine):
     Attributes:
         next_engine (BasicEngine): Next compiler engine (or the back-end).
         main_engine (MainEngine): Self.
-        active_qubits (WeakSet): WeakSet containing all active qubits
+        active_qubits (ActiveQubitSet): WeakSet containing all active qubits
+            (which can also be looked up by id, see ActiveQubitSet.get)
         dirty_qubits (Set): Containing all dirty qubit ids
         backend (BasicEngine): Access the back-end.
         mapper (BasicMapperEngine): Access to the mapper if there is one.
+        profiler (PipelineProfiler): Profiler of the compiler engines while
+            profiling is enabled (and None otherwise).
 
     """
-    def __init__(self, backend=None, engine_list=None, verbose=False):
+    def __init__(self, backend=None, engine_list=None, verbose=False,
+                 buffer_size=None, profile=False):
         """
         Initialize the main compiler engine and all compiler engines.
 
@@ -69,6 +108,14 @@ class MainEngine(BasicEngine):
                 Default: projectq.setups.default.get_engine_list()
             verbose (bool): Either print full or compact error messages.
                             Default: False (i.e. compact error messages).
+            buffer_size (int): If larger than 1, commands are accumulated
+                and sent down the pipeline in lists of (up to) buffer_size
+                commands, which reduces the per-command overhead of the
+                compiler engines. Default: None (i.e. every command is sent
+                on immediately).
+            profile (bool): If True, the compiler engines are profiled (see
+                PipelineProfiler) and the profiles can be accessed via
+                eng.profiler. Default: False.
 
         Example:
             .. code-block:: python
@@ -102,7 +149,18 @@ class MainEngine(BasicEngine):
                 engines = [AutoReplacer(rule_set), TagRemover(),
                            LocalOptimizer(3)]
                 eng = MainEngine(Simulator(), engines)
+
+        Example of buffer_size: With a buffer, gates are only processed once
+        the buffer is full or a FastForwardingGate (a measurement, a
+        deallocation or a flush) is applied, so int(qubit) still works right
+        after a measurement. Meta statements (Compute, Control, Dagger, Loop,
+        ...) send all buffered commands before inserting their engine and
+        bypass the buffer until they are left. Exceptions raised by later
+        engines may hence surface at a later statement than without buffer.
         """
+        self._buffer_size = buffer_size or 0
+        self._command_buffer = []
+        self.profiler = None
         BasicEngine.__init__(self)
 
         if backend is None:
@@ -121,6 +179,7 @@ class MainEngine(BasicEngine):
             engine_list = projectq.setups.default.get_engine_list()
 
         self.mapper = None
+        self._async_engines = []
         if isinstance(engine_list, list):
             # Test that engine list elements are all BasicEngine objects
             for current_eng in engine_list:
@@ -131,6 +190,8 @@ class MainEngine(BasicEngine):
                         "Did you forget the brackets to create an instance?\n"
                         "E.g. MainEngine(engine_list=[AutoReplacer]) instead "
                         "of\n     MainEngine(engine_list=[AutoReplacer()])")
+                if isinstance(current_eng, AsyncEngine):
+                    self._async_engines.append(current_eng)
                 if isinstance(current_eng, BasicMapperEngine):
                     if self.mapper is None:
                         self.mapper = current_eng
@@ -159,11 +220,15 @@ class MainEngine(BasicEngine):
         engine_list[-1].main_engine = self
         engine_list[-1].is_last_engine = True
         self.next_engine = engine_list[0]
+        self._pipeline_head = engine_list[0]
         self.main_engine = self
-        self.active_qubits = weakref.WeakSet()
+        self.active_qubits = ActiveQubitSet()
         self._measurements = dict()
         self.dirty_qubits = set()
         self.verbose = verbose
+        if profile:
+            from projectq.cengines._profiler import PipelineProfiler
+            PipelineProfiler(self).enable()
 
         # In order to terminate an example code without eng.flush
         def atexit_function(weakref_main_eng):
@@ -196,6 +261,21 @@ class MainEngine(BasicEngine):
         except AttributeError:
             pass
 
+    @property
+    def next_engine(self):
+        """
+        First compiler engine of the pipeline (or the engine of a meta
+        statement which has been inserted before it).
+        """
+        return self._next_engine
+
+    @next_engine.setter
+    def next_engine(self, engine):
+        # buffered commands belong to the pipeline they were issued for
+        if self._command_buffer:
+            self._send_buffer()
+        self._next_engine = engine
+
     def set_measurement_result(self, qubit, value):
         """
         Register a measurement result
@@ -232,6 +312,7 @@ class MainEngine(BasicEngine):
                 Measure | qubit
                 eng.get_measurement_result(qubit[0]) == int(qubit)
         """
+        self.synchronize()
         if qubit.id in self._measurements:
             return self._measurements[qubit.id]
         else:
@@ -245,6 +326,15 @@ class MainEngine(BasicEngine):
                 "underlying backend failed to register "
                 "the measurement result\n")
 
+    def synchronize(self):
+        """
+        Wait until the asynchronous engines (see AsyncEngine) have processed
+        all commands sent so far, e.g., before reading measurement results or
+        querying the state of the backend.
+        """
+        for engine in self._async_engines:
+            engine.synchronize()
+
     def get_new_qubit_id(self):
         """
         Returns a unique qubit id to be used for the next qubit allocation.
@@ -269,8 +359,35 @@ class MainEngine(BasicEngine):
         """
         Forward the list of commands to the next engine in the pipeline.
 
+        If buffering is enabled, the commands are accumulated until the
+        buffer is full or a FastForwardingGate (e.g., a measurement or a
+        flush) has to be executed.
+
         It also shortens exception stack traces if self.verbose is False.
         """
+        if (self._buffer_size > 1 and
+                self._next_engine is self._pipeline_head):
+            self._command_buffer.extend(command_list)
+            if len(self._command_buffer) >= self._buffer_size or any(
+                    isinstance(cmd.gate, FastForwardingGate)
+                    for cmd in command_list):
+                self._send_buffer()
+        else:
+            self._forward(command_list)
+
+    def _send_buffer(self):
+        """
+        Send all buffered commands down the pipeline.
+        """
+        command_list = self._command_buffer
+        self._command_buffer = []
+        self._forward(command_list)
+
+    def _forward(self, command_list):
+        """
+        Forward the list of commands to the next engine, shortening exception
+        stack traces if self.verbose is False.
+        """
         try:
             self.next_engine.receive(command_list)
         except:
@@ -298,7 +415,8 @@ class MainEngine(BasicEngine):
                 id to -1).
         """
         if deallocate_qubits:
-            while len(self.active_qubits):
-                qb = self.active_qubits.pop()
+            # iterate over a copy, as qubits may also be garbage collected
+            # in the meantime (e.g., when called from __del__)
+            for qb in list(self.active_qubits):
                 qb.__del__()
         self.receive([Command(self, FlushGate(), ([WeakQubitRef(self, -1)],))])
@@ -21,8 +21,9 @@ import pytest
 import projectq.setups.default
 from projectq.cengines import DummyEngine, BasicMapperEngine, LocalOptimizer
 from projectq.backends import Simulator
+from projectq.meta import Compute, ComputeTag, Control, Dagger, Uncompute
 from projectq.ops import (AllocateQubitGate, DeallocateQubitGate, FlushGate,
-                          H, X)
+                          H, Measure, Rx, X)
 
 from projectq.cengines import _main
 
@@ -46,6 +47,7 @@ def test_main_engine_init():
     assert id(test_backend.main_engine) == id(eng)
     assert not test_backend.next_engine
     assert len(engine_list) == 2
+    assert eng.profiler is None
 
 
 def test_main_engine_init_failure():
@@ -129,6 +131,20 @@ def test_main_engine_get_qubit_id():
     assert len(set(ids)) == 10
 
 
+def test_main_engine_active_qubits_by_id():
+    eng = _main.MainEngine(backend=DummyEngine(), engine_list=[])
+    qureg = eng.allocate_qureg(3)
+    assert isinstance(eng.active_qubits, _main.ActiveQubitSet)
+    assert eng.active_qubits.get(qureg[1].id) is qureg[1]
+    assert eng.active_qubits.get(10) is None
+    qubit_id = qureg[1].id
+    qureg[1].__del__()
+    assert eng.active_qubits.get(qubit_id) is None
+    qubit_id = qureg[2].id
+    del qureg
+    assert eng.active_qubits.get(qubit_id) is None
+
+
 def test_main_engine_flush():
     backend = DummyEngine(save_commands=True)
     eng = _main.MainEngine(backend=backend, engine_list=[DummyEngine()])
@@ -181,3 +197,58 @@ def test_exceptions_are_forwarded():
                             verbose=True)
     with pytest.raises(TypeError):
         eng2.allocate_qubit()
+
+
+def test_main_engine_buffer():
+    backend = DummyEngine(save_commands=True)
+    eng = _main.MainEngine(backend=backend, engine_list=[], buffer_size=4)
+    qureg = eng.allocate_qureg(2)
+    H | qureg[0]
+    assert len(backend.received_commands) == 0
+    H | qureg[1]
+    assert len(backend.received_commands) == 4
+    X | qureg[0]
+    assert len(backend.received_commands) == 4
+    eng.flush()
+    assert [cmd.gate for cmd in backend.received_commands[4:]] == \
+        [X, FlushGate()]
+
+
+def test_main_engine_buffer_fast_forwarding():
+    sim = Simulator()
+    eng = _main.MainEngine(backend=sim, engine_list=[LocalOptimizer()],
+                           buffer_size=1000)
+    qubit = eng.allocate_qubit()
+    X | qubit
+    Measure | qubit
+    # the measurement is executed without flushing
+    assert int(qubit) == 1
+
+
+def _buffer_meta_circuit(eng):
+    qureg = eng.allocate_qureg(3)
+    H | qureg[0]
+    with Compute(eng):
+        X | qureg[1]
+    with Control(eng, qureg[1]):
+        Rx(0.3) | qureg[2]
+    with Dagger(eng):
+        H | qureg[2]
+        Rx(0.2) | qureg[0]
+    Uncompute(eng)
+    eng.flush()
+    return qureg
+
+
+def test_main_engine_buffer_meta_statements():
+    results = []
+    for buffer_size in (None, 3):
+        backend = DummyEngine(save_commands=True)
+        eng = _main.MainEngine(backend=backend, engine_list=[],
+                               buffer_size=buffer_size)
+        qureg = _buffer_meta_circuit(eng)
+        results.append([(str(cmd), [type(tag) for tag in cmd.tags])
+                        for cmd in backend.received_commands])
+        del qureg
+    assert results[0] == results[1]
+    assert any(ComputeTag in tags for _, tags in results[1])
@@ -0,0 +1,310 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains peephole optimizer engines which keep their window as a dependency
+graph (DAG) of commands:
+
+* PeepholeOptimizer, which combines gates that are adjacent on all their
+  qubits, and
+* CommutationOptimizer, which additionally moves gates past commuting
+  neighbors (see projectq.ops.commutes) before combining them.
+"""
+
+from projectq.cengines import BasicEngine
+from projectq.ops import (commutes, FlushGate, FastForwardingGate,
+                          NotMergeable)
+
+
+class _Node(object):
+    """
+    Node of the dependency graph, i.e., a command together with its
+    predecessor and successor on each of its qubits.
+    """
+    __slots__ = ('cmd', 'ids', 'prev', 'next')
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.ids = [qb.id for qureg in cmd.all_qubits for qb in qureg]
+        self.prev = dict()
+        self.next = dict()
+
+
+class PeepholeOptimizer(BasicEngine):
+    """
+    PeepholeOptimizer is a compiler engine which optimizes locally (merging
+    rotations, cancelling gates with their inverse and removing identity
+    gates) in a window of user-defined size, like the LocalOptimizer.
+
+    The window is stored as a doubly linked list of commands per qubit (i.e.,
+    a dependency graph). Each new command is simplified with its
+    predecessor right away; only the commands which become adjacent by a
+    simplification are revisited (worklist). This takes amortized constant
+    time per command, independently of the window size, so large windows
+    (e.g., m=10000) are practical.
+
+    Example:
+        .. code-block:: python
+
+            eng = MainEngine(engine_list=[PeepholeOptimizer(m=1000)])
+    """
+    def __init__(self, m=5):
+        """
+        Initialize a PeepholeOptimizer object.
+
+        Args:
+            m (int): Number of gates to cache per qubit, before sending on the
+                first gate.
+        """
+        BasicEngine.__init__(self)
+        self._m = m
+        self._head = dict()  # first (oldest) node of each qubit
+        self._tail = dict()  # last (newest) node of each qubit
+        self._count = dict()  # number of nodes of each qubit
+
+    def _append(self, node):
+        """
+        Append a node to the lists of all its qubits.
+        """
+        for idx in node.ids:
+            last = self._tail.get(idx)
+            node.prev[idx] = last
+            node.next[idx] = None
+            if last is None:
+                self._head[idx] = node
+                self._count[idx] = 1
+            else:
+                last.next[idx] = node
+                self._count[idx] += 1
+            self._tail[idx] = node
+
+    def _remove(self, node):
+        """
+        Remove a node from the lists of all its qubits.
+
+        Returns:
+            List of the successors of the node, which may be simplified with
+            their new predecessors.
+        """
+        successors = []
+        for idx in node.ids:
+            before = node.prev[idx]
+            after = node.next[idx]
+            if before is None:
+                self._head[idx] = after
+            else:
+                before.next[idx] = after
+            if after is None:
+                self._tail[idx] = before
+            else:
+                after.prev[idx] = before
+                successors.append(after)
+            self._count[idx] -= 1
+            if self._count[idx] == 0:
+                del self._head[idx]
+                del self._tail[idx]
+                del self._count[idx]
+        node.prev.clear()  # marks the node as removed
+        return successors
+
+    def _get_partners(self, node):
+        """
+        Return the nodes with which the given node may be cancelled or
+        merged, i.e., its predecessor if it is the predecessor on all qubits
+        of the node.
+
+        Args:
+            node (_Node): Node to simplify.
+        """
+        partner = node.prev[node.ids[0]]
+        if partner is None or len(partner.ids) != len(node.ids):
+            return []
+        for idx in node.ids:
+            if node.prev[idx] is not partner:
+                return []
+        return [partner]
+
+    def _combine(self, partner, node):
+        """
+        Cancel the node with its partner if they are inverses of each other,
+        or merge them into the partner.
+
+        Returns:
+            List of nodes to simplify again, or None if the nodes cannot be
+            combined.
+        """
+        if partner.cmd.get_inverse() == node.cmd:
+            return self._remove(node) + self._remove(partner)
+        try:
+            merged_command = partner.cmd.get_merged(node.cmd)
+        except NotMergeable:
+            return None
+        partner.cmd = merged_command
+        return self._remove(node) + [partner]
+
+    def _simplify(self, node):
+        """
+        Remove identity gates, then cancel or merge the node with one of its
+        partners (see _get_partners) as long as possible.
+        """
+        worklist = [node]
+        while len(worklist) > 0:
+            node = worklist.pop()
+            if len(node.prev) == 0:
+                continue  # node has been removed in the meantime
+            if node.cmd.is_identity():
+                worklist += self._remove(node)
+                continue
+            for partner in self._get_partners(node):
+                revisit = self._combine(partner, node)
+                if revisit is not None:
+                    worklist += revisit
+                    break
+
+    def _send_node(self, node):
+        """
+        Send a node on to the next engine, after sending all nodes which have
+        to be executed before it.
+        """
+        stack = [node]
+        commands = []
+        while len(stack) > 0:
+            current = stack[-1]
+            for idx in current.ids:
+                first = self._head[idx]
+                if first is not current:
+                    stack.append(first)
+                    break
+            else:
+                stack.pop()
+                self._remove(current)
+                commands.append(current.cmd)
+        self.send(commands)
+
+    def _send_all(self):
+        """
+        Send all cached commands on to the next engine.
+        """
+        while len(self._head) > 0:
+            idx = next(iter(self._head))
+            self._send_node(self._tail[idx])
+
+    def _cache_cmd(self, cmd):
+        """
+        Cache a command, simplify it and send on the oldest commands of its
+        qubits if the window is full (or the command if it needs to be
+        fast-forwarded).
+        """
+        node = _Node(cmd)
+        if len(node.ids) == 0:
+            self._send_all()
+            self.send([cmd])
+            return
+        self._append(node)
+        self._simplify(node)
+        if len(node.prev) == 0:
+            return  # the command has been cancelled or merged
+        if isinstance(cmd.gate, FastForwardingGate):
+            self._send_node(node)
+            return
+        for idx in node.ids:
+            while self._count.get(idx, 0) >= self._m:
+                self._send_node(self._head[idx])
+
+    def receive(self, command_list):
+        """
+        Receive commands from the previous engine and cache them.
+        If a flush gate arrives, the entire buffer is sent on.
+        """
+        for cmd in command_list:
+            if isinstance(cmd.gate, FlushGate):
+                self._send_all()
+                self.send([cmd])
+            else:
+                self._cache_cmd(cmd)
+
+
+class CommutationOptimizer(PeepholeOptimizer):
+    """
+    CommutationOptimizer is a PeepholeOptimizer which also cancels and merges
+    gates that are not adjacent, as long as all gates between them commute
+    with the newer one (see projectq.ops.commutes). E.g., the two Rz gates
+    in
+
+    .. code-block:: python
+
+        Rz(0.1) | qubit0
+        CNOT | (qubit0, qubit1)
+        Rz(0.2) | qubit0
+
+    are merged into Rz(0.3), as diagonal gates commute with controls.
+
+    Example:
+        .. code-block:: python
+
+            eng = MainEngine(engine_list=[CommutationOptimizer(m=100)])
+    """
+    def __init__(self, m=5, lookback=20):
+        """
+        Initialize a CommutationOptimizer object.
+
+        Args:
+            m (int): Number of gates to cache per qubit, before sending on the
+                first gate.
+            lookback (int): Maximal number of predecessors per qubit which a
+                new gate is moved past, which bounds the time spent per
+                command.
+        """
+        PeepholeOptimizer.__init__(self, m)
+        self._lookback = lookback
+
+    def _is_reachable(self, node, partner, idx):
+        """
+        Return True if node can be moved right behind partner on the qubit
+        with id idx, i.e., if all nodes in between commute with node.
+        """
+        current = node.prev[idx]
+        for _ in range(self._lookback):
+            if current is None:
+                return False
+            if current is partner:
+                return True
+            if not commutes(current.cmd, node.cmd):
+                return False
+            current = current.prev[idx]
+        return False
+
+    def _get_partners(self, node):
+        """
+        Yield the nodes with which the given node may be cancelled or merged,
+        i.e., predecessors acting on the same qubits such that all nodes in
+        between commute with the given node.
+
+        Args:
+            node (_Node): Node to simplify.
+        """
+        first_id = node.ids[0]
+        ids = set(node.ids)
+        candidate = node.prev[first_id]
+        for _ in range(self._lookback):
+            if candidate is None:
+                return
+            if (len(candidate.ids) == len(node.ids) and
+                    ids.issuperset(candidate.ids) and
+                    all(self._is_reachable(node, candidate, idx)
+                        for idx in node.ids if idx != first_id)):
+                yield candidate
+            if not commutes(candidate.cmd, node.cmd):
+                return
+            candidate = candidate.prev[first_id]
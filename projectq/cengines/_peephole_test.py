@@ -0,0 +1,295 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.cengines._peephole.py."""
+
+import random
+
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import DummyEngine
+from projectq.ops import (All, AllocateQubitGate, ClassicalInstructionGate,
+                          CNOT, CZ, DeallocateQubitGate, H, Measure, Rx, Ry,
+                          Rz, S, Sdag, Swap, T, Tdag, X)
+
+from projectq.cengines import _peephole
+
+
+def _gates(backend):
+    return [cmd for cmd in backend.received_commands
+            if not isinstance(cmd.gate, ClassicalInstructionGate)]
+
+
+def test_peephole_optimizer_caching():
+    optimizer = _peephole.PeepholeOptimizer(m=4)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qb0 = eng.allocate_qubit()
+    qb1 = eng.allocate_qubit()
+    H | qb0
+    H | qb1
+    CNOT | (qb0, qb1)
+    assert len(backend.received_commands) == 0
+    Rx(0.5) | qb0
+    assert len(backend.received_commands) == 1
+    assert backend.received_commands[0].gate == AllocateQubitGate()
+    H | qb0
+    assert len(backend.received_commands) == 2
+    assert backend.received_commands[1].gate == H
+    # Sending the CNOT requires sending the pipeline of qb1 first
+    Rx(0.6) | qb0
+    assert len(backend.received_commands) == 5
+    assert backend.received_commands[2].gate == AllocateQubitGate()
+    assert backend.received_commands[3].gate == H
+    assert backend.received_commands[3].qubits[0][0].id == qb1[0].id
+    assert backend.received_commands[4].gate == X
+    assert backend.received_commands[4].control_qubits[0].id == qb0[0].id
+
+
+def test_peephole_optimizer_fast_forwarding_and_flush():
+    optimizer = _peephole.PeepholeOptimizer(m=10)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qb0 = eng.allocate_qubit()
+    qb1 = eng.allocate_qubit()
+    H | qb0
+    CNOT | (qb1, qb0)
+    H | qb1
+    assert len(backend.received_commands) == 0
+    Measure | qb0
+    # everything up to the measurement, but not H on qb1
+    assert [str(cmd.gate) for cmd in backend.received_commands] == [
+        "Allocate", "H", "Allocate", "X", "Measure"]
+    eng.flush()
+    assert [str(cmd.gate) for cmd in backend.received_commands[5:]] == [
+        "H", ""]
+
+
+def test_peephole_optimizer_cancel_and_merge():
+    optimizer = _peephole.PeepholeOptimizer(m=100)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qb0 = eng.allocate_qubit()
+    qb1 = eng.allocate_qubit()
+    for _ in range(11):
+        H | qb0
+    for _ in range(11):
+        CNOT | (qb0, qb1)
+    # cancellation makes Rx(0.5) and Rx(-0.5) adjacent
+    Rx(0.5) | qb1
+    H | qb1
+    S | qb1
+    Sdag | qb1
+    H | qb1
+    Rx(-0.5) | qb1
+    for _ in range(10):
+        Ry(0.5) | qb0
+    Rz(0.) | qb0
+    T | qb0
+    eng.flush()
+    gates = _gates(backend)
+    assert [str(cmd.gate) for cmd in gates] == ["H", "X", "Ry(5.0)", "T"]
+    assert gates[1].control_qubits[0].id == qb0[0].id
+
+
+def test_peephole_optimizer_multi_qubit_gates():
+    optimizer = _peephole.PeepholeOptimizer(m=100)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qureg = eng.allocate_qureg(3)
+    CNOT | (qureg[0], qureg[1])
+    H | qureg[2]
+    CNOT | (qureg[0], qureg[1])
+    # not adjacent on qubit 1 -> no cancellation
+    CNOT | (qureg[0], qureg[2])
+    X | qureg[1]
+    CNOT | (qureg[0], qureg[2])
+    Swap | (qureg[1], qureg[2])
+    Swap | (qureg[2], qureg[1])
+    eng.flush()
+    assert sorted(str(cmd.gate) for cmd in _gates(backend)) == ["H", "X"]
+
+
+def test_peephole_optimizer_allocation():
+    optimizer = _peephole.PeepholeOptimizer(m=100)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qb0 = eng.allocate_qubit()
+    ancilla = eng.allocate_qubit()
+    CNOT | (qb0, ancilla)
+    CNOT | (qb0, ancilla)
+    # allocation and deallocation of the unused ancilla cancel
+    del ancilla
+    assert backend.received_commands == []
+    H | qb0
+    del qb0
+    assert [str(cmd.gate) for cmd in backend.received_commands] == [
+        "Allocate", "H", "Deallocate"]
+    assert isinstance(backend.received_commands[-1].gate,
+                      DeallocateQubitGate)
+
+
+def test_peephole_optimizer_large_window():
+    optimizer = _peephole.PeepholeOptimizer(m=10000)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qureg = eng.allocate_qureg(2)
+    for i in range(3000):
+        Rx(0.1) | qureg[0]
+        CNOT | (qureg[0], qureg[1])
+        H | qureg[1]
+    assert len(backend.received_commands) == 0
+    for i in range(3000):
+        H | qureg[1]
+        CNOT | (qureg[0], qureg[1])
+        Rx(-0.1) | qureg[0]
+    eng.flush()
+    assert _gates(backend) == []
+
+
+@pytest.mark.parametrize("m", [1, 3, 20])
+def test_peephole_optimizer_preserves_state(m):
+    rng = random.Random(m)
+    gates = [H, X, S, Sdag, T, Rx(0.3), Rx(-0.3), Rz(0.7), Rz(0.), Ry(0.2)]
+
+    def circuit(eng):
+        qureg = eng.allocate_qureg(4)
+        for _ in range(300):
+            if rng.random() < 0.3:
+                a, b = rng.sample(range(4), 2)
+                CNOT | (qureg[a], qureg[b])
+            else:
+                rng.choice(gates) | qureg[rng.randrange(4)]
+        eng.flush()
+        return qureg
+
+    state = rng.getstate()
+    ref_sim = Simulator()
+    ref_eng = MainEngine(ref_sim, [])
+    ref_qureg = circuit(ref_eng)
+    rng.setstate(state)
+    sim = Simulator()
+    counter = DummyEngine(save_commands=True)
+    eng = MainEngine(sim, [_peephole.PeepholeOptimizer(m=m), counter])
+    qureg = circuit(eng)
+    assert len(_gates(counter)) < 300
+    for i in range(16):
+        bits = [(i >> j) & 1 for j in range(4)]
+        assert sim.get_amplitude(bits, qureg) == pytest.approx(
+            ref_sim.get_amplitude(bits, ref_qureg))
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
+
+
+def test_commutation_optimizer_merges_through_controls():
+    optimizer = _peephole.CommutationOptimizer(m=100)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qb0 = eng.allocate_qubit()
+    qb1 = eng.allocate_qubit()
+    Rz(0.1) | qb0
+    CNOT | (qb0, qb1)
+    Rz(0.2) | qb0
+    # X commutes with the target of a CNOT
+    X | qb1
+    CNOT | (qb0, qb1)
+    X | qb1
+    # diagonal gates commute with CZ
+    T | qb1
+    CZ | (qb0, qb1)
+    Tdag | qb1
+    eng.flush()
+    # the two CNOTs cancel as well, since the X gates in between cancel
+    gates = _gates(backend)
+    assert [str(cmd.gate) for cmd in gates] == ["Rz(0.3)", "Z"]
+    assert gates[1].control_qubits[0].id == qb0[0].id
+
+
+def test_commutation_optimizer_blocked():
+    optimizer = _peephole.CommutationOptimizer(m=100)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qb0 = eng.allocate_qubit()
+    qb1 = eng.allocate_qubit()
+    # Rz does not commute with the target of a CNOT, nor H with anything
+    Rz(0.1) | qb1
+    CNOT | (qb0, qb1)
+    Rz(0.2) | qb1
+    H | qb0
+    Rz(0.1) | qb0
+    H | qb0
+    eng.flush()
+    assert len(_gates(backend)) == 6
+
+
+def test_commutation_optimizer_lookback():
+    optimizer = _peephole.CommutationOptimizer(m=100, lookback=3)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[optimizer])
+    qureg = eng.allocate_qureg(5)
+    Rz(0.1) | qureg[0]
+    for i in range(1, 5):
+        CNOT | (qureg[0], qureg[i])
+    Rz(-0.1) | qureg[0]
+    eng.flush()
+    assert len(_gates(backend)) == 6
+    backend.received_commands = []
+    Rz(0.1) | qureg[0]
+    for i in range(1, 3):
+        CNOT | (qureg[0], qureg[i])
+    Rz(-0.1) | qureg[0]
+    eng.flush()
+    assert len(_gates(backend)) == 2
+
+
+@pytest.mark.parametrize("m", [3, 20])
+def test_commutation_optimizer_preserves_state(m):
+    rng = random.Random(m)
+    gates = [H, X, S, Sdag, T, Tdag, Rx(0.3), Rx(-0.3), Rz(0.7), Rz(-0.7),
+             Ry(0.2)]
+
+    def circuit(eng):
+        qureg = eng.allocate_qureg(4)
+        for _ in range(300):
+            if rng.random() < 0.3:
+                a, b = rng.sample(range(4), 2)
+                rng.choice([CNOT, CZ]) | (qureg[a], qureg[b])
+            else:
+                rng.choice(gates) | qureg[rng.randrange(4)]
+        eng.flush()
+        return qureg
+
+    state = rng.getstate()
+    ref_sim = Simulator()
+    ref_eng = MainEngine(ref_sim, [])
+    ref_qureg = circuit(ref_eng)
+    rng.setstate(state)
+    sim = Simulator()
+    peephole_counter = DummyEngine(save_commands=True)
+    MainEngine(DummyEngine(), [_peephole.PeepholeOptimizer(m=m),
+                               peephole_counter])
+    counter = DummyEngine(save_commands=True)
+    eng = MainEngine(sim, [_peephole.CommutationOptimizer(m=m), counter])
+    qureg = circuit(eng)
+    rng.setstate(state)
+    circuit(peephole_counter.main_engine)
+    assert len(_gates(counter)) < len(_gates(peephole_counter))
+    for i in range(16):
+        bits = [(i >> j) & 1 for j in range(4)]
+        assert sim.get_amplitude(bits, qureg) == pytest.approx(
+            ref_sim.get_amplitude(bits, ref_qureg))
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
@@ -0,0 +1,198 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.cengines._profiler.py."""
+
+import pytest
+
+from projectq import MainEngine
+from projectq.cengines import (AsyncEngine, AutoReplacer, DecompositionRule,
+                               DecompositionRuleSet, DummyEngine,
+                               InstructionFilter, LinearMapper,
+                               LocalOptimizer, PeepholeOptimizer,
+                               PipelineProfiler, TagRemover)
+from projectq.ops import BasicGate, CNOT, H, X
+
+from projectq.cengines import _profiler
+
+
+class SomeGateClass(BasicGate):
+    pass
+
+
+SomeGate = SomeGateClass()
+
+
+def decompose_some_gate(cmd):
+    X | cmd.qubits
+    H | cmd.qubits
+
+
+def make_engine_list():
+    rule_set = DecompositionRuleSet([DecompositionRule(SomeGateClass,
+                                                       decompose_some_gate)])
+    return [AutoReplacer(rule_set),
+            InstructionFilter(lambda eng, cmd:
+                              not isinstance(cmd.gate, SomeGateClass)),
+            LocalOptimizer(m=5)]
+
+
+def test_profiler_report():
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, make_engine_list(), profile=True)
+    assert isinstance(eng.profiler, PipelineProfiler)
+    qubit = eng.allocate_qubit()
+    SomeGate | qubit
+    eng.flush()
+    assert len(backend.received_commands) == 4
+    report = eng.profiler.get_report()
+    assert ([profile['name'] for profile in report] ==
+            ["MainEngine", "AutoReplacer", "InstructionFilter",
+             "LocalOptimizer", "DummyEngine"])
+    main, replacer, instruction_filter, optimizer, dummy = report
+    assert main['commands_out'] == 3
+    assert main['calls'] == 0
+    # the decomposed commands are sent back to the AutoReplacer
+    assert replacer['calls'] == 5
+    assert replacer['commands_in'] == 3
+    assert replacer['commands_out'] == 4
+    assert instruction_filter['commands_in'] == 4
+    assert optimizer['commands_in'] == 4
+    assert optimizer['commands_out'] == 4
+    assert dummy['commands_in'] == 4
+    assert dummy['commands_out'] == 0
+    for profile in report[1:]:
+        assert profile['flushes'] == 1
+    assert optimizer['max_buffer_size'] == 3
+    assert optimizer['buffer_size'] == 0
+    assert replacer['buffer_size'] is None
+    rule = replacer['rules']["_profiler_test.decompose_some_gate"]
+    assert rule['calls'] == 1
+    assert 0 <= rule['time'] <= rule['cumulative_time']
+    # the exclusive times add up to the total time
+    total = (sum(profile['time'] for profile in report) +
+             sum(rule['time'] for profile in report
+                 for rule in profile['rules'].values()))
+    assert total == pytest.approx(main['cumulative_time'])
+    assert replacer['cumulative_time'] == pytest.approx(
+        main['cumulative_time'])
+    assert dummy['time'] == pytest.approx(dummy['cumulative_time'])
+    table = str(eng.profiler)
+    assert "3 LocalOptimizer" in table
+    assert "_profiler_test.decompose_some_gate" in table
+    eng.profiler.reset()
+    assert eng.profiler.profiles[1].calls == 0
+    assert eng.profiler.profiles[1].rules == dict()
+
+
+def test_profiler_context_manager():
+    backend = DummyEngine()
+    engine_list = make_engine_list()
+    eng = MainEngine(backend, engine_list)
+    assert eng.profiler is None
+    qubit = eng.allocate_qubit()
+    with PipelineProfiler(eng) as profiler:
+        assert eng.profiler is profiler
+        assert 'receive' in backend.__dict__
+        profiler.enable()  # no effect
+        SomeGate | qubit
+        eng.flush()
+    assert eng.profiler is None
+    for engine in engine_list + [backend]:
+        assert 'receive' not in engine.__dict__
+    profiler.disable()  # no effect
+    SomeGate | qubit
+    eng.flush()
+    assert profiler.profiles[0].commands_out == 2
+    assert profiler.profiles[1].rules[
+        "_profiler_test.decompose_some_gate"].calls == 1
+    assert profiler.start_rule(engine_list[0], None) is None
+    profiler.stop_rule(None)
+
+
+def test_profiler_exception():
+    class FailingEngine(DummyEngine):
+        def receive(self, command_list):
+            raise RuntimeError
+
+    eng = MainEngine(FailingEngine(), [TagRemover()], verbose=True,
+                     profile=True)
+    with pytest.raises(RuntimeError):
+        eng.allocate_qubit()
+    assert eng.profiler._get_stack() == []
+    assert eng.profiler.profiles[2].calls > 0
+    # the MainEngine sends another FlushGate, therefore we remove the backend
+    dummy = DummyEngine()
+    dummy.is_last_engine = True
+    eng.next_engine = dummy
+
+
+def test_profiler_buffer_sizes():
+    mapper = LinearMapper(num_qubits=3)
+    eng = MainEngine(DummyEngine(), [PeepholeOptimizer(m=5), mapper],
+                     profile=True)
+    qureg = eng.allocate_qureg(3)
+    CNOT | (qureg[0], qureg[2])
+    eng.flush()
+    peephole, linear_mapper = eng.profiler.profiles[1:3]
+    # the CNOT is stored for both of its qubits
+    assert peephole.max_buffer_size == 5
+    assert peephole.buffer_size == 0
+    assert linear_mapper.max_buffer_size > 0
+    assert linear_mapper.buffer_size == 0
+    assert _profiler._get_buffer_size_function(DummyEngine()) is None
+
+
+def test_profiler_async_engine():
+    backend = DummyEngine()
+    eng = MainEngine(backend, [TagRemover(), AsyncEngine()], profile=True)
+    qureg = eng.allocate_qureg(2)
+    CNOT | (qureg[0], qureg[1])
+    eng.flush()
+    main, tag_remover, async_eng, dummy = eng.profiler.profiles
+    # the commands which the worker thread sends on are counted as commands
+    # of the AsyncEngine
+    assert main.commands_out == 4
+    assert async_eng.commands_in == 4
+    assert async_eng.commands_out == 4
+    assert dummy.commands_in == 4
+    assert dummy.cumulative_time <= async_eng.cumulative_time
+
+
+def test_profiler_nested():
+    backend = DummyEngine()
+    engine_list = make_engine_list()
+    eng = MainEngine(backend, engine_list, profile=True)
+    outer = eng.profiler
+    qubit = eng.allocate_qubit()
+    with PipelineProfiler(eng) as inner:
+        assert eng.profiler is inner
+        with pytest.raises(RuntimeError):
+            outer.disable()
+        SomeGate | qubit
+        eng.flush()
+    assert eng.profiler is outer
+    for engine in engine_list + [backend]:
+        assert 'receive' in engine.__dict__
+    SomeGate | qubit
+    eng.flush()
+    name = "_profiler_test.decompose_some_gate"
+    assert inner.profiles[1].commands_in == 2
+    assert inner.profiles[1].rules[name].calls == 1
+    assert outer.profiles[1].commands_in == 5
+    assert outer.profiles[1].rules[name].calls == 2
+    outer.disable()
+    assert eng.profiler is None
+    for engine in engine_list + [backend]:
+        assert 'receive' not in engine.__dict__
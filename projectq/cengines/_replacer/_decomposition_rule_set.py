@@ -28,6 +28,9 @@ class DecompositionRuleSet:
                 containing decomposition rules to add to the rule set.
         """
         self.decompositions = dict()
+        # cached results of get_candidates and get_inverse_candidates
+        self._candidates = dict()
+        self._inverse_candidates = dict()
 
         if rules:
             self.add_decomposition_rules(rules)
@@ -54,6 +57,60 @@ class DecompositionRuleSet:
         if cls not in self.decompositions:
             self.decompositions[cls] = []
         self.decompositions[cls].append(decomp_obj)
+        self._candidates.clear()
+        self._inverse_candidates.clear()
+
+    def get_candidates(self, gate_class):
+        """
+        Return the decompositions registered for the classes in the method
+        resolution order of gate_class (excluding object).
+
+        The result is cached until the next rule gets added.
+
+        Args:
+            gate_class (type): Class of the gate to decompose.
+
+        Returns:
+            List containing, for each class of the MRO, the list of its
+            _Decomposition objects (which may be empty).
+        """
+        try:
+            return self._candidates[gate_class]
+        except KeyError:
+            candidates = [self.decompositions.get(cls.__name__, [])
+                          for cls in gate_class.mro()[:-1]]
+            self._candidates[gate_class] = candidates
+            return candidates
+
+    def get_inverse_candidates(self, inverse_gate_class):
+        """
+        Return the inverted decompositions (see
+        _Decomposition.get_inverse_decomposition) registered for the classes
+        in the method resolution order of inverse_gate_class, i.e., of the
+        class of the inverse of the gate to decompose.
+
+        If the gate does not have an inverse, inverse_gate_class is
+        DaggeredGate and its parent classes BasicGate and object are not
+        checked.
+
+        The result is cached until the next rule gets added.
+
+        Args:
+            inverse_gate_class (type): Class of the inverse gate.
+
+        Returns:
+            List containing, for each class of the MRO, the list of the
+            inverted _Decomposition objects (which may be empty).
+        """
+        try:
+            return self._inverse_candidates[inverse_gate_class]
+        except KeyError:
+            candidates = [[decomp.get_inverse_decomposition()
+                           for decomp in self.decompositions.get(
+                               cls.__name__, [])]
+                          for cls in inverse_gate_class.mro()[:-2]]
+            self._inverse_candidates[inverse_gate_class] = candidates
+            return candidates
 
 
 class ModuleWithDecompositionRuleSet:
@@ -75,7 +132,7 @@ class _Decomposition(object):
     The Decomposition class can be used to register a decomposition rule (by
     calling register_decomposition)
     """
-    def __init__(self, replacement_fun, recogn_fun):
+    def __init__(self, replacement_fun, recogn_fun, name=None):
         """
         Construct the Decomposition object.
 
@@ -85,6 +142,9 @@ class _Decomposition(object):
             recogn_fun: Function that, when called with a `Command` object,
                 returns True if and only if the replacement rule can handle
                 this command.
+            name (str): Name of the decomposition (e.g., in profiling
+                reports). Default: module and name of replacement_fun, e.g.,
+                "cnot2cz._decompose_cnot".
 
         Every Decomposition is registered with the gate class. The
         Decomposition rule is then potentially valid for all objects which are
@@ -117,6 +177,12 @@ class _Decomposition(object):
         """
         self.decompose = replacement_fun
         self.check = recogn_fun
+        if name is None:
+            module = getattr(replacement_fun, '__module__', None) or ''
+            name = "{}.{}".format(module.split('.')[-1],
+                                  getattr(replacement_fun, '__name__',
+                                          type(replacement_fun).__name__))
+        self.name = name
 
     def get_inverse_decomposition(self):
         """
@@ -139,4 +205,4 @@ class _Decomposition(object):
         def recogn(cmd):
             return self.check(cmd.get_inverse())
 
-        return _Decomposition(decomp, recogn)
+        return _Decomposition(decomp, recogn, self.name + " (inverse)")
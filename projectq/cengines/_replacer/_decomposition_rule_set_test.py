@@ -0,0 +1,73 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.cengines._replacer._decomposition_rule_set.py."""
+
+from projectq.ops import BasicGate, DaggeredGate
+from . import DecompositionRule, DecompositionRuleSet
+
+
+class ParentGate(BasicGate):
+    pass
+
+
+class ChildGate(ParentGate):
+    pass
+
+
+def test_decomposition_rule_set_candidates():
+    rule_set = DecompositionRuleSet(rules=[
+        DecompositionRule(ParentGate, lambda cmd: None, lambda cmd: True)])
+    candidates = rule_set.get_candidates(ChildGate)
+    # ChildGate, ParentGate, BasicGate
+    assert [len(level) for level in candidates] == [0, 1, 0]
+    assert candidates[1][0] is rule_set.decompositions["ParentGate"][0]
+    assert rule_set.get_candidates(ChildGate) is candidates
+
+
+def test_decomposition_rule_set_inverse_candidates():
+    rule_set = DecompositionRuleSet(rules=[
+        DecompositionRule(ParentGate, lambda cmd: None, lambda cmd: True)])
+    candidates = rule_set.get_inverse_candidates(ChildGate)
+    # ChildGate (BasicGate and object are not checked)
+    assert [len(level) for level in candidates] == [0, 1]
+    assert candidates[1][0] is not rule_set.decompositions["ParentGate"][0]
+    assert rule_set.get_inverse_candidates(ChildGate) is candidates
+    assert rule_set.get_inverse_candidates(DaggeredGate) == [[]]
+
+
+def test_decomposition_rule_set_cache_invalidation():
+    rule_set = DecompositionRuleSet()
+    assert rule_set.get_candidates(ChildGate) == [[], [], []]
+    assert rule_set.get_inverse_candidates(ChildGate) == [[], []]
+    rule_set.add_decomposition_rule(
+        DecompositionRule(ChildGate, lambda cmd: None, lambda cmd: True))
+    assert len(rule_set.get_candidates(ChildGate)[0]) == 1
+    assert len(rule_set.get_inverse_candidates(ChildGate)[0]) == 1
+
+
+def test_decomposition_names():
+    def decompose_parent(cmd):
+        pass
+
+    rule_set = DecompositionRuleSet(rules=[
+        DecompositionRule(ParentGate, decompose_parent),
+        DecompositionRule(ChildGate, lambda cmd: None)])
+    decomposition = rule_set.decompositions["ParentGate"][0]
+    assert decomposition.name == ("_decomposition_rule_set_test."
+                                  "decompose_parent")
+    assert (decomposition.get_inverse_decomposition().name ==
+            "_decomposition_rule_set_test.decompose_parent (inverse)")
+    assert (rule_set.decompositions["ChildGate"][0].name ==
+            "_decomposition_rule_set_test.<lambda>")
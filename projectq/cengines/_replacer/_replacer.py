@@ -21,10 +21,14 @@ The InstructionFilter can be used to further specify which gates to
 replace/keep.
 """
 
+from collections import OrderedDict
+
 from projectq.cengines import (BasicEngine,
                                ForwarderEngine,
                                CommandModifier)
-from projectq.ops import (FlushGate,
+from projectq.ops import (ClassicalInstructionGate,
+                          Command,
+                          FlushGate,
                           get_inverse)
 
 
@@ -72,6 +76,60 @@ class InstructionFilter(BasicEngine):
         self.next_engine.receive(command_list)
 
 
+class _Template(object):
+    """
+    Fully decomposed command sequence of a command, in which the qubits are
+    stored as their positions in the decomposed command. It can be replayed
+    for another command with the same gate (see AutoReplacer).
+
+    Attributes:
+        valid (bool): False if the sequence cannot be replayed, e.g., because
+            it allocates qubits.
+    """
+    __slots__ = ('_positions', '_num_tags', '_commands', 'valid')
+
+    def __init__(self, cmd):
+        self._positions = {qubit.id: i for i, qubit in enumerate(
+            qubit for qureg in cmd.all_qubits for qubit in qureg)}
+        self._num_tags = len(cmd.tags)
+        self._commands = []
+        self.valid = True
+
+    def record(self, cmd):
+        """
+        Append a command of the decomposition to the template.
+        """
+        if not self.valid:
+            return
+        if isinstance(cmd.gate, ClassicalInstructionGate):
+            self.valid = False
+            return
+        positions = self._positions
+        try:
+            qubits = tuple(tuple(positions[qubit.id] for qubit in qureg)
+                           for qureg in cmd.qubits)
+            controls = tuple(positions[qubit.id]
+                             for qubit in cmd.control_qubits)
+        except KeyError:  # the command acts on other qubits
+            self.valid = False
+            return
+        self._commands.append((cmd.gate, qubits, controls,
+                               cmd.tags[self._num_tags:]))
+
+    def replay(self, cmd, engine):
+        """
+        Return the decomposition of cmd, i.e., the recorded commands acting on
+        the qubits of cmd and having its tags.
+        """
+        all_qubits = [qubit for qureg in cmd.all_qubits for qubit in qureg]
+        return [Command(engine, gate,
+                        tuple([all_qubits[i] for i in qureg]
+                              for qureg in qubits),
+                        [all_qubits[i] for i in controls],
+                        cmd.tags + tags)
+                for gate, qubits, controls, tags in self._commands]
+
+
 class AutoReplacer(BasicEngine):
     """
     The AutoReplacer is a compiler engine which uses engine.is_available in
@@ -81,7 +139,8 @@ class AutoReplacer(BasicEngine):
     """
     def __init__(self, decompositionRuleSet,
                  decomposition_chooser=lambda cmd,
-                 decomposition_list: decomposition_list[0]):
+                 decomposition_list: decomposition_list[0],
+                 template_cache_size=0):
         """
         Initialize an AutoReplacer.
 
@@ -90,6 +149,21 @@ class AutoReplacer(BasicEngine):
                 Command to decompose and a list of potential Decomposition
                 objects, determines (and then returns) the 'best'
                 decomposition.
+            template_cache_size (int): Number of decompositions to store as
+                templates (0 disables templates). The first time a gate
+                (with a given number of control qubits, qubits and tag types)
+                gets decomposed, the resulting (fully decomposed) commands
+                are recorded. Later commands with an equal gate are replaced
+                by replaying this template on their qubits, without running
+                the decomposition rules again. Decompositions which allocate
+                qubits or contain classical instructions (e.g.,
+                measurements) are not stored.
+
+        Note:
+            Templates assume that the decomposition of a command only depends
+            on its gate (as compared by ==), on the number of its qubits and
+            on the types of its tags, and that the availability of commands
+            does not change over time.
 
         The default decomposition chooser simply returns the first list
         element, i.e., calling
@@ -109,12 +183,44 @@ class AutoReplacer(BasicEngine):
         BasicEngine.__init__(self)
         self._decomp_chooser = decomposition_chooser
         self.decompositionRuleSet = decompositionRuleSet
+        self._forwarders = []  # one ForwarderEngine per nesting depth
+        self._old_tags = []  # tags of the commands being decomposed
+        self._template_cache_size = template_cache_size
+        self._templates = OrderedDict()  # LRU cache of _Template objects
+        self._recordings = []  # templates which are being recorded
+
+    def _get_template_key(self, cmd):
+        """
+        Return the key of the template for cmd, or None if templates are
+        disabled or the gate cannot be used as a key (e.g., because it is
+        not hashable).
+        """
+        if self._template_cache_size <= 0:
+            return None
+        key = (type(cmd.gate), cmd.gate, len(cmd.control_qubits),
+               tuple(len(qureg) for qureg in cmd.qubits),
+               tuple(type(tag) for tag in cmd.tags))
+        try:
+            hash(key)
+        except (TypeError, NotImplementedError):
+            return None
+        return key
+
+    def _send(self, command_list):
+        """
+        Send commands on to the next engine and record them in the templates
+        which are being recorded.
+        """
+        for template in self._recordings:
+            for cmd in command_list:
+                template.record(cmd)
+        self.send(command_list)
 
     def _process_command(self, cmd):
         """
-        Check whether a command cmd can be handled by further engines and,
-        if not, replace it using the decomposition rules loaded with the setup
-        (e.g., setups.default).
+        Replace a command cmd which cannot be handled by further engines
+        (see receive, which checks the availability) using the decomposition
+        rules loaded with the setup (e.g., setups.default).
 
         Args:
             cmd (Command): Command to process.
@@ -122,82 +228,110 @@ class AutoReplacer(BasicEngine):
         Raises:
             Exception if no replacement is available in the loaded setup.
         """
-        if self.is_available(cmd):
-            self.send([cmd])
-        else:
-            # check for decomposition rules
-            decomp_list = []
-            potential_decomps = []
-
-            # First check for a decomposition rules of the gate class, then
-            # the gate class of the inverse gate. If nothing is found, do the
-            # same for the first parent class, etc.
-            gate_mro = type(cmd.gate).mro()[:-1]
-            # If gate does not have an inverse it's parent classes are
-            # DaggeredGate, BasicGate, object. Hence don't check the last two
-            inverse_mro = type(get_inverse(cmd.gate)).mro()[:-2]
-            rules = self.decompositionRuleSet.decompositions
-            for level in range(max(len(gate_mro), len(inverse_mro))):
-                # Check for forward rules
-                if level < len(gate_mro):
-                    class_name = gate_mro[level].__name__
-                    try:
-                        potential_decomps = [d for d in rules[class_name]]
-                    except KeyError:
-                        pass
-                    # throw out the ones which don't recognize the command
-                    for d in potential_decomps:
-                        if d.check(cmd):
-                            decomp_list.append(d)
-                    if len(decomp_list) != 0:
-                        break
-                # Check for rules implementing the inverse gate
-                # and run them in reverse
-                if level < len(inverse_mro):
-                    inv_class_name = inverse_mro[level].__name__
-                    try:
-                        potential_decomps += [
-                            d.get_inverse_decomposition()
-                            for d in rules[inv_class_name]
-                        ]
-                    except KeyError:
-                        pass
-                    # throw out the ones which don't recognize the command
-                    for d in potential_decomps:
-                        if d.check(cmd):
-                            decomp_list.append(d)
-                    if len(decomp_list) != 0:
-                        break
-
-            if len(decomp_list) == 0:
-                raise NoGateDecompositionError("\nNo replacement found for " +
-                                               str(cmd) + "!")
-
-            # use decomposition chooser to determine the best decomposition
-            chosen_decomp = self._decomp_chooser(cmd, decomp_list)
-            # the decomposed command must have the same tags
-            # (plus the ones it gets from meta-statements inside the
-            # decomposition rule).
-            # --> use a CommandModifier with a ForwarderEngine to achieve this.
-            old_tags = cmd.tags[:]
-
-            def cmd_mod_fun(cmd):  # Adds the tags
-                cmd.tags = old_tags[:] + cmd.tags
-                cmd.engine = self.main_engine
-                return cmd
-            # the CommandModifier calls cmd_mod_fun for each command
-            # --> commands get the right tags.
-            cmod_eng = CommandModifier(cmd_mod_fun)
-            cmod_eng.next_engine = self  # send modified commands back here
-            cmod_eng.main_engine = self.main_engine
-            # forward everything to cmod_eng using the ForwarderEngine
-            # which behaves just like MainEngine
-            # (--> meta functions still work)
-            forwarder_eng = ForwarderEngine(cmod_eng)
-            cmd.engine = forwarder_eng  # send gates directly to forwarder
-            # (and not to main engine, which would screw up the ordering).
+        key = self._get_template_key(cmd)
+        if key is not None and key in self._templates:
+            template = self._templates[key]
+            if template is None:
+                key = None  # the decomposition cannot be replayed
+            else:
+                # mark as most recently used (OrderedDict.move_to_end is not
+                # available in Python 2.7)
+                del self._templates[key]
+                self._templates[key] = template
+                self._send(template.replay(cmd, self.main_engine))
+                return
+
+        # First check for a decomposition rules of the gate class, then
+        # the gate class of the inverse gate. If nothing is found, do the
+        # same for the first parent class, etc.
+        # The inverse gate is only computed if it is needed.
+        rules = self.decompositionRuleSet
+        gate_candidates = rules.get_candidates(type(cmd.gate))
+        inverse_candidates = None
+        decomp_list = []
+        level = 0
+        while True:
+            # Check for forward rules
+            if level < len(gate_candidates):
+                # throw out the ones which don't recognize the command
+                decomp_list = [d for d in gate_candidates[level]
+                               if d.check(cmd)]
+                if len(decomp_list) != 0:
+                    break
+            # Check for rules implementing the inverse gate
+            # and run them in reverse
+            if inverse_candidates is None:
+                inverse_candidates = rules.get_inverse_candidates(
+                    type(get_inverse(cmd.gate)))
+            if level < len(inverse_candidates):
+                decomp_list = [d for d in inverse_candidates[level]
+                               if d.check(cmd)]
+                if len(decomp_list) != 0:
+                    break
+            level += 1
+            if (level >= len(gate_candidates) and
+                    level >= len(inverse_candidates)):
+                break
 
+        if len(decomp_list) == 0:
+            raise NoGateDecompositionError("\nNo replacement found for " +
+                                           str(cmd) + "!")
+
+        # use decomposition chooser to determine the best decomposition
+        chosen_decomp = self._decomp_chooser(cmd, decomp_list)
+        # the decomposed command must have the same tags
+        # (plus the ones it gets from meta-statements inside the
+        # decomposition rule).
+        # --> use a CommandModifier with a ForwarderEngine to achieve this.
+        # Decompositions may be nested (the decomposed commands are sent
+        # back here), so there is one pair of engines per nesting depth
+        # which is reused for all decompositions at that depth.
+        depth = len(self._old_tags)
+        if depth == len(self._forwarders):
+            self._forwarders.append(self._make_forwarder(depth))
+        forwarder_eng = self._forwarders[depth]
+        cmd.engine = forwarder_eng  # send gates directly to forwarder
+        # (and not to main engine, which would screw up the ordering).
+        self._old_tags.append(list(cmd.tags))
+        if key is not None:
+            template = _Template(cmd)
+            self._recordings.append(template)
+        profiler = self.main_engine.profiler
+        if profiler is not None:
+            frame = profiler.start_rule(self, chosen_decomp)
+        try:
             chosen_decomp.decompose(cmd)  # run the decomposition
+        finally:
+            if profiler is not None:
+                profiler.stop_rule(frame)
+            self._old_tags.pop()
+            if key is not None:
+                self._recordings.pop()
+        if key is not None:
+            while len(self._templates) >= self._template_cache_size:
+                self._templates.popitem(last=False)
+            self._templates[key] = template if template.valid else None
+
+    def _make_forwarder(self, depth):
+        """
+        Create the ForwarderEngine which is used as the engine of the
+        commands decomposed at the given nesting depth.
+
+        It forwards all commands to a CommandModifier which adds the tags of
+        the decomposed command and sends the commands back to this engine.
+        The ForwarderEngine behaves just like the MainEngine
+        (--> meta functions still work).
+        """
+        def cmd_mod_fun(cmd):  # Adds the tags
+            cmd.tags = self._old_tags[depth] + cmd.tags
+            cmd.engine = self.main_engine
+            return cmd
+        # the CommandModifier calls cmd_mod_fun for each command
+        # --> commands get the right tags.
+        cmod_eng = CommandModifier(cmd_mod_fun)
+        cmod_eng.next_engine = self  # send modified commands back here
+        cmod_eng.main_engine = self.main_engine
+        return ForwarderEngine(cmod_eng)
 
     def receive(self, command_list):
         """
@@ -208,8 +342,16 @@ class AutoReplacer(BasicEngine):
         Args:
             command_list (list<Command>): List of commands to handle.
         """
+        # consecutive commands which need no replacement are sent on as one
+        # list
+        pending = []
         for cmd in command_list:
-            if not isinstance(cmd.gate, FlushGate):
-                self._process_command(cmd)
+            if isinstance(cmd.gate, FlushGate) or self.is_available(cmd):
+                pending.append(cmd)
             else:
-                self.send([cmd])
+                if len(pending) > 0:
+                    self._send(pending)
+                    pending = []
+                self._process_command(cmd)
+        if len(pending) > 0:
+            self._send(pending)
@@ -20,7 +20,11 @@ from projectq import MainEngine
 from projectq.cengines import (DummyEngine,
                                DecompositionRuleSet,
                                DecompositionRule)
-from projectq.ops import (BasicGate, ClassicalInstructionGate, Command, H,
+from projectq.meta import (Compute, ComputeTag, Control, Dagger,
+                           Uncompute)
+from projectq.ops import (AllocateQubitGate, BasicGate,
+                          ClassicalInstructionGate, CNOT, Command,
+                          DaggeredGate, FlushGate, get_inverse, H,
                           NotInvertible, Rx, Ry, S, X)
 from projectq.cengines._replacer import _replacer
 
@@ -124,6 +128,31 @@ def test_auto_replacer_decomposition_chooser(fixture_gate_filter):
     assert backend.received_commands[1].gate == H
 
 
+def test_auto_replacer_forwards_lists(fixture_gate_filter):
+    backend = DummyEngine(save_commands=True)
+    received = []
+
+    class ListRecorder(DummyEngine):
+        def receive(self, command_list):
+            received.append(len(command_list))
+            self.send(command_list)
+
+    eng = MainEngine(backend=backend,
+                     engine_list=[_replacer.AutoReplacer(rule_set),
+                                  fixture_gate_filter, ListRecorder()],
+                     buffer_size=10)
+    qb = eng.allocate_qubit()
+    H | qb
+    X | qb
+    SomeGate | qb
+    H | qb
+    eng.flush()
+    assert [cmd.gate for cmd in backend.received_commands] == \
+        [AllocateQubitGate(), H, X, X, H, FlushGate()]
+    # Allocate, H and X are sent on as one list
+    assert received == [3, 1, 2]
+
+
 def test_auto_replacer_no_rule_found():
     # Check that exception is thrown if no rule is found
     # For both the cmd and it's inverse (which exists)
@@ -222,3 +251,210 @@ def test_auto_replacer_searches_parent_class_for_rule():
     eng.flush()
     received_gate = backend.received_commands[1].gate
     assert received_gate == X or received_gate == H
+
+
+def test_auto_replacer_nested_decompositions_reuse_engines():
+    class OuterGate(BasicGate):
+        pass
+
+    class InnerGate(BasicGate):
+        pass
+
+    def decompose_outer(cmd):
+        qb = cmd.qubits
+        with Dagger(cmd.engine):
+            S | qb
+            InnerGate() | qb
+        H | qb
+
+    def decompose_inner(cmd):
+        qb = cmd.qubits
+        with Dagger(cmd.engine):
+            Ry(0.5) | qb
+            S | qb
+
+    nested_rule_set = DecompositionRuleSet(rules=[
+        DecompositionRule(OuterGate, decompose_outer, lambda cmd: True),
+        DecompositionRule(InnerGate, decompose_inner, lambda cmd: True)])
+
+    def no_outer_or_inner(self, cmd):
+        gate = cmd.gate
+        if isinstance(gate, DaggeredGate):
+            gate = gate._gate
+        return not isinstance(gate, (OuterGate, InnerGate))
+
+    replacer = _replacer.AutoReplacer(nested_rule_set)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend,
+                     engine_list=[replacer,
+                                  _replacer.InstructionFilter(
+                                      no_outer_or_inner)])
+    qb = eng.allocate_qubit()
+    for _ in range(2):
+        cmd = Command(eng, OuterGate(), (qb,))
+        cmd.tags = ["OuterTag"]
+        eng.send([cmd])
+    eng.flush()
+    gates = [cmd for cmd in backend.received_commands
+             if not isinstance(cmd.gate, ClassicalInstructionGate)]
+    # the inverse of InnerGate is decomposed inside the Dagger section
+    expected = [Ry(0.5), S, get_inverse(S), H]
+    assert [cmd.gate for cmd in gates] == 2 * expected
+    assert all(cmd.tags == ["OuterTag"] for cmd in gates)
+    # one pair of forwarding engines per nesting depth
+    assert len(replacer._forwarders) == 2
+    assert replacer._old_tags == []
+
+
+def test_auto_replacer_rule_set_cache_invalidation():
+    class CachedGate(SomeGateClass):
+        pass
+
+    cached_rule_set = make_decomposition_rule_set()
+
+    def cached_filter(self, cmd):
+        return not isinstance(cmd.gate, CachedGate)
+
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend,
+                     engine_list=[_replacer.AutoReplacer(cached_rule_set),
+                                  _replacer.InstructionFilter(cached_filter)])
+    qb = eng.allocate_qubit()
+    CachedGate() | qb
+    # a rule for the gate class itself takes precedence over the cached
+    # rules of the parent class
+    cached_rule_set.add_decomposition_rule(
+        DecompositionRule(CachedGate, lambda cmd: S | cmd.qubits,
+                          lambda cmd: True))
+    CachedGate() | qb
+    eng.flush()
+    assert [cmd.gate for cmd in backend.received_commands[1:3]] == [X, S]
+
+
+class TemplateGate(BasicGate):
+    def __init__(self, angle):
+        BasicGate.__init__(self)
+        self.angle = angle
+
+    def __eq__(self, other):
+        return isinstance(other, TemplateGate) and self.angle == other.angle
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __str__(self):
+        return "TemplateGate({})".format(self.angle)
+
+
+def _make_template_engine(decompose, template_cache_size):
+    template_rule_set = DecompositionRuleSet(rules=[
+        DecompositionRule(TemplateGate, decompose, lambda cmd: True)])
+
+    def no_template_gate(self, cmd):
+        return not isinstance(cmd.gate, TemplateGate)
+
+    backend = DummyEngine(save_commands=True)
+    replacer = _replacer.AutoReplacer(
+        template_rule_set, template_cache_size=template_cache_size)
+    eng = MainEngine(backend=backend,
+                     engine_list=[replacer,
+                                  _replacer.InstructionFilter(
+                                      no_template_gate)])
+    return eng, backend, replacer
+
+
+def test_auto_replacer_templates():
+    calls = []
+
+    def decompose(cmd):
+        calls.append(cmd)
+        ctrl, target = cmd.qubits
+        with Compute(cmd.engine):
+            Rx(cmd.gate.angle) | ctrl
+        with Control(cmd.engine, ctrl):
+            X | target
+        Uncompute(cmd.engine)
+
+    commands = []
+    for template_cache_size in [0, 10]:
+        eng, backend, replacer = _make_template_engine(decompose,
+                                                       template_cache_size)
+        qureg = eng.allocate_qureg(3)
+        TemplateGate(0.5) | (qureg[0], qureg[1])
+        TemplateGate(0.5) | (qureg[2], qureg[0])
+        for ctrl, target in [(1, 2), (2, 0)]:
+            cmd = Command(eng, TemplateGate(0.5),
+                          ([qureg[ctrl]], [qureg[target]]))
+            cmd.tags = ["OuterTag{}".format(ctrl)]
+            eng.send([cmd])
+        TemplateGate(0.3) | (qureg[1], qureg[2])
+        eng.flush()
+        commands.append([cmd for cmd in backend.received_commands
+                         if not isinstance(cmd.gate,
+                                           ClassicalInstructionGate)])
+    # with templates, the decomposition is only run once per gate and tag
+    # types
+    assert len(calls) == 5 + 3
+    assert len(replacer._templates) == 3
+    assert len(commands[0]) == len(commands[1]) == 15
+    for cmd0, cmd1 in zip(*commands):
+        assert cmd0.gate == cmd1.gate
+        assert ([qb.id for qb in cmd0.control_qubits] ==
+                [qb.id for qb in cmd1.control_qubits])
+        assert ([[qb.id for qb in qureg] for qureg in cmd0.qubits] ==
+                [[qb.id for qb in qureg] for qureg in cmd1.qubits])
+        assert cmd0.tags == cmd1.tags
+    # replayed decomposition of the second tagged command
+    assert commands[1][9].tags[0] == "OuterTag2"
+    assert isinstance(commands[1][9].tags[1], ComputeTag)
+    assert commands[1][10].tags == ["OuterTag2"]
+
+
+def test_auto_replacer_templates_not_stored_for_allocations():
+    calls = []
+
+    def decompose(cmd):
+        calls.append(cmd)
+        ancilla = cmd.engine.allocate_qubit()
+        CNOT | (cmd.qubits[0], ancilla)
+        CNOT | (cmd.qubits[0], ancilla)
+        del ancilla
+
+    eng, backend, replacer = _make_template_engine(decompose, 10)
+    qubit = eng.allocate_qubit()
+    TemplateGate(0.5) | qubit
+    TemplateGate(0.5) | qubit
+    eng.flush()
+    assert len(calls) == 2
+    assert list(replacer._templates.values()) == [None]
+
+
+def test_auto_replacer_templates_lru_eviction():
+    calls = []
+
+    def decompose(cmd):
+        calls.append(cmd)
+        Rx(cmd.gate.angle) | cmd.qubits
+
+    eng, backend, replacer = _make_template_engine(decompose, 2)
+    qubit = eng.allocate_qubit()
+    for angle in [0.1, 0.2, 0.1, 0.3, 0.2, 0.3]:
+        TemplateGate(angle) | qubit
+    eng.flush()
+    # 0.2 has been evicted when 0.3 was added
+    assert [cmd.gate.angle for cmd in calls] == [0.1, 0.2, 0.3, 0.2]
+    assert [key[1].angle for key in replacer._templates] == [0.2, 0.3]
+
+
+def test_auto_replacer_templates_unhashable_gate(fixture_gate_filter):
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend,
+                     engine_list=[_replacer.AutoReplacer(
+                         rule_set, template_cache_size=10),
+                         fixture_gate_filter])
+    qb = eng.allocate_qubit()
+    # SomeGate does not implement __str__ (and hence __hash__)
+    SomeGate | qb
+    SomeGate | qb
+    eng.flush()
+    assert [cmd.gate for cmd in backend.received_commands[1:3]] == [X, X]
@@ -0,0 +1,348 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains a lookahead swap router (SABRE heuristic) which the LinearMapper
+and the GridMapper can use instead of their default mapping strategies, and
+the coupling graphs and distance tables of the chain, cycle and grid
+topologies.
+
+Instead of computing a new mapping for all stored gates at once, the router
+inserts one swap at a time: it chooses the swap which minimizes the distance
+of the qubits of the blocked gates in the front layer, plus a weighted
+distance of the next gates (lookahead window). A decay factor penalizes
+swapping the same qubits over and over again, which favors parallel swaps.
+"""
+
+from collections import deque
+
+from projectq.ops import AllocateQubitGate
+
+
+def chain_neighbours(num_qubits, cyclic=False):
+    """
+    Return the coupling graph of a (cyclic) chain of qubits.
+
+    Args:
+        num_qubits (int): Number of qubits in the chain.
+        cyclic (bool): If the chain is a cycle.
+
+    Returns:
+        List which contains the list of neighbours of each qubit id.
+    """
+    neighbours = [[] for _ in range(num_qubits)]
+    for qubit_id in range(num_qubits - 1):
+        neighbours[qubit_id].append(qubit_id + 1)
+        neighbours[qubit_id + 1].append(qubit_id)
+    if cyclic and num_qubits > 2:
+        neighbours[0].append(num_qubits - 1)
+        neighbours[num_qubits - 1].append(0)
+    return neighbours
+
+
+def grid_neighbours(num_rows, num_columns):
+    """
+    Return the coupling graph of a 2D grid of qubits with row-major qubit
+    ids.
+
+    Args:
+        num_rows (int): Number of rows in the grid.
+        num_columns (int): Number of columns in the grid.
+
+    Returns:
+        List which contains the list of neighbours of each qubit id.
+    """
+    neighbours = [[] for _ in range(num_rows * num_columns)]
+    for row in range(num_rows):
+        for column in range(num_columns):
+            qubit_id = row * num_columns + column
+            if column + 1 < num_columns:
+                neighbours[qubit_id].append(qubit_id + 1)
+                neighbours[qubit_id + 1].append(qubit_id)
+            if row + 1 < num_rows:
+                neighbours[qubit_id].append(qubit_id + num_columns)
+                neighbours[qubit_id + num_columns].append(qubit_id)
+    return neighbours
+
+
+def get_distances(neighbours):
+    """
+    Return the table of the lengths of the shortest paths between all pairs
+    of qubits (breadth-first search from each qubit).
+
+    Args:
+        neighbours (list): List of the neighbours of each qubit id (see, e.g.,
+            chain_neighbours).
+
+    Returns:
+        List of lists such that distances[qubit_id0][qubit_id1] is the number
+        of edges between the two qubits, or None if they are not connected.
+    """
+    distances = []
+    for source in range(len(neighbours)):
+        distance = [None] * len(neighbours)
+        distance[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for neighbour in neighbours[current]:
+                if distance[neighbour] is None:
+                    distance[neighbour] = distance[current] + 1
+                    queue.append(neighbour)
+        distances.append(distance)
+    return distances
+
+
+class _LayerDistances(object):
+    """
+    Sum of the distances between the qubits of the gates of a layer, which
+    can be updated for a trial swap by only looking at the gates acting on
+    the swapped qubits.
+    """
+    def __init__(self, layer, mapping, distances):
+        self._distances = distances
+        self._pairs = [(mapping[gate[0]], mapping[gate[1]]) for gate in layer]
+        self._sum = sum(distances[id0][id1] for id0, id1 in self._pairs)
+        self._gates = dict()  # indices of the gates acting on a mapped id
+        for index, pair in enumerate(self._pairs):
+            for mapped_id in pair:
+                self._gates.setdefault(mapped_id, []).append(index)
+
+    def get_sum(self, swap):
+        """
+        Return the sum of the distances after swapping the mapped ids swap[0]
+        and swap[1].
+        """
+        total = self._sum
+        swapped = {swap[0]: swap[1], swap[1]: swap[0]}
+        indices = set(self._gates.get(swap[0], []))
+        indices.update(self._gates.get(swap[1], []))
+        for index in indices:
+            id0, id1 = self._pairs[index]
+            total += (self._distances[swapped.get(id0, id0)]
+                      [swapped.get(id1, id1)] - self._distances[id0][id1])
+        return total
+
+
+class SabreRouter(object):
+    """
+    Lookahead swap router which inserts swaps one at a time, chosen by the
+    heuristic of the SABRE algorithm (Li, Ding and Xie, 2019).
+
+    The router works on mapped ids (the qubit ids of the coupling graph) and
+    is used by a mapper engine, e.g.,
+
+    .. code-block:: python
+
+        mapper = LinearMapper(num_qubits=16, router=SabreRouter(lookahead=20))
+
+    The cost of a swap is
+
+    .. code-block:: python
+
+        max(decay[q0], decay[q1]) * (
+            sum(distances of the front layer) / len(front layer)
+            + lookahead_weight * sum(distances of the lookahead window)
+                / len(lookahead window))
+
+    where the front layer consists of the two-qubit gates which are blocked
+    only because their qubits are not nearest neighbours, and the lookahead
+    window of the next two-qubit gates.
+    """
+    def __init__(self, lookahead=20, lookahead_weight=0.5, decay=0.001,
+                 decay_reset=5):
+        """
+        Initialize a SabreRouter.
+
+        Args:
+            lookahead (int): Number of two-qubit gates after the front layer
+                which are taken into account when choosing a swap.
+            lookahead_weight (float): Weight of the lookahead window relative
+                to the front layer.
+            decay (float): Increment of the decay factor of both qubits of a
+                swap.
+            decay_reset (int): Number of swaps after which the decay factors
+                are reset to 1.
+        """
+        self.lookahead = lookahead
+        self.lookahead_weight = lookahead_weight
+        self.decay = decay
+        self.decay_reset = decay_reset
+
+    def place_new_qubits(self, mapping, num_qubits, stored_commands,
+                         distances):
+        """
+        Place the qubits which are allocated by the stored commands on free
+        mapped ids, close to the qubits they interact with first.
+
+        Args:
+            mapping (dict): Current mapping from logical ids to mapped ids.
+            num_qubits (int): Number of mapped ids.
+            stored_commands (list): Commands which have not been sent yet.
+            distances (list): Distance table (see get_distances).
+
+        Returns:
+            A new mapping which additionally contains the newly allocated
+            qubits (as long as there are free mapped ids).
+        """
+        mapping = dict(mapping)
+        free_ids = set(range(num_qubits)).difference(mapping.values())
+        for index, cmd in enumerate(stored_commands):
+            if len(free_ids) == 0:
+                break
+            if not isinstance(cmd.gate, AllocateQubitGate):
+                continue
+            logical_id = cmd.qubits[0][0].id
+            if logical_id in mapping:
+                continue
+            partners = self._get_partners(logical_id,
+                                          stored_commands[index + 1:],
+                                          mapping)
+            if len(partners) == 0:
+                partners = list(mapping.values())
+
+            def cost(mapped_id):
+                return (sum(distances[mapped_id][partner]
+                            for partner in partners), mapped_id)
+            mapped_id = min(free_ids, key=cost)
+            mapping[logical_id] = mapped_id
+            free_ids.remove(mapped_id)
+        return mapping
+
+    def _get_partners(self, logical_id, commands, mapping):
+        """
+        Return the mapped ids of the (already placed) qubits which interact
+        with the given qubit in the next self.lookahead two-qubit gates of
+        the qubit.
+        """
+        partners = []
+        num_gates = 0
+        for cmd in commands:
+            ids = [qubit.id for qureg in cmd.all_qubits for qubit in qureg]
+            if len(ids) != 2 or logical_id not in ids:
+                continue
+            other_id = ids[1] if ids[0] == logical_id else ids[0]
+            if other_id in mapping:
+                partners.append(mapping[other_id])
+            num_gates += 1
+            if num_gates >= self.lookahead:
+                break
+        return partners
+
+    def _get_layers(self, mapping, stored_commands, distances):
+        """
+        Return the front layer and the lookahead window as lists of pairs of
+        logical ids.
+        """
+        front = []
+        window = []
+        blocked_ids = set()
+        for cmd in stored_commands:
+            ids = [qubit.id for qureg in cmd.all_qubits for qubit in qureg]
+            if not all(idx in mapping for idx in ids):
+                blocked_ids.update(ids)
+                continue
+            if len(ids) != 2:
+                continue
+            if ids[0] in blocked_ids or ids[1] in blocked_ids:
+                window.append(tuple(ids))
+                blocked_ids.update(ids)
+                if len(window) >= self.lookahead:
+                    break
+            elif distances[mapping[ids[0]]][mapping[ids[1]]] > 1:
+                front.append(tuple(ids))
+                blocked_ids.update(ids)
+        return front, window
+
+    def find_swaps(self, mapping, stored_commands, distances, neighbours):
+        """
+        Return the swaps which make at least one gate of the front layer
+        executable.
+
+        Args:
+            mapping (dict): Mapping from logical ids to mapped ids which
+                contains all qubits of the stored commands which can be
+                mapped.
+            stored_commands (list): Commands which have not been sent yet.
+            distances (list): Distance table (see get_distances).
+            neighbours (list): List of the neighbours of each mapped id.
+
+        Returns:
+            A tuple (swaps, new_mapping) where swaps is a list of pairs of
+            mapped ids and new_mapping is the mapping after the swaps. The
+            list of swaps is empty if no gate is blocked by the mapping.
+        """
+        front, window = self._get_layers(mapping, stored_commands,
+                                         distances)
+        mapping = dict(mapping)
+        logical_ids = dict((mapped_id, logical_id)
+                           for logical_id, mapped_id in mapping.items())
+
+        def apply_swap(swap):
+            id0 = logical_ids.pop(swap[0], None)
+            id1 = logical_ids.pop(swap[1], None)
+            if id0 is not None:
+                mapping[id0] = swap[1]
+                logical_ids[swap[1]] = id0
+            if id1 is not None:
+                mapping[id1] = swap[0]
+                logical_ids[swap[0]] = id1
+
+        def is_executable(gate):
+            return distances[mapping[gate[0]]][mapping[gate[1]]] == 1
+
+        swaps = []
+        decay = [1.] * len(neighbours)
+        while len(front) > 0 and not any(is_executable(gate)
+                                         for gate in front):
+            if len(swaps) >= len(neighbours):
+                # no progress --> move the qubits of the closest gate of the
+                # front layer together along a shortest path
+                gate = min(front, key=lambda gate: distances[
+                    mapping[gate[0]]][mapping[gate[1]]])
+                target = mapping[gate[1]]
+                while not is_executable(gate):
+                    current = mapping[gate[0]]
+                    step = min(neighbour for neighbour in neighbours[current]
+                               if distances[neighbour][target] <
+                               distances[current][target])
+                    swaps.append((min(current, step), max(current, step)))
+                    apply_swap(swaps[-1])
+                break
+            candidates = set()
+            for gate in front:
+                for logical_id in gate:
+                    mapped_id = mapping[logical_id]
+                    for neighbour in neighbours[mapped_id]:
+                        candidates.add((min(mapped_id, neighbour),
+                                        max(mapped_id, neighbour)))
+
+            front_distances = _LayerDistances(front, mapping, distances)
+            window_distances = _LayerDistances(window, mapping, distances)
+
+            def cost(swap):
+                total = front_distances.get_sum(swap) / len(front)
+                if len(window) > 0:
+                    total += (self.lookahead_weight *
+                              window_distances.get_sum(swap) / len(window))
+                return (max(decay[swap[0]], decay[swap[1]]) * total, swap)
+            swap = min(candidates, key=cost)
+            apply_swap(swap)
+            swaps.append(swap)
+            if len(swaps) % self.decay_reset == 0:
+                decay = [1.] * len(neighbours)
+            else:
+                decay[swap[0]] += self.decay
+                decay[swap[1]] += self.decay
+        return swaps, mapping
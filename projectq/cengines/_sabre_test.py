@@ -0,0 +1,106 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.cengines._sabre.py."""
+
+from projectq.ops import Allocate, Command, X
+from projectq.types import WeakQubitRef
+
+from projectq.cengines import _sabre
+
+
+def _cnot(control_id, target_id):
+    return Command(None, X, qubits=([WeakQubitRef(None, target_id)],),
+                   controls=[WeakQubitRef(None, control_id)])
+
+
+def _allocate(qubit_id):
+    return Command(None, Allocate, qubits=([WeakQubitRef(None, qubit_id)],))
+
+
+def test_neighbours_and_distances():
+    assert _sabre.chain_neighbours(3) == [[1], [0, 2], [1]]
+    assert _sabre.chain_neighbours(2, cyclic=True) == [[1], [0]]
+    cycle = _sabre.chain_neighbours(5, cyclic=True)
+    assert sorted(cycle[0]) == [1, 4]
+    assert _sabre.get_distances(cycle)[0] == [0, 1, 2, 2, 1]
+    grid = _sabre.grid_neighbours(2, 3)
+    assert sorted(grid[1]) == [0, 2, 4]
+    assert sorted(grid[3]) == [0, 4]
+    distances = _sabre.get_distances(grid)
+    assert distances[0] == [0, 1, 2, 1, 2, 3]
+    assert distances[5][0] == 3
+    assert _sabre.get_distances([[], []])[0] == [0, None]
+
+
+def test_place_new_qubits():
+    router = _sabre.SabreRouter()
+    distances = _sabre.get_distances(_sabre.grid_neighbours(3, 3))
+    commands = [_allocate(1), _allocate(2), _cnot(0, 2), _allocate(3),
+                _cnot(2, 3)]
+    mapping = router.place_new_qubits({0: 4}, 9, commands, distances)
+    # qubit 1 doesn't interact -> close to the others, qubit 2 next to
+    # qubit 0 and qubit 3 next to qubit 2
+    assert mapping[0] == 4
+    assert mapping[1] == 1
+    assert mapping[2] == 3
+    assert mapping[3] == 0
+    # no free mapped ids left
+    mapping = router.place_new_qubits({0: 0, 1: 1}, 2, commands, distances)
+    assert mapping == {0: 0, 1: 1}
+
+
+def test_find_swaps_chain():
+    router = _sabre.SabreRouter()
+    neighbours = _sabre.chain_neighbours(5)
+    distances = _sabre.get_distances(neighbours)
+    mapping = {0: 0, 1: 4, 2: 1}
+    commands = [_cnot(0, 2), _cnot(0, 1), _cnot(2, 1)]
+    swaps, new_mapping = router.find_swaps(mapping, commands, distances,
+                                           neighbours)
+    # qubit 1 moves towards qubit 0 and past qubit 2, which it interacts
+    # with next
+    assert swaps == [(3, 4), (2, 3), (1, 2)]
+    assert new_mapping == {0: 0, 1: 1, 2: 2}
+    # nothing to do if all gates are executable
+    swaps, new_mapping = router.find_swaps(mapping, commands[:1], distances,
+                                           neighbours)
+    assert swaps == []
+    assert new_mapping == mapping
+
+
+def test_find_swaps_ignores_unmapped_qubits():
+    router = _sabre.SabreRouter()
+    neighbours = _sabre.chain_neighbours(3)
+    distances = _sabre.get_distances(neighbours)
+    commands = [_allocate(5), _cnot(5, 0), _cnot(0, 1)]
+    swaps, _ = router.find_swaps({0: 0, 1: 2}, commands, distances,
+                                 neighbours)
+    assert swaps == []
+
+
+def test_find_swaps_fallback():
+    # the lookahead window pins both qubits of the front layer gate, such
+    # that the heuristic moves them apart
+    router = _sabre.SabreRouter(lookahead_weight=10.)
+    neighbours = _sabre.chain_neighbours(5)
+    distances = _sabre.get_distances(neighbours)
+    mapping = {0: 1, 1: 3, 2: 0, 3: 4}
+    commands = [_cnot(0, 1), _cnot(0, 2), _cnot(1, 3)]
+    swaps, new_mapping = router.find_swaps(mapping, commands, distances,
+                                           neighbours)
+    assert len(swaps) > len(neighbours)
+    assert distances[new_mapping[0]][new_mapping[1]] == 1
+    for mapped_id0, mapped_id1 in swaps:
+        assert distances[mapped_id0][mapped_id1] == 1
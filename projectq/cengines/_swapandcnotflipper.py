@@ -17,8 +17,6 @@ Contains a compiler engine which flips the directionality of CNOTs according
 to the given connectivity graph. It also translates Swap gates to CNOTs if
 necessary.
 """
-from copy import deepcopy
-
 from projectq.cengines import (BasicEngine,
                                ForwarderEngine,
                                CommandModifier)
@@ -28,6 +26,7 @@ from projectq.ops import (All,
                           CNOT,
                           H,
                           Swap)
+from projectq.types import WeakQubitRef
 
 
 class SwapAndCNOTFlipper(BasicEngine):
@@ -105,7 +104,7 @@ class SwapAndCNOTFlipper(BasicEngine):
 
     def _send_cnot(self, cmd, control, target, flip=False):
         def cmd_mod(command):
-            command.tags = deepcopy(cmd.tags) + command.tags
+            command.tags = list(cmd.tags) + command.tags
             command.engine = self.main_engine
             return command
         # We'll have to add all meta tags before sending on
@@ -114,8 +113,8 @@ class SwapAndCNOTFlipper(BasicEngine):
         cmd_mod_eng.main_engine = self.main_engine
         # forward everything to the command modifier
         forwarder_eng = ForwarderEngine(cmd_mod_eng)
-        target[0].engine = forwarder_eng
-        control[0].engine = forwarder_eng
+        control = [WeakQubitRef(forwarder_eng, qubit.id) for qubit in control]
+        target = [WeakQubitRef(forwarder_eng, qubit.id) for qubit in target]
         if flip:
             # flip the CNOT using Hadamard gates:
             All(H) | (control + target)
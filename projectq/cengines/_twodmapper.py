@@ -27,10 +27,9 @@ import itertools
 import math
 import random
 
-import networkx as nx
-
 from projectq.cengines import (BasicMapperEngine, LinearMapper,
                                return_swap_depth)
+from projectq.cengines._sabre import get_distances, grid_neighbours
 from projectq.meta import LogicalQubitIDTag
 from projectq.ops import (AllocateQubitGate, Command, DeallocateQubitGate,
                           FlushGate, Swap)
@@ -78,7 +77,7 @@ class GridMapper(BasicMapperEngine):
     def __init__(self, num_rows, num_columns, mapped_ids_to_backend_ids=None,
                  storage=1000,
                  optimization_function=lambda x: return_swap_depth(x),
-                 num_optimization_steps=50):
+                 num_optimization_steps=50, router=None):
         """
         Initialize a GridMapper compiler engine.
 
@@ -102,6 +101,10 @@ class GridMapper(BasicMapperEngine):
             num_optimization_steps(int): Number of different permutations to
                                          of the matching to try and minimize
                                          the cost.
+            router(SabreRouter): Router which inserts swaps one at a time
+                                 using a lookahead heuristic instead of
+                                 mapping the stored gates on a first come
+                                 first served basis. Default is None.
         Raises:
             RuntimeError: if incorrect `mapped_ids_to_backend_ids` parameter
         """
@@ -131,6 +134,10 @@ class GridMapper(BasicMapperEngine):
         self.storage = storage
         self.optimization_function = optimization_function
         self.num_optimization_steps = num_optimization_steps
+        self.router = router
+        # Coupling graph and distance table for the router (created lazily):
+        self._neighbours = None
+        self._distances = None
         # Randomness to pick permutations if there are too many.
         # This creates an own instance of Random in order to not influence
         # the bound methods of the random module which might be used in other
@@ -179,6 +186,18 @@ class GridMapper(BasicMapperEngine):
                 self._current_row_major_mapping[logical_id] = (
                     self._backend_ids_to_mapped_ids[backend_id])
 
+    def restore_mapping(self, mapping):
+        """
+        Set the mapping (and the allocated qubits) after commands which this
+        mapper has mapped before were sent on without going through the
+        mapper (see BasicMapperEngine.restore_mapping).
+
+        Args:
+            mapping (dict): Mapping at the end of the mapped commands.
+        """
+        self.current_mapping = mapping
+        self._currently_allocated_ids = set(mapping)
+
     def is_available(self, cmd):
         """
         Only allows 1 or two qubit gates.
@@ -367,6 +386,7 @@ class GridMapper(BasicMapperEngine):
         # Build bipartite graph. Nodes are the current columns numbered
         # (0, 1, ...) and the destination columns numbered with an offset of
         # self.num_columns (0 + offset, 1+offset, ...)
+        import networkx as nx  # deferred to keep `import projectq` fast
         graph = nx.Graph()
         offset = self.num_columns
         graph.add_nodes_from(range(self.num_columns), bipartite=0)
@@ -518,11 +538,9 @@ class GridMapper(BasicMapperEngine):
         """
         Creates a new mapping and executes possible gates.
 
-        It first allocates all 0, ..., self.num_qubits-1 mapped qubit ids, if
-        they are not already used because we might need them all for the
-        swaps. Then it creates a new map, swaps all the qubits to the new map,
-        executes all possible gates, and finally deallocates mapped qubit ids
-        which don't store any information.
+        Without a router, it creates a new map, swaps all the qubits to the
+        new map and executes all possible gates (see _apply_new_mapping).
+        With a router, it routes all stored gates (see _route).
         """
         num_of_stored_commands_before = len(self._stored_commands)
         if not self.current_mapping:
@@ -531,30 +549,51 @@ class GridMapper(BasicMapperEngine):
             self._send_possible_commands()
             if len(self._stored_commands) == 0:
                 return
-        new_row_major_mapping = self._return_new_mapping()
-        # Find permutation of matchings with lowest cost
-        swaps = None
-        lowest_cost = None
-        matchings_numbers = list(range(self.num_rows))
-        if self.num_optimization_steps <= math.factorial(self.num_rows):
-            permutations = itertools.permutations(matchings_numbers,
-                                                  self.num_rows)
+        if self.router is None:
+            new_row_major_mapping = self._return_new_mapping()
+            # Find permutation of matchings with lowest cost
+            swaps = None
+            lowest_cost = None
+            matchings_numbers = list(range(self.num_rows))
+            if self.num_optimization_steps <= math.factorial(self.num_rows):
+                permutations = itertools.permutations(matchings_numbers,
+                                                      self.num_rows)
+            else:
+                permutations = []
+                for _ in range(self.num_optimization_steps):
+                    permutations.append(self._rng.sample(matchings_numbers,
+                                                         self.num_rows))
+            for permutation in permutations:
+                trial_swaps = self.return_swaps(
+                    old_mapping=self._current_row_major_mapping,
+                    new_mapping=new_row_major_mapping,
+                    permutation=permutation)
+                if swaps is None:
+                    swaps = trial_swaps
+                    lowest_cost = self.optimization_function(trial_swaps)
+                elif lowest_cost > self.optimization_function(trial_swaps):
+                    swaps = trial_swaps
+                    lowest_cost = self.optimization_function(trial_swaps)
+            self._apply_new_mapping(new_row_major_mapping, swaps)
         else:
-            permutations = []
-            for _ in range(self.num_optimization_steps):
-                permutations.append(self._rng.sample(matchings_numbers,
-                                                     self.num_rows))
-        for permutation in permutations:
-            trial_swaps = self.return_swaps(
-                old_mapping=self._current_row_major_mapping,
-                new_mapping=new_row_major_mapping,
-                permutation=permutation)
-            if swaps is None:
-                swaps = trial_swaps
-                lowest_cost = self.optimization_function(trial_swaps)
-            elif lowest_cost > self.optimization_function(trial_swaps):
-                swaps = trial_swaps
-                lowest_cost = self.optimization_function(trial_swaps)
+            self._route()
+        # Check that mapper actually made progress
+        if len(self._stored_commands) == num_of_stored_commands_before:
+            raise RuntimeError("Mapper is potentially in an infinite loop. " +
+                               "It is likely that the algorithm requires " +
+                               "too many qubits. Increase the number of " +
+                               "qubits for this mapper.")
+
+    def _apply_new_mapping(self, new_row_major_mapping, swaps):
+        """
+        Sends the swaps which change the current mapping to
+        new_row_major_mapping and executes all possible gates.
+
+        It first allocates all 0, ..., self.num_qubits-1 mapped qubit ids, if
+        they are not already used because we might need them all for the
+        swaps, and finally deallocates mapped qubit ids which don't store any
+        information.
+        """
         if swaps:  # first mapping requires no swaps
             # Allocate all mapped qubit ids (which are not already allocated,
             # i.e., contained in self._currently_allocated_ids)
@@ -615,12 +654,29 @@ class GridMapper(BasicMapperEngine):
         self.current_mapping = new_mapping
         # Send possible gates:
         self._send_possible_commands()
-        # Check that mapper actually made progress
-        if len(self._stored_commands) == num_of_stored_commands_before:
-            raise RuntimeError("Mapper is potentially in an infinite loop. " +
-                               "It is likely that the algorithm requires " +
-                               "too many qubits. Increase the number of " +
-                               "qubits for this mapper.")
+
+    def _route(self):
+        """
+        Inserts the swaps chosen by self.router and executes the gates, until
+        all stored gates have been sent or the router cannot make progress.
+        """
+        if self._distances is None:
+            self._neighbours = grid_neighbours(self.num_rows,
+                                               self.num_columns)
+            self._distances = get_distances(self._neighbours)
+        while len(self._stored_commands) > 0:
+            num_of_stored_commands_before = len(self._stored_commands)
+            # place the new qubits and execute the gates which don't need
+            # swaps, before routing the remaining ones:
+            self._apply_new_mapping(self.router.place_new_qubits(
+                self._current_row_major_mapping, self.num_qubits,
+                self._stored_commands, self._distances), [])
+            swaps, new_row_major_mapping = self.router.find_swaps(
+                self._current_row_major_mapping, self._stored_commands,
+                self._distances, self._neighbours)
+            self._apply_new_mapping(new_row_major_mapping, swaps)
+            if len(self._stored_commands) == num_of_stored_commands_before:
+                break
 
     def receive(self, command_list):
         """
@@ -21,10 +21,11 @@ import random
 import pytest
 
 import projectq
-from projectq.cengines import DummyEngine, LocalOptimizer
+from projectq.backends import Simulator
+from projectq.cengines import DummyEngine, LocalOptimizer, SabreRouter
 from projectq.meta import LogicalQubitIDTag
-from projectq.ops import (Allocate, BasicGate, Command, Deallocate, FlushGate,
-                          X)
+from projectq.ops import (All, Allocate, BasicGate, CNOT, Command, Deallocate,
+                          FlushGate, H, Measure, Ry, Rz, X)
 from projectq.types import WeakQubitRef
 
 from projectq.cengines import _twodmapper as two_d
@@ -503,3 +504,53 @@ def test_check_that_local_optimizer_doesnt_merge():
     cmd5 = Command(engine=None, gate=Deallocate, qubits=([qb1],))
     mapper.receive([cmd3, cmd4, cmd5, cmd_flush])
     assert len(backend.received_commands) == 7
+
+
+@pytest.mark.parametrize("different_backend_ids", [False, True])
+def test_run_with_router(different_backend_ids):
+    if different_backend_ids:
+        map_to_backend_ids = {0: 21, 1: 32, 2: 3, 3: 0, 4: 5, 5: 7}
+    else:
+        map_to_backend_ids = None
+    rng = random.Random(5)
+
+    def circuit(eng):
+        qureg = eng.allocate_qureg(5)
+        for _ in range(100):
+            if rng.random() < 0.5:
+                a, b = rng.sample(range(5), 2)
+                CNOT | (qureg[a], qureg[b])
+            else:
+                rng.choice([H, Ry(0.3), Rz(0.7)]) | qureg[rng.randrange(5)]
+        eng.flush()
+        return qureg
+
+    state = rng.getstate()
+    ref_sim = Simulator()
+    ref_qureg = circuit(projectq.MainEngine(ref_sim, []))
+    rng.setstate(state)
+    mapper = two_d.GridMapper(num_rows=2, num_columns=3,
+                              mapped_ids_to_backend_ids=map_to_backend_ids,
+                              router=SabreRouter())
+    backend = DummyEngine(save_commands=True)
+    sim = Simulator()
+    eng = projectq.MainEngine(sim, [mapper, backend])
+    qureg = circuit(eng)
+    assert mapper.num_mappings > 0
+    backend_ids_to_mapped_ids = dict(
+        (backend_id, mapped_id) for mapped_id, backend_id in
+        mapper._mapped_ids_to_backend_ids.items())
+    for cmd in backend.received_commands:
+        backend_ids = [qb.id for qureg in cmd.all_qubits for qb in qureg]
+        if len(backend_ids) == 2:
+            mapped_ids = sorted(backend_ids_to_mapped_ids[backend_id]
+                                for backend_id in backend_ids)
+            assert (mapped_ids[1] - mapped_ids[0] == 3 or
+                    (mapped_ids[1] - mapped_ids[0] == 1 and
+                     mapped_ids[1] % 3 != 0))
+    for i in range(32):
+        bits = [(i >> j) & 1 for j in range(5)]
+        assert sim.get_amplitude(bits, qureg) == pytest.approx(
+            ref_sim.get_amplitude(bits, ref_qureg))
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
@@ -25,7 +25,10 @@ and the compiler in writing/producing efficient code. It includes, e.g.,
 
 from ._dirtyqubit import DirtyQubitTag
 from ._loop import (LoopTag,
-                    Loop)
+                    Loop,
+                    LoopEndTag,
+                    LoopBody,
+                    LoopCollector)
 from ._compute import (Compute,
                        Uncompute,
                        CustomUncompute,
@@ -21,11 +21,11 @@ of the entire operation on the value of a qubit / register (only Action needs
 controls). This file also defines the corresponding meta tags.
 """
 
-from copy import deepcopy
+from copy import copy
 
-import projectq
 from projectq.cengines import BasicEngine
-from projectq.ops import Allocate, Deallocate
+from projectq.ops import Allocate, Command, Deallocate
+from projectq.types import WeakQubitRef
 from ._util import insert_engine, drop_engine_after
 
 
@@ -44,6 +44,7 @@ class ComputeTag(object):
     """
     Compute meta tag.
     """
+    __slots__ = ()
 
     def __eq__(self, other):
         return isinstance(other, ComputeTag)
@@ -56,6 +57,7 @@ class UncomputeTag(object):
     """
     Uncompute meta tag.
     """
+    __slots__ = ()
 
     def __eq__(self, other):
         return isinstance(other, UncomputeTag)
@@ -91,16 +93,45 @@ class ComputeEngine(BasicEngine):
         cmd.tags.append(UncomputeTag())
         return cmd
 
+    def _deallocate_compute_qubit(self, qubit_id):
+        """
+        Invalidate the qubit object of a qubit which was allocated in the
+        compute section and is deallocated by the uncompute section.
+
+        Removes the qubit from MainEngine.active_qubits and sets its id to
+        -1 such that it won't send another deallocate when it goes out of
+        scope.
+
+        Args:
+            qubit_id (int): Id of the qubit.
+
+        Raises:
+            QubitManagementError: If the qubit is not active.
+        """
+        active_qubits = self.main_engine.active_qubits
+        try:
+            qubit = active_qubits.get(qubit_id)
+        except AttributeError:
+            # active_qubits is a plain set without an index of the ids
+            qubit = next((active_qubit for active_qubit in active_qubits
+                          if active_qubit.id == qubit_id), None)
+        if qubit is None:
+            raise QubitManagementError(
+                "\nQubit was not found in " +
+                "MainEngine.active_qubits.\n")
+        active_qubits.discard(qubit)
+        qubit.id = -1
+
     def run_uncompute(self):
         """
         Send uncomputing gates.
 
         Sends the inverse of the stored commands in reverse order down to the
-        next engine. And also deals with allocated qubits in Compute section.
-        If a qubit has been allocated during compute, it will be deallocated
-        during uncompute. If a qubit has been allocated and deallocated during
-        compute, then a new qubit is allocated and deallocated during
-        uncompute.
+        next engine (as one list of commands). And also deals with allocated
+        qubits in Compute section. If a qubit has been allocated during
+        compute, it will be deallocated during uncompute. If a qubit has been
+        allocated and deallocated during compute, then a new qubit is
+        allocated and deallocated during uncompute.
         """
 
         # No qubits allocated during Compute section -> do standard uncompute
@@ -112,98 +143,53 @@ class ComputeEngine(BasicEngine):
         # qubits ids which were allocated and deallocated in Compute section
         ids_local_to_compute = self._allocated_qubit_ids.intersection(
             self._deallocated_qubit_ids)
-        # qubit ids which were allocated but not yet deallocated in
-        # Compute section
-        ids_still_alive = self._allocated_qubit_ids.difference(
-            self._deallocated_qubit_ids)
 
-        # No qubits allocated and already deallocated during compute.
-        # Don't inspect each command as below -> faster uncompute
-        # Just find qubits which have been allocated and deallocate them
-        if len(ids_local_to_compute) == 0:
-            for cmd in reversed(self._l):
-                if cmd.gate == Allocate:
-                    qubit_id = cmd.qubits[0][0].id
-                    # Remove this qubit from MainEngine.active_qubits and
-                    # set qubit.id to = -1 in Qubit object such that it won't
-                    # send another deallocate when it goes out of scope
-                    qubit_found = False
-                    for active_qubit in self.main_engine.active_qubits:
-                        if active_qubit.id == qubit_id:
-                            active_qubit.id = -1
-                            active_qubit.__del__()
-                            qubit_found = True
-                            break
-                    if not qubit_found:
-                        raise QubitManagementError(
-                            "\nQubit was not found in " +
-                            "MainEngine.active_qubits.\n")
-                    self.send([self._add_uncompute_tag(cmd.get_inverse())])
-                else:
-                    self.send([self._add_uncompute_tag(cmd.get_inverse())])
-            return
-        # There was at least one qubit allocated and deallocated within
-        # compute section. Handle uncompute in most general case
+        # The stored commands share their qubit references with the commands
+        # which have been sent, hence commands acting on local qubits are
+        # re-created with the ids of the new local qubits (instead of
+        # modifying the qubit ids in place).
+        def replace_local_ids(qureg):
+            return [WeakQubitRef(qubit.engine,
+                                 new_local_id.get(qubit.id, qubit.id))
+                    for qubit in qureg]
+
         new_local_id = dict()
+        command_list = []
         for cmd in reversed(self._l):
             if cmd.gate == Deallocate:
-                assert (cmd.qubits[0][0].id) in ids_local_to_compute
+                qubit_id = cmd.qubits[0][0].id
+                assert qubit_id in ids_local_to_compute
                 # Create new local qubit which lives within uncompute section
-
-                # Allocate needs to have old tags + uncompute tag
-                def add_uncompute(command, old_tags=deepcopy(cmd.tags)):
-                    command.tags = old_tags + [UncomputeTag()]
-                    return command
-                tagger_eng = projectq.cengines.CommandModifier(add_uncompute)
-                insert_engine(self, tagger_eng)
-                new_local_qb = self.allocate_qubit()
-                drop_engine_after(self)
-
-                new_local_id[cmd.qubits[0][0].id] = deepcopy(
-                    new_local_qb[0].id)
-                # Set id of new_local_qb to -1 such that it doesn't send a
-                # deallocate gate
-                new_local_qb[0].id = -1
-
-            elif cmd.gate == Allocate:
-                # Deallocate qubit
-                if cmd.qubits[0][0].id in ids_local_to_compute:
-                    # Deallocate local qubit and remove id from new_local_id
-                    old_id = deepcopy(cmd.qubits[0][0].id)
-                    cmd.qubits[0][0].id = new_local_id[cmd.qubits[0][0].id]
-                    del new_local_id[old_id]
-                    self.send([self._add_uncompute_tag(cmd.get_inverse())])
-
-                else:
-                    # Deallocate qubit which was allocated in compute section:
-                    qubit_id = cmd.qubits[0][0].id
-                    # Remove this qubit from MainEngine.active_qubits and
-                    # set qubit.id to = -1 in Qubit object such that it won't
-                    # send another deallocate when it goes out of scope
-                    qubit_found = False
-                    for active_qubit in self.main_engine.active_qubits:
-                        if active_qubit.id == qubit_id:
-                            active_qubit.id = -1
-                            active_qubit.__del__()
-                            qubit_found = True
-                            break
-                    if not qubit_found:
-                        raise QubitManagementError(
-                            "\nQubit was not found in " +
-                            "MainEngine.active_qubits.\n")
-                    self.send([self._add_uncompute_tag(cmd.get_inverse())])
-
+                # (the Allocate has the old tags + uncompute tag)
+                new_local_id[qubit_id] = self.main_engine.get_new_qubit_id()
+                command_list.append(
+                    Command(self, Allocate,
+                            ([WeakQubitRef(self, new_local_id[qubit_id])],),
+                            tags=cmd.tags + [UncomputeTag()]))
+            elif (cmd.gate == Allocate and
+                    cmd.qubits[0][0].id not in ids_local_to_compute):
+                # Deallocate qubit which was allocated in compute section
+                self._deallocate_compute_qubit(cmd.qubits[0][0].id)
+                command_list.append(
+                    self._add_uncompute_tag(cmd.get_inverse()))
             else:
-                # Process commands by replacing each local qubit from
-                # compute section with new local qubit from the uncompute
-                # section
-                if new_local_id:  # Only if we still have local qubits
-                    for qureg in cmd.all_qubits:
-                        for qubit in qureg:
-                            if qubit.id in new_local_id:
-                                qubit.id = new_local_id[qubit.id]
-
-                self.send([self._add_uncompute_tag(cmd.get_inverse())])
+                # Replace each local qubit from compute section with the new
+                # local qubit from the uncompute section
+                if new_local_id and any(qubit.id in new_local_id
+                                        for qureg in cmd.all_qubits
+                                        for qubit in qureg):
+                    old_cmd = cmd
+                    cmd = Command(cmd.engine, cmd.gate,
+                                  tuple(replace_local_ids(qureg)
+                                        for qureg in cmd.qubits),
+                                  replace_local_ids(cmd.control_qubits),
+                                  cmd.tags)
+                    if cmd.gate == Allocate:
+                        # the new local qubit is deallocated here
+                        del new_local_id[old_cmd.qubits[0][0].id]
+                command_list.append(
+                    self._add_uncompute_tag(cmd.get_inverse()))
+        self.send(command_list)
 
     def end_compute(self):
         """
@@ -226,7 +212,7 @@ class ComputeEngine(BasicEngine):
 
     def receive(self, command_list):
         """
-        If in compute-mode: Receive commands and store deepcopy of each cmd.
+        If in compute-mode: Receive commands and store a copy of each cmd.
                             Add ComputeTag to received cmd and send it on.
         Otherwise: send all received commands directly to next_engine.
 
@@ -239,7 +225,8 @@ class ComputeEngine(BasicEngine):
                     self._allocated_qubit_ids.add(cmd.qubits[0][0].id)
                 elif cmd.gate == Deallocate:
                     self._deallocated_qubit_ids.add(cmd.qubits[0][0].id)
-                self._l.append(deepcopy(cmd))
+                # the copy shares the gate and the qubit references with cmd
+                self._l.append(copy(cmd))
                 tags = cmd.tags
                 tags.append(ComputeTag())
             self.send(command_list)
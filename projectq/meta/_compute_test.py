@@ -176,6 +176,40 @@ def test_automatic_deallocation_of_qubit_in_uncompute():
     assert len(backend.received_commands) == 4
 
 
+def test_uncompute_is_sent_as_one_list():
+    backend = DummyEngine(save_commands=True)
+    received_lists = []
+
+    def receive(command_list):
+        received_lists.append(list(command_list))
+        DummyEngine.receive(backend, command_list)
+
+    backend.receive = receive
+    eng = MainEngine(backend=backend, engine_list=[])
+    qubit = eng.allocate_qubit()
+    with _compute.Compute(eng):
+        ancilla = eng.allocate_qubit()
+        local_ancilla = eng.allocate_qubit()
+        CNOT | (qubit, local_ancilla)
+        CNOT | (local_ancilla, ancilla)
+        CNOT | (qubit, local_ancilla)
+        del local_ancilla
+    sent_commands = list(backend.received_commands)
+    del received_lists[:]
+    _compute.Uncompute(eng)
+    assert len(received_lists) == 1
+    uncompute_commands = received_lists[0]
+    assert [cmd.gate for cmd in uncompute_commands] == [
+        Allocate, NOT, NOT, NOT, Deallocate, Deallocate]
+    new_local_id = uncompute_commands[0].qubits[0][0].id
+    assert uncompute_commands[2].control_qubits[0].id == new_local_id
+    assert uncompute_commands[4].qubits[0][0].id == new_local_id
+    assert ancilla[0].id == -1
+    # the commands of the compute section have not been modified
+    assert sent_commands[3].qubits[0][0].id != new_local_id
+    assert sent_commands[4].control_qubits[0].id != new_local_id
+
+
 def test_compute_uncompute_no_additional_qubits():
     # No ancilla qubit created in compute section
     backend0 = DummyEngine(save_commands=True)
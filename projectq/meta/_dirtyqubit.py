@@ -21,6 +21,8 @@ class DirtyQubitTag(object):
     """
     Dirty qubit meta tag
     """
+    __slots__ = ()
+
     def __eq__(self, other):
         return isinstance(other, DirtyQubitTag)
 
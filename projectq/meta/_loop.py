@@ -26,7 +26,8 @@ Example:
 from copy import deepcopy
 
 from projectq.cengines import BasicEngine
-from projectq.ops import Allocate, Deallocate
+from projectq.ops import Allocate, Command, Deallocate, FlushGate
+from projectq.types import WeakQubitRef
 from ._util import insert_engine, drop_engine_after
 
 
@@ -38,6 +39,8 @@ class LoopTag(object):
     """
     Loop meta tag
     """
+    __slots__ = ('num', 'id')
+
     def __init__(self, num):
         self.num = num
         self.id = LoopTag.loop_tag_id
@@ -53,6 +56,132 @@ class LoopTag(object):
     loop_tag_id = 0
 
 
+class LoopEndTag(object):
+    """
+    Meta tag of the command which marks the end of a loop.
+
+    If a LoopTag-handling engine also handles LoopEndTag, the LoopEngine
+    sends a FlushGate command with a LoopEndTag after the last command of the
+    loop body. Since it is a FlushGate, caching engines in between send all
+    commands of the loop body before it, and the handling engine knows that
+    the loop is complete.
+    """
+    __slots__ = ('loop_tag',)
+
+    def __init__(self, loop_tag):
+        self.loop_tag = loop_tag
+
+    def __eq__(self, other):
+        return (isinstance(other, LoopEndTag) and
+                self.loop_tag == other.loop_tag)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+class LoopBody(object):
+    """
+    Loop which has been collected by a LoopCollector.
+
+    Attributes:
+        tag (LoopTag): Loop tag of the loop.
+        body (list): Commands (which still carry their loop tags) and
+            LoopBody objects of nested loops, in the order of execution.
+    """
+    __slots__ = ('tag', 'body')
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.body = []
+
+    @property
+    def num(self):
+        """
+        Number of loop iterations.
+        """
+        return self.tag.num
+
+
+class LoopCollector(object):
+    """
+    Collects the commands of loops for an engine which handles LoopTag and
+    LoopEndTag, such that the engine can execute each loop body num times
+    instead of having the LoopEngine unroll it.
+
+    A loop is complete once its LoopEndTag command arrives (or, as a
+    fallback, once a FlushGate without loop tags or a command of another
+    loop arrives). Commands without loop tags which arrive while a loop is
+    open have been delayed by a caching engine (e.g., the LocalOptimizer)
+    and do not act on any qubit of the loop body so far, hence they are
+    ready to be executed right away.
+
+    Example:
+        .. code-block:: python
+
+            for item in self._loop_collector.add(cmd):
+                if isinstance(item, LoopBody):
+                    # execute item.body item.num times
+                else:
+                    # execute the command item
+    """
+    def __init__(self):
+        self._open_loops = []  # LoopBody objects, outermost loop first
+
+    def _close_loops(self, depth, ready):
+        """
+        Close all open loops which are nested deeper than depth and append
+        completed outermost loops to ready.
+        """
+        while len(self._open_loops) > depth:
+            loop = self._open_loops.pop()
+            if len(self._open_loops) > 0:
+                self._open_loops[-1].body.append(loop)
+            else:
+                ready.append(loop)
+
+    def add(self, cmd):
+        """
+        Add a command and return the commands and loops which are ready to
+        be executed.
+
+        Args:
+            cmd (Command): Received command.
+
+        Returns:
+            List of commands and LoopBody objects (of outermost loops) to
+            execute in this order.
+        """
+        loop_tags = []
+        end_tag = None
+        for tag in reversed(cmd.tags):
+            if isinstance(tag, LoopTag):
+                loop_tags.append(tag)
+            elif isinstance(tag, LoopEndTag):
+                end_tag = tag
+        ready = []
+        if len(loop_tags) > 0:
+            depth = 0
+            while (depth < len(self._open_loops) and
+                   depth < len(loop_tags) and
+                   self._open_loops[depth].tag.id == loop_tags[depth].id):
+                depth += 1
+            self._close_loops(depth, ready)
+            for tag in loop_tags[depth:]:
+                self._open_loops.append(LoopBody(tag))
+        if end_tag is not None:
+            depth = len(loop_tags)
+            if (len(self._open_loops) > depth and
+                    self._open_loops[depth].tag.id == end_tag.loop_tag.id):
+                self._close_loops(depth, ready)
+        elif len(loop_tags) > 0:
+            self._open_loops[-1].body.append(cmd)
+        else:
+            if cmd.gate == FlushGate():
+                self._close_loops(0, ready)
+            ready.append(cmd)
+        return ready
+
+
 class LoopEngine(BasicEngine):
     """
     Stores all commands and, when done, executes them num times if no loop tag
@@ -127,6 +256,11 @@ class LoopEngine(BasicEngine):
             # allocated in the loop body
             if self._deallocated_qubit_ids != self._allocated_qubit_ids:
                 raise QubitManagementError(error_message)
+            if (self._tag.num > 0 and
+                    self.next_engine.is_meta_tag_supported(LoopEndTag)):
+                self.send([Command(self, FlushGate(),
+                                   ([WeakQubitRef(self, -1)],),
+                                   tags=[LoopEndTag(self._tag)])])
 
     def receive(self, command_list):
         """
@@ -21,7 +21,9 @@ from copy import deepcopy
 from projectq import MainEngine
 from projectq.meta import ComputeTag, DirtyQubitTag
 from projectq.cengines import DummyEngine
-from projectq.ops import H, CNOT, X, FlushGate, Allocate, Deallocate
+from projectq.ops import (H, CNOT, X, FlushGate, Allocate, Deallocate,
+                          Command)
+from projectq.types import WeakQubitRef
 
 from projectq.meta import _loop
 
@@ -252,3 +254,78 @@ def test_qubit_management_error_when_loop_tag_supported():
     with pytest.raises(_loop.QubitManagementError):
         with _loop.Loop(eng, 3):
             qb = eng.allocate_qubit()
+
+
+def test_loop_end_tag_sent_if_supported():
+    backend = DummyEngine(save_commands=True)
+
+    def allow_loop_tags(self, meta_tag):
+        return meta_tag == _loop.LoopTag or meta_tag == _loop.LoopEndTag
+
+    backend.is_meta_tag_handler = types.MethodType(allow_loop_tags, backend)
+    eng = MainEngine(backend=backend, engine_list=[])
+    qubit = eng.allocate_qubit()
+    with _loop.Loop(eng, 3):
+        with _loop.Loop(eng, 2):
+            H | qubit
+    with _loop.Loop(eng, 0):
+        H | qubit
+    assert len(backend.received_commands) == 4
+    inner_end = backend.received_commands[2]
+    outer_end = backend.received_commands[3]
+    inner_tag, outer_tag = backend.received_commands[1].tags
+    assert inner_end.gate == FlushGate()
+    assert inner_end.tags == [_loop.LoopEndTag(inner_tag), outer_tag]
+    assert outer_end.gate == FlushGate()
+    assert outer_end.tags == [_loop.LoopEndTag(outer_tag)]
+    assert _loop.LoopEndTag(inner_tag) != _loop.LoopEndTag(outer_tag)
+
+
+def _loop_command(gate, qubit_id, tags):
+    return Command(None, gate, ([WeakQubitRef(None, qubit_id)],),
+                   tags=list(tags))
+
+
+def test_loop_collector():
+    collector = _loop.LoopCollector()
+    outer = _loop.LoopTag(3)
+    inner = _loop.LoopTag(2)
+    cmd0 = _loop_command(H, 0, [])
+    assert collector.add(cmd0) == [cmd0]
+    cmd1 = _loop_command(H, 0, [outer])
+    cmd2 = _loop_command(X, 0, [inner, outer])
+    inner_end = _loop_command(FlushGate(), -1,
+                              [_loop.LoopEndTag(inner), outer])
+    cmd3 = _loop_command(X, 1, [])
+    cmd4 = _loop_command(H, 0, [outer])
+    outer_end = _loop_command(FlushGate(), -1, [_loop.LoopEndTag(outer)])
+    for cmd in [cmd1, cmd2, inner_end]:
+        assert collector.add(cmd) == []
+    # commands without loop tags are ready right away
+    assert collector.add(cmd3) == [cmd3]
+    assert collector.add(cmd4) == []
+    loops = collector.add(outer_end)
+    assert len(loops) == 1
+    assert loops[0].tag == outer and loops[0].num == 3
+    assert loops[0].body[0] is cmd1
+    assert loops[0].body[1].tag == inner
+    assert loops[0].body[1].body == [cmd2]
+    assert loops[0].body[2] is cmd4
+    # end of a loop without commands
+    assert collector.add(outer_end) == []
+
+
+def test_loop_collector_without_end_tags():
+    collector = _loop.LoopCollector()
+    loop_tag0 = _loop.LoopTag(3)
+    loop_tag1 = _loop.LoopTag(2)
+    cmd0 = _loop_command(H, 0, [loop_tag0])
+    cmd1 = _loop_command(H, 0, [loop_tag1])
+    flush = _loop_command(FlushGate(), -1, [])
+    assert collector.add(cmd0) == []
+    loops = collector.add(cmd1)
+    assert len(loops) == 1 and loops[0].body == [cmd0]
+    loops = collector.add(flush)
+    assert len(loops) == 2
+    assert loops[0].body == [cmd1]
+    assert loops[1] is flush
@@ -31,6 +31,7 @@ needs to be made explicitely, while for one argument it is optional.
 """
 
 import math
+from collections import OrderedDict
 from copy import deepcopy
 
 import numpy as np
@@ -44,6 +45,35 @@ ANGLE_PRECISION = 12
 ANGLE_TOLERANCE = 10**-ANGLE_PRECISION
 RTOL = 1e-10
 ATOL = 1e-12
+#: Number of parametrized gates (e.g., Rz(0.5)) kept in the flyweight cache
+#: (0 disables the cache)
+FLYWEIGHT_CACHE_SIZE = 1024
+
+_flyweight_cache = OrderedDict()
+
+
+def _new_parametrized_gate(cls, base, args, kwargs):
+    """
+    Create a new instance of a parametrized gate class, or return the
+    interned instance if a gate of the same class and angle has been created
+    recently (flyweight pattern, with least-recently-used eviction).
+
+    Only gates whose state is fully determined by the angle are interned,
+    i.e., classes which do not override the __init__ function of the base
+    class and are instantiated with a single real-valued angle.
+    """
+    if (FLYWEIGHT_CACHE_SIZE > 0 and len(args) == 1 and not kwargs
+            and cls.__init__ is base.__init__
+            and isinstance(args[0], (int, float))):
+        key = (cls, args[0])
+        gate = _flyweight_cache.pop(key, None)
+        if gate is None:
+            gate = object.__new__(cls)
+            while len(_flyweight_cache) >= FLYWEIGHT_CACHE_SIZE:
+                _flyweight_cache.popitem(last=False)
+        _flyweight_cache[key] = gate
+        return gate
+    return object.__new__(cls)
 
 
 class NotMergeable(Exception):
@@ -331,18 +361,37 @@ class BasicRotationGate(BasicGate):
     Rotation gates of the same class can be merged by adding the angles.
     The continuous parameter is modulo 4 * pi, self.angle is in the interval
     [0, 4 * pi).
+
+    The angle may also be a 1D numpy array holding one angle per member of a
+    batch of simulations (see :class:`projectq.backends.BatchSimulator`).
+
+    Note:
+        Rotation gates with the same (real-valued) angle are shared, i.e.,
+        Rx(0.5) returns the same object while it is in the flyweight cache
+        (see FLYWEIGHT_CACHE_SIZE). Gates should thus not be modified after
+        their creation.
     """
+    def __new__(cls, *args, **kwargs):
+        return _new_parametrized_gate(cls, BasicRotationGate, args, kwargs)
+
     def __init__(self, angle):
         """
         Initialize a basic rotation gate.
 
         Args:
-            angle (float): Angle of rotation (saved modulo 4 * pi)
+            angle (float|numpy.ndarray): Angle of rotation (saved modulo
+                4 * pi), or an array of angles for batched simulations.
         """
         BasicGate.__init__(self)
-        rounded_angle = round(float(angle) % (4. * math.pi), ANGLE_PRECISION)
-        if rounded_angle > 4 * math.pi - ANGLE_TOLERANCE:
-            rounded_angle = 0.
+        if isinstance(angle, np.ndarray):
+            rounded_angle = np.round(angle.astype(float) % (4. * math.pi),
+                                     ANGLE_PRECISION)
+            rounded_angle[rounded_angle > 4 * math.pi - ANGLE_TOLERANCE] = 0.
+        else:
+            rounded_angle = round(float(angle) % (4. * math.pi),
+                                  ANGLE_PRECISION)
+            if rounded_angle > 4 * math.pi - ANGLE_TOLERANCE:
+                rounded_angle = 0.
         self.angle = rounded_angle
 
     def __str__(self):
@@ -391,6 +440,8 @@ class BasicRotationGate(BasicGate):
         Return the inverse of this rotation gate (negate the angle, return new
         object).
         """
+        if isinstance(self.angle, np.ndarray):
+            return self.__class__(-self.angle + 4 * math.pi)
         if self.angle == 0:
             return self.__class__(0)
         else:
@@ -419,7 +470,12 @@ class BasicRotationGate(BasicGate):
 
     def __eq__(self, other):
         """ Return True if same class and same rotation angle. """
+        if other is self:
+            return True
         if isinstance(other, self.__class__):
+            if (isinstance(self.angle, np.ndarray)
+                    or isinstance(other.angle, np.ndarray)):
+                return np.array_equal(self.angle, other.angle)
             return self.angle == other.angle
         else:
             return False
@@ -434,6 +490,9 @@ class BasicRotationGate(BasicGate):
         """
         Return True if the gate is equivalent to an Identity gate
         """
+        if isinstance(self.angle, np.ndarray):
+            return bool(np.all((self.angle == 0.)
+                               | (self.angle == 4 * math.pi)))
         return self.angle == 0. or self.angle == 4 * math.pi
 
 
@@ -446,18 +505,35 @@ class BasicPhaseGate(BasicGate):
     Phase gates of the same class can be merged by adding the angles.
     The continuous parameter is modulo 2 * pi, self.angle is in the interval
     [0, 2 * pi).
+
+    The angle may also be a 1D numpy array holding one angle per member of a
+    batch of simulations (see :class:`projectq.backends.BatchSimulator`).
+
+    Note:
+        Phase gates with the same (real-valued) angle are shared (see
+        BasicRotationGate).
     """
+    def __new__(cls, *args, **kwargs):
+        return _new_parametrized_gate(cls, BasicPhaseGate, args, kwargs)
+
     def __init__(self, angle):
         """
         Initialize a basic rotation gate.
 
         Args:
-            angle (float): Angle of rotation (saved modulo 2 * pi)
+            angle (float|numpy.ndarray): Angle of rotation (saved modulo
+                2 * pi), or an array of angles for batched simulations.
         """
         BasicGate.__init__(self)
-        rounded_angle = round(float(angle) % (2. * math.pi), ANGLE_PRECISION)
-        if rounded_angle > 2 * math.pi - ANGLE_TOLERANCE:
-            rounded_angle = 0.
+        if isinstance(angle, np.ndarray):
+            rounded_angle = np.round(angle.astype(float) % (2. * math.pi),
+                                     ANGLE_PRECISION)
+            rounded_angle[rounded_angle > 2 * math.pi - ANGLE_TOLERANCE] = 0.
+        else:
+            rounded_angle = round(float(angle) % (2. * math.pi),
+                                  ANGLE_PRECISION)
+            if rounded_angle > 2 * math.pi - ANGLE_TOLERANCE:
+                rounded_angle = 0.
         self.angle = rounded_angle
 
     def __str__(self):
@@ -489,6 +565,8 @@ class BasicPhaseGate(BasicGate):
         Return the inverse of this rotation gate (negate the angle, return new
         object).
         """
+        if isinstance(self.angle, np.ndarray):
+            return self.__class__(-self.angle + 2 * math.pi)
         if self.angle == 0:
             return self.__class__(0)
         else:
@@ -517,7 +595,12 @@ class BasicPhaseGate(BasicGate):
 
     def __eq__(self, other):
         """ Return True if same class and same rotation angle. """
+        if other is self:
+            return True
         if isinstance(other, self.__class__):
+            if (isinstance(self.angle, np.ndarray)
+                    or isinstance(other.angle, np.ndarray)):
+                return np.array_equal(self.angle, other.angle)
             return self.angle == other.angle
         else:
             return False
@@ -15,6 +15,8 @@
 """Tests for projectq.ops._basics."""
 
 import math
+from collections import OrderedDict
+from copy import deepcopy
 
 import numpy as np
 import pytest
@@ -227,6 +229,44 @@ def test_basic_rotation_gate_comparison_and_hash():
     assert basic_rotation_gate2 != _basics.BasicRotationGate(0.5 + 2 * math.pi)
 
 
+def test_basic_rotation_gate_batched_angles():
+    gate = _basics.BasicRotationGate(np.array([0.5, -0.5, 4 * math.pi]))
+    assert np.allclose(gate.angle, [0.5, 4 * math.pi - 0.5, 0.])
+    assert not gate.is_identity()
+    assert np.allclose(gate.get_inverse().angle, [4 * math.pi - 0.5, 0.5, 0.])
+    assert gate.get_merged(gate.get_inverse()).is_identity()
+    assert gate == _basics.BasicRotationGate(np.array([0.5, -0.5, 0.]))
+    assert gate != _basics.BasicRotationGate(0.5)
+    assert _basics.BasicRotationGate(0.5) != gate
+
+
+def test_basic_rotation_gate_flyweight(monkeypatch):
+    class MyRotationGate(_basics.BasicRotationGate):
+        def __init__(self, angle, label):
+            _basics.BasicRotationGate.__init__(self, angle)
+            self.label = label
+
+    monkeypatch.setattr(_basics, "FLYWEIGHT_CACHE_SIZE", 2)
+    monkeypatch.setattr(_basics, "_flyweight_cache", OrderedDict())
+    gate = _basics.BasicRotationGate(0.5)
+    assert gate is _basics.BasicRotationGate(0.5)
+    assert gate is not _basics.BasicPhaseGate(0.5)
+    assert _basics.BasicPhaseGate(0.5) is _basics.BasicPhaseGate(0.5)
+    assert gate.get_inverse() is _basics.BasicRotationGate(0.5).get_inverse()
+    # gates with other arguments are not shared
+    batched_gate = _basics.BasicRotationGate(np.array([0.5]))
+    assert batched_gate is not _basics.BasicRotationGate(np.array([0.5]))
+    assert MyRotationGate(0.5, "a") is not MyRotationGate(0.5, "a")
+    # least recently used gates are evicted
+    _basics.BasicRotationGate(1.)
+    _basics.BasicRotationGate(2.)
+    assert gate is not _basics.BasicRotationGate(0.5)
+    assert gate == _basics.BasicRotationGate(0.5)
+    # copies are new objects
+    assert deepcopy(gate) is not gate
+    assert deepcopy(gate) == gate
+
+
 @pytest.mark.parametrize("input_angle, modulo_angle",
                          [(2.0, 2.0), (17., 4.4336293856408275),
                           (-0.5 * math.pi, 1.5 * math.pi), (2 * math.pi, 0)])
@@ -291,6 +331,14 @@ def test_basic_phase_gate_comparison_and_hash():
     assert basic_phase_gate2 != _basics.BasicPhaseGate(0.5 + math.pi)
 
 
+def test_basic_phase_gate_batched_angles():
+    gate = _basics.BasicPhaseGate(np.array([0.5, 2 * math.pi]))
+    assert np.allclose(gate.angle, [0.5, 0.])
+    assert np.allclose(gate.get_inverse().angle, [2 * math.pi - 0.5, 0.])
+    assert gate == _basics.BasicPhaseGate(np.array([0.5, 0.]))
+    assert gate != _basics.BasicPhaseGate(0.5)
+
+
 def test_basic_math_gate():
     def my_math_function(a, b, c):
         return (a, b, c + a * b)
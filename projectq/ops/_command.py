@@ -58,6 +58,25 @@ def apply_command(cmd):
     engine.receive([cmd])
 
 
+def _weak_ref(qubit):
+    """
+    Return a WeakQubitRef to the given qubit, re-using the qubit itself if it
+    already is a WeakQubitRef.
+    """
+    if type(qubit) is WeakQubitRef:
+        return qubit
+    return WeakQubitRef(qubit.engine, qubit.id)
+
+
+def _rebind(qubit, engine):
+    """
+    Return a WeakQubitRef to the given qubit which belongs to engine.
+    """
+    if qubit.engine is engine:
+        return qubit
+    return WeakQubitRef(engine, qubit.id)
+
+
 class Command(object):
     """
     Class used as a container to store commands. If a gate is applied to
@@ -81,7 +100,17 @@ class Command(object):
           other scope receives the command after the inner scope LoopEngine
           and hence adds its LoopTag to the end.
         all_qubits: A tuple of control_qubits + qubits
+
+    Note:
+        Commands derived from other commands (e.g., inverses, merged
+        commands or commands generated by decompositions) share the
+        WeakQubitRef and tag objects of the original command instead of
+        copying them. Tags should thus not be modified in-place once they
+        have been attached to a command. Use deepcopy to obtain a command
+        with its own qubit references.
     """
+    __slots__ = ('gate', 'tags', '_qubits', '_control_qubits', '_engine')
+
     def __init__(self, engine, gate, qubits, controls=(), tags=()):
         """
         Initialize a Command object.
@@ -106,9 +135,8 @@ class Command(object):
                 Tags associated with the command.
         """
 
-        qubits = tuple(
-            [WeakQubitRef(qubit.engine, qubit.id) for qubit in qreg]
-            for qreg in qubits)
+        qubits = tuple([_weak_ref(qubit) for qubit in qreg]
+                       for qreg in qubits)
 
         self.gate = gate
         self.tags = list(tags)
@@ -125,9 +153,33 @@ class Command(object):
         self._qubits = self._order_qubits(qubits)
 
     def __deepcopy__(self, memo):
-        """ Deepcopy implementation. Engine should stay a reference."""
-        return Command(self.engine, deepcopy(self.gate), self.qubits,
-                       list(self.control_qubits), deepcopy(self.tags))
+        """
+        Deepcopy implementation. Engine should stay a reference.
+
+        The copy gets new WeakQubitRef objects (which may then be modified
+        without affecting this command), while the tags are shared.
+        """
+        qubits = tuple([WeakQubitRef(qubit.engine, qubit.id)
+                        for qubit in qureg] for qureg in self.qubits)
+        control_qubits = [WeakQubitRef(qubit.engine, qubit.id)
+                          for qubit in self.control_qubits]
+        return Command(self.engine, deepcopy(self.gate), qubits,
+                       control_qubits, self.tags)
+
+    def __copy__(self):
+        """
+        Copy implementation.
+
+        The copy shares the gate and the WeakQubitRef objects with this
+        command, but has its own list of tags.
+        """
+        cmd = self.__class__.__new__(self.__class__)
+        cmd.gate = self.gate
+        cmd.tags = list(self.tags)
+        cmd._qubits = self._qubits
+        cmd._control_qubits = self._control_qubits
+        cmd._engine = self._engine
+        return cmd
 
     def get_inverse(self):
         """
@@ -141,8 +193,7 @@ class Command(object):
                 BasicGate.get_inverse)
         """
         return Command(self._engine, projectq.ops.get_inverse(self.gate),
-                       self.qubits, list(self.control_qubits),
-                       deepcopy(self.tags))
+                       self.qubits, self.control_qubits, self.tags)
 
     def is_identity(self):
         """
@@ -168,8 +219,7 @@ class Command(object):
         if (self.tags == other.tags and self.all_qubits == other.all_qubits
                 and self.engine == other.engine):
             return Command(self.engine, self.gate.get_merged(other.gate),
-                           self.qubits, self.control_qubits,
-                           deepcopy(self.tags))
+                           self.qubits, self.control_qubits, self.tags)
         raise projectq.ops.NotMergeable("Commands not mergeable.")
 
     def _order_qubits(self, qubits):
@@ -221,10 +271,8 @@ class Command(object):
         Args:
             control_qubits (Qureg): quantum register
         """
-        self._control_qubits = ([
-            WeakQubitRef(qubit.engine, qubit.id) for qubit in qubits
-        ])
-        self._control_qubits = sorted(self._control_qubits, key=lambda x: x.id)
+        self._control_qubits = sorted([_weak_ref(qubit) for qubit in qubits],
+                                      key=lambda x: x.id)
 
     def add_control_qubits(self, qubits):
         """
@@ -240,9 +288,9 @@ class Command(object):
                 in state 1.
         """
         assert (isinstance(qubits, list))
-        self._control_qubits.extend(
-            [WeakQubitRef(qubit.engine, qubit.id) for qubit in qubits])
-        self._control_qubits = sorted(self._control_qubits, key=lambda x: x.id)
+        self._control_qubits = sorted(
+            self._control_qubits + [_weak_ref(qubit) for qubit in qubits],
+            key=lambda x: x.id)
 
     @property
     def all_qubits(self):
@@ -272,11 +320,12 @@ class Command(object):
             engine: New owner of qubits and owner of this Command object
         """
         self._engine = engine
-        for qureg in self.qubits:
-            for qubit in qureg:
-                qubit.engine = engine
-        for qubit in self.control_qubits:
-            qubit.engine = engine
+        # qubit references may be shared with other commands, so they are
+        # replaced instead of modified
+        self._qubits = tuple([_rebind(qubit, engine) for qubit in qureg]
+                             for qureg in self._qubits)
+        self._control_qubits = [_rebind(qubit, engine)
+                                for qubit in self._control_qubits]
 
     def __eq__(self, other):
         """
@@ -15,7 +15,7 @@
 
 """Tests for projectq.ops._command."""
 
-from copy import deepcopy
+from copy import copy, deepcopy
 import sys
 import math
 import pytest
@@ -88,6 +88,46 @@ def test_command_deepcopy(main_engine):
     assert copied_cmd.control_qubits[0].id == qureg1[0].id
     cmd.gate = "ChangedGate"
     assert copied_cmd.gate == gate
+    # qubit references of a copy can be modified independently
+    copied_cmd.qubits[0][0].id = 10
+    assert cmd.qubits[0][0].id == 0
+
+
+def test_command_copy(main_engine):
+    qureg0 = Qureg([Qubit(main_engine, 0)])
+    qureg1 = Qureg([Qubit(main_engine, 1)])
+    gate = BasicGate()
+    cmd = _command.Command(main_engine, gate, (qureg0,), qureg1,
+                           tags=["MyTestTag"])
+    copied_cmd = copy(cmd)
+    assert copied_cmd == cmd
+    assert copied_cmd.gate is gate
+    assert copied_cmd.qubits[0][0] is cmd.qubits[0][0]
+    assert copied_cmd.control_qubits[0] is cmd.control_qubits[0]
+    assert copied_cmd.engine is main_engine
+    # the list of tags is not shared
+    cmd.tags.append("TagAddedLater")
+    assert copied_cmd.tags == ["MyTestTag"]
+    cmd.add_control_qubits([WeakQubitRef(main_engine, 2)])
+    assert len(copied_cmd.control_qubits) == 1
+
+
+def test_command_slots(main_engine):
+    qubit = main_engine.allocate_qubit()
+    cmd = _command.Command(main_engine, Rx(0.5), (qubit,))
+    assert not hasattr(cmd, '__dict__')
+    assert not hasattr(cmd.qubits[0][0], '__dict__')
+    with pytest.raises(AttributeError):
+        cmd.some_attribute = 1
+
+
+def test_command_engine_does_not_modify_shared_qubits(main_engine):
+    qubit = main_engine.allocate_qubit()
+    cmd = _command.Command(main_engine, Rx(0.5), (qubit,))
+    inverse_cmd = cmd.get_inverse()
+    inverse_cmd.engine = "fake_engine"
+    assert inverse_cmd.qubits[0][0].engine == "fake_engine"
+    assert id(cmd.qubits[0][0].engine) == id(main_engine)
 
 
 def test_command_get_inverse(main_engine):
@@ -100,12 +140,15 @@ def test_command_get_inverse(main_engine):
     assert inverse_cmd.gate == Rx(-0.5 + 4 * math.pi)
     assert len(cmd.qubits) == len(inverse_cmd.qubits)
     assert cmd.qubits[0][0].id == inverse_cmd.qubits[0][0].id
-    assert id(cmd.qubits[0][0]) != id(inverse_cmd.qubits[0][0])
+    # qubit references and tags are shared, the lists are not
+    assert id(cmd.qubits[0][0]) == id(inverse_cmd.qubits[0][0])
     assert len(cmd.control_qubits) == len(inverse_cmd.control_qubits)
     assert cmd.control_qubits[0].id == inverse_cmd.control_qubits[0].id
-    assert id(cmd.control_qubits[0]) != id(inverse_cmd.control_qubits[0])
+    assert id(cmd.control_qubits[0]) == id(inverse_cmd.control_qubits[0])
+    assert id(cmd.control_qubits) != id(inverse_cmd.control_qubits)
     assert cmd.tags == inverse_cmd.tags
-    assert id(cmd.tags[0]) != id(inverse_cmd.tags[0])
+    assert id(cmd.tags[0]) == id(inverse_cmd.tags[0])
+    assert id(cmd.tags) != id(inverse_cmd.tags)
     assert id(cmd.engine) == id(inverse_cmd.engine)
 
 
@@ -0,0 +1,122 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains the commutation rules of commands, which allow optimizers to move
+gates past each other.
+
+Each command is described by a list of Pauli strings (its generators) such
+that the unitary of the command is a function of these Pauli strings only:
+
+* a control qubit contributes Z on that qubit (a controlled gate is block-
+  diagonal w.r.t. the control),
+* diagonal gates (Z, S, T, Rz, R, ...) contribute Z on their target qubits,
+  X-type gates (X, Rx, SqrtX) contribute X, and Y-type gates (Y, Ry) Y,
+* Rxx, Ryy and Rzz contribute XX, YY and ZZ, respectively,
+* QubitOperator and TimeEvolution gates contribute the Pauli strings of
+  their terms, and a global phase (Ph) contributes nothing.
+
+Two commands commute if they act on disjoint qubits, or if all their
+generators commute pairwise (i.e., if each pair of Pauli strings differs on
+an even number of qubits on which both act).
+"""
+
+from ._gates import (XGate, YGate, ZGate, SGate, TGate, SqrtXGate, Ph, Rx,
+                     Ry, Rz, Rxx, Ryy, Rzz, R)
+from ._metagates import DaggeredGate
+from ._qubit_operator import QubitOperator
+from ._time_evolution import TimeEvolution
+
+#: Pauli operator on the target qubits of which single-qubit gates are a
+#: function (the same holds for their DaggeredGate)
+SINGLE_QUBIT_AXES = {ZGate: 'Z', SGate: 'Z', TGate: 'Z', Rz: 'Z', R: 'Z',
+                     XGate: 'X', Rx: 'X', SqrtXGate: 'X',
+                     YGate: 'Y', Ry: 'Y'}
+#: Pauli operator which two-qubit rotations apply to both of their qubits
+TWO_QUBIT_AXES = {Rxx: 'X', Ryy: 'Y', Rzz: 'Z'}
+
+
+def _get_generators(cmd):
+    """
+    Return the generators of a command (see module docstring) as a list of
+    dicts mapping qubit ids to 'X', 'Y' or 'Z', or None if the command is
+    not covered by the commutation rules.
+    """
+    gate = cmd.gate
+    if isinstance(gate, DaggeredGate):
+        gate = gate._gate
+    generators = [{qubit.id: 'Z'} for qubit in cmd.control_qubits]
+    gate_type = type(gate)
+    if gate_type in SINGLE_QUBIT_AXES:
+        axis = SINGLE_QUBIT_AXES[gate_type]
+        generators += [{qubit.id: axis}
+                       for qureg in cmd.qubits for qubit in qureg]
+    elif gate_type in TWO_QUBIT_AXES:
+        axis = TWO_QUBIT_AXES[gate_type]
+        generators.append({qubit.id: axis
+                           for qureg in cmd.qubits for qubit in qureg})
+    elif gate_type is Ph:
+        pass
+    elif isinstance(gate, (QubitOperator, TimeEvolution)):
+        if isinstance(gate, TimeEvolution):
+            terms = gate.hamiltonian.terms
+        else:
+            terms = gate.terms
+        qureg = cmd.qubits[0]
+        generators += [{qureg[index].id: action for index, action in term}
+                       for term in terms if len(term) > 0]
+    else:
+        return None
+    return generators
+
+
+def _pauli_strings_commute(pauli_string0, pauli_string1):
+    """
+    Return True if the two Pauli strings (dicts mapping qubit ids to 'X',
+    'Y' or 'Z') commute.
+    """
+    if len(pauli_string1) < len(pauli_string0):
+        pauli_string0, pauli_string1 = pauli_string1, pauli_string0
+    num_anticommuting = 0
+    for qubit_id, action in pauli_string0.items():
+        other_action = pauli_string1.get(qubit_id)
+        if other_action is not None and other_action != action:
+            num_anticommuting += 1
+    return num_anticommuting % 2 == 0
+
+
+def commutes(cmd0, cmd1):
+    """
+    Return True if the two commands are known to commute (see the module
+    docstring for the rules which are applied).
+
+    A return value of False means that the commands may not commute.
+
+    Args:
+        cmd0 (Command): First command.
+        cmd1 (Command): Second command.
+    """
+    ids0 = set(qubit.id for qureg in cmd0.all_qubits for qubit in qureg)
+    if all(qubit.id not in ids0
+           for qureg in cmd1.all_qubits for qubit in qureg):
+        return True
+    generators0 = _get_generators(cmd0)
+    if generators0 is None:
+        return False
+    generators1 = _get_generators(cmd1)
+    if generators1 is None:
+        return False
+    return all(_pauli_strings_commute(pauli_string0, pauli_string1)
+               for pauli_string0 in generators0
+               for pauli_string1 in generators1)
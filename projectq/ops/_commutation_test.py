@@ -0,0 +1,101 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.ops._commutation."""
+
+import pytest
+
+from projectq import MainEngine
+from projectq.cengines import DummyEngine
+from projectq.ops import (Command, get_inverse, H, Measure, Ph,
+                          QubitOperator, Rx, Rxx, Ry, Rz, Rzz, S, Sdag, SqrtX,
+                          T, TimeEvolution, X, Y, Z)
+
+from projectq.ops import _commutation
+
+
+@pytest.fixture
+def qureg():
+    eng = MainEngine(DummyEngine(), [])
+    qureg = eng.allocate_qureg(3)
+    yield qureg
+    eng.flush(deallocate_qubits=True)
+
+
+def _cmd(gate, qubits, controls=()):
+    qubits = tuple([qubit] for qubit in qubits)
+    return Command(qubits[0][0].engine, gate, qubits, list(controls))
+
+
+def test_commutes_disjoint_qubits(qureg):
+    assert _commutation.commutes(_cmd(H, [qureg[0]]), _cmd(H, [qureg[1]]))
+    assert _commutation.commutes(_cmd(Measure, [qureg[0]]),
+                                 _cmd(X, [qureg[1]], [qureg[2]]))
+
+
+@pytest.mark.parametrize("gate", [Z, S, Sdag, T, Rz(0.3), Ph(0.2)])
+def test_commutes_diagonal_gates_through_controls(qureg, gate):
+    cnot = _cmd(X, [qureg[1]], [qureg[0]])
+    assert _commutation.commutes(_cmd(gate, [qureg[0]]), cnot)
+    assert _commutation.commutes(cnot, _cmd(gate, [qureg[0]]))
+    cz = _cmd(Z, [qureg[1]], [qureg[0]])
+    assert _commutation.commutes(_cmd(gate, [qureg[1]]), cz)
+    assert _commutation.commutes(_cmd(gate, [qureg[0]]), cz)
+
+
+def test_commutes_x_gates_through_targets(qureg):
+    cnot = _cmd(X, [qureg[1]], [qureg[0]])
+    for gate in [X, Rx(0.5), SqrtX, get_inverse(SqrtX)]:
+        assert _commutation.commutes(_cmd(gate, [qureg[1]]), cnot)
+        assert not _commutation.commutes(_cmd(gate, [qureg[0]]), cnot)
+    assert not _commutation.commutes(_cmd(Z, [qureg[1]]), cnot)
+    assert not _commutation.commutes(_cmd(Ry(0.1), [qureg[1]]), cnot)
+    # controlled-X gates with shared targets or controls commute
+    assert _commutation.commutes(cnot, _cmd(X, [qureg[1]], [qureg[2]]))
+    assert _commutation.commutes(cnot, _cmd(X, [qureg[2]], [qureg[0]]))
+    assert not _commutation.commutes(cnot, _cmd(X, [qureg[0]], [qureg[1]]))
+
+
+def test_commutes_two_qubit_rotations(qureg):
+    rzz = Command(qureg.engine, Rzz(0.2), ([qureg[0], qureg[1]],))
+    rxx = Command(qureg.engine, Rxx(0.2), ([qureg[0], qureg[1]],))
+    rxx12 = Command(qureg.engine, Rxx(0.2), ([qureg[1], qureg[2]],))
+    assert _commutation.commutes(rzz, rxx)
+    assert not _commutation.commutes(rzz, rxx12)
+    assert _commutation.commutes(rzz, _cmd(Rz(0.1), [qureg[1]]))
+    assert not _commutation.commutes(rxx12, _cmd(Y, [qureg[1]]))
+
+
+def test_commutes_pauli_strings(qureg):
+    def evolution(term):
+        gate = TimeEvolution(0.5, QubitOperator(term))
+        return Command(qureg.engine, gate, (list(qureg),))
+
+    assert _commutation.commutes(evolution("X0 X1"), evolution("Y0 Y1"))
+    assert not _commutation.commutes(evolution("X0 Z1"), evolution("Y0 Z1"))
+    assert _commutation.commutes(evolution("X0"), evolution("Z1 Y2"))
+    assert _commutation.commutes(evolution("Z0 Z2"), _cmd(Rz(0.1),
+                                                         [qureg[0]]))
+    operator = Command(qureg.engine, QubitOperator("X0 X2"), (list(qureg),))
+    assert _commutation.commutes(operator, _cmd(Rx(0.3), [qureg[2]]))
+    assert not _commutation.commutes(operator, _cmd(Z, [qureg[2]]))
+
+
+def test_commutes_unknown_gates(qureg):
+    assert not _commutation.commutes(_cmd(H, [qureg[0]]),
+                                     _cmd(H, [qureg[0]]))
+    assert not _commutation.commutes(_cmd(Z, [qureg[0]]),
+                                     _cmd(Measure, [qureg[0]]))
+    assert not _commutation.commutes(_cmd(Measure, [qureg[0]]),
+                                     _cmd(Z, [qureg[0]]))
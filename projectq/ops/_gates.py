@@ -59,6 +59,35 @@ from ._basics import (BasicGate,
 from ._command import apply_command
 
 
+def _read_only(matrix):
+    """
+    Return the matrix as a read-only numpy.matrix. Gate matrices are shared
+    between all users of a gate and must not be modified in-place.
+    """
+    matrix = np.matrix(matrix)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def _cached_matrix(compute_matrix):
+    """
+    Turn a function computing the matrix of a parametrized gate into a
+    property which caches the (read-only) matrix for the current angle.
+    """
+    def matrix(self):
+        cache = self.__dict__.get('_matrix_cache')
+        if (cache is None or isinstance(self.angle, np.ndarray)
+                or cache[0] != self.angle):
+            cache = (self.angle, _read_only(compute_matrix(self)))
+            self._matrix_cache = cache
+        return cache[1]
+    matrix.__doc__ = compute_matrix.__doc__
+    return property(matrix)
+
+
+_H_MATRIX = _read_only(1. / cmath.sqrt(2.) * np.matrix([[1, 1], [1, -1]]))
+
+
 class HGate(SelfInverseGate):
     """ Hadamard gate class """
     def __str__(self):
@@ -66,12 +95,15 @@ class HGate(SelfInverseGate):
 
     @property
     def matrix(self):
-        return 1. / cmath.sqrt(2.) * np.matrix([[1, 1], [1, -1]])
+        return _H_MATRIX
 
 #: Shortcut (instance of) :class:`projectq.ops.HGate`
 H = HGate()
 
 
+_X_MATRIX = _read_only([[0, 1], [1, 0]])
+
+
 class XGate(SelfInverseGate):
     """ Pauli-X gate class """
     def __str__(self):
@@ -79,12 +111,15 @@ class XGate(SelfInverseGate):
 
     @property
     def matrix(self):
-        return np.matrix([[0, 1], [1, 0]])
+        return _X_MATRIX
 
 #: Shortcut (instance of) :class:`projectq.ops.XGate`
 X = NOT = XGate()
 
 
+_Y_MATRIX = _read_only([[0, -1j], [1j, 0]])
+
+
 class YGate(SelfInverseGate):
     """ Pauli-Y gate class """
     def __str__(self):
@@ -92,12 +127,15 @@ class YGate(SelfInverseGate):
 
     @property
     def matrix(self):
-        return np.matrix([[0, -1j], [1j, 0]])
+        return _Y_MATRIX
 
 #: Shortcut (instance of) :class:`projectq.ops.YGate`
 Y = YGate()
 
 
+_Z_MATRIX = _read_only([[1, 0], [0, -1]])
+
+
 class ZGate(SelfInverseGate):
     """ Pauli-Z gate class """
     def __str__(self):
@@ -105,17 +143,20 @@ class ZGate(SelfInverseGate):
 
     @property
     def matrix(self):
-        return np.matrix([[1, 0], [0, -1]])
+        return _Z_MATRIX
 
 #: Shortcut (instance of) :class:`projectq.ops.ZGate`
 Z = ZGate()
 
 
+_S_MATRIX = _read_only([[1, 0], [0, 1j]])
+
+
 class SGate(BasicGate):
     """ S gate class """
     @property
     def matrix(self):
-        return np.matrix([[1, 0], [0, 1j]])
+        return _S_MATRIX
 
     def __str__(self):
         return "S"
@@ -126,11 +167,14 @@ S = SGate()
 Sdag = Sdagger = get_inverse(S)
 
 
+_T_MATRIX = _read_only([[1, 0], [0, cmath.exp(1j * cmath.pi / 4)]])
+
+
 class TGate(BasicGate):
     """ T gate class """
     @property
     def matrix(self):
-        return np.matrix([[1, 0], [0, cmath.exp(1j * cmath.pi / 4)]])
+        return _T_MATRIX
 
     def __str__(self):
         return "T"
@@ -141,11 +185,14 @@ T = TGate()
 Tdag = Tdagger = get_inverse(T)
 
 
+_SQRTX_MATRIX = _read_only(0.5 * np.matrix([[1+1j, 1-1j], [1-1j, 1+1j]]))
+
+
 class SqrtXGate(BasicGate):
     """ Square-root X gate class """
     @property
     def matrix(self):
-        return 0.5 * np.matrix([[1+1j, 1-1j], [1-1j, 1+1j]])
+        return _SQRTX_MATRIX
 
     def tex_str(self):
         return r'$\sqrt{X}$'
@@ -157,6 +204,12 @@ class SqrtXGate(BasicGate):
 SqrtX = SqrtXGate()
 
 
+_SWAP_MATRIX = _read_only([[1, 0, 0, 0],
+                           [0, 0, 1, 0],
+                           [0, 1, 0, 0],
+                           [0, 0, 0, 1]])
+
+
 class SwapGate(SelfInverseGate):
     """ Swap gate class (swaps 2 qubits) """
     def __init__(self):
@@ -168,15 +221,18 @@ class SwapGate(SelfInverseGate):
 
     @property
     def matrix(self):
-        return np.matrix([[1, 0, 0, 0],
-                          [0, 0, 1, 0],
-                          [0, 1, 0, 0],
-                          [0, 0, 0, 1]])
+        return _SWAP_MATRIX
 
 #: Shortcut (instance of) :class:`projectq.ops.SwapGate`
 Swap = SwapGate()
 
 
+_SQRTSWAP_MATRIX = _read_only([[1, 0, 0, 0],
+                               [0, 0.5+0.5j, 0.5-0.5j, 0],
+                               [0, 0.5-0.5j, 0.5+0.5j, 0],
+                               [0, 0, 0, 1]])
+
+
 class SqrtSwapGate(BasicGate):
     """ Square-root Swap gate class """
     def __init__(self):
@@ -188,10 +244,7 @@ class SqrtSwapGate(BasicGate):
 
     @property
     def matrix(self):
-        return np.matrix([[1, 0, 0, 0],
-                          [0, 0.5+0.5j, 0.5-0.5j, 0],
-                          [0, 0.5-0.5j, 0.5+0.5j, 0],
-                          [0, 0, 0, 1]])
+        return _SQRTSWAP_MATRIX
 
 #: Shortcut (instance of) :class:`projectq.ops.SqrtSwapGate`
 SqrtSwap = SqrtSwapGate()
@@ -211,7 +264,7 @@ Entangle = EntangleGate()
 
 class Ph(BasicPhaseGate):
     """ Phase gate (global phase) """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[cmath.exp(1j * self.angle), 0],
                           [0, cmath.exp(1j * self.angle)]])
@@ -219,7 +272,7 @@ class Ph(BasicPhaseGate):
 
 class Rx(BasicRotationGate):
     """ RotationX gate class """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[math.cos(0.5 * self.angle),
                            -1j * math.sin(0.5 * self.angle)],
@@ -229,7 +282,7 @@ class Rx(BasicRotationGate):
 
 class Ry(BasicRotationGate):
     """ RotationY gate class """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[math.cos(0.5 * self.angle),
                            -math.sin(0.5 * self.angle)],
@@ -239,7 +292,7 @@ class Ry(BasicRotationGate):
 
 class Rz(BasicRotationGate):
     """ RotationZ gate class """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[cmath.exp(-.5 * 1j * self.angle), 0],
                           [0, cmath.exp(.5 * 1j * self.angle)]])
@@ -247,7 +300,7 @@ class Rz(BasicRotationGate):
 
 class Rxx(BasicRotationGate):
     """ RotationXX gate class """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[cmath.cos(.5 * self.angle), 0, 0, -1j*cmath.sin(.5 * self.angle)],
                           [0, cmath.cos( .5 * self.angle), -1j*cmath.sin(.5 * self.angle), 0],
@@ -257,7 +310,7 @@ class Rxx(BasicRotationGate):
 
 class Ryy(BasicRotationGate):
     """ RotationYY gate class """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[cmath.cos(.5 * self.angle), 0, 0, 1j*cmath.sin(.5 * self.angle)],
                           [0, cmath.cos( .5 * self.angle), -1j*cmath.sin(.5 * self.angle), 0],
@@ -267,7 +320,7 @@ class Ryy(BasicRotationGate):
 
 class Rzz(BasicRotationGate):
     """ RotationZZ gate class """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[cmath.exp(-.5 * 1j * self.angle), 0, 0, 0],
                           [0, cmath.exp( .5 * 1j * self.angle), 0, 0],
@@ -277,7 +330,7 @@ class Rzz(BasicRotationGate):
 
 class R(BasicPhaseGate):
     """ Phase-shift gate (equivalent to Rz up to a global phase) """
-    @property
+    @_cached_matrix
     def matrix(self):
         return np.matrix([[1, 0], [0, cmath.exp(1j * self.angle)]])
 
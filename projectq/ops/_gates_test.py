@@ -16,6 +16,7 @@
 
 import math
 import cmath
+from copy import deepcopy
 import numpy as np
 import pytest
 
@@ -134,6 +135,29 @@ def test_rx(angle):
     assert np.allclose(gate.matrix, expected_matrix)
 
 
+def test_constant_gate_matrices_are_read_only():
+    for gate in [_gates.H, _gates.X, _gates.Y, _gates.Z, _gates.S, _gates.T,
+                 _gates.SqrtX, _gates.Swap, _gates.SqrtSwap]:
+        assert gate.matrix is gate.matrix
+        assert isinstance(gate.matrix, np.matrix)
+        with pytest.raises(ValueError):
+            gate.matrix[0, 0] = 2.
+
+
+def test_parametrized_gate_matrices_are_cached():
+    gate = _gates.Rx(0.3)
+    matrix = gate.matrix
+    assert gate.matrix is matrix
+    assert _gates.Rx(0.3).matrix is matrix
+    with pytest.raises(ValueError):
+        matrix[0, 0] = 2.
+    # the cache is invalidated if the angle changes
+    gate = deepcopy(gate)
+    gate.angle = 0.
+    assert np.allclose(gate.matrix, np.identity(2))
+    assert np.allclose(_gates.Rx(0.3).matrix, matrix)
+
+
 @pytest.mark.parametrize("angle", [0, 0.2, 2.1, 4.1, 2 * math.pi,
                                    4 * math.pi])
 def test_ry(angle):
@@ -28,7 +28,7 @@ As well as the meta functions
 * C (Creates an n-ary controlled version of an arbitrary gate)
 """
 
-from ._basics import BasicGate, NotInvertible
+from ._basics import BasicGate, ClassicalInstructionGate, NotInvertible
 from ._command import Command, apply_command
 
 
@@ -234,6 +234,16 @@ class ControlledGate(BasicGate):
                                     "First qureg(s) need to contain exactly "
                                     "the required number of control quregs.")
 
+        if (type(self._gate).__or__ is BasicGate.__or__ and
+                not isinstance(self._gate, ClassicalInstructionGate)):
+            # Add the controls directly, which is equivalent to the Control
+            # section below but does not modify the engine pipeline (and
+            # hence keeps buffered commands of the MainEngine buffered).
+            cmd = self._gate.generate_command(tuple(gate_quregs))
+            cmd.add_control_qubits(ctrl)
+            apply_command(cmd)
+            return
+
         import projectq.meta
         with projectq.meta.Control(gate_quregs[0][0].engine, ctrl):
             self._gate | tuple(gate_quregs)
@@ -0,0 +1,271 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Defines a decomposition chooser which selects the cheapest decomposition of
+a command according to a cost model.
+
+The cost of a decomposition is the cost of the fully decomposed circuit in
+the target gate set. It is determined by a dry run of the decomposition into
+a ResourceCounter and cached per gate, such that the dry runs only happen the
+first time a gate is decomposed.
+
+Example:
+    .. code-block:: python
+
+        chooser = CostModelChooser(rule_set, is_available,
+                                   controlled_gate_weight=10, t_gate_weight=5)
+        eng = MainEngine(engine_list=[AutoReplacer(rule_set, chooser),
+                                      InstructionFilter(
+                                          lambda eng, cmd: is_available(cmd))])
+
+The restricted gate set setup (see
+:meth:`projectq.setups.restrictedgateset.get_engine_list`) accepts a
+CostModelChooser without rule set as its compiler_chooser and then uses its
+own decomposition rules and target gate set.
+"""
+
+from projectq.backends import ResourceCounter
+from projectq.cengines import (AutoReplacer, BasicEngine, InstructionFilter,
+                               MainEngine)
+from projectq.cengines._replacer import NoGateDecompositionError
+from projectq.ops import (ClassicalInstructionGate, Command, DaggeredGate,
+                          TGate)
+
+
+class _DecompositionCycle(Exception):
+    """
+    Raised if the dry run of a decomposition needs to decompose a gate
+    whose cost is being estimated (i.e., if the decomposition rules are
+    cyclic).
+    """
+    pass
+
+
+class _DryRunReplacer(AutoReplacer):
+    """
+    AutoReplacer of the dry runs which records (instead of raising) that a
+    command cannot be decomposed into the target gate set, and drops the
+    command. The dry run hence always completes and leaves the pipeline in a
+    consistent state.
+    """
+    def __init__(self, rule_set, chooser):
+        AutoReplacer.__init__(self, rule_set, chooser)
+        self.failed = False
+
+    def _process_command(self, cmd):
+        try:
+            AutoReplacer._process_command(self, cmd)
+        except (NoGateDecompositionError, _DecompositionCycle):
+            self.failed = True
+
+
+class _DryRunBackend(BasicEngine):
+    """
+    Backend of the dry runs which passes all commands on to the
+    ResourceCounter of the current dry run.
+    """
+    def __init__(self):
+        BasicEngine.__init__(self)
+        self.counter = None
+
+    def new_counter(self):
+        """
+        Start counting with a new ResourceCounter (and return it).
+        """
+        self.counter = ResourceCounter()
+        self.counter.main_engine = self.main_engine
+        self.counter.is_last_engine = True
+        return self.counter
+
+    def is_available(self, cmd):
+        return True
+
+    def is_meta_tag_handler(self, tag):
+        return self.counter.is_meta_tag_handler(tag)
+
+    def receive(self, command_list):
+        self.counter.receive(command_list)
+
+
+class CostModelChooser(object):
+    """
+    Decomposition chooser (see AutoReplacer) which always chooses the
+    decomposition with the lowest cost in the target gate set.
+
+    The cost of a circuit is
+
+    .. code-block:: python
+
+        (gate_weight * number of gates
+         + controlled_gate_weight * number of gates with control qubits
+         + t_gate_weight * number of T and Tdag gates
+         + depth_weight * depth)
+
+    where classical instructions (allocation, measurement, ...) are not
+    counted.
+
+    Attributes:
+        costs (dict): Maps the keys of the decomposed gates (class, gate,
+            number of control qubits and number of qubits per register) to
+            the chosen decomposition and its cost.
+    """
+    def __init__(self, rule_set=None, is_available=None, gate_weight=1,
+                 controlled_gate_weight=10, t_gate_weight=0, depth_weight=0):
+        """
+        Initialize a CostModelChooser.
+
+        Args:
+            rule_set (DecompositionRuleSet): Decomposition rules which are
+                used to fully decompose a command during the dry runs.
+            is_available (function): Function which returns True if a
+                command is in the target gate set (and False if it has to be
+                decomposed).
+            gate_weight (float): Cost of a gate.
+            controlled_gate_weight (float): Additional cost of a gate with
+                control qubits (e.g., a CNOT).
+            t_gate_weight (float): Additional cost of a T or Tdag gate.
+            depth_weight (float): Cost per layer of the circuit.
+        """
+        self._rule_set = rule_set
+        self._is_available = is_available
+        self._weights = dict(gate_weight=gate_weight,
+                             controlled_gate_weight=controlled_gate_weight,
+                             t_gate_weight=t_gate_weight,
+                             depth_weight=depth_weight)
+        self._evaluating = set()  # keys of the gates in the current dry runs
+        self._dry_runs = []  # engines for the dry runs per nesting depth
+        self.costs = dict()
+
+    @property
+    def rule_set(self):
+        return self._rule_set
+
+    def for_target(self, rule_set, is_available):
+        """
+        Return a CostModelChooser with the same weights for the given
+        decomposition rules and target gate set.
+        """
+        return CostModelChooser(rule_set, is_available, **self._weights)
+
+    def get_cost(self, resource_counter):
+        """
+        Return the cost of the circuit counted by the resource counter.
+
+        Args:
+            resource_counter (ResourceCounter): Resource counter which
+                received the circuit.
+        """
+        cost = self._weights['depth_weight'] * resource_counter.depth_of_dag
+        for (gate, ctrl_cnt), num in resource_counter.gate_counts.items():
+            if isinstance(gate, ClassicalInstructionGate):
+                continue
+            gate_cost = self._weights['gate_weight']
+            if ctrl_cnt > 0:
+                gate_cost += self._weights['controlled_gate_weight']
+            if isinstance(gate, DaggeredGate):
+                gate = gate._gate
+            if isinstance(gate, TGate):
+                gate_cost += self._weights['t_gate_weight']
+            cost += num * gate_cost
+        return cost
+
+    def _get_dry_run_engine(self, depth):
+        """
+        Return the MainEngine for the dry runs at the given nesting depth.
+
+        The engines are created once and reused for all dry runs, since a
+        dry run may start further dry runs (one level deeper) while it is
+        running.
+        """
+        while len(self._dry_runs) <= depth:
+            is_available = self._is_available
+            self._dry_runs.append(MainEngine(
+                _DryRunBackend(),
+                [_DryRunReplacer(self._rule_set, self),
+                 InstructionFilter(lambda eng, cmd: is_available(cmd))],
+                verbose=True))
+        return self._dry_runs[depth]
+
+    def _estimate_cost(self, cmd, decomposition):
+        """
+        Return the cost of the fully decomposed circuit which results from
+        decomposing cmd using the given decomposition, or None if the
+        circuit cannot be decomposed into the target gate set.
+        """
+        eng = self._get_dry_run_engine(len(self._evaluating) - 1)
+        replacer = eng.next_engine
+        replacer.failed = False
+        counter = eng.backend.new_counter()
+        qubits = tuple(eng.allocate_qureg(len(qureg)) for qureg in cmd.qubits)
+        controls = eng.allocate_qureg(len(cmd.control_qubits))
+        decomposition.decompose(Command(eng, cmd.gate, qubits, controls))
+        eng.flush()
+        if replacer.failed:
+            return None
+        return self.get_cost(counter)
+
+    def __call__(self, cmd, decomposition_list):
+        """
+        Return the decomposition of cmd with the lowest cost.
+
+        Args:
+            cmd (Command): Command to decompose.
+            decomposition_list (list): Decompositions which can be used to
+                decompose cmd (see AutoReplacer).
+
+        Raises:
+            RuntimeError: If no rule set or target gate set was given.
+            NoGateDecompositionError: If none of the decompositions can be
+                decomposed into the target gate set.
+        """
+        if len(decomposition_list) == 1:
+            return decomposition_list[0]
+        if self._rule_set is None or self._is_available is None:
+            raise RuntimeError("The CostModelChooser requires a rule set "
+                               "and an is_available function.")
+        key = (type(cmd.gate), cmd.gate, len(cmd.control_qubits),
+               tuple(len(qureg) for qureg in cmd.qubits))
+        try:
+            decomposition, _ = self.costs[key]
+            if decomposition in decomposition_list:
+                return decomposition
+        except KeyError:
+            pass
+        except (TypeError, NotImplementedError):
+            # the gate is not hashable, so the costs cannot be cached
+            return decomposition_list[0]
+        if key in self._evaluating:
+            raise _DecompositionCycle()
+
+        self._evaluating.add(key)
+        try:
+            costs = [self._estimate_cost(cmd, decomposition)
+                     for decomposition in decomposition_list]
+        finally:
+            self._evaluating.remove(key)
+        candidates = [(cost, i) for i, cost in enumerate(costs)
+                      if cost is not None]
+        if len(candidates) == 0:
+            if len(self._evaluating) > 0:
+                raise _DecompositionCycle()
+            raise NoGateDecompositionError(
+                "\nNo decomposition of " + str(cmd) + " into the target "
+                "gate set found!")
+        cost, index = min(candidates)
+        # inside of a dry run, a decomposition may only have failed because
+        # it needs a gate which is being evaluated --> don't cache the choice
+        if len(candidates) == len(costs) or len(self._evaluating) == 0:
+            self.costs[key] = (decomposition_list[index], cost)
+        return decomposition_list[index]
@@ -0,0 +1,184 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for projectq.setups.cost_chooser."""
+
+import pytest
+
+import projectq
+from projectq.cengines import (AutoReplacer, DecompositionRule,
+                               DecompositionRuleSet, DummyEngine,
+                               InstructionFilter)
+from projectq.cengines._replacer import NoGateDecompositionError
+from projectq.ops import (BasicGate, ClassicalInstructionGate, CNOT, H,
+                          Measure, Rx, Rz, T, Toffoli, X)
+import projectq.setups.restrictedgateset as restrictedgateset
+
+from projectq.setups import cost_chooser
+
+
+class _Gate(BasicGate):
+    def __str__(self):
+        return type(self).__name__
+
+
+class CostlyGate(_Gate):
+    pass
+
+
+class MidGate(_Gate):
+    pass
+
+
+class CyclicGate(_Gate):
+    pass
+
+
+def _target(cmd):
+    return not isinstance(cmd.gate, _Gate)
+
+
+def _rule(gate_class, gates, calls=None):
+    def decompose(cmd):
+        if calls is not None:
+            calls.append(gate_class)
+        qubit0, qubit1 = cmd.qubits
+        for gate in gates:
+            if gate is CNOT or isinstance(gate, _Gate):
+                gate | (qubit0, qubit1)
+            else:
+                gate | qubit0
+    return DecompositionRule(gate_class, decompose, lambda cmd: True)
+
+
+def _run(rule_set, chooser):
+    backend = DummyEngine(save_commands=True)
+    eng = projectq.MainEngine(backend, [
+        AutoReplacer(rule_set, chooser),
+        InstructionFilter(lambda eng, cmd: _target(cmd))])
+    qubit0 = eng.allocate_qubit()
+    qubit1 = eng.allocate_qubit()
+    CostlyGate() | (qubit0, qubit1)
+    CostlyGate() | (qubit1, qubit0)
+    eng.flush()
+    return [len(cmd.control_qubits) * "C" + str(cmd.gate)
+            for cmd in backend.received_commands
+            if not isinstance(cmd.gate, ClassicalInstructionGate)]
+
+
+def test_cost_model_chooser_fully_expanded_cost():
+    calls = []
+    # MidGate looks cheap, but it expands into 5 CNOTs
+    rule_set = DecompositionRuleSet(rules=[
+        _rule(CostlyGate, [MidGate()], calls),
+        _rule(CostlyGate, [CNOT, CNOT], calls),
+        _rule(MidGate, 5 * [CNOT])])
+    chooser = cost_chooser.CostModelChooser(rule_set, _target)
+    assert _run(rule_set, chooser) == 4 * ["CX"]
+    # both rules have been dry run once, then the cached choice is used
+    assert len(calls) == 2 + 2
+    key = (CostlyGate, CostlyGate(), 0, (1, 1))
+    assert chooser.costs[key][1] == 2 * 11
+    assert _run(rule_set, lambda cmd, decomps: decomps[0]) == 10 * ["CX"]
+
+
+def test_cost_model_chooser_weights():
+    rule_set = DecompositionRuleSet(rules=[
+        _rule(CostlyGate, 3 * [T]),
+        _rule(CostlyGate, 4 * [H])])
+    chooser = cost_chooser.CostModelChooser(rule_set, _target)
+    assert _run(rule_set, chooser) == 6 * ["T"]
+    chooser = cost_chooser.CostModelChooser(rule_set, _target,
+                                            t_gate_weight=1)
+    assert _run(rule_set, chooser) == 8 * ["H"]
+    # depth: the CNOTs act on both qubits, the H gates only on one
+    rule_set = DecompositionRuleSet(rules=[
+        _rule(CostlyGate, [CNOT, CNOT]),
+        _rule(CostlyGate, 3 * [H])])
+    chooser = cost_chooser.CostModelChooser(rule_set, _target,
+                                            controlled_gate_weight=0,
+                                            depth_weight=1)
+    assert _run(rule_set, chooser) == 4 * ["CX"]
+
+
+def test_cost_model_chooser_cyclic_rules():
+    rule_set = DecompositionRuleSet(rules=[
+        _rule(CostlyGate, [MidGate()]),
+        _rule(CostlyGate, 3 * [H]),
+        _rule(MidGate, [CostlyGate()]),
+        _rule(MidGate, [CyclicGate()]),
+        _rule(MidGate, [X]),
+        _rule(CyclicGate, [MidGate()]),
+        _rule(CyclicGate, [CostlyGate()])])
+    chooser = cost_chooser.CostModelChooser(rule_set, _target)
+    assert _run(rule_set, chooser) == 2 * ["X"]
+
+
+def test_cost_model_chooser_no_decomposition():
+    rule_set = DecompositionRuleSet(rules=[
+        _rule(CostlyGate, [MidGate()]),
+        _rule(CostlyGate, [CyclicGate()]),
+        _rule(CyclicGate, [CostlyGate()])])
+    chooser = cost_chooser.CostModelChooser(rule_set, _target)
+    with pytest.raises(NoGateDecompositionError):
+        _run(rule_set, chooser)
+
+
+def test_cost_model_chooser_failed_dry_run():
+    def decompose_with_ancilla(cmd):
+        ancilla = cmd.engine.allocate_qubit()
+        CNOT | (cmd.qubits[0], ancilla)
+        MidGate() | (ancilla, cmd.qubits[1])  # cannot be decomposed
+        CNOT | (cmd.qubits[0], ancilla)
+        del ancilla
+
+    rule_set = DecompositionRuleSet(rules=[
+        DecompositionRule(CostlyGate, decompose_with_ancilla),
+        _rule(CostlyGate, 3 * [H])])
+    chooser = cost_chooser.CostModelChooser(rule_set, _target)
+    assert _run(rule_set, chooser) == 6 * ["H"]
+    # all dry runs share one engine, which has deallocated all its qubits
+    assert len(chooser._dry_runs) == 1
+    assert len(chooser._dry_runs[0].active_qubits) == 0
+
+
+def test_cost_model_chooser_requires_target():
+    rule_set = DecompositionRuleSet(rules=[
+        _rule(CostlyGate, [X]),
+        _rule(CostlyGate, [H])])
+    chooser = cost_chooser.CostModelChooser()
+    with pytest.raises(RuntimeError):
+        _run(rule_set, chooser)
+    # no choice to make
+    rule_set = DecompositionRuleSet(rules=[_rule(CostlyGate, [X])])
+    assert _run(rule_set, chooser) == 2 * ["X"]
+
+
+def test_cost_model_chooser_restricted_gate_set():
+    counts = []
+    for chooser in [restrictedgateset.default_chooser,
+                    cost_chooser.CostModelChooser(t_gate_weight=5)]:
+        engine_list = restrictedgateset.get_engine_list(
+            one_qubit_gates=(Rz, Rx, H), two_qubit_gates=(CNOT,),
+            compiler_chooser=chooser)
+        backend = DummyEngine(save_commands=True)
+        eng = projectq.MainEngine(backend, engine_list)
+        qureg = eng.allocate_qureg(3)
+        Toffoli | (qureg[0], qureg[1], qureg[2])
+        Rx(0.3) | qureg[0]
+        eng.flush()
+        counts.append(len(backend.received_commands))
+        for qubit in qureg:
+            Measure | qubit
+    assert counts[1] <= counts[0]
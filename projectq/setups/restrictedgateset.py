@@ -29,6 +29,7 @@ from projectq.cengines import (AutoReplacer, DecompositionRuleSet,
                                InstructionFilter, LocalOptimizer, TagRemover)
 from projectq.ops import (BasicGate, BasicMathGate, ClassicalInstructionGate,
                           CNOT, ControlledGate, get_inverse, QFT, Swap)
+from projectq.setups.cost_chooser import CostModelChooser
 
 
 def high_level_gates(eng, cmd):
@@ -106,7 +107,9 @@ def get_engine_list(one_qubit_gates="any",
                          which are equal to it. If the gate is a class, it
                          allows all instances of this class.
         compiler_chooser:function selecting the decomposition to use in the
-                         Autoreplacer engine
+                         Autoreplacer engine. A CostModelChooser without rule
+                         set chooses the decompositions with the lowest cost
+                         in the gate set given by the other arguments.
     Raises:
         TypeError: If input is for the gates is not "any" or a tuple. Also if
                    element within tuple is not a class or instance of BasicGate
@@ -202,6 +205,11 @@ def get_engine_list(one_qubit_gates="any",
             return True
         return False
 
+    if (isinstance(compiler_chooser, CostModelChooser) and
+            compiler_chooser.rule_set is None):
+        compiler_chooser = compiler_chooser.for_target(
+            rule_set, lambda cmd: low_level_gates(None, cmd))
+
     return [
         AutoReplacer(rule_set, compiler_chooser),
         TagRemover(),
@@ -0,0 +1,41 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Tests that importing ProjectQ does not import its optional dependencies.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import projectq
+
+_SCRIPT = """
+import json, sys
+import projectq
+import projectq.backends, projectq.cengines, projectq.ops
+print(json.dumps([name for name in ("matplotlib", "requests", "networkx")
+                  if name in sys.modules]))
+"""
+
+
+def test_import_does_not_load_optional_dependencies():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(projectq.__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([root, env.get("PYTHONPATH", "")])
+    output = subprocess.check_output([sys.executable, "-c", _SCRIPT],
+                                     env=env, cwd=root)
+    assert json.loads(output.decode().strip().splitlines()[-1]) == []
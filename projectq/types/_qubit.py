@@ -41,6 +41,8 @@ class BasicQubit(object):
 
     They have an id and a reference to the owning engine.
     """
+    __slots__ = ('id', 'engine', '__weakref__')
+
     def __init__(self, engine, idx):
         """
         Initialize a BasicQubit object.
@@ -118,6 +120,8 @@ class Qubit(BasicQubit):
     Thus the qubit is not copyable; only returns a reference to the same
     object.
     """
+    __slots__ = ()
+
     def __del__(self):
         """
         Destroy the qubit and deallocate it (automatically).
@@ -164,8 +168,14 @@ class WeakQubitRef(BasicQubit):
     them along the compiler pipeline, while the actual qubit objects may be
     garbage-collected (and, thus, cleaned up early). Otherwise there is no
     difference between a WeakQubitRef and a Qubit object.
+
+    Note:
+        WeakQubitRefs are shared between commands which act on the same
+        qubits (e.g., a command and its inverse). Engines which need to
+        change the id or engine of a qubit must do so on a copy of the
+        command (see Command.__deepcopy__).
     """
-    pass
+    __slots__ = ()
 
 
 class Qureg(list):